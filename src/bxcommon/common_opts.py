@@ -65,6 +65,11 @@ class CommonOpts:
     dump_removed_short_ids: bool
     dump_removed_short_ids_path: str
     enable_buffered_send: bool
+    enable_adaptive_buffered_send: bool
+    track_detailed_sent_messages: bool
+    output_buffer_high_watermark_bytes: int
+    output_buffer_low_watermark_bytes: int
+    use_timing_wheel_alarm_queue: bool
     use_extensions: bool
     import_extensions: bool
     thread_pool_parallelism_degree: int
@@ -25,7 +25,11 @@ from bxcommon.utils import memory_utils
 from bxcommon.utils.alarm_queue import AlarmId
 from bxcommon.utils.buffers.input_buffer import InputBuffer
 from bxcommon.utils.buffers.output_buffer import OutputBuffer
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
+from bxcommon.utils.read_budget import ReadBudget
 from bxcommon.utils.stats import hooks, stats_format
+from bxcommon.utils.stats.measurement_type import MeasurementType
 from bxutils import log_messages
 from bxutils import logging
 from bxutils.constants import HAS_PREFIX
@@ -37,6 +41,8 @@ if TYPE_CHECKING:
     # noinspection PyUnresolvedReferences
     # pylint: disable=ungrouped-imports,cyclic-import
     from bxcommon.connections.abstract_node import AbstractNode
+    from bxcommon.services.message_batch_service import MessageBatchService
+    from bxcommon.utils.buffers.message_tracker import MessageTracker, CompactMessageTracker
 
 logger = logging.get_logger(__name__)
 memory_logger = logging.get_logger(LogRecordType.BxMemory, __name__)
@@ -64,6 +70,11 @@ class AbstractConnection(Generic[Node]):
     # performance critical attribute, has been pulled out of connection state
     established: bool
 
+    # processes the input in batches once the connection is established, if the connection sets one
+    message_batch_service: Optional["MessageBatchService"] = None
+    # latest ping/pong round trip time, if measured by the connection
+    ping_latency: Optional[float] = None
+
     def __init__(self, socket_connection: AbstractSocketConnectionProtocol, node: Node) -> None:
         self.socket_connection = socket_connection
         self.file_no = socket_connection.file_no
@@ -98,6 +109,19 @@ class AbstractConnection(Generic[Node]):
         self.message_factory = self.connection_message_factory()
         self.message_handlers = {}
 
+        # copies of recently received messages dropped by `AbstractNode.duplicate_message_filter`
+        self.duplicate_messages_dropped = 0
+
+        self.read_budget = ReadBudget()
+        self.has_pending_input = False
+        self.reading_paused_for_backlog = False
+
+        # output backlog limits, only checked while the socket has paused writing
+        self.output_high_watermark = node.opts.output_buffer_high_watermark_bytes
+        self.output_low_watermark = node.opts.output_buffer_low_watermark_bytes
+        self.writing_paused = False
+        self.output_congested = False
+
         self.log_throughput = True
 
         self.pong_message = None
@@ -169,6 +193,17 @@ class AbstractConnection(Generic[Node]):
     def log(self, level: LogLevel, message, *args, **kwargs):
         self._log_message(level, message, *args, **kwargs)
 
+    @property
+    def message_tracker(self) -> Optional[Union["MessageTracker", "CompactMessageTracker"]]:
+        """
+        Tracker of the messages in `outputbuf`, if the connection keeps one.
+        """
+        return self.outputbuf.message_tracker
+
+    @message_tracker.setter
+    def message_tracker(self, message_tracker: Optional[Union["MessageTracker", "CompactMessageTracker"]]) -> None:
+        self.outputbuf.set_message_tracker(message_tracker)
+
     def is_active(self) -> bool:
         """
         Indicates whether the connection is established and ready for normal messages.
@@ -195,6 +230,7 @@ class AbstractConnection(Generic[Node]):
             self.state |= ConnectionState.HELLO_ACKD
             self.state |= ConnectionState.ESTABLISHED
             self.established = True
+            self.node.connection_pool.on_connection_updated(self)
 
             self.log_info("Connection established.")
 
@@ -229,22 +265,92 @@ class AbstractConnection(Generic[Node]):
 
     def advance_sent_bytes(self, bytes_sent):
         self.advance_bytes_on_buffer(self.outputbuf, bytes_sent)
+        if self.output_congested:
+            self.update_output_backlog_state()
+
+    def on_writing_paused(self) -> None:
+        self.writing_paused = True
+        self.update_output_backlog_state()
+
+    def on_writing_resumed(self) -> None:
+        self.writing_paused = False
+
+    def update_output_backlog_state(self) -> None:
+        """
+        Marks the connection as congested once the output buffer grows past `output_high_watermark`,
+        until it drains below `output_low_watermark`. Queued messages of droppable classes that
+        waited too long are dropped while the connection is congested.
+        """
+        if not self.output_congested:
+            if self.outputbuf.length > self.output_high_watermark:
+                self.log_debug(
+                    "Output buffer is congested. Backlog: {} bytes by priority: {}.",
+                    self.outputbuf.length,
+                    self.outputbuf.get_queued_bytes_by_priority()
+                )
+                self.output_congested = True
+        elif self.outputbuf.length < self.output_low_watermark:
+            self.log_debug("Output buffer is no longer congested. Backlog: {} bytes.", self.outputbuf.length)
+            self.output_congested = False
+
+        if self.output_congested:
+            dropped_messages = self.outputbuf.drop_expired_messages()
+            if dropped_messages:
+                self.log_trace("Dropped {} expired messages from output buffer.", len(dropped_messages))
 
     def enqueue_msg(self, msg: AbstractMessage, prepend: bool = False):
         """
         Enqueues the contents of a Message instance, msg, to our outputbuf and attempts to send it if the underlying
         socket has room in the send buffer.
 
+        Messages are serialized with `get_versioned_message_bytes` and passed on to `enqueue_serialized_msg`.
+        Override that method instead of this one to change how messages are enqueued.
+
         :param msg: message
         :param prepend: if the message should be bumped to the front of the outputbuf
         """
+        if not self.is_alive():
+            return
+
+        self.enqueue_serialized_msg(msg, self.get_versioned_message_bytes(msg), prepend)
+
+    def enqueue_serialized_msg(
+        self,
+        msg: AbstractMessage,
+        msg_bytes: Union[bytearray, memoryview, SegmentedBuffer],
+        prepend: bool = False
+    ):
+        """
+        Enqueues msg, already converted and serialized into msg_bytes with `get_versioned_message_bytes`.
+        Both `enqueue_msg` and broadcasts go through this method, which makes it the override point
+        for connections that change how messages are enqueued. On broadcast, msg_bytes is a single
+        buffer shared across all connections of the same message version.
+
+        :param msg: message
+        :param msg_bytes: serialized versioned message, must not be modified after enqueueing
+        :param prepend: if the message should be bumped to the front of the outputbuf
+        """
         self._log_message(msg.log_level(), "Enqueued message: {}", msg)
-        self.enqueue_msg_bytes(msg.rawbytes(), prepend)
+        self.enqueue_msg_bytes(msg_bytes, prepend, msg.output_priority())
+
+    def get_message_version(self) -> Optional[int]:
+        """
+        :return: protocol version messages are converted to before being sent on this connection,
+        or None if messages are sent as is
+        """
+        return None
+
+    def get_versioned_message_bytes(self, msg: AbstractMessage) -> Union[memoryview, SegmentedBuffer]:
+        """
+        Serializes msg in the version returned by `get_message_version`.
+        """
+        return msg.rawbytes()
 
     def enqueue_msg_bytes(
         self,
-        msg_bytes: Union[bytearray, memoryview],
+        msg_bytes: Union[bytearray, memoryview, SegmentedBuffer],
         prepend: bool = False,
+        priority: OutputPriority = OutputPriority.TX,
     ):
         """
         Enqueues the raw bytes of a message, msg_bytes, to our outputbuf and attempts to send it if the
@@ -255,6 +361,7 @@ class AbstractConnection(Generic[Node]):
 
         :param msg_bytes: message bytes
         :param prepend: if the message should be bumped to the front of the outputbuf
+        :param priority: output queue class of the message, ignored if prepend is set
         """
 
         if not self.socket_connection.alive:
@@ -265,10 +372,13 @@ class AbstractConnection(Generic[Node]):
         if prepend:
             self.outputbuf.prepend_msgbytes(msg_bytes)
         else:
-            self.outputbuf.enqueue_msgbytes(msg_bytes)
+            self.outputbuf.enqueue_msgbytes(msg_bytes, priority)
 
         self.socket_connection.send()
 
+        if self.writing_paused:
+            self.update_output_backlog_state()
+
     def pre_process_msg(self) -> ConnectionMessagePreview:
         is_full_msg, msg_type, payload_len = self.message_factory.get_message_header_preview_from_input_buffer(
             self.inputbuf
@@ -291,23 +401,40 @@ class AbstractConnection(Generic[Node]):
         """
         Processes the next bytes on the socket's inputbuffer.
         Returns 0 in order to avoid being rescheduled if this was an alarm.
+
+        Processing stops once the connection read budget is used up, in which case
+        `has_pending_input` is set and the rest of the input is left on the buffer.
         """
         # pylint: disable=too-many-return-statements, too-many-branches, too-many-statements
+        self.has_pending_input = False
+        message_batch_service = self.message_batch_service
+        if message_batch_service is not None and self.established:
+            message_batch_service.process_message_batch()
+            return
 
         logger.trace("START PROCESSING from {}", self)
 
         start_time = time.time()
         messages_processed = defaultdict(int)
         total_bytes_processed = 0
+        # frames dropped without being handled, which still count toward the read budget
+        messages_dropped = 0
 
         self.processing_message_index = 0
 
         while True:
+            if self.read_budget.is_exhausted(
+                start_time, self.processing_message_index + messages_dropped, total_bytes_processed
+            ):
+                self.has_pending_input = self.inputbuf.length > 0
+                break
+
             input_buffer_len_before = self.inputbuf.length
             is_full_msg = False
             payload_len = None
             msg = None
             msg_type = None
+            duplicate_filter_key = None
 
             try:
                 # abort message processing if connection has been closed
@@ -318,6 +445,7 @@ class AbstractConnection(Generic[Node]):
 
                 if not should_process and is_full_msg:
                     self.pop_next_bytes(payload_len)
+                    messages_dropped += 1
                     continue
 
                 self.message_validator.validate(
@@ -333,6 +461,14 @@ class AbstractConnection(Generic[Node]):
                 if not is_full_msg:
                     break
 
+                if self.established:
+                    duplicate_filter_key = self._get_duplicate_filter_key(msg_type, payload_len, self.inputbuf)
+                    if self._is_duplicate_message(duplicate_filter_key, msg_type):
+                        self.pop_next_bytes(payload_len)
+                        total_bytes_processed += self.message_factory.base_message_type.HEADER_LENGTH + payload_len
+                        messages_dropped += 1
+                        continue
+
                 msg = self.pop_next_message(payload_len)
                 total_bytes_processed += len(msg.rawbytes())
 
@@ -350,50 +486,9 @@ class AbstractConnection(Generic[Node]):
                     self.mark_for_close()
                     return
 
-                if self.log_throughput:
-                    hooks.add_throughput_event(
-                        NetworkDirection.INBOUND,
-                        msg_type,
-                        len(msg.rawbytes()),
-                        self.peer_desc,
-                        self.peer_id
-                    )
-
-                if not logger.isEnabledFor(msg.log_level()) and logger.isEnabledFor(LogLevel.INFO):
-                    self._debug_message_tracker[msg_type] += 1
-                elif len(self._debug_message_tracker) > 0:
-                    self.log_debug(
-                        "Processed the following messages types: {} over {:.2f} seconds.",
-                        self._debug_message_tracker,
-                        time.time() - self._last_debug_message_log_time
-                    )
-                    self._debug_message_tracker.clear()
-                    self._last_debug_message_log_time = time.time()
-
-                self._log_message(msg.log_level(), "Processing message: {}", msg)
-
-                if msg_type in self.message_handlers:
-                    msg_handler = self.message_handlers[msg_type]
-
-                    handler_start = time.time()
-                    msg_handler(msg)
-                    performance_utils.log_operation_duration(
-                        msg_handling_logger,
-                        "Single message handler",
-                        handler_start,
-                        constants.MSG_HANDLERS_CYCLE_DURATION_WARN_THRESHOLD_S,
-                        connection=self,
-                        handler=msg_handler,
-                        message=msg
-                    )
+                self._handle_message(msg_type, msg, len(msg.rawbytes()))
                 messages_processed[msg_type] += 1
 
-            # TODO: Investigate possible solutions to recover from PayloadLenError errors
-            except PayloadLenError as e:
-                self.log_error(log_messages.COULD_NOT_PARSE_MESSAGE, e.msg)
-                self.mark_for_close()
-                return
-
             except MemoryError as e:
                 self.log_error(log_messages.OUT_OF_MEMORY, e, exc_info=True)
                 self.log_debug(
@@ -402,83 +497,22 @@ class AbstractConnection(Generic[Node]):
                 )
                 raise
 
-            except UnauthorizedMessageError as e:
-                self.log_error(log_messages.UNAUTHORIZED_MESSAGE, e.msg.MESSAGE_TYPE, self.peer_desc)
-                self.log_debug(
-                    "Failed message bytes: {}",
-                    self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len)
-                )
-
-                # give connection a chance to restore its state and get ready to process next message
-                self.clean_up_current_msg(payload_len, input_buffer_len_before == self.inputbuf.length)
-
-                if self._report_bad_message():
-                    return
-
-            except MessageValidationError as e:
-                if self.node.NODE_TYPE not in NodeType.GATEWAY_TYPE:
-                    if isinstance(e, ControlFlagValidationError):
-                        if e.is_cancelled_cut_through:
-                            self.log_debug(
-                                "Message validation failed for {} message: {}. Probably cut-through cancellation",
-                                msg_type, e.msg)
-                        else:
-                            self.log_warning(log_messages.MESSAGE_VALIDATION_FAILED, msg_type, e.msg)
-                    else:
-                        self.log_warning(log_messages.MESSAGE_VALIDATION_FAILED, msg_type, e.msg)
-                else:
-                    self.log_debug("Message validation failed for {} message: {}.", msg_type, e.msg)
-                self.log_debug("Failed message bytes: {}",
-                               self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
-
-                if is_full_msg:
-                    self.clean_up_current_msg(payload_len, input_buffer_len_before == self.inputbuf.length)
-                else:
-                    self.log_error(log_messages.UNABLE_TO_RECOVER_PARTIAL_MESSAGE)
-                    self.mark_for_close()
-                    return
-
-                if self._report_bad_message():
-                    return
-
-            except NonVersionMessageError as e:
-                if e.is_known:
-                    self.log_debug("Received invalid handshake request on {}:{}, {}", self.peer_ip, self.peer_port,
-                                   e.msg)
-                else:
-                    self.log_warning(log_messages.INVALID_HANDSHAKE, self.peer_ip, self.peer_port, e.msg)
-                self.log_debug("Failed message bytes: {}",
-                               self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
-
-                self.mark_for_close()
-                return
-
             # TODO: Throw custom exception for any errors that come from input that has not been
             # validated and only catch that subclass of exceptions
             # pylint: disable=broad-except
             except Exception as e:
-
-                # Attempt to recover connection by removing bad full message
-                if is_full_msg:
-                    self.log_error(log_messages.TRYING_TO_RECOVER_MESSAGE, e, exc_info=True)
-                    self.log_debug("Failed message bytes: {}",
-                                   self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
-
-                    # give connection a chance to restore its state and get ready to process next message
-                    self.clean_up_current_msg(payload_len, input_buffer_len_before == self.inputbuf.length)
-
-                # Connection is unable to recover from message processing error if incomplete message is received
-                else:
-                    self.log_error(log_messages.UNABLE_TO_RECOVER_FULL_MESSAGE, e, exc_info=True)
-                    self.log_debug("Failed message bytes: {}",
-                                   self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
-                    self.mark_for_close()
-                    return
-
-                if self._report_bad_message():
+                if self._handle_message_processing_error(
+                    e,
+                    msg,
+                    msg_type,
+                    is_full_msg=is_full_msg,
+                    payload_len=payload_len,
+                    input_buffer_len_before=input_buffer_len_before
+                ):
                     return
             else:
                 self.num_bad_messages = 0
+                self._remember_handled_message(duplicate_filter_key)
 
             self.processing_message_index += 1
 
@@ -491,6 +525,113 @@ class AbstractConnection(Generic[Node]):
         logger.trace("DONE PROCESSING from {}. Bytes processed: {}. Messages processed: {}. Duration: {}",
                      self, total_bytes_processed, messages_processed, stats_format.duration(duration_ms))
 
+    def update_reading_state(self) -> None:
+        """
+        Pauses reading from the socket while the unprocessed input left over by the read
+        budget is above `constants.INBOUND_BACKLOG_PAUSE_READING_THRESHOLD_BYTES`, and
+        resumes it once the backlog drops below `constants.INBOUND_BACKLOG_RESUME_READING_THRESHOLD_BYTES`.
+        Bytes the socket has already read while reading is paused are still added to the input buffer.
+        """
+        if not self.is_alive():
+            return
+
+        backlog = self.inputbuf.length if self.has_pending_input else 0
+        if not self.reading_paused_for_backlog:
+            if backlog > constants.INBOUND_BACKLOG_PAUSE_READING_THRESHOLD_BYTES:
+                self.log_debug("Pausing reading from socket. Unprocessed input backlog: {} bytes.", backlog)
+                self.reading_paused_for_backlog = True
+                self.socket_connection.pause_reading_for_backlog()
+        elif backlog < constants.INBOUND_BACKLOG_RESUME_READING_THRESHOLD_BYTES:
+            self.log_debug("Resuming reading from socket. Unprocessed input backlog: {} bytes.", backlog)
+            self.reading_paused_for_backlog = False
+            self.socket_connection.resume_reading_for_backlog()
+
+    def peek_duplicate_filter_key(
+        self, _msg_type: bytes, _payload_len: int, _input_buffer: InputBuffer
+    ) -> Optional[bytes]:
+        """
+        Returns a key identifying copies of the full message at the start of the input buffer,
+        read from its bytes without parsing it, or None if copies of the message should
+        not be dropped.
+        """
+        return None
+
+    def _handle_message(self, msg_type: bytes, msg: AbstractMessage, received_bytes: int) -> None:
+        """
+        Records and logs a parsed message and passes it to its handler.
+        """
+        self._log_inbound_throughput(msg_type, received_bytes)
+
+        if not logger.isEnabledFor(msg.log_level()) and logger.isEnabledFor(LogLevel.INFO):
+            self._debug_message_tracker[msg_type] += 1
+        elif len(self._debug_message_tracker) > 0:
+            self.log_debug(
+                "Processed the following messages types: {} over {:.2f} seconds.",
+                self._debug_message_tracker,
+                time.time() - self._last_debug_message_log_time
+            )
+            self._debug_message_tracker.clear()
+            self._last_debug_message_log_time = time.time()
+
+        self._log_message(msg.log_level(), "Processing message: {}", msg)
+
+        if msg_type in self.message_handlers:
+            msg_handler = self.message_handlers[msg_type]
+
+            handler_start = time.time()
+            msg_handler(msg)
+            performance_utils.log_operation_duration(
+                msg_handling_logger,
+                "Single message handler",
+                handler_start,
+                constants.MSG_HANDLERS_CYCLE_DURATION_WARN_THRESHOLD_S,
+                connection=self,
+                handler=msg_handler,
+                message=msg
+            )
+
+    def _log_inbound_throughput(self, msg_type: bytes, received_bytes: int) -> None:
+        if self.log_throughput:
+            hooks.add_throughput_event(
+                NetworkDirection.INBOUND,
+                msg_type,
+                received_bytes,
+                self.peer_desc,
+                self.peer_id
+            )
+
+    def _get_duplicate_filter_key(
+        self, msg_type: bytes, payload_len: int, input_buffer: InputBuffer
+    ) -> Optional[bytes]:
+        if self.node.duplicate_message_filter is None:
+            return None
+        return self.peek_duplicate_filter_key(msg_type, payload_len, input_buffer)
+
+    def _is_duplicate_message(self, key: Optional[bytes], msg_type: bytes) -> bool:
+        """
+        Checks if a message is a copy of a recently handled message, as recorded by the duplicate
+        message filter of the node. The caller drops the message without parsing it if it is.
+        """
+        duplicate_message_filter = self.node.duplicate_message_filter
+        if key is None or duplicate_message_filter is None or key not in duplicate_message_filter:
+            return False
+
+        # keep keys of messages that are still received in the filter
+        duplicate_message_filter.add(key)
+        self.duplicate_messages_dropped += 1
+        hooks.add_measurement(self.peer_desc, MeasurementType.DUPLICATES_DROPPED, 1, self.peer_id)
+        self.log_trace("Dropped duplicate message of type {} before parsing.", msg_type)
+        return True
+
+    def _remember_handled_message(self, key: Optional[bytes]) -> None:
+        """
+        Records a message in the duplicate message filter of the node once it has been handled
+        without errors, so that copies of it received later are dropped.
+        """
+        duplicate_message_filter = self.node.duplicate_message_filter
+        if key is not None and duplicate_message_filter is not None:
+            duplicate_message_filter.add(key)
+
     def pop_next_message(self, payload_len: int) -> AbstractMessage:
         """
         Pop the next full message off of the buffer given the message length.
@@ -501,9 +642,13 @@ class AbstractConnection(Generic[Node]):
         :param payload_len: length of payload
         :return: message object
         """
-        return self.message_factory.create_message_from_buffer(
-            self.pop_next_bytes(payload_len)
-        )
+        return self.parse_message(self.pop_next_bytes(payload_len))
+
+    def parse_message(self, msg_bytes: Union[bytearray, memoryview]) -> AbstractMessage:
+        """
+        Parses the bytes of a full message received on this connection.
+        """
+        return self.message_factory.create_message_from_buffer(msg_bytes)
 
     def pop_next_bytes(self, payload_len: int) -> Union[memoryview, bytearray, bytes]:
         msg_len = self.message_factory.base_message_type.HEADER_LENGTH + payload_len
@@ -678,6 +823,7 @@ class AbstractConnection(Generic[Node]):
             self.node.connection_pool.update_connection_type(self, peer_info.connection_type)
         self.account_id = peer_info.account_id
         self._is_authenticated = True
+        self.node.connection_pool.on_connection_updated(self)
 
     async def wait_closed(self):
         if self._close_waiter is not None:
@@ -697,6 +843,7 @@ class AbstractConnection(Generic[Node]):
         if not self._is_authenticated:
             self.account_id = account_id
         self.tier_name = tier_name
+        self.node.connection_pool.on_connection_updated(self)
 
     def get_backlog_size(self) -> int:
         output_buffer_backlog = self.outputbuf.length
@@ -738,6 +885,99 @@ class AbstractConnection(Generic[Node]):
             self.num_bad_messages += 1
             return False
 
+    def _handle_message_processing_error(
+        self,
+        e: Exception,
+        msg: Optional[AbstractMessage],
+        msg_type: Optional[bytes],
+        *,
+        is_full_msg: bool,
+        payload_len: Optional[int],
+        input_buffer_len_before: int,
+    ) -> bool:
+        """
+        Logs an error raised while processing a message and attempts to recover the connection.
+
+        :return: if message processing should be aborted
+        """
+        # pylint: disable=too-many-return-statements
+        # TODO: Investigate possible solutions to recover from PayloadLenError errors
+        if isinstance(e, PayloadLenError):
+            self.log_error(log_messages.COULD_NOT_PARSE_MESSAGE, e.msg)
+            self.mark_for_close()
+            return True
+
+        if isinstance(e, UnauthorizedMessageError):
+            self.log_error(log_messages.UNAUTHORIZED_MESSAGE, e.msg.MESSAGE_TYPE, self.peer_desc)
+            self.log_debug(
+                "Failed message bytes: {}",
+                self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len)
+            )
+
+            # give connection a chance to restore its state and get ready to process next message
+            self.clean_up_current_msg(payload_len, input_buffer_len_before == self.inputbuf.length)
+
+            return self._report_bad_message()
+
+        if isinstance(e, MessageValidationError):
+            self._log_message_validation_error(e, msg_type)
+            self.log_debug("Failed message bytes: {}",
+                           self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
+
+            if is_full_msg:
+                self.clean_up_current_msg(payload_len, input_buffer_len_before == self.inputbuf.length)
+            else:
+                self.log_error(log_messages.UNABLE_TO_RECOVER_PARTIAL_MESSAGE)
+                self.mark_for_close()
+                return True
+
+            return self._report_bad_message()
+
+        if isinstance(e, NonVersionMessageError):
+            if e.is_known:
+                self.log_debug("Received invalid handshake request on {}:{}, {}", self.peer_ip, self.peer_port,
+                               e.msg)
+            else:
+                self.log_warning(log_messages.INVALID_HANDSHAKE, self.peer_ip, self.peer_port, e.msg)
+            self.log_debug("Failed message bytes: {}",
+                           self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
+
+            self.mark_for_close()
+            return True
+
+        # Attempt to recover connection by removing bad full message
+        if is_full_msg:
+            self.log_error(log_messages.TRYING_TO_RECOVER_MESSAGE, e, exc_info=True)
+            self.log_debug("Failed message bytes: {}",
+                           self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
+
+            # give connection a chance to restore its state and get ready to process next message
+            self.clean_up_current_msg(payload_len, input_buffer_len_before == self.inputbuf.length)
+
+        # Connection is unable to recover from message processing error if incomplete message is received
+        else:
+            self.log_error(log_messages.UNABLE_TO_RECOVER_FULL_MESSAGE, e, exc_info=True)
+            self.log_debug("Failed message bytes: {}",
+                           self._get_last_msg_bytes(msg, input_buffer_len_before, payload_len))
+            self.mark_for_close()
+            return True
+
+        return self._report_bad_message()
+
+    def _log_message_validation_error(self, e: MessageValidationError, msg_type: Optional[bytes]) -> None:
+        if self.node.NODE_TYPE not in NodeType.GATEWAY_TYPE:
+            if isinstance(e, ControlFlagValidationError):
+                if e.is_cancelled_cut_through:
+                    self.log_debug(
+                        "Message validation failed for {} message: {}. Probably cut-through cancellation",
+                        msg_type, e.msg)
+                else:
+                    self.log_warning(log_messages.MESSAGE_VALIDATION_FAILED, msg_type, e.msg)
+            else:
+                self.log_warning(log_messages.MESSAGE_VALIDATION_FAILED, msg_type, e.msg)
+        else:
+            self.log_debug("Message validation failed for {} message: {}.", msg_type, e.msg)
+
     def _get_last_msg_bytes(self, msg, input_buffer_len_before, payload_len):
 
         if msg is not None:
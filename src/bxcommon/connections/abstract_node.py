@@ -3,7 +3,7 @@ import os
 import time
 from abc import ABCMeta, abstractmethod
 from asyncio import Future
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
 from ssl import SSLContext
 from typing import List, Optional, Tuple, Dict, NamedTuple, Union, Set
 
@@ -25,17 +25,23 @@ from bxcommon.network.abstract_socket_connection_protocol import AbstractSocketC
 from bxcommon.network.ip_endpoint import IpEndpoint
 from bxcommon.network.peer_info import ConnectionPeerInfo
 from bxcommon.network.socket_connection_state import SocketConnectionStates
+from bxcommon.network import socket_tuning_profile
+from bxcommon.network.socket_tuning_profile import SocketTuningProfile
 from bxcommon.services import sdn_http_service, async_http_service
 from bxcommon.services.broadcast_service import BroadcastService, \
     BroadcastOptions
+from bxcommon.services.broadcast_tree import build_broadcast_tree
+from bxcommon.services.broadcast_tree_service import BroadcastTreeService
 from bxcommon.services.threaded_request_service import ThreadedRequestService
 from bxcommon.services.transaction_service import TransactionService
 from bxcommon.storage.serialized_message_cache import SerializedMessageCache
 from bxcommon.utils import memory_utils, convert, performance_utils
 from bxcommon.utils.alarm_queue import AlarmQueue, AlarmId
+from bxcommon.utils.timing_wheel_alarm_queue import TimingWheelAlarmQueue
 from bxcommon.utils.blockchain_utils import bdn_tx_to_bx_tx
 from bxcommon.common_opts import CommonOpts
 from bxcommon.utils.expiring_dict import ExpiringDict
+from bxcommon.utils.rotating_digest_set import RotatingDigestSet
 from bxcommon.utils.stats.block_statistics_service import block_stats
 from bxcommon.utils.stats.memory_statistics_service import memory_statistics
 from bxcommon.utils.stats.node_info_service import node_info_statistics
@@ -76,7 +82,10 @@ class AbstractNode:
         connection_pool: Optional[ConnectionPool] = None
     ):
         # Event handling queue for delayed events
-        self.alarm_queue = AlarmQueue()
+        if opts.use_timing_wheel_alarm_queue:
+            self.alarm_queue: AlarmQueue = TimingWheelAlarmQueue()
+        else:
+            self.alarm_queue = AlarmQueue()
         self.node_ssl_service = node_ssl_service
         logger.debug("Initializing node of type: {}", self.NODE_TYPE)
         self.server_endpoints = [
@@ -106,6 +115,9 @@ class AbstractNode:
 
         self.num_retries_by_ip: Dict[Tuple[str, int], int] = defaultdict(int)
 
+        # connections that used up their read budget, resumed in round-robin order
+        self.connections_with_pending_input: "OrderedDict[int, AbstractConnection]" = OrderedDict()
+
         self.init_node_status_logging()
         self.init_throughput_logging()
         self.init_node_info_logging()
@@ -122,6 +134,10 @@ class AbstractNode:
 
         self.network_num = opts.blockchain_network_num
         self.broadcast_service = self.get_broadcast_service()
+        self.broadcast_tree_service = BroadcastTreeService(self.connection_pool)
+
+        # filter of recently received messages shared by all connections, see `init_duplicate_message_filter`
+        self.duplicate_message_filter: Optional[RotatingDigestSet] = None
 
         # converting setting in MB to bytes
         self.next_report_mem_usage_bytes = self.opts.dump_detailed_report_at_memory_usage * 1024 * 1024
@@ -212,6 +228,12 @@ class AbstractNode:
     ) -> None:
         pass
 
+    def get_socket_tuning_profile(self, connection_type: ConnectionType) -> SocketTuningProfile:
+        """
+        Socket options to apply to new connections of connection_type. Override to tune per node type.
+        """
+        return socket_tuning_profile.get_profile(connection_type)
+
     def report_connection_attempt(self, ip_address: str) -> int:
         if ip_address in self.recent_connections:
             self.recent_connections[ip_address] += 1
@@ -383,7 +405,38 @@ class AbstractNode:
             return
 
         conn.add_received_bytes(bytes_received)
+
+        # connection is already waiting for its turn, processing it now would let it skip the queue
+        if file_no in self.connections_with_pending_input:
+            conn.update_reading_state()
+            return
+
         conn.process_message()
+        if conn.has_pending_input:
+            self.connections_with_pending_input[file_no] = conn
+        conn.update_reading_state()
+
+    def process_pending_input(self) -> None:
+        """
+        Gives each connection with input left over from its read budget another budget,
+        in round-robin order. Connections that still have input left are moved to the back.
+        """
+        pending_connections = self.connections_with_pending_input
+        for _ in range(len(pending_connections)):
+            if not pending_connections:
+                break
+
+            file_no, conn = pending_connections.popitem(last=False)
+            if not conn.is_alive():
+                continue
+
+            conn.process_message()
+            if conn.has_pending_input:
+                pending_connections[file_no] = conn
+            conn.update_reading_state()
+
+    def has_pending_input(self) -> bool:
+        return len(self.connections_with_pending_input) > 0
 
     def get_bytes_to_send(self, file_no: int) -> Optional[memoryview]:
         conn = self.connection_pool.get_by_fileno(file_no)
@@ -507,6 +560,34 @@ class AbstractNode:
     def cleanup_memory_stats_logging(self):
         memory_statistics.stop_recording()
 
+    def init_duplicate_message_filter(self, capacity: int = constants.DUPLICATE_MESSAGE_FILTER_CAPACITY) -> None:
+        """
+        Enables dropping copies of recently received messages before they are parsed,
+        for the message types connections provide duplicate filter keys for.
+        """
+        self.duplicate_message_filter = RotatingDigestSet(capacity)
+
+    def init_broadcast_tree(self, connection_types: Tuple[ConnectionType, ...]) -> None:
+        """
+        Enables broadcasting to connections of connection_types through a fan-out tree,
+        recomputed periodically from the measured ping latencies. The broadcast service sends
+        through the tree with `BroadcastTreeService.select_connections`.
+        """
+        self.alarm_queue.register_alarm(
+            constants.BROADCAST_TREE_UPDATE_INTERVAL_S, self.update_broadcast_tree, connection_types
+        )
+
+    def update_broadcast_tree(self, connection_types: Tuple[ConnectionType, ...]) -> int:
+        latencies = {}
+        for connection in self.connection_pool.get_by_connection_types(connection_types):
+            if connection.is_active() and connection.peer_id is not None and connection.ping_latency is not None:
+                latencies[connection.peer_id] = connection.ping_latency
+
+        self.broadcast_tree_service.set_broadcast_tree(
+            build_broadcast_tree(latencies, constants.BROADCAST_TREE_FANOUT)
+        )
+        return constants.BROADCAST_TREE_UPDATE_INTERVAL_S
+
     def init_block_stats_logging(self):
         block_stats.set_node(self)
 
@@ -671,6 +752,7 @@ class AbstractNode:
         logger.debug("Breaking connection to {}. Attempting retry: {}", conn, should_retry)
 
         self.connection_pool.delete(conn)
+        self.connections_with_pending_input.pop(conn.file_no, None)
         self.handle_connection_closed(
             should_retry, ConnectionPeerInfo(conn.endpoint, conn.CONNECTION_TYPE), conn.state
         )
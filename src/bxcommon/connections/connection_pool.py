@@ -1,10 +1,9 @@
 import functools
+import operator
 from collections import defaultdict
-from itertools import chain
 from typing import Iterable
-from typing import List, Dict, Optional, Tuple, ClassVar
+from typing import Dict, Optional, Tuple, ClassVar, Sequence
 import time
-from more_itertools import flatten
 
 from prometheus_client import Gauge
 
@@ -35,17 +34,24 @@ class ConnectionPool:
     INITIAL_FILENO: ClassVar[int] = 100
 
     by_ipport: Dict[Tuple[str, int], AbstractConnection]
-    by_connection_type: Dict[ConnectionType, List[AbstractConnection]]
+    # connections of each type, as insertion ordered sets
+    by_connection_type: Dict[ConnectionType, Dict[AbstractConnection, None]]
     by_node_id: Dict[str, AbstractConnection]
     len_fileno: int
+    # incremented whenever a connection is added, deleted or updated, for invalidating derived lookups
+    connections_version: int
     count_conn_by_ip: Dict[str, int]
 
     def __init__(self) -> None:
         self.by_fileno = [None] * ConnectionPool.INITIAL_FILENO
         self.by_ipport = {}
-        self.by_connection_type = defaultdict(list)
+        self.by_connection_type = defaultdict(dict)
+        # results of `get_by_connection_types` by the combined mask of the queried types,
+        # cleared whenever the connection types in the pool change
+        self._by_connection_types_cache: Dict[ConnectionType, Tuple[AbstractConnection, ...]] = {}
         self.by_node_id = {}
         self.len_fileno = ConnectionPool.INITIAL_FILENO
+        self.connections_version = 0
         self.count_conn_by_ip = defaultdict(lambda: 0)
 
         self._create_metrics()
@@ -63,7 +69,9 @@ class ConnectionPool:
 
         self.by_fileno[fileno] = conn
         self.by_ipport[(ip, port)] = conn
-        self.by_connection_type[conn.CONNECTION_TYPE].append(conn)
+        self.by_connection_type[conn.CONNECTION_TYPE][conn] = None
+        self._by_connection_types_cache.clear()
+        self.connections_version += 1
         self.count_conn_by_ip[ip] += 1
 
     def update_port(self, old_port: int, new_port: int, conn: AbstractConnection) -> None:
@@ -91,6 +99,13 @@ class ConnectionPool:
     def index_conn_node_id(self, node_id: str, conn: AbstractConnection) -> None:
         self.by_node_id[node_id] = conn
 
+    def on_connection_updated(self, _conn: AbstractConnection) -> None:
+        """
+        Called when a connection property that decides whether messages are broadcast to it
+        changes, e.g. the connection is established, or its network number or account is updated.
+        """
+        self.connections_version += 1
+
     def has_connection(
             self, ip: Optional[str] = None, port: Optional[int] = None, node_id: Optional[str] = None) -> bool:
         if node_id is not None and node_id in self.by_node_id:
@@ -107,20 +122,26 @@ class ConnectionPool:
                 yield connection
 
     def get_by_connection_types(
-        self, connection_types: Tuple[ConnectionType, ...]
-    ) -> List[AbstractConnection]:
-        # pyre-fixme [7]: Expected `List[AbstractConnection[typing.Any]]`
-        #  but got `typing.Iterator[Variable[more_itertools.recipes._T]]`.
-        return flatten(self._iter_by_connection_types(connection_types))
-
-    def _iter_by_connection_types(
-        self, connection_types: Tuple[ConnectionType, ...]
-    ) -> Iterable[AbstractConnection]:
-        for connection_type, connections in self.by_connection_type.items():
-            if any(connection_type & matching_type for matching_type in connection_types):
-                # pyre-fixme[7]: Expected `Iterable[AbstractConnection[typing.Any]]`
-                #  but got `typing.Generator[chain[AbstractConnection[typing.Any]], None, None]`.
-                yield chain(connections)
+        self, connection_types: Sequence[ConnectionType]
+    ) -> Sequence[AbstractConnection]:
+        """
+        Returns the connections matching any of connection_types. The result is cached
+        until a connection is added, deleted or changes type, so it must not be modified.
+        """
+        if not connection_types:
+            return ()
+
+        connection_types_mask = functools.reduce(operator.or_, connection_types)
+        connections = self._by_connection_types_cache.get(connection_types_mask)
+        if connections is None:
+            connections = tuple(
+                connection
+                for connection_type, connections_of_type in self.by_connection_type.items()
+                if connection_type & connection_types_mask
+                for connection in connections_of_type
+            )
+            self._by_connection_types_cache[connection_types_mask] = connections
+        return connections
 
     def get_by_ipport(self, ip: str, port: int, node_id: Optional[str] = None) -> AbstractConnection:
         ip_port = (ip, port)
@@ -153,11 +174,13 @@ class ConnectionPool:
         if ipport in self.by_ipport and self.by_ipport[ipport].file_no == conn.file_no:
             del self.by_ipport[(conn.peer_ip, conn.peer_port)]
 
-        if conn.CONNECTION_TYPE in self.by_connection_type:
-            if len(self.by_connection_type[conn.CONNECTION_TYPE]) == 1:
+        connections_of_type = self.by_connection_type.get(conn.CONNECTION_TYPE)
+        if connections_of_type is not None:
+            connections_of_type.pop(conn, None)
+            if not connections_of_type:
                 del self.by_connection_type[conn.CONNECTION_TYPE]
-            else:
-                self.by_connection_type[conn.CONNECTION_TYPE].remove(conn)
+            self._by_connection_types_cache.clear()
+        self.connections_version += 1
 
         # Decrement the count- if it's 0, we delete the key.
         if self.count_conn_by_ip[conn.peer_ip] == 1:
@@ -314,4 +337,4 @@ class ConnectionPool:
         )
 
     def _get_number_of_connections(self, connection_type: ConnectionType) -> int:
-        return len(list(self.get_by_connection_types((connection_type,))))
+        return len(self.get_by_connection_types((connection_type,)))
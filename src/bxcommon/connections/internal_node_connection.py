@@ -1,6 +1,6 @@
 import time
 from abc import ABCMeta
-from typing import Optional, Dict, cast
+from typing import Optional, Dict, Union, cast, ClassVar, Tuple, FrozenSet
 
 from bxcommon import constants
 from bxcommon.connections.abstract_connection import AbstractConnection, Node, \
@@ -9,19 +9,30 @@ from bxcommon.connections.connection_state import ConnectionState
 from bxcommon.connections.connection_type import ConnectionType
 from bxcommon.messages.abstract_message import AbstractMessage
 from bxcommon.messages.abstract_message_factory import AbstractMessageFactory
+from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
+from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
 from bxcommon.messages.bloxroute.ack_message import AckMessage
 from bxcommon.messages.bloxroute.bloxroute_message_factory import bloxroute_message_factory
+from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.messages.bloxroute.bloxroute_message_validator import BloxrouteMessageValidator
 from bxcommon.messages.bloxroute.bloxroute_version_manager import bloxroute_version_manager
 from bxcommon.messages.bloxroute.broadcast_message import BroadcastMessage
+from bxcommon.messages.bloxroute.broadcast_tree_ack_message import BroadcastTreeAckMessage
+from bxcommon.messages.bloxroute.broadcast_tree_assign_message import BroadcastTreeAssignMessage
 from bxcommon.messages.bloxroute.ping_message import PingMessage
 from bxcommon.messages.bloxroute.pong_message import PongMessage
 from bxcommon.network.abstract_socket_connection_protocol import AbstractSocketConnectionProtocol
-from bxcommon.utils import nonce_generator
+from bxcommon.utils import nonce_generator, crypto
+from bxcommon.utils.alarm_queue import AlarmId
+from bxcommon.utils.buffers.adaptive_hold_policy import AdaptiveHoldPolicy
+from bxcommon.utils.buffers.input_buffer import InputBuffer
 from bxcommon.utils.buffers.output_buffer import OutputBuffer
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 from bxcommon.utils.expiring_dict import ExpiringDict
 from bxcommon.utils.stats import hooks
 from bxcommon.utils.stats.measurement_type import MeasurementType
+from bxcommon.services.message_envelope_service import MessageEnvelopeService
 from bxcommon.services.tx_sync_service import TxSyncService
 
 from bxutils import log_messages
@@ -31,15 +42,61 @@ from bxutils import logging
 logger = logging.get_logger(__name__)
 
 
+_HASH_AND_NETWORK_NUM_RANGE = (
+    AbstractBloxrouteMessage.HEADER_LENGTH,
+    AbstractBloxrouteMessage.HEADER_LENGTH + crypto.SHA256_HASH_LEN + constants.NETWORK_NUM_LEN
+)
+# offset of the fields following the common broadcast message fields, which ends with the control flags
+_BROADCAST_FIELDS_END = \
+    AbstractBloxrouteMessage.HEADER_LENGTH + AbstractBroadcastMessage.PAYLOAD_LENGTH - constants.CONTROL_FLAGS_LEN
+
+
+# pylint: disable=too-many-public-methods
 class InternalNodeConnection(AbstractConnection[Node]):
     __metaclass__ = ABCMeta
 
+    # byte ranges of the current protocol version messages that identify copies of a message
+    # received from several peers, see `peek_duplicate_filter_key`
+    DUPLICATE_FILTER_KEY_RANGES: ClassVar[Dict[bytes, Tuple[Tuple[int, int], ...]]] = {
+        BloxrouteMessageType.BROADCAST: (
+            _HASH_AND_NETWORK_NUM_RANGE,
+            (_BROADCAST_FIELDS_END, _BROADCAST_FIELDS_END + constants.BROADCAST_TYPE_LEN),
+        ),
+        # messages assigning a short id to a known transaction are not copies
+        BloxrouteMessageType.TRANSACTION: (
+            _HASH_AND_NETWORK_NUM_RANGE,
+            (_BROADCAST_FIELDS_END, _BROADCAST_FIELDS_END + constants.SID_LEN),
+        ),
+    }
+    # small, frequent messages that are held for up to `constants.BATCH_MESSAGE_FLUSH_DELAY_S`
+    # and sent to peers that support it together in a single BatchMessage
+    BATCHED_MESSAGE_TYPES: ClassVar[FrozenSet[bytes]] = frozenset([
+        BloxrouteMessageType.TRANSACTION,
+        BloxrouteMessageType.TX_SERVICE_SYNC_TXS,
+    ])
+    # messages that are sent compressed to peers that support it, while `compression` finds it pays off
+    COMPRESSED_MESSAGE_TYPES: ClassVar[FrozenSet[bytes]] = frozenset([
+        BloxrouteMessageType.BROADCAST,
+        BloxrouteMessageType.TRANSACTION,
+        BloxrouteMessageType.TRANSACTIONS,
+        BloxrouteMessageType.TX_SERVICE_SYNC_TXS,
+        BloxrouteMessageType.COMPRESSED_BLOCK_TXS,
+    ])
+    # envelope messages, which are not processed when found inside of another envelope
+    ENVELOPE_MESSAGE_TYPES: ClassVar[FrozenSet[bytes]] = frozenset([
+        BloxrouteMessageType.BATCH,
+        BloxrouteMessageType.COMPRESSED,
+    ])
+
     def __init__(self, sock: AbstractSocketConnectionProtocol, node: Node) -> None:
         super(InternalNodeConnection, self).__init__(sock, node)
 
         # Enable buffering only on internal connections
         self.enable_buffered_send = node.opts.enable_buffered_send
-        self.outputbuf = OutputBuffer(enable_buffering=self.enable_buffered_send)
+        hold_policy = AdaptiveHoldPolicy() if node.opts.enable_adaptive_buffered_send else None
+        self.outputbuf = OutputBuffer(enable_buffering=self.enable_buffered_send, hold_policy=hold_policy)
+        # sends the messages held by the output buffer once their hold time is over
+        self._output_flush_alarm_id: Optional[AlarmId] = None
 
         self.network_num = node.network_num
         self.version_manager = bloxroute_version_manager
@@ -65,6 +122,14 @@ class InternalNodeConnection(AbstractConnection[Node]):
         self.tx_sync_service = TxSyncService(self)
         self.inbound_peer_latency: float = time.time()
 
+        self.message_envelope_service = MessageEnvelopeService(self)
+
+        # subclasses replacing `message_handlers` need to keep these handlers
+        self.message_handlers[BloxrouteMessageType.BATCH] = self.message_envelope_service.msg_batch
+        self.message_handlers[BloxrouteMessageType.COMPRESSED] = self.message_envelope_service.msg_compressed
+        self.message_handlers[BloxrouteMessageType.BROADCAST_TREE_ASSIGN] = self.msg_broadcast_tree_assign
+        self.message_handlers[BloxrouteMessageType.BROADCAST_TREE_ACK] = self.msg_broadcast_tree_ack
+
     def connection_message_factory(self) -> AbstractMessageFactory:
         return bloxroute_message_factory
 
@@ -79,6 +144,7 @@ class InternalNodeConnection(AbstractConnection[Node]):
         :return:
         """
         self.enable_buffered_send = False
+        self.message_envelope_service.flush_message_batch()
         self.outputbuf.flush()
         self.outputbuf.enable_buffering = False
         self.socket_connection.send()
@@ -128,19 +194,44 @@ class InternalNodeConnection(AbstractConnection[Node]):
 
         return super(InternalNodeConnection, self).pre_process_msg()
 
-    def enqueue_msg(self, msg, prepend=False):
-        if not self.is_alive():
-            return
-
+    def enqueue_serialized_msg(
+        self,
+        msg: AbstractMessage,
+        msg_bytes: Union[bytearray, memoryview, SegmentedBuffer],
+        prepend: bool = False
+    ):
+        if not self.message_envelope_service.enqueue_msg(msg, msg_bytes, prepend):
+            super(InternalNodeConnection, self).enqueue_serialized_msg(msg, msg_bytes, prepend)
+
+    def enqueue_msg_bytes(
+        self,
+        msg_bytes: Union[bytearray, memoryview, SegmentedBuffer],
+        prepend: bool = False,
+        priority: OutputPriority = OutputPriority.TX,
+    ):
+        # keep messages enqueued after the batched ones behind them
+        if not prepend:
+            self.message_envelope_service.flush_message_batch()
+        super(InternalNodeConnection, self).enqueue_msg_bytes(msg_bytes, prepend, priority)
+        self._schedule_output_flush()
+
+    def advance_sent_bytes(self, bytes_sent):
+        super(InternalNodeConnection, self).advance_sent_bytes(bytes_sent)
+        # queued messages can start a new batch once the sent ones are out of the output buffer
+        self._schedule_output_flush()
+
+    def get_message_version(self) -> Optional[int]:
         if self.protocol_version < self.version_manager.CURRENT_PROTOCOL_VERSION:
-            versioned_message = self.version_manager.convert_message_to_older_version(self.protocol_version, msg)
-        else:
-            versioned_message = msg
+            return self.protocol_version
+        return None
 
-        super(InternalNodeConnection, self).enqueue_msg(versioned_message, prepend)
+    def get_versioned_message_bytes(self, msg: AbstractMessage) -> Union[memoryview, SegmentedBuffer]:
+        if self.protocol_version < self.version_manager.CURRENT_PROTOCOL_VERSION:
+            return self.version_manager.convert_message_bytes_to_older_version(self.protocol_version, msg)
+        return msg.rawbytes()
 
-    def pop_next_message(self, payload_len: int) -> AbstractMessage:
-        msg = super(InternalNodeConnection, self).pop_next_message(payload_len)
+    def parse_message(self, msg_bytes: Union[bytearray, memoryview]) -> AbstractMessage:
+        msg = super(InternalNodeConnection, self).parse_message(msg_bytes)
 
         if msg is None or self.protocol_version >= self.version_manager.CURRENT_PROTOCOL_VERSION:
             return msg
@@ -149,6 +240,20 @@ class InternalNodeConnection(AbstractConnection[Node]):
 
         return versioned_msg
 
+    def peek_duplicate_filter_key(
+        self, msg_type: bytes, payload_len: int, input_buffer: InputBuffer
+    ) -> Optional[bytes]:
+        key_ranges = self.DUPLICATE_FILTER_KEY_RANGES.get(msg_type)
+        if key_ranges is None or self.protocol_version != self.version_manager.CURRENT_PROTOCOL_VERSION:
+            return None
+
+        msg_bytes = input_buffer.peek_message(key_ranges[-1][1])
+        key = bytearray(msg_type)
+        key += payload_len.to_bytes(4, "little")
+        for start, end in key_ranges:
+            key += msg_bytes[start:end]
+        return bytes(key)
+
     def check_ping_latency_for_network(self, network_num: int) -> None:
         ping_message = cast(PingMessage, self.ping_message())
         self.enqueue_msg(ping_message)
@@ -169,7 +274,9 @@ class InternalNodeConnection(AbstractConnection[Node]):
             self.mark_for_close()
             return
 
-        self.network_num = network_num
+        if network_num != self.network_num:
+            self.network_num = network_num
+            self.node.connection_pool.on_connection_updated(self)
 
         self.schedule_pings()
 
@@ -189,6 +296,12 @@ class InternalNodeConnection(AbstractConnection[Node]):
 
         self.enqueue_msg(PongMessage(nonce=nonce, timestamp=nonce_generator.get_nonce()))
 
+    def msg_broadcast_tree_assign(self, msg: BroadcastTreeAssignMessage) -> None:
+        self.node.broadcast_tree_service.on_tree_children_assigned(self, msg.peer_ids())
+
+    def msg_broadcast_tree_ack(self, msg: BroadcastTreeAckMessage) -> None:
+        self.node.broadcast_tree_service.on_tree_children_confirmed(self, msg.peer_ids())
+
     # pylint: disable=arguments-differ
     def msg_pong(self, msg: PongMessage):
         super(InternalNodeConnection, self).msg_pong(msg)
@@ -200,6 +313,10 @@ class InternalNodeConnection(AbstractConnection[Node]):
         if nonce in self.ping_message_timestamps.contents:
             request_msg_timestamp = self.ping_message_timestamps.contents[nonce]
             request_response_time = time.time() - request_msg_timestamp
+            self.ping_latency = request_response_time
+            hold_policy = self.outputbuf.hold_policy
+            if hold_policy is not None:
+                hold_policy.set_rtt(request_response_time)
 
             if nonce in self._nonce_to_network_num:
                 self.sync_ping_latencies[self._nonce_to_network_num[nonce]] = request_response_time
@@ -231,6 +348,13 @@ class InternalNodeConnection(AbstractConnection[Node]):
         super(InternalNodeConnection, self).mark_for_close(should_retry)
         self.cancel_pong_timeout()
 
+    def dispose(self):
+        self.message_envelope_service.dispose()
+        if self._output_flush_alarm_id is not None:
+            self.node.alarm_queue.unregister_alarm(self._output_flush_alarm_id)
+            self._output_flush_alarm_id = None
+        super(InternalNodeConnection, self).dispose()
+
     def is_gateway_connection(self):
         return self.CONNECTION_TYPE in ConnectionType.GATEWAY
 
@@ -247,6 +371,36 @@ class InternalNodeConnection(AbstractConnection[Node]):
     def is_proxy_connection(self) -> bool:
         return self.CONNECTION_TYPE in ConnectionType.RELAY_PROXY
 
+    def _log_inbound_throughput(self, msg_type: bytes, received_bytes: int) -> None:
+        # received bytes of envelope messages are recorded for the messages inside of them
+        if msg_type not in self.ENVELOPE_MESSAGE_TYPES:
+            super(InternalNodeConnection, self)._log_inbound_throughput(msg_type, received_bytes)
+
+    def _schedule_output_flush(self) -> None:
+        # without a hold policy, held messages are sent by `AbstractNode.flush_all_send_buffers`
+        if self._output_flush_alarm_id is None and self.outputbuf.hold_policy is not None:
+            flush_time = self.outputbuf.get_flush_time()
+            if flush_time is not None:
+                self._output_flush_alarm_id = self.node.alarm_queue.register_alarm(
+                    max(flush_time - time.time(), 0), self._flush_output_on_alarm
+                )
+
+    def _flush_output_on_alarm(self) -> float:
+        self._output_flush_alarm_id = None
+        flush_time = self.outputbuf.get_flush_time()
+        if flush_time is None or not self.socket_connection.alive:
+            return 0
+
+        if flush_time > time.time():
+            # a new batch started since this alarm was scheduled
+            self._schedule_output_flush()
+            return 0
+
+        self.outputbuf.flush()
+        if self.socket_connection.can_send:
+            self.socket_connection.send()
+        return 0
+
     def update_tx_sync_complete(self, network_num: int):
         if network_num in self.sync_ping_latencies:
             del self.sync_ping_latencies[network_num]
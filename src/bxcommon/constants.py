@@ -34,6 +34,21 @@ DEFAULT_NETWORK_NUM = 1
 
 OUTPUT_BUFFER_MIN_SIZE = 65535
 OUTPUT_BUFFER_BATCH_MAX_HOLD_TIME = 0.05
+# minimum share of sent messages of each output queue class while higher classes are backlogged
+OUTPUT_BUFFER_MIN_SHARE_BLOCK = 0.5
+OUTPUT_BUFFER_MIN_SHARE_TX = 0.1
+OUTPUT_BUFFER_MIN_SHARE_SYNC = 0.05
+# output buffer backlog above which a connection with paused writing is congested, until it drops below the low one
+OUTPUT_BUFFER_HIGH_WATERMARK_BYTES = 32 * 1024 * 1024
+OUTPUT_BUFFER_LOW_WATERMARK_BYTES = 8 * 1024 * 1024
+# queued txs older than this are dropped from congested connections, other classes are never dropped
+OUTPUT_BUFFER_TX_MAX_AGE_S = 0.5
+# adaptive output buffering holds small messages for this many mean intervals between messages,
+# and at most this fraction of the round trip time
+OUTPUT_BUFFER_ADAPTIVE_TARGET_BATCH_COUNT = 8
+OUTPUT_BUFFER_ADAPTIVE_RTT_FRACTION = 0.1
+# weight of the latest interval in the moving average of intervals between messages
+OUTPUT_BUFFER_ADAPTIVE_INTERVAL_SMOOTHING = 0.1
 
 FULL_QUOTA_PERCENTAGE = 100
 
@@ -68,6 +83,10 @@ RECV_BUFSIZE = 1024 * 1024
 MAX_BAD_MESSAGES = 3
 PING_INTERVAL_S = 60
 PING_PONG_TRESHOLD = 0.5
+
+# socket tuning profile values, see network/socket_tuning_profile.py
+SOCKET_TCP_NOTSENT_LOWAT_BYTES = 128 * 1024
+SOCKET_TCP_USER_TIMEOUT_MS = 30 * 1000
 # </editor-fold>
 
 # <editor-fold desc="Logging">
@@ -202,6 +221,27 @@ WARN_ALL_ALARMS_EXECUTION_DURATION = 0.5
 # Timeout to warn on if alarm executed later than expected
 WARN_ALARM_EXECUTION_OFFSET = 5
 
+# resolution of the timing wheel alarm queue, alarms fire no earlier than scheduled but are grouped per tick
+ALARM_TIMING_WHEEL_TICK_S = 0.001
+
+# the alarm heap is rebuilt without canceled alarms once they are over this share of a heap of at least the min size,
+# moving this many alarms per alarm queue tick
+ALARM_QUEUE_COMPACTION_CANCELLED_RATIO = 0.5
+ALARM_QUEUE_COMPACTION_MIN_SIZE = 1000
+ALARM_QUEUE_COMPACTION_BATCH_SIZE = 5000
+
+# time a single alarm queue tick may spend firing alarms, the remaining due alarms fire on the next tick
+ALARM_QUEUE_TICK_BUDGET_S = 0.02
+
+# how often the alarms that took the most time are logged, and how many of them
+ALARM_PROFILER_LOG_INTERVAL_S = 5 * 60
+ALARM_PROFILER_TOP_COUNT = 5
+
+# how often expiring collections are swept, the time a sweep may take and the entries removed per collection visit
+EXPIRY_SWEEPER_INTERVAL_S = 1
+EXPIRY_SWEEPER_BUDGET_S = 0.01
+EXPIRY_SWEEPER_BATCH_SIZE = 1000
+
 # Minimal expired transactions clean up task frequency
 MIN_CLEAN_UP_EXPIRED_TXS_TASK_INTERVAL_S = 15
 
@@ -220,11 +260,20 @@ REMOVED_TRANSACTIONS_HISTORY_EXPIRATION_S = 6 * 60 * 60
 REMOVED_TRANSACTIONS_HISTORY_CLEANUP_INTERVAL_S = 10
 REMOVED_TRANSACTIONS_HISTORY_LENGTH_LIMIT = 500000
 
+BROADCAST_TREE_UPDATE_INTERVAL_S = 60
+
 RESPONSIVENESS_CHECK_INTERVAL_S = 1
 RESPONSIVENESS_CHECK_DELAY_WARN_THRESHOLD_S = 0.2
 MEMORY_STATS_DURATION_WARN_THRESHOLD_S = 0.2
 MSG_HANDLERS_CYCLE_DURATION_WARN_THRESHOLD_S = 0.2
 MSG_HANDLERS_DURATION_WARN_THRESHOLD_S = 0.5
+MSG_HANDLERS_MAX_BATCH_SIZE = 1000
+# inbound processing budget of a connection per event loop turn, leftover input waits for the next turn
+INBOUND_READ_BUDGET_BYTES = 4 * 1024 * 1024
+INBOUND_READ_BUDGET_MESSAGES = 2000
+INBOUND_READ_BUDGET_TIME_S = 0.05
+INBOUND_BACKLOG_PAUSE_READING_THRESHOLD_BYTES = 16 * 1024 * 1024
+INBOUND_BACKLOG_RESUME_READING_THRESHOLD_BYTES = 4 * 1024 * 1024
 NETWORK_OPERATION_CYCLE_DURATION_WARN_THRESHOLD_S = 0.2
 NETWORK_OPERATION_DURATION_WARN_THRESHOLD_S = 0.5
 GC_DURATION_WARN_THRESHOLD = 0.1
@@ -287,6 +336,26 @@ HTTP_HEADERS = {"Content-Type": "application/json"}
 
 MAX_EVENT_LOOP_TIMEOUT: float = 0.05
 
+# maximum number of peers each forwarder of a broadcast tree relays messages to
+BROADCAST_TREE_FANOUT = 8
+
+# keys per generation of the inbound duplicate message filter.
+# Every generation keeps the digests of its keys, about 80 bytes per key.
+DUPLICATE_MESSAGE_FILTER_CAPACITY = 100000
+
+# small messages to internal peers are held for up to this long and sent together in a batch message
+BATCH_MESSAGE_FLUSH_DELAY_S = 0.0002
+BATCH_MESSAGE_MAX_SIZE_BYTES = 64 * 1024
+BATCH_MESSAGE_MAX_COUNT = 256
+
+# zlib compression of large messages to internal peers, enabled per peer when the time saved sending
+# the compressed bytes at the measured throughput of the peer is above the time spent compressing them
+COMPRESSION_LEVEL = 1
+COMPRESSION_MIN_MESSAGE_SIZE_BYTES = 1024
+COMPRESSION_UPDATE_INTERVAL_S = 5
+# messages compressed while compression is disabled, to keep measuring its ratio and cost
+COMPRESSION_PROBE_INTERVAL = 50
+
 MAX_EXPIRED_TXS_TO_REMOVE = 500
 
 # </editor-fold>
@@ -0,0 +1,68 @@
+import struct
+from typing import List, Optional
+
+from bxcommon import constants
+from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
+from bxcommon.utils import uuid_pack
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxutils.logging.log_level import LogLevel
+
+
+class AbstractBroadcastTreeMessage(AbstractBloxrouteMessage):
+    """
+    Message with a list of node ids of tree children, exchanged between the root of a
+    broadcast tree and its forwarders.
+
+    Payload format:
+    - count of node ids (4 bytes)
+    - node ids (16 bytes each)
+    - control flags (1 byte)
+    """
+    MESSAGE_TYPE = b""
+
+    def __init__(self, peer_ids: Optional[List[str]] = None, buf: Optional[bytearray] = None) -> None:
+        if buf is None:
+            assert peer_ids is not None
+            buf = bytearray(
+                self.HEADER_LENGTH
+                + constants.UL_INT_SIZE_IN_BYTES
+                + len(peer_ids) * constants.NODE_ID_SIZE_IN_BYTES
+                + constants.CONTROL_FLAGS_LEN
+            )
+            off = self.HEADER_LENGTH
+            struct.pack_into("<L", buf, off, len(peer_ids))
+            off += constants.UL_INT_SIZE_IN_BYTES
+            for peer_id in peer_ids:
+                struct.pack_into("<16s", buf, off, uuid_pack.to_bytes(peer_id))
+                off += constants.NODE_ID_SIZE_IN_BYTES
+
+        self.buf = buf
+        self._peer_ids: Optional[List[str]] = None
+        super().__init__(self.MESSAGE_TYPE, len(buf) - self.HEADER_LENGTH, buf)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}<peer_ids: {self.peer_ids()}>"
+
+    def log_level(self) -> LogLevel:
+        return LogLevel.DEBUG
+
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.BLOCK
+
+    def peer_ids(self) -> List[str]:
+        if self._peer_ids is None:
+            off = self.HEADER_LENGTH
+            count, = struct.unpack_from("<L", self.buf, off)
+            off += constants.UL_INT_SIZE_IN_BYTES
+
+            peer_ids = []
+            for _ in range(count):
+                peer_id = uuid_pack.from_bytes(struct.unpack_from("<16s", self.buf, off)[0])
+                off += constants.NODE_ID_SIZE_IN_BYTES
+                if peer_id is not None:
+                    peer_ids.append(peer_id)
+            self._peer_ids = peer_ids
+
+        peer_ids = self._peer_ids
+        assert peer_ids is not None
+        return peer_ids
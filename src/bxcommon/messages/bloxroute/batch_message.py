@@ -0,0 +1,92 @@
+import struct
+from typing import List, Optional, Iterator, Union
+
+from bxcommon import constants
+from bxcommon.messages.abstract_message import AbstractMessage
+from bxcommon.messages.abstract_message_factory import AbstractMessageFactory
+from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
+from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxutils.logging.log_level import LogLevel
+
+
+class BatchMessage(AbstractBloxrouteMessage):
+    """
+    Envelope of several small messages sent under a single header.
+
+    Inner messages are stored whole, including their own headers, so they are copied in as
+    serialized and read back as views of the batch buffer without copying.
+
+    Payload format:
+    - count of messages (4 bytes)
+    - messages, one after another
+    - control flags (1 byte)
+    """
+    MESSAGE_TYPE = BloxrouteMessageType.BATCH
+
+    def __init__(
+        self,
+        messages_bytes: Optional[List[Union[bytearray, memoryview]]] = None,
+        output_priority: OutputPriority = OutputPriority.TX,
+        buf: Optional[bytearray] = None
+    ) -> None:
+        if buf is None:
+            assert messages_bytes is not None
+            buf = bytearray(
+                self.HEADER_LENGTH
+                + constants.UL_INT_SIZE_IN_BYTES
+                + sum(len(msg_bytes) for msg_bytes in messages_bytes)
+                + constants.CONTROL_FLAGS_LEN
+            )
+            off = self.HEADER_LENGTH
+            struct.pack_into("<L", buf, off, len(messages_bytes))
+            off += constants.UL_INT_SIZE_IN_BYTES
+            for msg_bytes in messages_bytes:
+                buf[off:off + len(msg_bytes)] = msg_bytes
+                off += len(msg_bytes)
+
+        self.buf = buf
+        self._output_priority = output_priority
+        self._count: Optional[int] = None
+        super().__init__(self.MESSAGE_TYPE, len(buf) - self.HEADER_LENGTH, buf)
+
+    def __repr__(self) -> str:
+        return f"BatchMessage<count: {self.count()}, length: {len(self.buf)}>"
+
+    def log_level(self) -> LogLevel:
+        return LogLevel.DEBUG
+
+    def output_priority(self) -> OutputPriority:
+        return self._output_priority
+
+    def count(self) -> int:
+        if self._count is None:
+            self._count, = struct.unpack_from("<L", self.buf, self.HEADER_LENGTH)
+        count = self._count
+        assert count is not None
+        return count
+
+    def messages(self, message_factory: AbstractMessageFactory) -> Iterator[AbstractMessage]:
+        """
+        Parses the inner messages one at a time, as they are iterated.
+        """
+        for msg_bytes in self.messages_bytes():
+            yield message_factory.create_message_from_buffer(msg_bytes)
+
+    def messages_bytes(self) -> Iterator[memoryview]:
+        """
+        Iterates over the bytes of the inner messages, including their headers, as views of the batch buffer.
+        """
+        end = len(self.buf) - constants.CONTROL_FLAGS_LEN
+        off = self.HEADER_LENGTH + constants.UL_INT_SIZE_IN_BYTES
+        for _ in range(self.count()):
+            if off + self.HEADER_LENGTH > end:
+                raise ValueError(f"Batched message at offset {off} ends after the end of {self}.")
+            _msg_type, payload_len = struct.unpack_from(
+                "<12sL", self.buf, off + AbstractBloxrouteMessage.STARTING_BYTES_LEN
+            )
+            msg_end = off + self.HEADER_LENGTH + payload_len
+            if msg_end > end:
+                raise ValueError(f"Batched message at offset {off} ends after the end of {self}.")
+            yield self._memoryview[off:msg_end]
+            off = msg_end
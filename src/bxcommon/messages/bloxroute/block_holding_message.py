@@ -3,6 +3,7 @@ from typing import Optional
 from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.utils.object_hash import Sha256Hash
+from bxcommon.utils.buffers.output_priority import OutputPriority
 
 
 class BlockHoldingMessage(AbstractBroadcastMessage):
@@ -16,6 +17,9 @@ class BlockHoldingMessage(AbstractBroadcastMessage):
         self._block_id = None
         super().__init__(block_hash, network_num, source_id, buf)
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.BLOCK
+
     def __repr__(self) -> str:
         return f"BlockHoldingMessage<block_hash: {self.block_hash()}>"
 
@@ -8,12 +8,16 @@ from bxcommon.messages.bloxroute.blockchain_network_message import RefreshBlockc
 from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
 from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
 from bxcommon.messages.bloxroute.ack_message import AckMessage
+from bxcommon.messages.bloxroute.batch_message import BatchMessage
 from bxcommon.messages.bloxroute.bdn_performance_stats_message import BdnPerformanceStatsMessage
 from bxcommon.messages.bloxroute.block_confirmation_message import BlockConfirmationMessage
 from bxcommon.messages.bloxroute.block_holding_message import BlockHoldingMessage
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.messages.bloxroute.broadcast_message import BroadcastMessage
+from bxcommon.messages.bloxroute.broadcast_tree_ack_message import BroadcastTreeAckMessage
+from bxcommon.messages.bloxroute.broadcast_tree_assign_message import BroadcastTreeAssignMessage
 from bxcommon.messages.bloxroute.compressed_block_txs_message import CompressedBlockTxsMessage
+from bxcommon.messages.bloxroute.compressed_message import CompressedMessage
 from bxcommon.messages.bloxroute.disconnect_relay_peer_message import DisconnectRelayPeerMessage
 from bxcommon.messages.bloxroute.get_compressed_block_txs_message import GetCompressedBlockTxsMessage
 from bxcommon.messages.bloxroute.get_tx_contents_message import GetTxContentsMessage
@@ -77,6 +81,10 @@ class _BloxrouteMessageFactory(AbstractMessageFactory):
         BloxrouteMessageType.GET_COMPRESSED_BLOCK_TXS: GetCompressedBlockTxsMessage,
         BloxrouteMessageType.COMPRESSED_BLOCK_TXS: CompressedBlockTxsMessage,
         BloxrouteMessageType.ROUTING_UPDATE: RoutingUpdateMessage,
+        BloxrouteMessageType.BATCH: BatchMessage,
+        BloxrouteMessageType.COMPRESSED: CompressedMessage,
+        BloxrouteMessageType.BROADCAST_TREE_ASSIGN: BroadcastTreeAssignMessage,
+        BloxrouteMessageType.BROADCAST_TREE_ACK: BroadcastTreeAckMessage,
     }
 
     def __init__(self) -> None:
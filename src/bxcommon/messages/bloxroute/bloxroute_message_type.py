@@ -26,3 +26,7 @@ class BloxrouteMessageType:
     GET_COMPRESSED_BLOCK_TXS = b"getblocktxs"
     COMPRESSED_BLOCK_TXS = b"blocktxs"
     ROUTING_UPDATE = b"routing"
+    BATCH = b"batch"
+    COMPRESSED = b"compressed"
+    BROADCAST_TREE_ASSIGN = b"treeassign"
+    BROADCAST_TREE_ACK = b"treeack"
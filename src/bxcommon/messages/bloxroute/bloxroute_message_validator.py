@@ -51,6 +51,20 @@ class BloxrouteMessageValidator(AbstractMessageValidator):
         if self._connection_protocol_version >= self.FIRST_VALIDATING_VERSION:
             self._validate_control_flags(is_full_msg, header_len, payload_len, input_buffer)
 
+    def get_max_payload_len(self) -> int:
+        """
+        :return: payload length of the largest messages that pass validation, or the limit of message
+        types without a configured size if payload lengths are not validated
+        """
+        size_validation_settings = self._size_validation_settings
+        if size_validation_settings is None:
+            return constants.DEFAULT_MAX_PAYLOAD_LEN_BYTES
+        return max(
+            size_validation_settings.max_block_size_bytes or 0,
+            size_validation_settings.max_tx_size_bytes or 0,
+            constants.DEFAULT_MAX_PAYLOAD_LEN_BYTES
+        )
+
     def _validate_starting_sequence(self, input_buffer: InputBuffer) -> None:
 
         if input_buffer.length < constants.STARTING_SEQUENCE_BYTES_LEN:
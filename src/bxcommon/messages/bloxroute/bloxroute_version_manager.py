@@ -35,6 +35,12 @@ from bxcommon.messages.bloxroute.v20.message_converter_factory_v20 import messag
 from bxcommon.messages.bloxroute.v20.bloxroute_message_factory_v20 import bloxroute_message_factory_v20
 from bxcommon.messages.bloxroute.v21.message_converter_factory_v21 import message_converter_factory_v21
 from bxcommon.messages.bloxroute.v21.bloxroute_message_factory_v21 import bloxroute_message_factory_v21
+from bxcommon.messages.bloxroute.v23.message_converter_factory_v23 import message_converter_factory_v23
+from bxcommon.messages.bloxroute.v23.bloxroute_message_factory_v23 import bloxroute_message_factory_v23
+from bxcommon.messages.bloxroute.v24.message_converter_factory_v24 import message_converter_factory_v24
+from bxcommon.messages.bloxroute.v24.bloxroute_message_factory_v24 import bloxroute_message_factory_v24
+from bxcommon.messages.bloxroute.v25.message_converter_factory_v25 import message_converter_factory_v25
+from bxcommon.messages.bloxroute.v25.bloxroute_message_factory_v25 import bloxroute_message_factory_v25
 from bxcommon.messages.versioning.abstract_version_manager import AbstractVersionManager
 
 
@@ -42,6 +48,16 @@ class _BloxrouteVersionManager(AbstractVersionManager):
     CURRENT_PROTOCOL_VERSION = PROTOCOL_VERSION
     MIN_SUPPORTED_PROTOCOL_VERSION = 6
     VERSION_MESSAGE_MAIN_LENGTH = constants.VERSIONED_HELLO_MSG_MIN_PAYLOAD_LEN
+    CACHED_CONVERSION_MESSAGE_TYPES = frozenset([
+        BloxrouteMessageType.BROADCAST,
+        BloxrouteMessageType.TRANSACTION,
+        BloxrouteMessageType.KEY,
+        BloxrouteMessageType.TX_SERVICE_SYNC_REQ,
+        BloxrouteMessageType.TX_SERVICE_SYNC_BLOCKS_SHORT_IDS,
+        BloxrouteMessageType.TX_SERVICE_SYNC_TXS,
+        BloxrouteMessageType.TX_SERVICE_SYNC_COMPLETE,
+        BloxrouteMessageType.COMPRESSED_BLOCK_TXS,
+    ])
     _PROTOCOL_TO_CONVERTER_FACTORY_MAPPING = {
         6: message_converter_factory_v6,
         7: message_converter_factory_v7,
@@ -59,7 +75,10 @@ class _BloxrouteVersionManager(AbstractVersionManager):
         19: message_converter_factory_v19,
         20: message_converter_factory_v20,
         21: message_converter_factory_v21,
-        22: message_converter_factory_v22
+        22: message_converter_factory_v22,
+        23: message_converter_factory_v23,
+        24: message_converter_factory_v24,
+        25: message_converter_factory_v25
     }
     _PROTOCOL_TO_FACTORY_MAPPING = {
         6: bloxroute_message_factory_v6,
@@ -79,7 +98,10 @@ class _BloxrouteVersionManager(AbstractVersionManager):
         20: bloxroute_message_factory_v20,
         21: bloxroute_message_factory_v21,
         22: bloxroute_message_factory_v22,
-        23: bloxroute_message_factory
+        23: bloxroute_message_factory_v23,
+        24: bloxroute_message_factory_v24,
+        25: bloxroute_message_factory_v25,
+        26: bloxroute_message_factory
     }
 
     def __init__(self) -> None:
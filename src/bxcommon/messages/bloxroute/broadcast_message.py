@@ -9,6 +9,7 @@ from bxcommon.models.broadcast_message_type import BroadcastMessageType
 from bxcommon.utils import crypto
 from bxcommon.utils.buffers.input_buffer import InputBuffer
 from bxcommon.utils.object_hash import Sha256Hash, ConcatHash
+from bxcommon.utils.buffers.output_priority import OutputPriority
 from bxutils.logging.log_level import LogLevel
 
 
@@ -63,6 +64,9 @@ class BroadcastMessage(AbstractBroadcastMessage):
     def log_level(self) -> LogLevel:
         return LogLevel.DEBUG
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.BLOCK
+
     def broadcast_type(self) -> BroadcastMessageType:
         if self._broadcast_type is None:
             off = self.HEADER_LENGTH + AbstractBroadcastMessage.PAYLOAD_LENGTH - constants.CONTROL_FLAGS_LEN
@@ -0,0 +1,10 @@
+from bxcommon.messages.bloxroute.abstract_broadcast_tree_message import AbstractBroadcastTreeMessage
+from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
+
+
+class BroadcastTreeAckMessage(AbstractBroadcastTreeMessage):
+    """
+    Reply of a forwarder to BroadcastTreeAssignMessage, with the assigned peers it has a live
+    connection to and relays messages from the root to.
+    """
+    MESSAGE_TYPE = BloxrouteMessageType.BROADCAST_TREE_ACK
@@ -0,0 +1,11 @@
+from bxcommon.messages.bloxroute.abstract_broadcast_tree_message import AbstractBroadcastTreeMessage
+from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
+
+
+class BroadcastTreeAssignMessage(AbstractBroadcastTreeMessage):
+    """
+    Sent by the root of a broadcast tree to a forwarder, with the peers the forwarder
+    is assigned to relay messages from the root to. Replaces previous assignments.
+    The forwarder replies with BroadcastTreeAckMessage.
+    """
+    MESSAGE_TYPE = BloxrouteMessageType.BROADCAST_TREE_ASSIGN
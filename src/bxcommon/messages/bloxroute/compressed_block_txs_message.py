@@ -9,6 +9,7 @@ from bxcommon.messages.bloxroute.txs_message import TxsMessage
 from bxcommon.models.transaction_info import TransactionInfo
 from bxcommon.utils import crypto
 from bxcommon.utils.object_hash import Sha256Hash
+from bxcommon.utils.buffers.output_priority import OutputPriority
 from bxutils import logging
 
 logger = logging.get_logger(__name__)
@@ -53,6 +54,9 @@ class CompressedBlockTxsMessage(AbstractBloxrouteMessage):
         self._network_num = None
         self._block_hash = None
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.BLOCK
+
     def get_txs(self) -> List[TransactionInfo]:
         if self._txs is None:
             self._parse()
@@ -0,0 +1,83 @@
+import struct
+import zlib
+from typing import Optional, Union
+
+from bxcommon import constants
+from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
+from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxutils.logging.log_level import LogLevel
+
+
+class CompressedMessage(AbstractBloxrouteMessage):
+    """
+    Envelope of a single message compressed with zlib, including its own header.
+
+    Payload format:
+    - length of the uncompressed message (4 bytes)
+    - zlib compressed message
+    - control flags (1 byte)
+    """
+    MESSAGE_TYPE = BloxrouteMessageType.COMPRESSED
+
+    def __init__(
+        self,
+        compressed_bytes: Optional[Union[bytes, bytearray, memoryview]] = None,
+        uncompressed_length: Optional[int] = None,
+        output_priority: OutputPriority = OutputPriority.TX,
+        buf: Optional[bytearray] = None
+    ) -> None:
+        if buf is None:
+            assert compressed_bytes is not None
+            assert uncompressed_length is not None
+            buf = bytearray(
+                self.HEADER_LENGTH
+                + constants.UL_INT_SIZE_IN_BYTES
+                + len(compressed_bytes)
+                + constants.CONTROL_FLAGS_LEN
+            )
+            off = self.HEADER_LENGTH
+            struct.pack_into("<L", buf, off, uncompressed_length)
+            off += constants.UL_INT_SIZE_IN_BYTES
+            buf[off:off + len(compressed_bytes)] = compressed_bytes
+
+        self.buf = buf
+        self._output_priority = output_priority
+        self._uncompressed_length: Optional[int] = None
+        super().__init__(self.MESSAGE_TYPE, len(buf) - self.HEADER_LENGTH, buf)
+
+    def __repr__(self) -> str:
+        return f"CompressedMessage<length: {len(self.buf)}, uncompressed length: {self.uncompressed_length()}>"
+
+    def log_level(self) -> LogLevel:
+        return LogLevel.DEBUG
+
+    def output_priority(self) -> OutputPriority:
+        return self._output_priority
+
+    def uncompressed_length(self) -> int:
+        if self._uncompressed_length is None:
+            self._uncompressed_length, = struct.unpack_from("<L", self.buf, self.HEADER_LENGTH)
+        uncompressed_length = self._uncompressed_length
+        assert uncompressed_length is not None
+        return uncompressed_length
+
+    def decompress(self, max_length: int) -> bytearray:
+        """
+        Decompresses the message carried by this message.
+
+        :param max_length: maximum allowed length of the uncompressed message
+        :return: bytes of the uncompressed message
+        """
+        uncompressed_length = self.uncompressed_length()
+        if uncompressed_length > max_length:
+            raise ValueError(f"Uncompressed length of {self} exceeds the maximum of {max_length} bytes.")
+
+        decompressor = zlib.decompressobj()
+        off = self.HEADER_LENGTH + constants.UL_INT_SIZE_IN_BYTES
+        msg_bytes = decompressor.decompress(
+            self._memoryview[off:len(self.buf) - constants.CONTROL_FLAGS_LEN], uncompressed_length
+        )
+        if len(msg_bytes) != uncompressed_length or decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError(f"Compressed bytes of {self} do not match the uncompressed length.")
+        return bytearray(msg_bytes)
@@ -7,6 +7,7 @@ from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxr
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.utils import crypto
 from bxcommon.utils.object_hash import Sha256Hash
+from bxcommon.utils.buffers.output_priority import OutputPriority
 
 
 class GetCompressedBlockTxsMessage(AbstractBloxrouteMessage):
@@ -51,6 +52,9 @@ class GetCompressedBlockTxsMessage(AbstractBloxrouteMessage):
         self._block_hash = None
         self._short_ids = None
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.BLOCK
+
     def get_short_ids(self) -> List[int]:
         if self._short_ids is None:
             self._parse()
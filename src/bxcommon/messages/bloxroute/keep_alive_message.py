@@ -4,6 +4,7 @@ from bxcommon import constants
 from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
 from bxcommon.messages.bloxroute.protocol_version import PROTOCOL_VERSION
 from bxcommon.utils.message_buffer_builder import PayloadElement, PayloadBlock
+from bxcommon.utils.buffers.output_priority import OutputPriority
 
 
 class KeepAliveMessage(AbstractBloxrouteMessage):
@@ -38,6 +39,9 @@ class KeepAliveMessage(AbstractBloxrouteMessage):
         self._memoryview = memoryview(buf)
         super(KeepAliveMessage, self).__init__(msg_type, payload_length, buf)
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.CONTROL
+
     def __unpack(self) -> None:
         contents = self.KEEP_ALIVE_MESSAGE_BLOCK.read(self._memoryview)
         self._nonce = contents.get("nonce")
@@ -5,6 +5,7 @@ from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroad
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.utils import crypto
 from bxcommon.utils.object_hash import Sha256Hash
+from bxcommon.utils.buffers.output_priority import OutputPriority
 from bxutils.logging.log_level import LogLevel
 
 
@@ -31,6 +32,9 @@ class KeyMessage(AbstractBroadcastMessage):
     def log_level(self):
         return LogLevel.DEBUG
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.BLOCK
+
     def block_hash(self) -> Sha256Hash:
         return self.message_hash()
 
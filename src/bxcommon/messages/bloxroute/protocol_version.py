@@ -1,5 +1,8 @@
-PROTOCOL_VERSION = 23
+PROTOCOL_VERSION = 26
 
+BROADCAST_TREE_MESSAGE = 26
+COMPRESSED_MESSAGE = 25
+BATCH_MESSAGE = 24
 SPLIT_RELAYS = 22
 TX_MSG_WITH_ACCOUNT_ID = 21
 EXPOSE_BDN_LOCAL_REGION = 19
@@ -10,6 +13,15 @@ BDN_PERFORMANCE_NEW_BLOCK = 15
 RELAY_BLOCK_CAN_SEND_COMPRESSED_BLOCK_TXS_MESSAGE = 13
 RELAY_BLOCK_CAN_SEND_TXS_MESSAGE = 12
 
+# PROTOCOL_VERSION 26 (10/19/2026)
+# add broadcast tree assign and ack messages, assigning forwarders their tree children
+
+# PROTOCOL_VERSION 25 (10/19/2026)
+# add compressed message, carrying a zlib compressed message
+
+# PROTOCOL_VERSION 24 (10/19/2026)
+# add batch message, carrying several small messages under one header
+
 # PROTOCOL_VERSION 22 (01/26/2021)
 # add to TxMessage account id
 
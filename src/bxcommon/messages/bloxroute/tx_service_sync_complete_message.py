@@ -4,6 +4,7 @@ from typing import Optional
 from bxcommon.constants import UL_INT_SIZE_IN_BYTES, CONTROL_FLAGS_LEN
 from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
+from bxcommon.utils.buffers.output_priority import OutputPriority
 from bxutils.logging.log_level import LogLevel
 
 
@@ -35,6 +36,9 @@ class TxServiceSyncCompleteMessage(AbstractBloxrouteMessage):
     def log_level(self) -> LogLevel:
         return LogLevel.DEBUG
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.SYNC
+
     def network_num(self) -> int:
         if self._network_num is None:
             off = self.HEADER_LENGTH
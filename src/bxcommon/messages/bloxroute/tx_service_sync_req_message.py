@@ -4,6 +4,7 @@ from typing import Optional
 from bxcommon import constants
 from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
+from bxcommon.utils.buffers.output_priority import OutputPriority
 
 
 class TxServiceSyncReqMessage(AbstractBloxrouteMessage):
@@ -30,6 +31,9 @@ class TxServiceSyncReqMessage(AbstractBloxrouteMessage):
             self.buf
         )
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.SYNC
+
     def network_num(self) -> int:
         if self._network_num is None:
             off = self.HEADER_LENGTH
@@ -6,6 +6,7 @@ from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxr
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.messages.bloxroute.v15 import txs_serializer_v15
 from bxcommon.messages.bloxroute.v15.txs_serializer_v15 import TxContentShortIdsV15
+from bxcommon.utils.buffers.output_priority import OutputPriority
 from bxutils.logging.log_level import LogLevel
 
 
@@ -44,6 +45,9 @@ class TxServiceSyncTxsMessageV15(AbstractBloxrouteMessage):
     def log_level(self):
         return LogLevel.DEBUG
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.SYNC
+
     def network_num(self) -> int:
         if self._network_num is None:
             off = self.HEADER_LENGTH
@@ -1,6 +1,9 @@
+import struct
 from typing import cast
 
+from bxcommon import constants
 from bxcommon.messages.abstract_internal_message import AbstractInternalMessage
+from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
 from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.messages.bloxroute.tx_message import TxMessage
 from bxcommon.messages.bloxroute.v21.tx_message_v21 import TxMessageV21
@@ -20,6 +23,16 @@ class _TxMessageConverterV21(AbstractMessageConverter):
         BloxrouteMessageType.TRANSACTION: TxMessage
     }
 
+    _LEFT_BREAKPOINT = (
+        AbstractBroadcastMessage.HEADER_LENGTH
+        + AbstractBroadcastMessage.PAYLOAD_LENGTH
+        + constants.SID_LEN
+        + constants.TRANSACTION_FLAG_LEN
+        + constants.DOUBLE_SIZE_IN_BYTES
+        - constants.CONTROL_FLAGS_LEN
+    )
+    _RIGHT_BREAKPOINT = _LEFT_BREAKPOINT + constants.ACCOUNT_ID_SIZE_IN_BYTES
+
     def convert_from_older_version(
         self, msg: AbstractInternalMessage
     ) -> AbstractInternalMessage:
@@ -82,10 +95,24 @@ class _TxMessageConverterV21(AbstractMessageConverter):
             timestamp=ts
         )
 
+    def get_rewritten_prefix_length(self, _msg: AbstractInternalMessage) -> int:
+        return self._RIGHT_BREAKPOINT
+
     def convert_first_bytes_to_older_version(
         self, first_msg_bytes: memoryview
     ) -> memoryview:
-        raise NotImplementedError
+        if len(first_msg_bytes) < self._RIGHT_BREAKPOINT:
+            raise ValueError("Not enough bytes to convert.")
+        command, payload_len = TxMessage.unpack(first_msg_bytes)
+
+        result_bytes = bytearray(len(first_msg_bytes) - constants.ACCOUNT_ID_SIZE_IN_BYTES)
+        result_bytes[:self._LEFT_BREAKPOINT] = first_msg_bytes[:self._LEFT_BREAKPOINT]
+        result_bytes[self._LEFT_BREAKPOINT:] = first_msg_bytes[self._RIGHT_BREAKPOINT:]
+
+        struct.pack_into("<12sL", result_bytes, constants.STARTING_SEQUENCE_BYTES_LEN, command,
+                         payload_len - constants.ACCOUNT_ID_SIZE_IN_BYTES)
+
+        return memoryview(result_bytes)
 
     def convert_first_bytes_from_older_version(
         self, first_msg_bytes: memoryview
@@ -103,7 +130,7 @@ class _TxMessageConverterV21(AbstractMessageConverter):
         raise NotImplementedError
 
     def get_message_size_change_to_older_version(self) -> int:
-        raise NotImplementedError
+        return -constants.ACCOUNT_ID_SIZE_IN_BYTES
 
     def get_message_size_change_from_older_version(self) -> int:
         raise NotImplementedError
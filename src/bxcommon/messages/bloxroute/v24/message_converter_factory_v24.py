@@ -0,0 +1,18 @@
+from bxcommon.messages.versioning.abstract_version_converter_factory import AbstractMessageConverterFactory
+from bxcommon.messages.versioning.no_changes_message_converter import no_changes_message_converter
+
+
+class _MessageConverterFactoryV24(AbstractMessageConverterFactory):
+    _MESSAGE_CONVERTER_MAPPING = {}
+
+    def get_message_converter(self, msg_type):
+        if not msg_type:
+            raise ValueError("msg_type is required.")
+
+        if msg_type not in self._MESSAGE_CONVERTER_MAPPING:
+            return no_changes_message_converter
+
+        return self._MESSAGE_CONVERTER_MAPPING[msg_type]
+
+
+message_converter_factory_v24 = _MessageConverterFactoryV24()
@@ -55,6 +55,9 @@ class _BroadcastMessageConverterV8(AbstractMessageConverter):
             (msg_type, old_version_payload_len),
         )
 
+    def get_rewritten_prefix_length(self, _msg: AbstractInternalMessage) -> int:
+        return self._BREAKPOINT
+
     def convert_from_older_version(
         self, msg: AbstractInternalMessage
     ) -> AbstractInternalMessage:
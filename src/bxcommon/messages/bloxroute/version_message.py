@@ -1,6 +1,7 @@
 from bxcommon import constants
 from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
 from bxcommon.utils.message_buffer_builder import PayloadElement, PayloadBlock
+from bxcommon.utils.buffers.output_priority import OutputPriority
 
 
 class VersionMessage(AbstractBloxrouteMessage):
@@ -33,6 +34,9 @@ class VersionMessage(AbstractBloxrouteMessage):
         self._network_num = None
         super(VersionMessage, self).__init__(msg_type, payload_len, buf)
 
+    def output_priority(self) -> OutputPriority:
+        return OutputPriority.CONTROL
+
     def __unpack(self):
         contents = self.VERSION_MESSAGE_BLOCK.read(self._memoryview)
         self._protocol_version = contents.get("protocol_version")
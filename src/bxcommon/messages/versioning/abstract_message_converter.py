@@ -1,6 +1,8 @@
 from abc import ABCMeta, abstractmethod
+from typing import Optional
 
 from bxcommon.messages.abstract_internal_message import AbstractInternalMessage
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 
 
 class AbstractMessageConverter:
@@ -75,3 +77,34 @@ class AbstractMessageConverter:
 
         :return: message size difference
         """
+
+    def get_rewritten_prefix_length(self, _msg: AbstractInternalMessage) -> Optional[int]:
+        """
+        Returns the length of the prefix of the message that differs in older version (version of converter),
+        if the rest of the message is the same in both versions. The prefix is converted
+        with `convert_first_bytes_to_older_version`.
+
+        Override this for converters that only rewrite header fields.
+
+        :param _msg: message in current protocol version
+        :return: prefix length, or None if the whole message needs to be converted
+        """
+        return None
+
+    def convert_to_older_version_segments(self, msg: AbstractInternalMessage) -> Optional[SegmentedBuffer]:
+        """
+        Converts message of current protocol version to older version (version of converter) without
+        copying the part of the message that did not change.
+
+        :param msg: message in current protocol version
+        :return: rewritten prefix followed by the rest of the original message bytes,
+        or None if the converter does not support header rewrite
+        """
+        prefix_length = self.get_rewritten_prefix_length(msg)
+        if prefix_length is None:
+            return None
+
+        msg_bytes = msg.rawbytes()
+        return SegmentedBuffer(
+            (self.convert_first_bytes_to_older_version(msg_bytes[:prefix_length]), msg_bytes[prefix_length:])
+        )
@@ -1,18 +1,29 @@
 import struct
 from abc import ABCMeta
+from typing import FrozenSet, Union
+
+from prometheus_client import Counter
 
 from bxcommon import constants
 from bxcommon.constants import VERSION_NUM_LEN
 from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
-from bxcommon.messages.bloxroute.tx_message import TxMessage
 from bxcommon.messages.bloxroute.version_message import VersionMessage
 from bxcommon.messages.versioning.nonversion_message_error import NonVersionMessageError
 from bxcommon.utils.buffers.input_buffer import InputBuffer
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 from bxutils import log_messages
 from bxutils import logging
 
 logger = logging.get_logger(__name__)
 
+conversion_cache_requests_counter = Counter(
+    "version_conversion_cache_requests",
+    "Number of conversions to older protocol versions looked up in the conversion cache",
+    ("result",),
+)
+_conversion_cache_hits = conversion_cache_requests_counter.labels("hit")
+_conversion_cache_misses = conversion_cache_requests_counter.labels("miss")
+
 
 class AbstractVersionManager:
     __metaclass__ = ABCMeta
@@ -20,11 +31,16 @@ class AbstractVersionManager:
     CURRENT_PROTOCOL_VERSION = 1
     MIN_SUPPORTED_PROTOCOL_VERSION = 1
     VERSION_MESSAGE_MAIN_LENGTH = VersionMessage.BASE_LENGTH
+    # types of messages that are commonly sent to many peers, and whose conversions are cached
+    # on the message itself, to be released with it
+    CACHED_CONVERSION_MESSAGE_TYPES: FrozenSet[bytes] = frozenset()
 
     def __init__(self) -> None:
         self.protocol_to_factory_mapping = {}
         self.protocol_to_converter_factory_mapping = {}
         self.version_message_command = ""
+        self.conversion_cache_hits = 0
+        self.conversion_cache_misses = 0
 
     def is_protocol_supported(self, protocol_version):
         return protocol_version >= self.MIN_SUPPORTED_PROTOCOL_VERSION
@@ -61,14 +77,66 @@ class AbstractVersionManager:
         if convert_to_version not in self.protocol_to_converter_factory_mapping:
             raise ValueError("Conversion for version {} is not supported".format(convert_to_version))
 
-        if isinstance(msg, TxMessage) and convert_to_version in msg.converted_message:
-            converted_msg = msg.converted_message[convert_to_version]
-        else:
-            msg_converter = self._get_message_converter(convert_to_version, msg.msg_type())
-            converted_msg = msg_converter.convert_to_older_version(msg)
-            msg.converted_message[convert_to_version] = converted_msg
+        msg_type = msg.msg_type()
+        if msg_type not in self.CACHED_CONVERSION_MESSAGE_TYPES:
+            msg_converter = self._get_message_converter(convert_to_version, msg_type)
+            return msg_converter.convert_to_older_version(msg)
+
+        converted_messages = msg.converted_message
+        if convert_to_version in converted_messages:
+            self.conversion_cache_hits += 1
+            _conversion_cache_hits.inc()
+            return converted_messages[convert_to_version]
+
+        self.conversion_cache_misses += 1
+        _conversion_cache_misses.inc()
+        msg_converter = self._get_message_converter(convert_to_version, msg_type)
+        converted_msg = msg_converter.convert_to_older_version(msg)
+        converted_messages[convert_to_version] = converted_msg
         return converted_msg
 
+    def convert_message_bytes_to_older_version(
+        self, convert_to_version: int, msg: AbstractBloxrouteMessage
+    ) -> Union[memoryview, SegmentedBuffer]:
+        """
+        Converts message from current version to provided version, for sending. If the converter
+        only rewrites the header of the message, returns the new header followed by the original
+        message body, without copying the body.
+
+        :param convert_to_version: version to convert to
+        :param msg: message
+        :return: converted message bytes
+        """
+        if not convert_to_version:
+            raise ValueError("convert_to_version is required")
+
+        if not msg:
+            raise ValueError("msg is required")
+
+        if convert_to_version not in self.protocol_to_converter_factory_mapping:
+            raise ValueError("Conversion for version {} is not supported".format(convert_to_version))
+
+        msg_converter = self._get_message_converter(convert_to_version, msg.msg_type())
+        converted_msg_bytes = msg_converter.convert_to_older_version_segments(msg)
+        if converted_msg_bytes is not None:
+            return converted_msg_bytes
+        return self.convert_message_to_older_version(convert_to_version, msg).rawbytes()
+
+    def invalidate_converted_message(self, msg: AbstractBloxrouteMessage) -> None:
+        """
+        Drops the cached conversions of a message. Must be called if the message is modified
+        after being converted.
+
+        :param msg: message
+        """
+        msg.converted_message.clear()
+
+    def get_conversion_cache_hit_rate(self) -> float:
+        requests = self.conversion_cache_hits + self.conversion_cache_misses
+        if requests == 0:
+            return 0
+        return self.conversion_cache_hits / requests
+
     def convert_message_from_older_version(self, convert_from_version, msg):
         """
         Converts message from older version to current version
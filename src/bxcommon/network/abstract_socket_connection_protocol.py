@@ -3,10 +3,11 @@ import sys
 import typing
 from abc import abstractmethod
 from asyncio import BaseTransport, Transport, BaseProtocol
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, Dict
 
 from cryptography.x509 import Certificate
 
+from bxcommon.network import socket_tuning_profile
 from bxcommon.network.ip_endpoint import IpEndpoint
 from bxcommon.network.network_direction import NetworkDirection
 from bxcommon.network.socket_connection_state import SocketConnectionState, SocketConnectionStates
@@ -66,6 +67,9 @@ class AbstractSocketConnectionProtocol(BaseProtocol):
 
         self.alive = True
         self.initialized = False
+        # socket options set by the tuning profile, as read back from the socket
+        self.socket_options: Dict[str, int] = {}
+        self.reading_paused_for_backlog = False
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__} <{self.endpoint}, {self.direction.name}>"
@@ -86,7 +90,11 @@ class AbstractSocketConnectionProtocol(BaseProtocol):
             )
             logger.debug("[{}] - accepted connection.", self)
 
-        self._node.on_connection_added(self)
+        conn = self._node.on_connection_added(self)
+        if conn is not None:
+            self.apply_socket_tuning_profile(
+                self._node.get_socket_tuning_profile(conn.CONNECTION_TYPE)
+            )
         self.initialized = True
         self.can_send = True
         self.send()
@@ -116,8 +124,17 @@ class AbstractSocketConnectionProtocol(BaseProtocol):
         self.can_send = False
         logger.debug("[{}] - paused writing.", self)
 
+        conn = self._node.connection_pool.get_by_fileno(self.file_no)
+        if conn:
+            conn.on_writing_paused()
+
     def resume_writing(self) -> None:
         self.can_send = True
+
+        conn = self._node.connection_pool.get_by_fileno(self.file_no)
+        if conn:
+            conn.on_writing_resumed()
+
         self.send()
         logger.debug("[{}] - resumed writing.", self)
 
@@ -200,6 +217,28 @@ class AbstractSocketConnectionProtocol(BaseProtocol):
             self.state &= ~SocketConnectionStates.HALT_RECEIVE
             logger.debug("[{}] - resumed reading.", self)
 
+    def pause_reading_for_backlog(self) -> None:
+        """
+        Stops reading from the transport while the connection works through its input backlog.
+        Unlike `pause_reading`, bytes the transport has already read are still passed on to the node.
+        """
+        if self.alive and not self.reading_paused_for_backlog:
+            transport = self.transport
+            assert transport is not None, "Connection is broken!"
+            if not transport.is_closing():
+                transport.pause_reading()
+            self.reading_paused_for_backlog = True
+            logger.debug("[{}] - paused reading for input backlog.", self)
+
+    def resume_reading_for_backlog(self) -> None:
+        if self.alive and self.reading_paused_for_backlog:
+            transport = self.transport
+            assert transport is not None, "Connection is broken!"
+            if not transport.is_closing():
+                transport.resume_reading()
+            self.reading_paused_for_backlog = False
+            logger.debug("[{}] - resumed reading after input backlog.", self)
+
     def mark_for_close(self, should_retry: bool = True) -> None:
         if not self.alive:
             return
@@ -247,6 +286,17 @@ class AbstractSocketConnectionProtocol(BaseProtocol):
         else:
             return transport.get_write_buffer_size()
 
+    def apply_socket_tuning_profile(self, profile: socket_tuning_profile.SocketTuningProfile) -> None:
+        transport = self.transport
+        assert transport is not None, "Connection is broken!"
+        sock = transport.get_extra_info("socket")
+        if sock is None:
+            logger.debug("Socket info is None on connection")
+            return
+
+        self.socket_options = socket_tuning_profile.apply_profile(sock, profile)
+        logger.debug("[{}] - applied socket options: {}.", self, self.socket_options)
+
     def enable_tcp_quickack(self):
         if "linux" in sys.platform:
             sock = self.transport.get_extra_info("socket")
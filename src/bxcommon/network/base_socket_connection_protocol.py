@@ -110,6 +110,16 @@ class BaseSocketConnectionProtocol(BaseProtocol):
         if delegate_protocol is not None:
             delegate_protocol.resume_reading()
 
+    def pause_reading_for_backlog(self) -> None:
+        delegate_protocol = self._delegate_protocol
+        if delegate_protocol is not None:
+            delegate_protocol.pause_reading_for_backlog()
+
+    def resume_reading_for_backlog(self) -> None:
+        delegate_protocol = self._delegate_protocol
+        if delegate_protocol is not None:
+            delegate_protocol.resume_reading_for_backlog()
+
     def get_buffer(self, sizehint: int):
         delegate_protocol = self._delegate_protocol
         if delegate_protocol is not None:
@@ -81,6 +81,8 @@ class NodeEventLoop:
 
     async def _run(self) -> None:
         node_servers = await self._create_servers()
+        # alarms are fired from the event loop thread, so its calls can skip the alarm queue lock
+        self._node.alarm_queue.set_owner_thread()
         try:
             await self._node.init()
             loop = asyncio.get_event_loop()
@@ -203,9 +205,13 @@ class NodeEventLoop:
             return None
 
     async def _perform_node_tasks(self) -> None:
+        self._node.process_pending_input()
         timeout = self._node.fire_alarms()
         self._node.flush_all_send_buffers()
-        if timeout is None or timeout < 0:
+        if self._node.has_pending_input():
+            # only yield to the event loop, so other connections get their turn before the leftover input
+            timeout = 0
+        elif timeout is None or timeout < 0:
             timeout = constants.MAX_EVENT_LOOP_TIMEOUT
         else:
             timeout = min(timeout, constants.MAX_EVENT_LOOP_TIMEOUT)
@@ -0,0 +1,110 @@
+import socket
+import sys
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple
+
+from bxcommon import constants
+from bxcommon.connections.connection_type import ConnectionType
+from bxutils import logging
+
+logger = logging.get_logger(__name__)
+
+# option numbers from linux headers, not all of them are exposed by the socket module
+TCP_NOTSENT_LOWAT = getattr(socket, "TCP_NOTSENT_LOWAT", 25)
+TCP_USER_TIMEOUT = getattr(socket, "TCP_USER_TIMEOUT", 18)
+SO_BUSY_POLL = getattr(socket, "SO_BUSY_POLL", 46)
+
+
+@dataclass
+class SocketTuningProfile:
+    """
+    Socket options applied to a connection once it is made. Options set to None
+    keep the operating system defaults.
+    """
+    send_buffer_size: Optional[int] = None
+    receive_buffer_size: Optional[int] = None
+    tcp_nodelay: Optional[bool] = None
+    # keeps unsent data in the output buffer, where it can still be prioritized or dropped
+    tcp_notsent_lowat: Optional[int] = None
+    tcp_user_timeout_ms: Optional[int] = None
+    # requires CAP_NET_ADMIN
+    busy_poll_us: Optional[int] = None
+
+    def get_socket_options(self) -> List[Tuple[str, int, int, int]]:
+        """
+        :return: list of (name, level, option, value) of the options to set
+        """
+        options = []
+        if self.send_buffer_size is not None:
+            options.append(("SO_SNDBUF", socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size))
+        if self.receive_buffer_size is not None:
+            options.append(("SO_RCVBUF", socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size))
+        if self.tcp_nodelay is not None:
+            options.append(("TCP_NODELAY", socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.tcp_nodelay)))
+
+        # remaining options are linux only
+        if "linux" not in sys.platform:
+            return options
+
+        if self.tcp_notsent_lowat is not None:
+            options.append(("TCP_NOTSENT_LOWAT", socket.IPPROTO_TCP, TCP_NOTSENT_LOWAT, self.tcp_notsent_lowat))
+        if self.tcp_user_timeout_ms is not None:
+            options.append(("TCP_USER_TIMEOUT", socket.IPPROTO_TCP, TCP_USER_TIMEOUT, self.tcp_user_timeout_ms))
+        if self.busy_poll_us is not None:
+            options.append(("SO_BUSY_POLL", socket.SOL_SOCKET, SO_BUSY_POLL, self.busy_poll_us))
+        return options
+
+
+DEFAULT_PROFILE = SocketTuningProfile(tcp_nodelay=True)
+
+# first matching connection type is used
+DEFAULT_PROFILES: Dict[ConnectionType, SocketTuningProfile] = {
+    ConnectionType.RELAY_BLOCK: SocketTuningProfile(
+        tcp_nodelay=True,
+        tcp_notsent_lowat=constants.SOCKET_TCP_NOTSENT_LOWAT_BYTES,
+        tcp_user_timeout_ms=constants.SOCKET_TCP_USER_TIMEOUT_MS,
+    ),
+    ConnectionType.RELAY_TRANSACTION: SocketTuningProfile(
+        tcp_nodelay=True,
+        tcp_notsent_lowat=constants.SOCKET_TCP_NOTSENT_LOWAT_BYTES,
+        tcp_user_timeout_ms=constants.SOCKET_TCP_USER_TIMEOUT_MS,
+    ),
+    ConnectionType.GATEWAY: SocketTuningProfile(
+        tcp_nodelay=True,
+        tcp_notsent_lowat=constants.SOCKET_TCP_NOTSENT_LOWAT_BYTES,
+        tcp_user_timeout_ms=constants.SOCKET_TCP_USER_TIMEOUT_MS,
+    ),
+    ConnectionType.BLOCKCHAIN_NODE | ConnectionType.REMOTE_BLOCKCHAIN_NODE: SocketTuningProfile(
+        tcp_nodelay=True,
+        tcp_notsent_lowat=constants.SOCKET_TCP_NOTSENT_LOWAT_BYTES,
+    ),
+}
+
+
+def get_profile(
+    connection_type: ConnectionType,
+    profiles: Optional[Dict[ConnectionType, SocketTuningProfile]] = None
+) -> SocketTuningProfile:
+    if profiles is None:
+        profiles = DEFAULT_PROFILES
+
+    for profile_connection_type, profile in profiles.items():
+        if connection_type & profile_connection_type:
+            return profile
+    return DEFAULT_PROFILE
+
+
+def apply_profile(sock: Any, profile: SocketTuningProfile) -> Dict[str, int]:
+    """
+    Sets the profile options on the socket. Options that fail to set are skipped.
+
+    :return: values of the set options, as read back from the socket
+    """
+    applied_options = {}
+    for name, level, option, value in profile.get_socket_options():
+        try:
+            sock.setsockopt(level, option, value)
+            applied_options[name] = sock.getsockopt(level, option)
+        except OSError as e:
+            logger.debug("Failed to set socket option {} to {}: {}", name, value, e)
+    return applied_options
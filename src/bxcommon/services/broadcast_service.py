@@ -1,14 +1,27 @@
 from abc import abstractmethod, ABC
-from typing import Optional, List, Iterable, TypeVar, Generic, Tuple
+from typing import Optional, List, Iterable, TypeVar, Generic, Tuple, Dict, Hashable
+
+from prometheus_client import Counter
 
 from bxcommon.connections.abstract_connection import AbstractConnection
 from bxcommon.connections.connection_pool import ConnectionPool
 from bxcommon.connections.connection_type import ConnectionType
 from bxcommon.messages.abstract_message import AbstractMessage
+from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 from bxutils import logging
 
 logger = logging.get_logger(__name__)
 
+broadcast_conversions_saved_counter = Counter(
+    "broadcast_conversions_saved",
+    "Number of message version conversions avoided by converting once per broadcast version group",
+)
+broadcast_serializations_saved_counter = Counter(
+    "broadcast_serializations_saved",
+    "Number of message serializations avoided by sharing one buffer per broadcast version group",
+)
+
 
 class BroadcastOptions:
     broadcasting_connection: Optional[AbstractConnection]
@@ -40,6 +53,10 @@ class BroadcastService(Generic[MT, CT, OT], ABC):
     def __init__(self, connection_pool: ConnectionPool) -> None:
         self.connection_pool = connection_pool
 
+        # broadcast targets by connection types and targets key, valid for a version of the connection pool
+        self._targets_cache: Dict[Tuple[Tuple[ConnectionType, ...], Hashable], List[CT]] = {}
+        self._targets_cache_version = -1
+
     def broadcast(self, message: MT, options: OT) -> List[CT]:
         if options.broadcasting_connection is not None:
             logger.log(message.log_level(), "Broadcasting {} to [{}] connections from {}.",
@@ -57,24 +74,105 @@ class BroadcastService(Generic[MT, CT, OT], ABC):
     ) -> bool:
         pass
 
+    def get_targets_key(self, message: MT, _options: OT) -> Optional[Hashable]:
+        """
+        Returns a key of the message and options properties `should_broadcast_to_connection` depends on,
+        for reusing broadcast targets of messages with the same key and connection types until
+        a connection is added, deleted or updated. Returns None to check every connection per message.
+
+        Defaults to the network number of broadcast messages. Services that check other properties
+        of the message or options must override this.
+        """
+        if isinstance(message, AbstractBroadcastMessage):
+            return message.network_num()
+        return None
+
     def get_connections_for_broadcast(self, message: MT, options: OT) -> List[CT]:
-        connections = []
-        for connection in self.connection_pool.get_by_connection_types(
-            options.connection_types
-        ):
-            if (
-                self.should_broadcast_to_connection(message, connection, options) and
-                connection != options.broadcasting_connection
+        targets_key = self.get_targets_key(message, options)
+        if targets_key is None:
+            connections = []
+            for connection in self.connection_pool.get_by_connection_types(
+                options.connection_types
             ):
-                connections.append(connection)
+                if (
+                    self.should_broadcast_to_connection(message, connection, options) and
+                    connection != options.broadcasting_connection
+                ):
+                    connections.append(connection)
+        else:
+            connections = [
+                connection for connection in self._get_targets(message, options, targets_key)
+                if connection != options.broadcasting_connection
+            ]
+
+        return self.select_tree_connections(message, options, connections)
+
+    def select_tree_connections(self, _message: MT, _options: OT, connections: List[CT]) -> List[CT]:
+        """
+        Hook for broadcasting through a fan-out tree, e.g. with `BroadcastTreeService.select_connections`.
+        Returns the connections to send the message to out of the broadcast targets, which it defaults to.
+        """
         return connections
 
+    def _get_targets(self, message: MT, options: OT, targets_key: Hashable) -> List[CT]:
+        connection_pool = self.connection_pool
+        if self._targets_cache_version != connection_pool.connections_version:
+            self._targets_cache.clear()
+            self._targets_cache_version = connection_pool.connections_version
+
+        cache_key = (tuple(options.connection_types), targets_key)
+        targets = self._targets_cache.get(cache_key)
+        if targets is None:
+            targets = [
+                connection
+                for connection in connection_pool.get_by_connection_types(options.connection_types)
+                if self.should_broadcast_to_connection(message, connection, options)
+            ]
+            self._targets_cache[cache_key] = targets
+        return targets
+
     def broadcast_to_connections(
         self, message: AbstractMessage, connections: Iterable[CT], options: OT
     ) -> List[CT]:
+        """
+        Enqueues message on the active connections. Connections are grouped by the protocol
+        version they expect, and the message is converted and serialized once per group into
+        read-only bytes shared by all connections of the group.
+        """
         broadcast_connections = []
+        connections_by_version: Dict[Optional[int], List[CT]] = {}
+        priority = message.output_priority()
+        congested_connections = 0
         for connection in connections:
             if connection.is_active():
-                connection.enqueue_msg(message, options.prepend_to_queue)
+                # congested connections would only queue the message to drop it later
+                if connection.output_congested and connection.outputbuf.is_droppable(priority):
+                    congested_connections += 1
+                    continue
+                message_version = connection.get_message_version()
+                if message_version in connections_by_version:
+                    connections_by_version[message_version].append(connection)
+                else:
+                    connections_by_version[message_version] = [connection]
                 broadcast_connections.append(connection)
+
+        conversions_saved = 0
+        for message_version, version_connections in connections_by_version.items():
+            msg_bytes = version_connections[0].get_versioned_message_bytes(message)
+            if not isinstance(msg_bytes, SegmentedBuffer):
+                msg_bytes = memoryview(msg_bytes).toreadonly()
+            for connection in version_connections:
+                connection.enqueue_serialized_msg(message, msg_bytes, options.prepend_to_queue)
+
+            if message_version is not None:
+                conversions_saved += len(version_connections) - 1
+
+        if conversions_saved:
+            broadcast_conversions_saved_counter.inc(conversions_saved)
+        serializations_saved = len(broadcast_connections) - len(connections_by_version)
+        if serializations_saved:
+            broadcast_serializations_saved_counter.inc(serializations_saved)
+
+        if congested_connections:
+            logger.trace("Skipped broadcasting {} to {} congested connections.", message, congested_connections)
         return broadcast_connections
@@ -0,0 +1,96 @@
+from typing import Dict, List, Optional, Iterable, Set
+
+from bxutils import logging
+
+logger = logging.get_logger(__name__)
+
+
+class BroadcastTree:
+    """
+    Application level fan-out tree for messages broadcast by this node (the root).
+    Messages are sent directly to the forwarders and to peers without a forwarder,
+    and each forwarder relays them to its children. Children are only left to their forwarder
+    once it confirms relaying to them, until then they are sent to directly.
+    """
+
+    children_by_forwarder: Dict[str, List[str]]
+    forwarder_by_child: Dict[str, str]
+    confirmed_forwarder_by_child: Dict[str, str]
+
+    def __init__(self, children_by_forwarder: Dict[str, List[str]]) -> None:
+        self.children_by_forwarder = children_by_forwarder
+        self.forwarder_by_child = {
+            child: forwarder
+            for forwarder, children in children_by_forwarder.items()
+            for child in children
+        }
+        self.confirmed_forwarder_by_child = {}
+
+    def __repr__(self) -> str:
+        return f"BroadcastTree<forwarders: {len(self.children_by_forwarder)}, " \
+            f"children: {len(self.forwarder_by_child)}, confirmed: {len(self.confirmed_forwarder_by_child)}>"
+
+    def get_forwarder(self, peer_id: str) -> Optional[str]:
+        return self.forwarder_by_child.get(peer_id)
+
+    def get_children(self, peer_id: str) -> List[str]:
+        return self.children_by_forwarder.get(peer_id, [])
+
+    def confirm_children(self, forwarder: str, children: Iterable[str]) -> None:
+        """
+        Records the assigned children that forwarder confirmed relaying messages to, replacing
+        its previous confirmation.
+        """
+        confirmed_children = set(children)
+        confirmed_forwarder_by_child = self.confirmed_forwarder_by_child
+        for child in self.get_children(forwarder):
+            if child in confirmed_children:
+                confirmed_forwarder_by_child[child] = forwarder
+            else:
+                confirmed_forwarder_by_child.pop(child, None)
+
+    def get_direct_peers(self, peer_ids: Iterable[Optional[str]]) -> Set[Optional[str]]:
+        """
+        Returns the peers that the root has to send a message to itself, out of the message targets.
+        Children that are not confirmed by their forwarder, or whose forwarder is not a target itself,
+        are sent to directly.
+        """
+        target_peer_ids = set(peer_ids)
+        target_peer_ids.discard(None)
+        forwarder_by_child = self.confirmed_forwarder_by_child
+        return {
+            peer_id for peer_id in target_peer_ids
+            if forwarder_by_child.get(peer_id) not in target_peer_ids
+        }
+
+
+def build_broadcast_tree(latencies: Dict[str, float], fanout: int) -> BroadcastTree:
+    """
+    Builds a two level broadcast tree from the ping latencies of the root to its peers.
+
+    The peers with the lowest latency become forwarders, since they receive messages first.
+    The remaining peers are assigned to forwarders in order of latency, so each forwarder
+    gets at most `fanout` children with a similar spread of latencies.
+
+    :param latencies: ping latency from the root by peer id
+    :param fanout: maximum number of children per forwarder
+    :return: broadcast tree
+    """
+    if fanout < 1:
+        raise ValueError("Broadcast tree fanout must be positive.")
+
+    if len(latencies) <= fanout:
+        return BroadcastTree({})
+
+    peer_ids = sorted(latencies, key=lambda peer_id: (latencies[peer_id], peer_id))
+    forwarders_count = -(-len(peer_ids) // (fanout + 1))
+    children_by_forwarder: Dict[str, List[str]] = {
+        forwarder: [] for forwarder in peer_ids[:forwarders_count]
+    }
+    forwarders = peer_ids[:forwarders_count]
+    for i, child in enumerate(peer_ids[forwarders_count:]):
+        children_by_forwarder[forwarders[i % forwarders_count]].append(child)
+
+    broadcast_tree = BroadcastTree(children_by_forwarder)
+    logger.debug("Built {} from {} peers.", broadcast_tree, len(peer_ids))
+    return broadcast_tree
@@ -0,0 +1,137 @@
+from typing import Callable, List, Optional
+
+from bxcommon.connections.abstract_connection import AbstractConnection
+from bxcommon.connections.connection_pool import ConnectionPool
+from bxcommon.connections.internal_node_connection import InternalNodeConnection
+from bxcommon.messages.bloxroute.broadcast_tree_ack_message import BroadcastTreeAckMessage
+from bxcommon.messages.bloxroute.broadcast_tree_assign_message import BroadcastTreeAssignMessage
+from bxcommon.messages.bloxroute.protocol_version import BROADCAST_TREE_MESSAGE
+from bxcommon.services.broadcast_tree import BroadcastTree
+from bxutils import logging
+
+logger = logging.get_logger(__name__)
+
+
+class BroadcastTreeService:
+    """
+    Assigns the children of the broadcast tree of this node to its forwarders over internal node
+    connections, and keeps the children this node forwards to in the broadcast tree of another node.
+
+    Broadcast services send through the trees by returning `select_connections` from
+    `BroadcastService.select_tree_connections`.
+    """
+
+    connection_pool: ConnectionPool
+    broadcast_tree: Optional[BroadcastTree]
+    tree_parent_peer_id: Optional[str]
+    tree_children: List[str]
+
+    def __init__(self, connection_pool: ConnectionPool) -> None:
+        self.connection_pool = connection_pool
+
+        # fan-out tree of messages broadcast by this node
+        self.broadcast_tree = None
+
+        # peers this node forwards messages to as a forwarder in the broadcast tree of another node
+        self.tree_parent_peer_id = None
+        self.tree_children = []
+
+    def set_broadcast_tree(self, broadcast_tree: Optional[BroadcastTree]) -> None:
+        """
+        Replaces the fan-out tree of messages broadcast by this node, and sends the forwarders their
+        assigned children. Children are sent to directly until their forwarder confirms the assignment
+        with BroadcastTreeAckMessage, see `on_tree_children_confirmed`.
+        """
+        previous_forwarders = [] if self.broadcast_tree is None else self.broadcast_tree.children_by_forwarder
+        children_by_forwarder = {} if broadcast_tree is None else broadcast_tree.children_by_forwarder
+        self.broadcast_tree = broadcast_tree
+
+        assignments = dict(children_by_forwarder)
+        for forwarder in previous_forwarders:
+            if forwarder not in assignments:
+                assignments[forwarder] = []
+        for forwarder, children in assignments.items():
+            connection = self.connection_pool.by_node_id.get(forwarder)
+            if connection is not None and connection.is_active() and self.can_assign_tree_children(connection):
+                connection.enqueue_msg(BroadcastTreeAssignMessage(children))
+
+    def can_assign_tree_children(self, connection: AbstractConnection) -> bool:
+        """
+        Returns if the peer of connection handles BroadcastTreeAssignMessage, and can be a forwarder.
+        """
+        return isinstance(connection, InternalNodeConnection) and connection.protocol_version >= BROADCAST_TREE_MESSAGE
+
+    def on_tree_children_assigned(self, connection: AbstractConnection, children: List[str]) -> None:
+        """
+        Handles BroadcastTreeAssignMessage from the root of a broadcast tree on connection. Only the
+        children this node has a live connection to are forwarded to and confirmed to the root.
+        """
+        connection_pool = self.connection_pool
+        connected_children = []
+        for peer_id in children:
+            child_connection = connection_pool.by_node_id.get(peer_id)
+            if child_connection is not None and child_connection.is_active():
+                connected_children.append(peer_id)
+
+        # an empty assignment from a previous root does not replace the assignment of the current one
+        if connected_children or connection.peer_id == self.tree_parent_peer_id:
+            self.set_tree_children(connection.peer_id, connected_children)
+        connection.enqueue_msg(BroadcastTreeAckMessage(connected_children))
+
+    def on_tree_children_confirmed(self, connection: AbstractConnection, children: List[str]) -> None:
+        """
+        Handles BroadcastTreeAckMessage from a forwarder of the broadcast tree of this node on connection.
+        """
+        broadcast_tree = self.broadcast_tree
+        if broadcast_tree is not None and connection.peer_id is not None:
+            broadcast_tree.confirm_children(connection.peer_id, children)
+            logger.debug("{} confirmed {} tree children: {}", connection, len(children), broadcast_tree)
+
+    def set_tree_children(self, parent_peer_id: Optional[str], children: List[str]) -> None:
+        """
+        Makes this node a forwarder in the broadcast tree of parent_peer_id. Messages broadcast
+        from the parent are forwarded to the children, in addition to the usual broadcast targets.
+        """
+        self.tree_parent_peer_id = parent_peer_id
+        self.tree_children = children
+
+    def select_connections(
+        self,
+        connections: List[AbstractConnection],
+        broadcasting_connection: Optional[AbstractConnection],
+        can_forward_to_child: Callable[[AbstractConnection], bool],
+    ) -> List[AbstractConnection]:
+        """
+        Selects the connections to send a message to out of the broadcast targets. Messages from the
+        tree parent are also forwarded to the tree children that can_forward_to_child accepts, and
+        children confirmed by a forwarder that is a target are left to the forwarder.
+        """
+        if (
+            self.tree_children and
+            broadcasting_connection is not None and
+            broadcasting_connection.peer_id == self.tree_parent_peer_id
+        ):
+            connections = connections + self._get_tree_children_connections(connections, can_forward_to_child)
+
+        broadcast_tree = self.broadcast_tree
+        if broadcast_tree is not None and broadcast_tree.confirmed_forwarder_by_child:
+            direct_peer_ids = broadcast_tree.get_direct_peers(
+                connection.peer_id for connection in connections if connection.is_active()
+            )
+            connections = [
+                connection for connection in connections
+                if connection.peer_id is None or connection.peer_id in direct_peer_ids
+            ]
+        return connections
+
+    def _get_tree_children_connections(
+        self,
+        connections: List[AbstractConnection],
+        can_forward_to_child: Callable[[AbstractConnection], bool],
+    ) -> List[AbstractConnection]:
+        children_connections = []
+        for peer_id in self.tree_children:
+            connection = self.connection_pool.by_node_id.get(peer_id)
+            if connection is not None and connection not in connections and can_forward_to_child(connection):
+                children_connections.append(connection)
+        return children_connections
@@ -0,0 +1,267 @@
+import time
+from collections import defaultdict
+from itertools import groupby
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from bxcommon import constants
+from bxcommon.messages.abstract_message import AbstractMessage
+from bxcommon.utils import performance_utils
+from bxcommon.utils.stats import stats_format
+from bxutils import log_messages
+from bxutils import logging
+from bxutils.logging.log_level import LogLevel
+from bxutils.logging.log_record_type import LogRecordType
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from bxcommon.connections.abstract_connection import AbstractConnection
+
+logger = logging.get_logger(__name__)
+msg_handling_logger = logging.get_logger(LogRecordType.MessageHandlingTroubleshooting, __name__)
+
+
+class BatchedMessage(NamedTuple):
+    msg_type: bytes
+    message: AbstractMessage
+    payload_len: int
+    duplicate_filter_key: Optional[bytes] = None
+
+
+# pylint: disable=protected-access
+class MessageBatchService:
+    """
+    Processes the input of an established connection in batches. Every complete message on the
+    input buffer is parsed in a single pass (up to `constants.MSG_HANDLERS_MAX_BATCH_SIZE` messages)
+    before any handler runs. Consecutive messages of the same type are then passed together to the
+    handler in `message_batch_handlers`, or one by one to the handler in the connection's
+    `message_handlers` if the type does not have a batch handler.
+    """
+
+    def __init__(self, conn: "AbstractConnection") -> None:
+        self.conn = conn
+        # handlers that accept all consecutive messages of the same type parsed in one batch
+        self.message_batch_handlers: Dict[bytes, Callable[[List[AbstractMessage]], None]] = {}
+        # receive time shared by all messages of the batch currently being processed
+        self.message_batch_time = 0.0
+
+    def process_message_batch(self) -> None:
+        """
+        Processes the next bytes on the connection's input buffer, until the read budget
+        of the connection is used up.
+        """
+        conn = self.conn
+        logger.trace("START BATCH PROCESSING from {}", conn)
+
+        start_time = time.time()
+        messages_processed = defaultdict(int)
+        total_bytes_processed = 0
+        total_messages_processed = 0
+
+        while conn.socket_connection.alive:
+            if conn.read_budget.is_exhausted(start_time, total_messages_processed, total_bytes_processed):
+                conn.has_pending_input = conn.inputbuf.length > 0
+                break
+
+            self.message_batch_time = time.time()
+            conn.processing_message_index = 0
+
+            batch_size = min(
+                constants.MSG_HANDLERS_MAX_BATCH_SIZE, conn.read_budget.max_messages - total_messages_processed
+            )
+            batch, messages_dropped, bytes_dropped = self._pop_message_batch(batch_size)
+            total_messages_processed += messages_dropped
+            total_bytes_processed += bytes_dropped
+
+            batch_start_time = self.message_batch_time
+            for msg_type, messages in groupby(batch, key=lambda batched_message: batched_message.msg_type):
+                if not conn.socket_connection.alive:
+                    return
+                messages = list(messages)
+                self._process_message_group(msg_type, messages)
+                messages_processed[msg_type] += len(messages)
+                total_messages_processed += len(messages)
+                total_bytes_processed += sum(
+                    conn.message_factory.base_message_type.HEADER_LENGTH + batched_message.payload_len
+                    for batched_message in messages
+                )
+
+            performance_utils.log_operation_duration(
+                msg_handling_logger,
+                "Message batch handlers",
+                batch_start_time,
+                constants.MSG_HANDLERS_CYCLE_DURATION_WARN_THRESHOLD_S,
+                connection=conn,
+                count=len(batch)
+            )
+
+            if len(batch) + messages_dropped < batch_size:
+                break
+
+        performance_utils.log_operation_duration(msg_handling_logger,
+                                                 "Message handlers",
+                                                 start_time,
+                                                 constants.MSG_HANDLERS_DURATION_WARN_THRESHOLD_S,
+                                                 connection=conn, count=messages_processed)
+        duration_ms = (time.time() - start_time) * 1000
+        logger.trace("DONE BATCH PROCESSING from {}. Bytes processed: {}. Messages processed: {}. Duration: {}",
+                     conn, total_bytes_processed, messages_processed, stats_format.duration(duration_ms))
+
+    def _pop_message_batch(self, max_batch_size: int) -> Tuple[List[BatchedMessage], int, int]:
+        """
+        Parses up to `max_batch_size` complete messages off of the input buffer, without
+        running any message handlers. Messages dropped without being handled count toward
+        `max_batch_size`.
+
+        :return: parsed messages, number of dropped messages, bytes of dropped messages
+        """
+        conn = self.conn
+        batch = []
+        messages_dropped = 0
+        bytes_dropped = 0
+
+        while len(batch) + messages_dropped < max_batch_size:
+            input_buffer_len_before = conn.inputbuf.length
+            is_full_msg = False
+            payload_len = None
+            msg = None
+            msg_type = None
+
+            try:
+                if not conn.socket_connection.alive:
+                    break
+
+                is_full_msg, should_process, msg_type, payload_len = conn.pre_process_msg()
+
+                if not should_process and is_full_msg:
+                    conn.pop_next_bytes(payload_len)
+                    messages_dropped += 1
+                    continue
+
+                conn.message_validator.validate(
+                    is_full_msg,
+                    msg_type,
+                    conn.header_size,
+                    payload_len,
+                    conn.inputbuf
+                )
+
+                conn.process_msg_type(msg_type, is_full_msg, payload_len)
+
+                if not is_full_msg:
+                    break
+
+                duplicate_filter_key = conn._get_duplicate_filter_key(msg_type, payload_len, conn.inputbuf)
+                if conn._is_duplicate_message(duplicate_filter_key, msg_type):
+                    conn.pop_next_bytes(payload_len)
+                    messages_dropped += 1
+                    bytes_dropped += conn.message_factory.base_message_type.HEADER_LENGTH + payload_len
+                    continue
+
+                msg = conn.pop_next_message(payload_len)
+
+                if msg is None:
+                    if conn._report_bad_message():
+                        break
+                    continue
+
+                conn._log_inbound_throughput(msg_type, len(msg.rawbytes()))
+                batch.append(BatchedMessage(msg_type, msg, payload_len, duplicate_filter_key))
+
+            except MemoryError as e:
+                conn.log_error(log_messages.OUT_OF_MEMORY, e, exc_info=True)
+                conn.log_debug(
+                    "Failed message bytes: {}",
+                    conn._get_last_msg_bytes(msg, input_buffer_len_before, payload_len)
+                )
+                raise
+
+            # pylint: disable=broad-except
+            except Exception as e:
+                if conn._handle_message_processing_error(
+                    e,
+                    msg,
+                    msg_type,
+                    is_full_msg=is_full_msg,
+                    payload_len=payload_len,
+                    input_buffer_len_before=input_buffer_len_before
+                ):
+                    break
+
+        return batch, messages_dropped, bytes_dropped
+
+    def _process_message_group(self, msg_type: bytes, messages: List[BatchedMessage]) -> None:
+        """
+        Runs the handlers for a group of consecutive messages of the same type.
+        """
+        conn = self.conn
+        self._log_message_group(msg_type, messages)
+
+        if msg_type in self.message_batch_handlers:
+            if self._run_message_handler(
+                self.message_batch_handlers[msg_type],
+                [batched_message.message for batched_message in messages],
+                messages[0]
+            ):
+                for batched_message in messages:
+                    conn._remember_handled_message(batched_message.duplicate_filter_key)
+        elif msg_type in conn.message_handlers:
+            msg_handler = conn.message_handlers[msg_type]
+            for batched_message in messages:
+                if not conn.socket_connection.alive:
+                    return
+                if self._run_message_handler(msg_handler, batched_message.message, batched_message):
+                    conn._remember_handled_message(batched_message.duplicate_filter_key)
+                conn.processing_message_index += 1
+        else:
+            for batched_message in messages:
+                conn._remember_handled_message(batched_message.duplicate_filter_key)
+
+    def _log_message_group(self, msg_type: bytes, messages: List[BatchedMessage]) -> None:
+        conn = self.conn
+        if not logger.isEnabledFor(messages[0].message.log_level()) and logger.isEnabledFor(LogLevel.INFO):
+            conn._debug_message_tracker[msg_type] += len(messages)
+            return
+
+        if len(conn._debug_message_tracker) > 0:
+            conn.log_debug(
+                "Processed the following messages types: {} over {:.2f} seconds.",
+                conn._debug_message_tracker,
+                self.message_batch_time - conn._last_debug_message_log_time
+            )
+            conn._debug_message_tracker.clear()
+            conn._last_debug_message_log_time = self.message_batch_time
+
+        for batched_message in messages:
+            conn.log(batched_message.message.log_level(), "Processing message: {}", batched_message.message)
+
+    def _run_message_handler(self, msg_handler: Callable, handler_arg, batched_message: BatchedMessage) -> bool:
+        """
+        :return: if the handler completed without errors
+        """
+        conn = self.conn
+        try:
+            msg_handler(handler_arg)
+
+        except MemoryError as e:
+            conn.log_error(log_messages.OUT_OF_MEMORY, e, exc_info=True)
+            conn.log_debug(
+                "Failed message bytes: {}",
+                conn._get_last_msg_bytes(batched_message.message, -1, batched_message.payload_len)
+            )
+            raise
+
+        # pylint: disable=broad-except
+        except Exception as e:
+            conn._handle_message_processing_error(
+                e,
+                batched_message.message,
+                batched_message.msg_type,
+                is_full_msg=True,
+                payload_len=batched_message.payload_len,
+                # message has already been removed from the input buffer
+                input_buffer_len_before=-1
+            )
+            return False
+
+        conn.num_bad_messages = 0
+        return True
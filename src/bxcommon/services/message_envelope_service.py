@@ -0,0 +1,252 @@
+import time
+from typing import List, Optional, Union, TYPE_CHECKING
+
+from bxcommon import constants
+from bxcommon.messages.abstract_message import AbstractMessage
+from bxcommon.messages.bloxroute.batch_message import BatchMessage
+from bxcommon.messages.bloxroute.compressed_message import CompressedMessage
+from bxcommon.messages.bloxroute.protocol_version import BATCH_MESSAGE, COMPRESSED_MESSAGE
+from bxcommon.messages.validation.message_validation_error import MessageValidationError
+from bxcommon.utils.adaptive_compression import AdaptiveCompression
+from bxcommon.utils.alarm_queue import AlarmId
+from bxcommon.utils.buffers.input_buffer import InputBuffer
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
+from bxcommon.utils.stats import hooks
+from bxcommon.utils.stats.measurement_type import MeasurementType
+from bxcommon.utils.stats.throughput_service import throughput_statistics
+from bxutils import log_messages
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from bxcommon.connections.internal_node_connection import InternalNodeConnection
+
+
+class MessageEnvelopeService:
+    """
+    Sends and receives the envelope messages of an internal node connection: small messages
+    held for up to `constants.BATCH_MESSAGE_FLUSH_DELAY_S` and sent together in a BatchMessage,
+    and large messages sent in a CompressedMessage while `compression` finds it pays off.
+    """
+
+    def __init__(self, conn: "InternalNodeConnection") -> None:
+        self.conn = conn
+        self.node = conn.node
+        self.compression = AdaptiveCompression()
+        # compressible messages enqueued since the last compression update, and how many of them
+        # were enqueued while earlier messages were still waiting to be sent
+        self._compressible_count = 0
+        self._backlogged_count = 0
+
+        self._message_batch: List[Union[bytearray, memoryview]] = []
+        self._message_batch_bytes = 0
+        self._message_batch_priority = OutputPriority.TX
+        self._message_batch_alarm_id: Optional[AlarmId] = None
+
+    def enqueue_msg(
+        self,
+        msg: AbstractMessage,
+        msg_bytes: Union[bytearray, memoryview, SegmentedBuffer],
+        prepend: bool = False
+    ) -> bool:
+        """
+        Enqueues a serialized message compressed or in the message batch, if it should be.
+
+        :return: if the message was enqueued
+        """
+        if self._can_compress(msg, msg_bytes):
+            compression = self.compression
+            self._compressible_count += 1
+            if self.conn.outputbuf.has_queued_messages():
+                self._backlogged_count += 1
+            if time.time() - compression.last_update_time >= constants.COMPRESSION_UPDATE_INTERVAL_S:
+                self._update_compression()
+            if compression.should_compress(len(msg_bytes)) and self._enqueue_compressed_msg(msg, msg_bytes, prepend):
+                return True
+
+        if prepend or not self._can_batch(msg, msg_bytes):
+            return False
+
+        conn = self.conn
+        if not conn.socket_connection.alive:
+            return True
+
+        conn.log(msg.log_level(), "Enqueued message to batch: {}", msg)
+        priority = msg.output_priority()
+        if self._message_batch and (
+            priority != self._message_batch_priority
+            or self._message_batch_bytes + len(msg_bytes) > constants.BATCH_MESSAGE_MAX_SIZE_BYTES
+        ):
+            self.flush_message_batch()
+
+        self._message_batch.append(msg_bytes)
+        self._message_batch_bytes += len(msg_bytes)
+        self._message_batch_priority = priority
+
+        if len(self._message_batch) >= constants.BATCH_MESSAGE_MAX_COUNT:
+            self.flush_message_batch()
+        elif self._message_batch_alarm_id is None:
+            self._message_batch_alarm_id = self.node.alarm_queue.register_alarm(
+                constants.BATCH_MESSAGE_FLUSH_DELAY_S, self._flush_message_batch_on_alarm
+            )
+        return True
+
+    def flush_message_batch(self) -> None:
+        """
+        Enqueues the messages held for batching, in a single BatchMessage if there is more than one.
+        """
+        message_batch = self._message_batch
+        if not message_batch:
+            return
+
+        if self._message_batch_alarm_id is not None:
+            self.node.alarm_queue.unregister_alarm(self._message_batch_alarm_id)
+            self._message_batch_alarm_id = None
+
+        self._message_batch = []
+        self._message_batch_bytes = 0
+        if len(message_batch) == 1:
+            msg_bytes = message_batch[0]
+        else:
+            batch_message = BatchMessage(message_batch, self._message_batch_priority)
+            self.conn.log(batch_message.log_level(), "Enqueued message: {}", batch_message)
+            msg_bytes = batch_message.rawbytes()
+        self.conn.enqueue_msg_bytes(msg_bytes, False, self._message_batch_priority)
+
+    def msg_batch(self, msg: BatchMessage) -> None:
+        conn = self.conn
+        for msg_bytes in msg.messages_bytes():
+            if not conn.is_alive():
+                return
+            if not self.process_inner_message(msg_bytes, len(msg_bytes)):
+                return
+
+    def msg_compressed(self, msg: CompressedMessage) -> None:
+        # the received bytes of the message are the compressed ones
+        self.process_inner_message(msg.decompress(self._get_max_message_len()), len(msg.rawbytes()))
+
+    def process_inner_message(self, msg_bytes: Union[bytearray, memoryview], received_bytes: int) -> bool:
+        """
+        Processes a message carried inside of an envelope message the same way the connection processes
+        the messages read from the socket: the message is validated, dropped if it is a copy of a recently
+        handled message, and passed to its handler.
+
+        :param msg_bytes: full message, including its header
+        :param received_bytes: bytes received for the message, as recorded in the throughput stats
+        :return: if processing of the rest of the envelope should continue
+        """
+        # pylint: disable=protected-access
+        conn = self.conn
+        input_buffer = InputBuffer()
+        input_buffer.add_bytes(msg_bytes)
+        is_full_msg, msg_type, payload_len = conn.message_factory.get_message_header_preview_from_input_buffer(
+            input_buffer
+        )
+        msg = None
+        duplicate_filter_key = None
+
+        try:
+            header_length = conn.message_factory.base_message_type.HEADER_LENGTH
+            if not is_full_msg or header_length + payload_len != len(msg_bytes):
+                raise MessageValidationError(
+                    f"Inner message of {len(msg_bytes)} bytes does not match the payload length in its header."
+                )
+            if msg_type in conn.ENVELOPE_MESSAGE_TYPES:
+                raise MessageValidationError(f"{msg_type} message is not allowed inside of another message.")
+
+            conn.message_validator.validate(True, msg_type, conn.header_size, payload_len, input_buffer)
+
+            duplicate_filter_key = conn._get_duplicate_filter_key(msg_type, payload_len, input_buffer)
+            if conn._is_duplicate_message(duplicate_filter_key, msg_type):
+                return True
+
+            msg = conn.parse_message(msg_bytes)
+            conn._handle_message(msg_type, msg, received_bytes)
+
+        except MemoryError as e:
+            conn.log_error(log_messages.OUT_OF_MEMORY, e, exc_info=True)
+            conn.log_debug("Failed message bytes: {}", conn._get_last_msg_bytes(msg, -1, payload_len))
+            raise
+
+        # pylint: disable=broad-except
+        except Exception as e:
+            # message is not on the input buffer
+            return not conn._handle_message_processing_error(
+                e, msg, msg_type, is_full_msg=True, payload_len=payload_len, input_buffer_len_before=-1
+            )
+
+        conn.num_bad_messages = 0
+        conn._remember_handled_message(duplicate_filter_key)
+        return True
+
+    def dispose(self) -> None:
+        if self._message_batch_alarm_id is not None:
+            self.node.alarm_queue.unregister_alarm(self._message_batch_alarm_id)
+            self._message_batch_alarm_id = None
+        self._message_batch = []
+        self._message_batch_bytes = 0
+
+    def _can_compress(self, msg: AbstractMessage, msg_bytes: Union[bytearray, memoryview, SegmentedBuffer]) -> bool:
+        conn = self.conn
+        return (
+            conn.established
+            and conn.protocol_version >= COMPRESSED_MESSAGE
+            and msg.msg_type() in conn.COMPRESSED_MESSAGE_TYPES
+            and not isinstance(msg_bytes, SegmentedBuffer)
+            # larger messages would not be decompressed by peers with the same limits
+            and len(msg_bytes) <= self._get_max_message_len()
+        )
+
+    def _can_batch(self, msg: AbstractMessage, msg_bytes: Union[bytearray, memoryview, SegmentedBuffer]) -> bool:
+        if isinstance(msg_bytes, SegmentedBuffer) or len(msg_bytes) >= constants.BATCH_MESSAGE_MAX_SIZE_BYTES:
+            return False
+        conn = self.conn
+        return (
+            conn.established
+            and conn.protocol_version >= BATCH_MESSAGE
+            and msg.msg_type() in conn.BATCHED_MESSAGE_TYPES
+        )
+
+    def _enqueue_compressed_msg(
+        self, msg: AbstractMessage, msg_bytes: Union[bytearray, memoryview], prepend: bool
+    ) -> bool:
+        """
+        Enqueues msg compressed, unless compressing it does not make it smaller.
+
+        :return: if the message was enqueued
+        """
+        conn = self.conn
+        compressed_bytes, compression_time_s = self.compression.compress(msg_bytes)
+        hooks.add_measurement(
+            conn.peer_desc, MeasurementType.COMPRESSION_INPUT_BYTES, len(msg_bytes), conn.peer_id
+        )
+        hooks.add_measurement(
+            conn.peer_desc, MeasurementType.COMPRESSION_OUTPUT_BYTES, len(compressed_bytes), conn.peer_id
+        )
+        hooks.add_measurement(conn.peer_desc, MeasurementType.COMPRESSION_TIME, compression_time_s, conn.peer_id)
+
+        if len(compressed_bytes) + CompressedMessage.HEADER_LENGTH + constants.UL_INT_SIZE_IN_BYTES \
+                + constants.CONTROL_FLAGS_LEN >= len(msg_bytes):
+            return False
+
+        compressed_message = CompressedMessage(compressed_bytes, len(msg_bytes), msg.output_priority())
+        conn.log(msg.log_level(), "Enqueued message: {} as {}", msg, compressed_message)
+        conn.enqueue_msg_bytes(compressed_message.rawbytes(), prepend, msg.output_priority())
+        return True
+
+    def _update_compression(self) -> None:
+        conn = self.conn
+        congested = conn.writing_paused or self._backlogged_count * 2 > self._compressible_count
+        # while messages queue up, the connection sends as fast as the peer receives
+        capacity_bytes_per_s = throughput_statistics.get_peer_throughput_out(conn.peer_desc) if congested else None
+        self._compressible_count = 0
+        self._backlogged_count = 0
+        self.compression.update(congested, capacity_bytes_per_s)
+
+    def _get_max_message_len(self) -> int:
+        return CompressedMessage.HEADER_LENGTH + self.conn.message_validator.get_max_payload_len()
+
+    def _flush_message_batch_on_alarm(self) -> float:
+        self._message_batch_alarm_id = None
+        self.flush_message_batch()
+        return 0
@@ -3,7 +3,8 @@ from nacl.exceptions import CryptoError
 from bxcommon.exceptions import DecryptionError
 from bxcommon.utils import crypto, convert
 from bxcommon.utils.crypto import symmetric_decrypt, symmetric_encrypt
-from bxcommon.utils.expiration_queue import ExpirationQueue
+from bxcommon.utils.bucketed_expiration_queue import BucketedExpirationQueue
+from bxcommon.utils.expiry_sweeper import ExpiringCollection, get_expiry_sweeper
 from bxutils import log_messages
 from bxutils import logging
 
@@ -27,16 +28,18 @@ class EncryptionCacheItem:
             raise DecryptionError("Decryption failed. Key does not match ciphertext.")
 
 
-class EncryptedCache:
+class EncryptedCache(ExpiringCollection):
     """
     Storage for in-progress received or sent encrypted blocks.
     """
 
     def __init__(self, expiration_time_s, alarm_queue) -> None:
         self._cache = {}
-        self._expiration_queue = ExpirationQueue(expiration_time_s)
+        self._expiration_queue = BucketedExpirationQueue(expiration_time_s)
         self._expiration_time_s = expiration_time_s
         self._alarm_queue = alarm_queue
+        self._expiry_sweeper = get_expiry_sweeper(alarm_queue)
+        self._expiry_sweeper.register(self)
 
     def encrypt_and_add_payload(self, payload):
         """
@@ -102,14 +105,21 @@ class EncryptedCache:
         if hash_key in self._cache:
             del self._cache[hash_key]
 
+    def _remove_items(self, hash_keys):
+        cache = self._cache
+        for hash_key in hash_keys:
+            cache.pop(hash_key, None)
+
     def _add(self, hash_key, encryption_key, ciphertext, payload):
         self._cache[hash_key] = EncryptionCacheItem(encryption_key, ciphertext, payload)
         self._expiration_queue.add(hash_key)
-        self._alarm_queue.register_approx_alarm(self._expiration_time_s * 2, self._expiration_time_s,
-                                                self._cleanup_old_cache_items)
+        self._expiry_sweeper.schedule()
+
+    def sweep_expired(self, limit: int) -> int:
+        return len(self._expiration_queue.remove_expired_batch(remove_batch_callback=self._remove_items, limit=limit))
 
-    def _cleanup_old_cache_items(self):
-        self._expiration_queue.remove_expired(remove_callback=self.remove_item)
+    def has_expiring_entries(self) -> bool:
+        return bool(self._expiration_queue)
 
     def __iter__(self):
         return iter(self._cache)
@@ -13,6 +13,7 @@ from bxcommon.messages.bloxroute.block_confirmation_message import BlockConfirma
 from bxcommon.messages.bloxroute.blocks_short_ids_serializer import BlockShortIds
 from bxcommon.messages.bloxroute.bloxroute_version_manager import bloxroute_version_manager
 from bxcommon.messages.bloxroute.broadcast_message import BroadcastMessage
+from bxcommon.messages.bloxroute.compressed_block_txs_message import CompressedBlockTxsMessage
 from bxcommon.messages.bloxroute.get_txs_message import GetTxsMessage
 from bxcommon.messages.bloxroute.hello_message import HelloMessage
 from bxcommon.messages.bloxroute.key_message import KeyMessage
@@ -34,6 +35,7 @@ from bxcommon.models.transaction_info import TransactionInfo
 from bxcommon.test_utils import helpers
 from bxcommon.test_utils.abstract_test_case import AbstractTestCase
 from bxcommon.utils import nonce_generator
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 
 M1 = TypeVar("M1", bound=AbstractBloxrouteMessage)
 M2 = TypeVar("M2", bound=AbstractBloxrouteMessage)
@@ -158,6 +160,16 @@ class AbstractBloxrouteVersionManagerTest(
             ]
         )
 
+    def compressed_block_txs_message(self) -> CompressedBlockTxsMessage:
+        return CompressedBlockTxsMessage(
+            self.NETWORK_NUMBER,
+            helpers.generate_object_hash(),
+            [
+                TransactionInfo(helpers.generate_object_hash(), helpers.generate_bytearray(250), i,)
+                for i in range(1, 10)
+            ]
+        )
+
     def key_message(self) -> KeyMessage:
         return KeyMessage(
             helpers.generate_object_hash(),
@@ -749,6 +761,48 @@ class AbstractBloxrouteVersionManagerTest(
         )
         self.compare_bdn_performance_stats_old_to_current(old_to_current_message, current_message)
 
+    def test_conversion_cache(self):
+        cached_messages = [
+            self.broadcast_message(),
+            self.tx_message(),
+            self.key_message(),
+            self.txstart_message(),
+            self.txblock_message(),
+            self.txtxs_message(),
+            self.txdone_message(),
+            self.compressed_block_txs_message(),
+        ]
+        for current_message in cached_messages:
+            converted_message = bloxroute_version_manager.convert_message_to_older_version(
+                self.version_to_test(), current_message
+            )
+            hits = bloxroute_version_manager.conversion_cache_hits
+            self.assertIs(
+                converted_message,
+                bloxroute_version_manager.convert_message_to_older_version(self.version_to_test(), current_message)
+            )
+            self.assertEqual(hits + 1, bloxroute_version_manager.conversion_cache_hits)
+
+            bloxroute_version_manager.invalidate_converted_message(current_message)
+            misses = bloxroute_version_manager.conversion_cache_misses
+            reconverted_message = bloxroute_version_manager.convert_message_to_older_version(
+                self.version_to_test(), current_message
+            )
+            self.assertEqual(misses + 1, bloxroute_version_manager.conversion_cache_misses)
+            self.assertEqual(converted_message.rawbytes(), reconverted_message.rawbytes())
+
+    def test_convert_message_bytes(self):
+        for current_message in [self.broadcast_message(), self.tx_message()]:
+            converted_message_bytes = bloxroute_version_manager.convert_message_bytes_to_older_version(
+                self.version_to_test(), current_message
+            )
+            converted_message = bloxroute_version_manager.convert_message_to_older_version(
+                self.version_to_test(), current_message
+            )
+            if isinstance(converted_message_bytes, SegmentedBuffer):
+                converted_message_bytes = converted_message_bytes.tobytes()
+            self.assertEqual(converted_message.rawbytes(), converted_message_bytes)
+
     # </editor-fold>
 
     # <editor-fold desc="UTILITIES">
@@ -296,6 +296,11 @@ def get_common_opts(
             "hostname": "bxlocal",
             "sdn_url": f"{constants.LOCALHOST}:8080",
             "enable_buffered_send": False,
+            "enable_adaptive_buffered_send": False,
+            "track_detailed_sent_messages": False,
+            "output_buffer_high_watermark_bytes": constants.OUTPUT_BUFFER_HIGH_WATERMARK_BYTES,
+            "output_buffer_low_watermark_bytes": constants.OUTPUT_BUFFER_LOW_WATERMARK_BYTES,
+            "use_timing_wheel_alarm_queue": False,
             "block_compression_debug": False,
             "enable_tcp_quickack": True,
             "thread_pool_parallelism_degree": config.get_thread_pool_parallelism_degree(
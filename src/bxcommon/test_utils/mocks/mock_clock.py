@@ -0,0 +1,26 @@
+from mock import patch
+
+
+class MockClock:
+    """
+    Clock of deterministic tests of time based behavior, patched in as `time.time` and moved
+    forward only by `advance`.
+
+    with mock_clock.patch():
+        ...
+        mock_clock.advance(0.01)
+    """
+
+    now: float
+
+    def __init__(self, now: float = 1600000000.0) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    def patch(self):
+        return patch("time.time", self.time)
@@ -11,6 +11,8 @@ from bxcommon.network.network_direction import NetworkDirection
 from bxcommon.utils import memory_utils
 from bxcommon.utils.buffers.input_buffer import InputBuffer
 from bxcommon.utils.buffers.output_buffer import OutputBuffer
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 from bxcommon.utils.memory_utils import SpecialMemoryProperties, SpecialTuple
 from bxcommon.models.broadcast_message_type import BroadcastMessageType
 
@@ -28,6 +30,7 @@ class MockConnection(AbstractConnection, SpecialMemoryProperties):
         self.peer_ip, self.peer_port = sock.endpoint
         self.endpoint = sock.endpoint
         self.peer_id = None
+        self.ping_latency = None
         self.my_ip = node.opts.external_ip
         self.my_port = node.opts.external_port
         self.direction = self.socket_connection.direction
@@ -46,6 +49,10 @@ class MockConnection(AbstractConnection, SpecialMemoryProperties):
         self.num_bad_messages = 0
         self.peer_desc = "{} {}".format(self.peer_ip, self.peer_port)
         self.message_handlers = None
+        self.has_pending_input = False
+        self.reading_paused_for_backlog = False
+        self.writing_paused = False
+        self.output_congested = False
         self.network_num = node.opts.blockchain_network_num
         self.format_connection()
 
@@ -77,24 +84,27 @@ class MockConnection(AbstractConnection, SpecialMemoryProperties):
     def advance_bytes_on_buffer(self, buf, bytes_written):
         buf.advance_buffer(bytes_written)
 
-    def enqueue_msg(self, msg: AbstractMessage, prepend: bool = False):
-        if not self.is_alive():
-            return
-
-        self.outputbuf.enqueue_msgbytes(msg.rawbytes())
-        self.enqueued_messages.append(msg)
-
     def enqueue_msg_bytes(
         self,
-        msg_bytes: Union[bytearray, memoryview],
+        msg_bytes: Union[bytearray, memoryview, SegmentedBuffer],
         prepend: bool = False,
+        priority: OutputPriority = OutputPriority.TX,
     ):
         if not self.is_alive():
             return
 
-        self.outputbuf.enqueue_msgbytes(msg_bytes)
+        self.outputbuf.enqueue_msgbytes(msg_bytes, priority)
         self.enqueued_messages.append(msg_bytes)
 
+    def enqueue_serialized_msg(
+        self, msg: AbstractMessage, msg_bytes: Union[bytearray, memoryview, SegmentedBuffer], prepend: bool = False
+    ):
+        if not self.is_alive():
+            return
+
+        self.outputbuf.enqueue_msgbytes(msg_bytes, msg.output_priority())
+        self.enqueued_messages.append(msg)
+
     def process_message(self):
         pass
 
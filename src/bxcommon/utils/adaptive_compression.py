@@ -0,0 +1,133 @@
+import time
+import zlib
+from typing import Optional, Union, Tuple
+
+from bxcommon import constants
+from bxutils import logging
+
+logger = logging.get_logger(__name__)
+
+
+class AdaptiveCompression:
+    """
+    Decides whether messages sent to a peer are compressed, from the measured compression
+    ratio and CPU time and whether the connection to the peer is congested.
+
+    Compression only saves time while messages queue up on the connection, since otherwise
+    they are sent as soon as they are enqueued. It is enabled while the connection is congested
+    and the time it saves sending the removed bytes at the measured capacity of the connection
+    is above the time spent compressing them. While it is disabled, one out of every
+    `probe_interval` eligible messages is still compressed to keep the measurements current.
+    """
+
+    # the last compressed bytes, reused when the same buffer is sent to several peers
+    _last_compressed: Optional[Tuple[Union[bytearray, memoryview], bytes]] = None
+
+    level: int
+    min_size: int
+    probe_interval: int
+    enabled: bool
+    input_bytes: int
+    output_bytes: int
+    compression_time_s: float
+    compression_ratio: float
+    time_per_byte_s: float
+    last_update_time: float
+
+    def __init__(
+        self,
+        level: int = constants.COMPRESSION_LEVEL,
+        min_size: int = constants.COMPRESSION_MIN_MESSAGE_SIZE_BYTES,
+        probe_interval: int = constants.COMPRESSION_PROBE_INTERVAL,
+    ) -> None:
+        self.level = level
+        self.min_size = min_size
+        self.probe_interval = probe_interval
+
+        # enabled until measured otherwise
+        self.enabled = True
+
+        # measurements since the last update
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.compression_time_s = 0.0
+
+        # estimates as of the last update
+        self.compression_ratio = 1.0
+        self.time_per_byte_s = 0.0
+        self.last_update_time = time.time()
+
+        self._skipped_count = 0
+
+    def __repr__(self) -> str:
+        return f"AdaptiveCompression<enabled: {self.enabled}, ratio: {self.compression_ratio:.2f}, " \
+            f"time per MB: {self.time_per_byte_s * 1024 * 1024 * 1000:.2f}ms>"
+
+    def should_compress(self, length: int) -> bool:
+        if length < self.min_size:
+            return False
+        if self.enabled:
+            return True
+
+        self._skipped_count += 1
+        if self._skipped_count >= self.probe_interval:
+            self._skipped_count = 0
+            return True
+        return False
+
+    def compress(self, msg_bytes: Union[bytearray, memoryview]) -> Tuple[bytes, float]:
+        """
+        Compresses msg_bytes and records the ratio and time it took.
+
+        :return: compressed bytes, time spent compressing in seconds
+        """
+        last_compressed = AdaptiveCompression._last_compressed
+        if last_compressed is not None and last_compressed[0] is msg_bytes:
+            compressed_bytes = last_compressed[1]
+            compression_time_s = 0.0
+        else:
+            start_time = time.perf_counter()
+            compressed_bytes = zlib.compress(msg_bytes, self.level)
+            compression_time_s = time.perf_counter() - start_time
+            AdaptiveCompression._last_compressed = (msg_bytes, compressed_bytes)
+
+        self.input_bytes += len(msg_bytes)
+        self.output_bytes += len(compressed_bytes)
+        self.compression_time_s += compression_time_s
+        return compressed_bytes, compression_time_s
+
+    def update(self, congested: bool, capacity_bytes_per_s: Optional[float] = None) -> bool:
+        """
+        Updates the estimates from the messages compressed since the last update
+        and enables or disables compression.
+
+        :param congested: if messages queued up on the connection since the last update
+        :param capacity_bytes_per_s: rate the connection sent at while congested, if known
+        :return: if compression is enabled
+        """
+        self.last_update_time = time.time()
+        if self.input_bytes:
+            self.compression_ratio = self.output_bytes / self.input_bytes
+            self.time_per_byte_s = self.compression_time_s / self.input_bytes
+            self.input_bytes = 0
+            self.output_bytes = 0
+            self.compression_time_s = 0.0
+
+        if not congested:
+            enabled = False
+        elif capacity_bytes_per_s:
+            saved_time_per_byte_s = (1 - self.compression_ratio) / capacity_bytes_per_s
+            enabled = saved_time_per_byte_s > self.time_per_byte_s
+        else:
+            # nothing was sent while congested
+            enabled = self.compression_ratio < 1
+
+        if enabled != self.enabled:
+            logger.debug(
+                "{} compression. Congested: {}, capacity: {} bytes/s. {}",
+                "Enabling" if enabled else "Disabling", congested, capacity_bytes_per_s, self
+            )
+            self.enabled = enabled
+            self._skipped_count = 0
+
+        return self.enabled
@@ -0,0 +1,94 @@
+import time
+from typing import Dict, List, Tuple
+
+from prometheus_client import Histogram
+
+from bxcommon import constants
+from bxutils import logging
+from bxutils.logging import LogRecordType
+
+logger = logging.get_logger(LogRecordType.AlarmTroubleshooting, __name__)
+
+alarm_duration_histogram = Histogram(
+    "alarm_duration_s",
+    "Time alarm callbacks take to execute",
+    ("alarm",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+
+
+class AlarmDurationStats:
+    count: int
+    total_duration_s: float
+    max_duration_s: float
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_duration_s = 0.0
+        self.max_duration_s = 0.0
+
+    def __repr__(self) -> str:
+        return f"AlarmDurationStats<count: {self.count}, total: {self.total_duration_s * 1000:.2f}ms, " \
+            f"max: {self.max_duration_s * 1000:.2f}ms>"
+
+
+class AlarmProfiler:
+    """
+    Records how long alarm callbacks take to execute, by callback `__qualname__`.
+
+    Durations are exported as a histogram per callback. Every `log_interval_s` the callbacks
+    that took the most time in total since the previous report are logged.
+    """
+
+    log_interval_s: float
+    top_count: int
+    durations: Dict[str, AlarmDurationStats]
+    last_log_time: float
+
+    def __init__(
+        self,
+        log_interval_s: float = constants.ALARM_PROFILER_LOG_INTERVAL_S,
+        top_count: int = constants.ALARM_PROFILER_TOP_COUNT,
+    ) -> None:
+        self.log_interval_s = log_interval_s
+        self.top_count = top_count
+        self.durations = {}
+        self.last_log_time = time.time()
+        self._histograms: Dict[str, Histogram] = {}
+
+    def record(self, name: str, duration_s: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = alarm_duration_histogram.labels(name)
+            self._histograms[name] = histogram
+        histogram.observe(duration_s)
+
+        stats = self.durations.get(name)
+        if stats is None:
+            stats = AlarmDurationStats()
+            self.durations[name] = stats
+        stats.count += 1
+        stats.total_duration_s += duration_s
+        stats.max_duration_s = max(stats.max_duration_s, duration_s)
+
+        if time.time() - self.last_log_time >= self.log_interval_s:
+            self.log_top_alarms()
+
+    def get_top_alarms(self) -> List[Tuple[str, AlarmDurationStats]]:
+        return sorted(
+            self.durations.items(), key=lambda item: item[1].total_duration_s, reverse=True
+        )[:self.top_count]
+
+    def log_top_alarms(self) -> None:
+        """
+        Logs the callbacks that took the most time since the last report and starts a new one.
+        """
+        now = time.time()
+        if self.durations:
+            logger.info(
+                "Alarms that took the most time in the last {:.0f}s: {}",
+                now - self.last_log_time,
+                ", ".join(f"{name}: {stats}" for name, stats in self.get_top_alarms())
+            )
+        self.durations = {}
+        self.last_log_time = now
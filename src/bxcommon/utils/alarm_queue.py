@@ -1,16 +1,35 @@
+import functools
+import threading
 import time
+from collections import deque
 from heapq import heappop, heappush
 from threading import RLock
-from typing import List, Optional, Callable, Dict
+from typing import List, Optional, Callable, Dict, Tuple, Deque
+
+from prometheus_client import Counter, Gauge
 
 from bxcommon import constants
 from bxcommon.utils import performance_utils
+from bxcommon.utils.alarm_profiler import AlarmProfiler
 from bxutils import logging
 from bxutils.logging import LogRecordType
 
 logger = logging.get_logger(__name__)
 alarm_troubleshooting_logger = logging.get_logger(LogRecordType.AlarmTroubleshooting, __name__)
 
+approx_alarms_coalesced_counter = Counter(
+    "alarm_approx_coalesced",
+    "Number of approximate alarm registrations coalesced into an alarm already scheduled in their window",
+)
+alarm_queue_size_gauge = Gauge(
+    "alarm_queue_size",
+    "Number of alarms stored in the alarm queue, including canceled alarms not removed yet",
+)
+alarm_queue_cancelled_ratio_gauge = Gauge(
+    "alarm_queue_cancelled_ratio",
+    "Ratio of canceled alarms not removed yet to live alarms in the alarm queue",
+)
+
 
 class Alarm:
     """
@@ -85,7 +104,10 @@ class AlarmId:
 
 class AlarmQueue:
     """
-    Queue for events that take place some time in the future.
+    Queue for events that take place some time in the future, stored in a min-heap.
+
+    Subclasses can store alarms differently by overriding `_push_alarm`, `_pop_due_alarm`,
+    `_remove_cancelled_alarms`, `_has_alarms` and `_next_fire_time`, see `TimingWheelAlarmQueue`.
 
     Constants
     ---------
@@ -93,17 +115,54 @@ class AlarmQueue:
 
     Attributes
     ----------
-    alarms: list of alarms, denoted by (fire time, unique count, alarm function)
+    alarms: min-heap of alarms, denoted by (fire time, unique count, alarm function)
     uniq_count: counter used for tiebreakers in heap comparison if same fire time
     approx_alarms_scheduled: function => min-heap of scheduled alarms. used to ensure multiple alarms
                              with the same function handle are not executed repeatedly
+    approx_alarm_buckets: (function, fire time bucket) => scheduled alarms, index of `approx_alarms_scheduled`
+                          by fire time in buckets as wide as the slop the function was first registered with
+    cancelled_count: number of canceled alarms still stored in the queue
+    profiler: execution time of alarm callbacks
+    lock: lock taken by all calls, until the queue is owned by a thread
+
+    Once `set_owner_thread` is called, usually by the event loop, calls from the owner thread skip the lock.
+    Registrations and cancellations from other threads are queued instead, and applied in order by the owner
+    thread at the start of `fire_alarms` and `time_to_next_alarm`. Alarms canceled from another thread never
+    fire, even before the cancellation is applied. Only the owner thread may fire alarms.
+
+    Each call of `fire_alarms` fires due alarms for up to `constants.ALARM_QUEUE_TICK_BUDGET_S`,
+    the ones left wait for the next call.
+
+    Canceled alarms stay in the heap until they reach its head. Once they are most of a large heap,
+    the heap is set aside in `_compacting_alarms` and its live alarms are moved to a new heap a batch
+    per `fire_alarms` call, while alarms are popped from whichever of the two heaps is earlier.
     """
 
+    # most buckets searched for an approximate alarm before scanning all alarms of the function instead
+    APPROX_ALARM_MAX_SEARCHED_BUCKETS = 4
+
     def __init__(self) -> None:
         self.alarms: List[AlarmId] = []
         self.uniq_count: int = 0
         self.approx_alarms_scheduled: Dict[Callable, List[AlarmId]] = {}
+        self.approx_alarm_buckets: Dict[Tuple[Callable, int], List[AlarmId]] = {}
+        self._approx_alarm_bucket_widths: Dict[Callable, float] = {}
+        self.cancelled_count = 0
+        self._compacting_alarms: List[AlarmId] = []
+        self.profiler = AlarmProfiler()
         self.lock = RLock()
+        self._owner_thread_id: Optional[int] = None
+        # operations of other threads for the owner thread to apply, deque appends and pops are thread-safe
+        self._inbound_operations: Deque[Callable[[], None]] = deque()
+        self._create_metrics()
+
+    def set_owner_thread(self, thread_id: Optional[int] = None) -> None:
+        """
+        Makes the queue owned by a thread, so that its calls skip the lock.
+        :param thread_id: identifier of the owner thread, the calling thread if None
+        """
+        with self.lock:
+            self._owner_thread_id = threading.get_ident() if thread_id is None else thread_id
 
     def register_alarm(
         self,
@@ -138,12 +197,20 @@ class AlarmQueue:
         alarm_id = AlarmId(time.time() + fire_delay, self.uniq_count, alarm)
 
         if fire_immediately and fire_delay == 0:
+            alarm_id.is_active = False
             alarm.fire()
             return alarm_id
 
-        with self.lock:
-            heappush(self.alarms, alarm_id)
+        owner_thread_id = self._owner_thread_id
+        if owner_thread_id is None:
+            with self.lock:
+                self._push_alarm(alarm_id)
+                self.uniq_count += 1
+        elif owner_thread_id == threading.get_ident():
+            self._push_alarm(alarm_id)
             self.uniq_count += 1
+        else:
+            self._inbound_operations.append(functools.partial(self._push_inbound_alarm, alarm_id))
         return alarm_id
 
     def register_approx_alarm(
@@ -174,77 +241,55 @@ class AlarmQueue:
         if slop < 0:
             raise ValueError("Invalid negative slop.")
 
-        with self.lock:
-            if fn not in self.approx_alarms_scheduled:
-                new_alarm_id = self.register_alarm(
-                    fire_delay, fn, *args, alarm_name=alarm_name, **kwargs
-                )
-                self.approx_alarms_scheduled[fn] = []
-                heappush(self.approx_alarms_scheduled[fn], new_alarm_id)
-            else:
-                now = time.time()
-                late_time, early_time = fire_delay + now + slop, fire_delay + now - slop
-                for alarm_id in self.approx_alarms_scheduled[fn]:
-                    if early_time <= alarm_id.fire_time <= late_time:
-                        return
-                heappush(
-                    self.approx_alarms_scheduled[fn],
-                    self.register_alarm(fire_delay, fn, *args, alarm_name=alarm_name, **kwargs)
+        owner_thread_id = self._owner_thread_id
+        if owner_thread_id is None:
+            with self.lock:
+                self._register_approx_alarm(fire_delay, slop, fn, *args, alarm_name=alarm_name, **kwargs)
+        elif owner_thread_id == threading.get_ident():
+            self._register_approx_alarm(fire_delay, slop, fn, *args, alarm_name=alarm_name, **kwargs)
+        else:
+            # fire time is counted from when the owner thread applies the registration
+            self._inbound_operations.append(
+                functools.partial(
+                    self._register_approx_alarm, fire_delay, slop, fn, *args, alarm_name=alarm_name, **kwargs
                 )
+            )
 
     def unregister_alarm(self, alarm_id: AlarmId) -> None:
         """
         Cancels alarm and cleans up the head of the heap.
         :param alarm_id: alarm to cancel
         """
+        was_active = alarm_id.is_active
         alarm_id.is_active = False
 
-        with self.lock:
-            while self.alarms and not self.alarms[0].is_active:
-                heappop(self.alarms)
+        owner_thread_id = self._owner_thread_id
+        if owner_thread_id is None:
+            with self.lock:
+                self._on_alarm_unregistered(was_active)
+        elif owner_thread_id == threading.get_ident():
+            self._on_alarm_unregistered(was_active)
+        else:
+            self._inbound_operations.append(functools.partial(self._on_alarm_unregistered, was_active))
 
-    def fire_alarms(self) -> None:
+    def fire_alarms(self) -> bool:
         """
         Fire alarms that are ready.
         Reschedules alarms that return a value > 0 with the return value as the next timeout.
+        :return: if due alarms were left for the next call, after running out of the tick budget
         """
-        if not self.alarms:
-            return
+        if self._inbound_operations:
+            self._apply_inbound_operations()
 
-        curr_time = time.time()
-        alarms_count = 0
+        if not self._has_alarms():
+            return False
 
-        with self.lock:
-            while self.alarms and self.alarms[0].fire_time <= curr_time:
-                alarm_id: AlarmId = heappop(self.alarms)
-                alarm = alarm_id.alarm
-
-                if alarm_id.is_active:
-                    try:
-                        start_time = time.time()
-                        next_delay = alarm.fire()
-                        alarms_count += 1
-                    # pylint: disable=broad-except
-                    except Exception as e:
-                        logger.exception("Alarm {} could not fire and failed with exception: {}", alarm, e)
-                        if alarm.fn in self.approx_alarms_scheduled:
-                            self._pop_and_cleanup_approx_alarm(alarm_id)
-                    else:
-                        performance_utils.log_operation_duration(
-                            alarm_troubleshooting_logger,
-                            "Single alarm", start_time,
-                            constants.WARN_ALARM_EXECUTION_DURATION,
-                            alarm=alarm
-                        )
-
-                        if next_delay is not None and next_delay > 0:
-                            next_time = time.time() + next_delay
-                            alarm_id.fire_time = next_time
-                            alarm_id.alarm.fire_time = next_time
-                            heappush(self.alarms, alarm_id)
-                        # Delete alarm from approx_alarms_scheduled if applicable
-                        elif alarm.fn in self.approx_alarms_scheduled:
-                            self._pop_and_cleanup_approx_alarm(alarm_id)
+        curr_time = time.time()
+        if self._owner_thread_id is None:
+            with self.lock:
+                alarms_count, deferred = self._fire_due_alarms(curr_time)
+        else:
+            alarms_count, deferred = self._fire_due_alarms(curr_time)
 
         performance_utils.log_operation_duration(
             alarm_troubleshooting_logger,
@@ -253,16 +298,22 @@ class AlarmQueue:
             constants.WARN_ALL_ALARMS_EXECUTION_DURATION,
             count=alarms_count
         )
+        if deferred:
+            logger.debug("Alarms took over the tick budget after {} alarms, firing the rest on the next tick.",
+                         alarms_count)
+        return deferred
 
     def fire_ready_alarms(self) -> Optional[float]:
         """
-        Fires ready alarm repeatedly until no more should be fired.
-        :return: time until next alarm, or None
+        Fires ready alarm repeatedly until no more should be fired, or the tick budget runs out.
+        :return: time until next alarm, 0 if due alarms were deferred, or None
         """
         time_to_next_alarm = self.time_to_next_alarm()
 
         while time_to_next_alarm is not None and time_to_next_alarm <= 0:
-            self.fire_alarms()
+            if self.fire_alarms():
+                # let the event loop run before the deferred alarms
+                return 0
             time_to_next_alarm = self.time_to_next_alarm()
 
         return time_to_next_alarm
@@ -272,12 +323,205 @@ class AlarmQueue:
         Indicates if there's not an alarm on the queue and the timeout to the next one if there is.
         :return: (if alarm queue is empty, timeout to next alarm)
         """
-        with self.lock:
-            if not self.alarms:
-                return None
+        if self._owner_thread_id is None:
+            with self.lock:
+                next_fire_time = self._next_fire_time()
+        else:
+            if self._inbound_operations:
+                self._apply_inbound_operations()
+            next_fire_time = self._next_fire_time()
+
+        if next_fire_time is None:
+            return None
 
-            time_to_alarm = self.alarms[0].fire_time - time.time()
-            return time_to_alarm
+        time_to_alarm = next_fire_time - time.time()
+        return time_to_alarm
+
+    def _register_approx_alarm(
+        self,
+        fire_delay: float,
+        slop: float,
+        fn: Callable,
+        *args,
+        alarm_name: Optional[str] = None,
+        **kwargs
+    ) -> None:
+        alarm_heap = self.approx_alarms_scheduled.get(fn)
+        if alarm_heap is None:
+            alarm_heap = []
+            self.approx_alarms_scheduled[fn] = alarm_heap
+            self._approx_alarm_bucket_widths[fn] = slop
+        else:
+            fire_time = time.time() + fire_delay
+            if self._has_approx_alarm(fn, fire_time - slop, fire_time + slop):
+                approx_alarms_coalesced_counter.inc()
+                return
+
+        new_alarm_id = self.register_alarm(fire_delay, fn, *args, alarm_name=alarm_name, **kwargs)
+        heappush(alarm_heap, new_alarm_id)
+        self._add_approx_alarm_to_bucket(new_alarm_id)
+
+    def _push_inbound_alarm(self, alarm_id: AlarmId) -> None:
+        # alarms canceled before they are pushed are counted and removed like any other
+        alarm_id.count = self.uniq_count
+        self._push_alarm(alarm_id)
+        self.uniq_count += 1
+
+    def _on_alarm_unregistered(self, was_active: bool) -> None:
+        if was_active:
+            self.cancelled_count += 1
+        self._remove_cancelled_alarms()
+
+    def _apply_inbound_operations(self) -> None:
+        """
+        Applies the registrations and cancellations made by other threads than the owner, in order.
+        """
+        inbound_operations = self._inbound_operations
+        while inbound_operations:
+            inbound_operations.popleft()()
+
+    def _fire_due_alarms(self, curr_time: float) -> Tuple[int, bool]:
+        """
+        Fires the alarms due at `curr_time` until the tick budget runs out.
+        :return: number of alarms fired, if due alarms were left
+        """
+        budget_end_time = curr_time + constants.ALARM_QUEUE_TICK_BUDGET_S
+        alarms_count = 0
+        deferred = False
+
+        self._compact_alarms()
+
+        while True:
+            if alarms_count and time.time() > budget_end_time:
+                next_fire_time = self._next_fire_time()
+                deferred = next_fire_time is not None and next_fire_time <= curr_time
+                break
+
+            alarm_id = self._pop_due_alarm(curr_time)
+            if alarm_id is None:
+                break
+            alarm = alarm_id.alarm
+
+            if alarm_id.is_active:
+                try:
+                    start_time = time.time()
+                    next_delay = alarm.fire()
+                    alarms_count += 1
+                # pylint: disable=broad-except
+                except Exception as e:
+                    logger.exception("Alarm {} could not fire and failed with exception: {}", alarm, e)
+                    alarm_id.is_active = False
+                    if alarm.fn in self.approx_alarms_scheduled:
+                        self._pop_and_cleanup_approx_alarm(alarm_id)
+                else:
+                    self.profiler.record(getattr(alarm.fn, "__qualname__", alarm.name), time.time() - start_time)
+                    performance_utils.log_operation_duration(
+                        alarm_troubleshooting_logger,
+                        "Single alarm", start_time,
+                        constants.WARN_ALARM_EXECUTION_DURATION,
+                        alarm=alarm
+                    )
+
+                    if next_delay is not None and next_delay > 0:
+                        next_time = time.time() + next_delay
+                        is_approx_alarm = alarm.fn in self.approx_alarms_scheduled
+                        if is_approx_alarm:
+                            self._remove_approx_alarm_from_bucket(alarm_id)
+                        alarm_id.fire_time = next_time
+                        alarm_id.alarm.fire_time = next_time
+                        self._push_alarm(alarm_id)
+                        if is_approx_alarm:
+                            self._add_approx_alarm_to_bucket(alarm_id)
+                    else:
+                        alarm_id.is_active = False
+                        # Delete alarm from approx_alarms_scheduled if applicable
+                        if alarm.fn in self.approx_alarms_scheduled:
+                            self._pop_and_cleanup_approx_alarm(alarm_id)
+
+        return alarms_count, deferred
+
+    def _push_alarm(self, alarm_id: AlarmId) -> None:
+        heappush(self.alarms, alarm_id)
+
+    def _pop_due_alarm(self, curr_time: float) -> Optional[AlarmId]:
+        """
+        Removes the next alarm, active or not, if it is due at `curr_time`.
+        """
+        alarms = self.alarms
+        compacting_alarms = self._compacting_alarms
+        if compacting_alarms and (not alarms or compacting_alarms[0] < alarms[0]):
+            alarms = compacting_alarms
+
+        if alarms and alarms[0].fire_time <= curr_time:
+            alarm_id = heappop(alarms)
+            if not alarm_id.is_active:
+                self._on_cancelled_alarm_removed()
+            return alarm_id
+        return None
+
+    def _remove_cancelled_alarms(self) -> None:
+        for alarms in (self.alarms, self._compacting_alarms):
+            while alarms and not alarms[0].is_active:
+                heappop(alarms)
+                self._on_cancelled_alarm_removed()
+
+        alarms_count = len(self.alarms)
+        if (
+            not self._compacting_alarms
+            and alarms_count >= constants.ALARM_QUEUE_COMPACTION_MIN_SIZE
+            and self.cancelled_count > alarms_count * constants.ALARM_QUEUE_COMPACTION_CANCELLED_RATIO
+        ):
+            logger.debug(
+                "Compacting alarm queue of {} alarms, of which {} are canceled.", alarms_count, self.cancelled_count
+            )
+            self._compacting_alarms = self.alarms
+            self.alarms = []
+
+    def _compact_alarms(self) -> None:
+        """
+        Moves the next batch of live alarms out of the heap being compacted.
+        """
+        compacting_alarms = self._compacting_alarms
+        if not compacting_alarms:
+            return
+
+        alarms = self.alarms
+        # removing from the end keeps the rest a valid heap
+        for _ in range(min(len(compacting_alarms), constants.ALARM_QUEUE_COMPACTION_BATCH_SIZE)):
+            alarm_id = compacting_alarms.pop()
+            if alarm_id.is_active:
+                heappush(alarms, alarm_id)
+            else:
+                self._on_cancelled_alarm_removed()
+
+    def _on_cancelled_alarm_removed(self) -> None:
+        # alarms canceled after they fired are counted, but never removed
+        if self.cancelled_count > 0:
+            self.cancelled_count -= 1
+
+    def _has_alarms(self) -> bool:
+        return bool(self.alarms or self._compacting_alarms)
+
+    def _next_fire_time(self) -> Optional[float]:
+        alarms = self.alarms
+        compacting_alarms = self._compacting_alarms
+        if compacting_alarms and (not alarms or compacting_alarms[0] < alarms[0]):
+            alarms = compacting_alarms
+
+        if not alarms:
+            return None
+        return alarms[0].fire_time
+
+    def _stored_alarms_count(self) -> int:
+        return len(self.alarms) + len(self._compacting_alarms)
+
+    def _get_cancelled_ratio(self) -> float:
+        live_count = self._stored_alarms_count() - self.cancelled_count
+        return self.cancelled_count / max(live_count, 1)
+
+    def _create_metrics(self) -> None:
+        alarm_queue_size_gauge.set_function(self._stored_alarms_count)
+        alarm_queue_cancelled_ratio_gauge.set_function(self._get_cancelled_ratio)
 
     def _pop_and_cleanup_approx_alarm(self, alarm_id: AlarmId) -> None:
         alarm_heap = self.approx_alarms_scheduled[alarm_id.alarm.fn]
@@ -285,6 +529,51 @@ class AlarmQueue:
         # alarm that was just fired must be the first one in the list
         assert alarm_heap[0].count == alarm_id.count
         heappop(alarm_heap)
+        self._remove_approx_alarm_from_bucket(alarm_id)
 
         if not alarm_heap:
             del self.approx_alarms_scheduled[alarm_id.alarm.fn]
+            del self._approx_alarm_bucket_widths[alarm_id.alarm.fn]
+
+    def _has_approx_alarm(self, fn: Callable, early_time: float, late_time: float) -> bool:
+        """
+        Indicates if an approximate alarm of `fn` is scheduled between `early_time` and `late_time`.
+        """
+        width = self._approx_alarm_bucket_widths[fn]
+        if width > 0 and (late_time - early_time) / width < self.APPROX_ALARM_MAX_SEARCHED_BUCKETS:
+            buckets = self.approx_alarm_buckets
+            for bucket in range(int(early_time // width), int(late_time // width) + 1):
+                for alarm_id in buckets.get((fn, bucket), ()):
+                    if early_time <= alarm_id.fire_time <= late_time:
+                        return True
+            return False
+
+        for alarm_id in self.approx_alarms_scheduled[fn]:
+            if early_time <= alarm_id.fire_time <= late_time:
+                return True
+        return False
+
+    def _add_approx_alarm_to_bucket(self, alarm_id: AlarmId) -> None:
+        fn = alarm_id.alarm.fn
+        width = self._approx_alarm_bucket_widths[fn]
+        if width > 0:
+            key = (fn, int(alarm_id.fire_time // width))
+            bucket = self.approx_alarm_buckets.get(key)
+            if bucket is None:
+                self.approx_alarm_buckets[key] = [alarm_id]
+            else:
+                bucket.append(alarm_id)
+
+    def _remove_approx_alarm_from_bucket(self, alarm_id: AlarmId) -> None:
+        fn = alarm_id.alarm.fn
+        width = self._approx_alarm_bucket_widths[fn]
+        if width > 0:
+            key = (fn, int(alarm_id.fire_time // width))
+            bucket = self.approx_alarm_buckets.get(key)
+            if bucket is not None:
+                for i, bucket_alarm_id in enumerate(bucket):
+                    if bucket_alarm_id is alarm_id:
+                        del bucket[i]
+                        break
+                if not bucket:
+                    del self.approx_alarm_buckets[key]
@@ -0,0 +1,185 @@
+import time
+from heapq import heappush, heappop
+from typing import TypeVar, Optional, Callable, Dict, Any, List, Tuple
+
+from bxcommon.utils.expiration_queue import ExpirationQueue
+
+T = TypeVar("T")
+
+
+class BucketedExpirationQueue(ExpirationQueue[T]):
+    """
+    Expiration queue that groups items in buckets by the time they were added, `bucket_width_s` per bucket.
+
+    Expiration is checked a bucket at a time instead of an item at a time, and `remove_expired_batch`
+    removes whole expired buckets and returns their items in one list instead of calling back per item.
+    `queue` still maps items to the time they were added, from oldest to newest.
+    """
+
+    bucket_width_s: float
+    queue: Dict[T, float]
+    _buckets: Dict[int, Dict[T, None]]
+    # min-heap of bucket keys, may still hold keys of emptied buckets
+    _bucket_keys: List[int]
+
+    def __init__(self, time_to_live_sec: int, bucket_width_s: float = 1) -> None:
+        super().__init__(time_to_live_sec)
+
+        if bucket_width_s <= 0:
+            raise ValueError("Bucket width must be positive.")
+
+        self.bucket_width_s = bucket_width_s
+        self.queue = {}
+        self._buckets = {}
+        self._bucket_keys = []
+
+    def add(self, item: T) -> None:
+        """
+        Adds item to the queue, or moves it to the newest bucket if already in the queue
+        :param item: item
+        """
+        timestamp = time.time()
+        queue = self.queue
+        if item in queue:
+            self._remove_from_bucket(item, queue.pop(item))
+        queue[item] = timestamp
+
+        key = int(timestamp // self.bucket_width_s)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = {}
+            self._buckets[key] = bucket
+            heappush(self._bucket_keys, key)
+        bucket[item] = None
+
+    def remove(self, item: T) -> None:
+        """
+        Removes item from expiration queue
+        :param item: item to remove
+        """
+        timestamp = self.queue.pop(item, None)
+        if timestamp is not None:
+            self._remove_from_bucket(item, timestamp)
+
+    def remove_expired(
+        self,
+        current_time: Optional[float] = None,
+        remove_callback: Optional[Callable[[T], Any]] = None,
+        limit: Optional[int] = None,
+        **kwargs
+    ) -> List[T]:
+        """
+        Removes expired items from the queue
+        :param current_time: time to use as current time for expiration
+        :param remove_callback: reference to a callback function that is being called when item is removed
+        :param limit: max number of entries to remove in one call
+        :param kwargs: keyword args to pass into the callback method
+        """
+        removed = self._pop_expired(current_time, limit)
+        if remove_callback is not None:
+            for item in removed:
+                remove_callback(item, **kwargs)
+        return removed
+
+    def remove_expired_batch(
+        self,
+        current_time: Optional[float] = None,
+        remove_batch_callback: Optional[Callable[[List[T]], Any]] = None,
+        limit: Optional[int] = None,
+    ) -> List[T]:
+        """
+        Removes expired items from the queue, calling back once with all of them
+        :param current_time: time to use as current time for expiration
+        :param remove_batch_callback: reference to a callback function that is called with the removed items
+        :param limit: max number of entries to remove in one call
+        :return: removed items, from oldest
+        """
+        removed = self._pop_expired(current_time, limit)
+        if remove_batch_callback is not None and removed:
+            remove_batch_callback(removed)
+        return removed
+
+    def get_oldest(self) -> Optional[T]:
+        """
+        Returns the value of oldest item in the queue
+        :return: value of oldest item
+        """
+        oldest_bucket = self._get_oldest_bucket()
+        if oldest_bucket is None:
+            return None
+        return next(iter(oldest_bucket[1]))
+
+    def remove_oldest(
+        self, remove_callback: Optional[Callable[[T], None]] = None, **kwargs
+    ) -> None:
+        """
+        Remove one oldest item from the queue
+        :param remove_callback: reference to a callback function that is being called when item is removed
+        """
+        item = self.get_oldest()
+        if item is not None:
+            self.remove(item)
+
+            if remove_callback is not None:
+                remove_callback(item, **kwargs)
+
+    def clear(self) -> None:
+        self.queue.clear()
+        self._buckets.clear()
+        self._bucket_keys.clear()
+
+    def _pop_expired(self, current_time: Optional[float], limit: Optional[int]) -> List[T]:
+        if current_time is None:
+            current_time = time.time()
+        if limit is None:
+            limit = len(self.queue)
+
+        # items added before this time are expired
+        expired_before = current_time - self.time_to_live_sec
+        bucket_width_s = self.bucket_width_s
+        queue = self.queue
+        buckets = self._buckets
+        removed: List[T] = []
+
+        while len(removed) < limit:
+            oldest_bucket = self._get_oldest_bucket()
+            if oldest_bucket is None:
+                break
+            key, bucket = oldest_bucket
+            if key * bucket_width_s >= expired_before:
+                break
+
+            if (key + 1) * bucket_width_s <= expired_before and len(bucket) <= limit - len(removed):
+                # the whole bucket is expired
+                for item in bucket:
+                    del queue[item]
+                removed.extend(bucket)
+                del buckets[key]
+                continue
+
+            for item in list(bucket):
+                if len(removed) >= limit or queue[item] >= expired_before:
+                    return removed
+                del bucket[item]
+                del queue[item]
+                removed.append(item)
+            del buckets[key]
+
+        return removed
+
+    def _get_oldest_bucket(self) -> Optional[Tuple[int, Dict[T, None]]]:
+        bucket_keys = self._bucket_keys
+        buckets = self._buckets
+        while bucket_keys:
+            bucket = buckets.get(bucket_keys[0])
+            if bucket:
+                return bucket_keys[0], bucket
+            heappop(bucket_keys)
+        return None
+
+    def _remove_from_bucket(self, item: T, timestamp: float) -> None:
+        key = int(timestamp // self.bucket_width_s)
+        bucket = self._buckets[key]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[key]
@@ -0,0 +1,102 @@
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+from bxcommon import constants
+from bxcommon.utils.buffers.output_priority import OutputPriority
+
+hold_time_histogram = Histogram(
+    "output_buffer_hold_time_s",
+    "Time output buffers with adaptive batching hold small messages before sending them",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05),
+)
+batch_messages_histogram = Histogram(
+    "output_buffer_batch_messages",
+    "Number of messages coalesced into each write by output buffers with adaptive batching",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+unheld_messages_counter = Counter(
+    "output_buffer_unheld_messages",
+    "Number of messages output buffers with adaptive batching sent without holding them",
+    ("reason",),
+)
+_unheld_for_priority = unheld_messages_counter.labels("priority")
+_unheld_for_light_load = unheld_messages_counter.labels("light_load")
+
+
+class AdaptiveHoldPolicy:
+    """
+    Nagle-like policy of how long an `OutputBuffer` holds small messages to coalesce them into larger
+    writes, tuned per connection from the rate messages are enqueued at and the round trip time.
+
+    Messages of `immediate_priority` or a more urgent class, such as blocks, are never held. Other
+    messages are held for `target_batch_count` mean intervals between messages, but no longer than
+    `rtt_fraction` of the round trip time or `max_hold_time_s`. Under light load, when the next message
+    is not expected within that time, messages are not held at all.
+    """
+
+    max_hold_time_s: float
+    target_batch_count: int
+    rtt_fraction: float
+    smoothing: float
+    immediate_priority: OutputPriority
+    # moving average of the interval between messages, None until two messages are enqueued
+    message_interval_s: Optional[float]
+    rtt_s: Optional[float]
+    # hold time chosen for the last message that was not of an immediate class
+    hold_time_s: float
+
+    def __init__(
+        self,
+        max_hold_time_s: float = constants.OUTPUT_BUFFER_BATCH_MAX_HOLD_TIME,
+        target_batch_count: int = constants.OUTPUT_BUFFER_ADAPTIVE_TARGET_BATCH_COUNT,
+        rtt_fraction: float = constants.OUTPUT_BUFFER_ADAPTIVE_RTT_FRACTION,
+        smoothing: float = constants.OUTPUT_BUFFER_ADAPTIVE_INTERVAL_SMOOTHING,
+        immediate_priority: OutputPriority = OutputPriority.BLOCK,
+    ) -> None:
+        self.max_hold_time_s = max_hold_time_s
+        self.target_batch_count = target_batch_count
+        self.rtt_fraction = rtt_fraction
+        self.smoothing = smoothing
+        self.immediate_priority = immediate_priority
+        self.message_interval_s = None
+        self.rtt_s = None
+        self.hold_time_s = 0
+        self._last_message_time: Optional[float] = None
+
+    def set_rtt(self, rtt_s: float) -> None:
+        self.rtt_s = rtt_s
+
+    def get_hold_time(self, priority: OutputPriority, now: float) -> float:
+        """
+        Records a message enqueued at `now` and returns how long it can be held.
+        :return: hold time in seconds, 0 to send the message right away
+        """
+        last_message_time = self._last_message_time
+        self._last_message_time = now
+        if last_message_time is not None:
+            interval = now - last_message_time
+            message_interval_s = self.message_interval_s
+            if message_interval_s is None:
+                self.message_interval_s = interval
+            else:
+                self.message_interval_s = message_interval_s + self.smoothing * (interval - message_interval_s)
+
+        if priority <= self.immediate_priority:
+            _unheld_for_priority.inc()
+            return 0
+
+        hold_time = self.max_hold_time_s
+        rtt_s = self.rtt_s
+        if rtt_s is not None:
+            hold_time = min(hold_time, rtt_s * self.rtt_fraction)
+
+        message_interval_s = self.message_interval_s
+        if message_interval_s is None or message_interval_s >= hold_time:
+            hold_time = 0
+            _unheld_for_light_load.inc()
+        else:
+            hold_time = min(hold_time, message_interval_s * self.target_batch_count)
+
+        self.hold_time_s = hold_time
+        return hold_time
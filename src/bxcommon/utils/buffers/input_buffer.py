@@ -1,5 +1,5 @@
 from collections import deque
-from typing import Deque, Union
+from typing import Deque, Union, List
 from typing import Set, Optional
 
 from bxcommon.utils import memory_utils
@@ -7,6 +7,15 @@ from bxcommon.utils.memory_utils import SpecialMemoryProperties, SpecialTuple
 
 
 class InputBuffer(SpecialMemoryProperties):
+    """
+    Bytes received from a connection, kept as the list of chunks they were received in.
+
+    Peeks and slices that span several chunks copy only the bytes asked for, and the chunks are never
+    merged in place. Removing bytes drops consumed chunks and keeps the rest of a partly consumed chunk
+    as a memoryview, so the bytes of a message are copied once, when it is removed to be parsed.
+    `get_segments` exposes a range of the buffer as memoryviews of its chunks, without copying.
+    """
+
     def __init__(self) -> None:
         self.input_list: Deque[Union[memoryview, bytearray, bytes]] = deque()
         self.length = 0
@@ -19,14 +28,16 @@ class InputBuffer(SpecialMemoryProperties):
         if not isinstance(suffix, (memoryview, bytearray, bytes)):
             raise ValueError(f"Suffix must be memoryview, bytearray or bytes, not {type(suffix)}.")
 
-        end_slice = self.input_list[-1]
-        if len(end_slice) < len(suffix):
-            end_slice = self.get_slice(self.length - len(suffix), self.length)
-        if not isinstance(end_slice, bytearray):
-            end_slice = bytearray(end_slice)
-            self.input_list[-1] = end_slice
+        suffix_len = len(suffix)
+        if suffix_len > self.length:
+            return False
+        if suffix_len == 0:
+            return True
 
-        return end_slice.endswith(suffix)  # pyre-ignore
+        end_slice = self.input_list[-1]
+        if len(end_slice) >= suffix_len:
+            return memoryview(end_slice)[len(end_slice) - suffix_len:] == suffix
+        return self._copy_slice(self.length - suffix_len, self.length) == suffix
 
     def add_bytes(self, piece: Union[bytearray, bytes, memoryview]) -> None:
         """
@@ -40,54 +51,93 @@ class InputBuffer(SpecialMemoryProperties):
 
     def remove_bytes(self, num_bytes: int) -> Union[bytearray, bytes, memoryview]:
         """
-        Removes the first num_bytes bytes in the input buffer and returns them.
+        Removes the first num_bytes bytes in the input buffer and returns them, in a single bytearray.
         """
         if num_bytes is None or num_bytes < 0:
             raise ValueError("Invalid num_bytes {}".format(num_bytes))
 
-        self._shrink_if_needed(num_bytes, True)
+        input_list = self.input_list
+        assert input_list or num_bytes == 0, f"Input buffer is empty and attempting to remove {num_bytes} bytes!"
 
-        assert self.input_list or num_bytes == 0, f"Input buffer is empty and attempting to remove {num_bytes} bytes!"
+        num_bytes = min(num_bytes, self.length)
+        if num_bytes == 0:
+            return bytearray(0)
 
-        if self.input_list and num_bytes > 0:
-            to_return = self.input_list[0][:num_bytes]
-            self.input_list[0] = self.input_list[0][num_bytes:]
+        head = input_list[0]
+        if len(head) == num_bytes and isinstance(head, bytearray):
+            # message received in a chunk of its own
+            input_list.popleft()
             self.length -= num_bytes
-        else:
-            to_return = bytearray(0)
-
+            return head
+
+        to_return = bytearray(num_bytes)
+        copied = 0
+        while copied < num_bytes:
+            head = input_list[0]
+            head_len = len(head)
+            remaining = num_bytes - copied
+            if head_len <= remaining:
+                to_return[copied:copied + head_len] = head
+                copied += head_len
+                input_list.popleft()
+            else:
+                head_view = memoryview(head)
+                to_return[copied:] = head_view[:remaining]
+                input_list[0] = head_view[remaining:]
+                copied = num_bytes
+
+        self.length -= num_bytes
         return to_return
 
     def peek_message(self, bytes_to_peek):
         """
         Returns at LEAST the first bytes_to_peek bytes in the input buffer.
-        The assumption is that these bytes are all part of the same message.
-        Thus, we combine pieces if we cannot just return the first message.
+        If they span more than the first received chunk, only they are copied, without merging the chunks.
         """
         if bytes_to_peek > self.length:
             bytes_to_peek = self.length
 
         if bytes_to_peek == 0:
             return bytearray(0)
-        self._shrink_if_needed(bytes_to_peek)
 
-        return self.input_list[0]
+        head = self.input_list[0]
+        if bytes_to_peek <= len(head):
+            return head
+        return self._copy_slice(0, bytes_to_peek)
 
     def get_slice(self, start, end):
         """
         Gets a slice of the inputbuffer from start to end.
-        We assume that this slice is a piece of a single bitcoin message
-        for performance reasons (with respect to the number of copies).
+        A slice that spans several received chunks is copied into a new bytearray, leaving the chunks as they are.
         Additionally, the start value of the slice must exist.
         """
         if start is None or end is None or self.length < start:
             raise ValueError("Start ({}) and end ({}) must exist and start must be less or equal to length ({})."
                              .format(start, end, self.length))
 
-        # Combine all of the pieces in this slice into the first item on the list.
-        # Since we will need to do so anyway when handing the message.
-        self._shrink_if_needed(end)
-        return self.input_list[0][start:end]
+        if not self.input_list:
+            return bytearray(0)
+
+        head = self.input_list[0]
+        if end <= len(head):
+            return head[start:end]
+        return self._copy_slice(start, end)
+
+    def get_segments(self, start: int, end: int) -> List[memoryview]:
+        """
+        Returns the bytes from start to end as memoryviews of the received chunks they span, without copying.
+        The memoryviews should not be kept once these bytes are removed.
+        """
+        segments = []
+        offset = 0
+        for piece in self.input_list:
+            piece_end = offset + len(piece)
+            if piece_end > start:
+                segments.append(memoryview(piece)[max(start - offset, 0):end - offset])
+                if piece_end >= end:
+                    break
+            offset = piece_end
+        return segments
 
     def __len__(self) -> int:
         return self.length
@@ -112,14 +162,5 @@ class InputBuffer(SpecialMemoryProperties):
     def special_memory_size(self, ids: Optional[Set[int]] = None) -> SpecialTuple:
         return memory_utils.get_special_size(self.input_list, ids=ids)
 
-    def _shrink_if_needed(self, end: int, ensure_byte_array: bool = False) -> None:
-        if self.input_list:
-            head_message = self.input_list[0]
-            if end > len(head_message) or ensure_byte_array:
-                if isinstance(head_message, bytearray):
-                    head = self.input_list.popleft()
-                else:
-                    head = bytearray(self.input_list.popleft())
-                while end > len(head) and self.input_list:
-                    head.extend(self.input_list.popleft())  # pyre-ignore
-                self.input_list.appendleft(head)
+    def _copy_slice(self, start: int, end: int) -> bytearray:
+        return bytearray().join(self.get_segments(start, end))
@@ -1,10 +1,12 @@
 import time
+from array import array
 from collections import deque
-from typing import Deque, Optional, TYPE_CHECKING
+from typing import Deque, Optional, TYPE_CHECKING, Dict, List, Tuple, Union, Generic, TypeVar
 
 from bxcommon.messages.abstract_block_message import AbstractBlockMessage
 from bxcommon.messages.abstract_message import AbstractMessage
 from bxcommon.messages.bloxroute.tx_message import TxMessage
+from bxcommon.utils.buffers.output_priority import OutputPriority
 from bxcommon.utils.stats.transaction_statistics_service import tx_stats
 from bxutils import logging
 from bxutils.logging.log_level import LogLevel
@@ -15,6 +17,8 @@ if TYPE_CHECKING:
     # pylint: disable=ungrouped-imports,cyclic-import
     from bxcommon.connections.abstract_connection import AbstractConnection
 
+T = TypeVar("T")
+
 
 class MessageTrackerEntry:
     message: Optional[AbstractMessage]
@@ -76,16 +80,78 @@ class MessageTrackerEntry:
         )
 
 
+class PendingTrackerEntries(Generic[T]):
+    """
+    Tracker entries of messages waiting in the priority queues of an `OutputBuffer`, by output
+    priority, until the output buffer schedules them for sending.
+
+    The output buffer may schedule a message before its entry is added, in which case
+    the entry is passed on as soon as it is added.
+    """
+
+    queues: List[Deque[T]]
+
+    def __init__(self) -> None:
+        self.queues = [deque() for _ in OutputPriority]
+        self._scheduled_counts = [0 for _ in OutputPriority]
+
+    def add(self, priority: OutputPriority, entry: T) -> bool:
+        """
+        :return: if the message of the entry has already been scheduled
+        """
+        if self._scheduled_counts[priority]:
+            self._scheduled_counts[priority] -= 1
+            return True
+        self.queues[priority].append(entry)
+        return False
+
+    def pop_scheduled(self, priority: OutputPriority) -> Optional[T]:
+        """
+        :return: entry of the message the output buffer scheduled, None if it has not been added yet
+        """
+        queue = self.queues[priority]
+        if queue:
+            return queue.popleft()
+        self._scheduled_counts[priority] += 1
+        return None
+
+    def drop(self, priority: OutputPriority, count: int) -> List[T]:
+        """
+        Removes the entries of the oldest `count` messages of the priority class, which
+        the output buffer dropped from the head of its queue for the class.
+
+        :return: removed entries
+        """
+        queue = self.queues[priority]
+        return [queue.popleft() for _ in range(min(count, len(queue)))]
+
+    def clear(self) -> List[T]:
+        """
+        :return: removed entries
+        """
+        entries = [entry for queue in self.queues for entry in queue]
+        for queue in self.queues:
+            queue.clear()
+        self._scheduled_counts = [0 for _ in OutputPriority]
+        return entries
+
+
 class MessageTracker:
     """
     Service to track when message bytes get fully written from the output buffer to the
     OS level socket.
+
+    Entries are sent in the order they are appended, unless the tracker is set on the output
+    buffer of the connection with `OutputBuffer.set_message_tracker`. Entries then wait in
+    `pending` by the output priority of their message until the output buffer schedules
+    the message for sending, since messages of higher priority classes are sent first.
     """
 
     messages: Deque[MessageTrackerEntry]
     connection: "AbstractConnection"
     is_working: bool = True
     bytes_remaining: int = 0
+    pending: Optional[PendingTrackerEntries[MessageTrackerEntry]] = None
 
     def __init__(self, connection: "AbstractConnection") -> None:
         self.connection = connection
@@ -106,6 +172,24 @@ class MessageTracker:
             entry.message, AbstractBlockMessage
         )
 
+    def track_scheduling(self) -> None:
+        """
+        Keeps appended entries in `pending` until `on_message_scheduled` is called for them.
+        """
+        self.pending = PendingTrackerEntries()
+
+    def on_message_scheduled(self, priority: OutputPriority) -> None:
+        """
+        Moves the oldest pending entry of the priority class to the entries being sent.
+        """
+        if not self.is_working:
+            return
+
+        # pyre-fixme[16]: `Optional` has no attribute `pop_scheduled`.
+        entry = self.pending.pop_scheduled(priority)
+        if entry is not None:
+            self.messages.append(entry)
+
     def advance_bytes(self, num_bytes: int):
         if not self.is_working:
             return
@@ -123,6 +207,8 @@ class MessageTracker:
                 )
                 self.bytes_remaining = 0
                 self.messages.clear()
+                if self.pending is not None:
+                    self.pending.clear()
                 return
 
             curr_time = time.time()
@@ -172,6 +258,7 @@ class MessageTracker:
         num_bytes: int,
         message: Optional[AbstractMessage],
         label: Optional[str] = None,
+        priority: Optional[OutputPriority] = None,
     ):
         """
         Appends a message entry to the tracker.
@@ -179,11 +266,16 @@ class MessageTracker:
         This method trusts that that num_bytes matches the message, but does
         not verify it. This is useful for Ethereum, which frames and encrypts
         the message, which may change the length of the message.
+
+        :param priority: output priority the message was enqueued with, by default the one of the message
         """
         if not self.is_working:
             return
 
-        self.messages.append(MessageTrackerEntry(message, num_bytes, label))
+        entry = MessageTrackerEntry(message, num_bytes, label)
+        pending = self.pending
+        if pending is None or pending.add(_get_output_priority(message, priority), entry):
+            self.messages.append(entry)
         self.bytes_remaining += num_bytes
 
     def prepend_message(
@@ -213,6 +305,18 @@ class MessageTracker:
 
         self.bytes_remaining += num_bytes
 
+    def on_messages_dropped(self, priority: OutputPriority, count: int) -> None:
+        """
+        Removes the pending entries of the oldest `count` messages of the priority class,
+        which the output buffer dropped before scheduling them.
+        """
+        if not self.is_working:
+            return
+
+        # pyre-fixme[16]: `Optional` has no attribute `drop`.
+        for entry_removed in self.pending.drop(priority, count):
+            self.bytes_remaining -= entry_removed.length
+
     def empty_bytes(self, skip_bytes: int):
         """
         Remove bytes from tracker starting at `skip_bytes`.
@@ -220,6 +324,10 @@ class MessageTracker:
         Used when the output buffer is being emptied, to stop tracking of
         later bytes.
         """
+        if self.pending is not None:
+            for entry_removed in self.pending.clear():
+                self.bytes_remaining -= entry_removed.length
+
         bytes_skipped = 0
         index = 0
 
@@ -254,3 +362,285 @@ class MessageTracker:
                         ),
                 1000 * (curr_time - entry_removed.queued_time),
             )
+
+
+class CompactMessageTracker:
+    """
+    Lightweight version of `MessageTracker`, used unless detailed tracking of sent messages is enabled.
+
+    Only the type, length and queued time of each message are kept, in parallel ring buffers
+    of fixed size values, so no objects are allocated per message once it is scheduled for
+    sending. Messages are logged by type at trace level instead of with their contents.
+    """
+
+    INITIAL_CAPACITY = 64
+    # message types are stored as 2 byte ids, later types are tracked under the generic id
+    MAX_MESSAGE_TYPES = 0xffff
+
+    # (message class, label) => id, shared across trackers
+    _message_type_ids: Dict[Tuple[Optional[type], Optional[str]], int] = {(None, None): 0}
+    _message_type_names: List[str] = ["Message"]
+    _block_message_type_ids: List[bool] = [False]
+
+    connection: "AbstractConnection"
+    is_working: bool = True
+    bytes_remaining: int = 0
+    # length, type id and queued time of the messages waiting to be scheduled
+    pending: Optional[PendingTrackerEntries[Tuple[int, int, float]]] = None
+
+    def __init__(self, connection: "AbstractConnection", capacity: int = INITIAL_CAPACITY) -> None:
+        self.connection = connection
+        self._type_ids = array("H", bytes(2 * capacity))
+        self._lengths = array("Q", bytes(8 * capacity))
+        self._queued_times = array("d", bytes(8 * capacity))
+        self._capacity = capacity
+        self._head = 0
+        self._count = 0
+        # only the message at the head of the buffer can be partially sent
+        self._head_sent_bytes = 0
+
+    def __repr__(self):
+        return (
+            f"CompactMessageTracker<connection: {self.connection}, "
+            f"messages: {self._count}, "
+            f"bytes_remaining: {self.bytes_remaining}>"
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def is_sending_block_message(self) -> bool:
+        if not self._count:
+            return False
+
+        return self._block_message_type_ids[self._type_ids[self._head]]
+
+    def track_scheduling(self) -> None:
+        """
+        See `MessageTracker.track_scheduling`.
+        """
+        self.pending = PendingTrackerEntries()
+
+    def on_message_scheduled(self, priority: OutputPriority) -> None:
+        """
+        See `MessageTracker.on_message_scheduled`.
+        """
+        if not self.is_working:
+            return
+
+        # pyre-fixme[16]: `Optional` has no attribute `pop_scheduled`.
+        entry = self.pending.pop_scheduled(priority)
+        if entry is not None:
+            self._append_entry(*entry)
+
+    def advance_bytes(self, num_bytes: int):
+        if not self.is_working:
+            return
+
+        bytes_left = num_bytes
+        self.bytes_remaining -= num_bytes
+        curr_time = time.time()
+        log_enabled = logger.isEnabledFor(LogLevel.TRACE)
+        lengths = self._lengths
+        while bytes_left > 0:
+            if not self._count:
+                self.connection.log_debug(
+                    "Message tracker somehow got out of sync. "
+                    "Attempted to send {} bytes when none left in tracker. "
+                    "Resetting. ",
+                    bytes_left,
+                )
+                self.bytes_remaining = 0
+                self._clear()
+                return
+
+            head = self._head
+            head_bytes_left = lengths[head] - self._head_sent_bytes
+            if bytes_left >= head_bytes_left:
+                if log_enabled:
+                    self.connection.log_trace(
+                        "Sent {}(len: {}) to socket. Took {:.2f}ms. {} bytes remaining on buffer.",
+                        self._message_type_names[self._type_ids[head]],
+                        lengths[head],
+                        1000 * (curr_time - self._queued_times[head]),
+                        self.bytes_remaining,
+                    )
+                bytes_left -= head_bytes_left
+                self._head = (head + 1) % self._capacity
+                self._count -= 1
+                self._head_sent_bytes = 0
+            else:
+                self._head_sent_bytes += bytes_left
+                bytes_left = 0
+
+    def append_message(
+        self,
+        num_bytes: int,
+        message: Optional[AbstractMessage],
+        label: Optional[str] = None,
+        priority: Optional[OutputPriority] = None,
+    ):
+        """
+        Appends a message entry to the tracker. See `MessageTracker.append_message`.
+        """
+        if not self.is_working:
+            return
+
+        entry = (num_bytes, self._get_message_type_id(None if message is None else type(message), label), time.time())
+        pending = self.pending
+        if pending is None or pending.add(_get_output_priority(message, priority), entry):
+            self._append_entry(*entry)
+        self.bytes_remaining += num_bytes
+
+    def prepend_message(
+        self,
+        num_bytes: int,
+        message: Optional[AbstractMessage],
+        label: Optional[str] = None,
+    ):
+        """
+        Inserts a message entry right after the message being sent if it has been partially sent,
+        and appends it otherwise. See `MessageTracker.prepend_message`.
+        """
+        if not self.is_working:
+            return
+
+        message_type_id = self._get_message_type_id(None if message is None else type(message), label)
+        self.bytes_remaining += num_bytes
+        if not self._count or self._head_sent_bytes == 0:
+            self._append_entry(num_bytes, message_type_id, time.time())
+            return
+
+        if self._count == self._capacity:
+            self._grow()
+
+        # keep the message being sent at the head
+        head = self._head
+        new_head = (head - 1) % self._capacity
+        self._set_entry(new_head, self._lengths[head], self._type_ids[head], self._queued_times[head])
+        self._set_entry(head, num_bytes, message_type_id, time.time())
+        self._head = new_head
+        self._count += 1
+
+    def on_messages_dropped(self, priority: OutputPriority, count: int) -> None:
+        """
+        See `MessageTracker.on_messages_dropped`.
+        """
+        if not self.is_working:
+            return
+
+        # pyre-fixme[16]: `Optional` has no attribute `drop`.
+        for num_bytes, _message_type_id, _queued_time in self.pending.drop(priority, count):
+            self.bytes_remaining -= num_bytes
+
+    def empty_bytes(self, skip_bytes: int):
+        """
+        Remove bytes from tracker starting at `skip_bytes`. See `MessageTracker.empty_bytes`.
+        """
+        if self.pending is not None:
+            for num_bytes, _message_type_id, _queued_time in self.pending.clear():
+                self.bytes_remaining -= num_bytes
+
+        capacity = self._capacity
+        lengths = self._lengths
+        bytes_skipped = -self._head_sent_bytes
+        kept_count = 0
+        while kept_count < self._count:
+            message_bytes = lengths[(self._head + kept_count) % capacity]
+            if bytes_skipped + message_bytes > skip_bytes:
+                break
+            bytes_skipped += message_bytes
+            kept_count += 1
+            if bytes_skipped == skip_bytes:
+                break
+
+        while self._count > kept_count:
+            self._count -= 1
+            index = (self._head + self._count) % capacity
+            self.bytes_remaining -= lengths[index]
+            if self._count == 0:
+                self.bytes_remaining += self._head_sent_bytes
+                self._head_sent_bytes = 0
+            self.connection.log_trace(
+                "Removed {} bytes of {} from buffer. Message was queued for {:.2f}ms.",
+                lengths[index],
+                self._message_type_names[self._type_ids[index]],
+                1000 * (time.time() - self._queued_times[index]),
+            )
+
+    def _append_entry(self, num_bytes: int, message_type_id: int, queued_time: float) -> None:
+        if self._count == self._capacity:
+            self._grow()
+
+        self._set_entry((self._head + self._count) % self._capacity, num_bytes, message_type_id, queued_time)
+        self._count += 1
+
+    def _set_entry(self, index: int, num_bytes: int, message_type_id: int, queued_time: float) -> None:
+        self._type_ids[index] = message_type_id
+        self._lengths[index] = num_bytes
+        self._queued_times[index] = queued_time
+
+    def _grow(self) -> None:
+        capacity = self._capacity
+        head = self._head
+        for values in (self._type_ids, self._lengths, self._queued_times):
+            ordered = values[head:] + values[:head]
+            values[:] = ordered + array(values.typecode, bytes(values.itemsize * capacity))
+        self._head = 0
+        self._capacity = 2 * capacity
+
+    def _clear(self) -> None:
+        self._head = 0
+        self._count = 0
+        self._head_sent_bytes = 0
+        if self.pending is not None:
+            self.pending.clear()
+
+    @classmethod
+    def _get_message_type_id(cls, message_cls: Optional[type], label: Optional[str]) -> int:
+        key = (message_cls, label)
+        message_type_id = cls._message_type_ids.get(key)
+        if message_type_id is not None:
+            return message_type_id
+
+        message_type_names = cls._message_type_names
+        if len(message_type_names) > cls.MAX_MESSAGE_TYPES:
+            return 0
+
+        message_type_id = len(message_type_names)
+        if message_cls is None:
+            message_type_names.append(str(label))
+        elif label is None:
+            message_type_names.append(message_cls.__name__)
+        else:
+            message_type_names.append(f"{message_cls.__name__}({label})")
+        cls._block_message_type_ids.append(
+            message_cls is not None and issubclass(message_cls, AbstractBlockMessage)
+        )
+        cls._message_type_ids[key] = message_type_id
+        return message_type_id
+
+
+def _get_output_priority(message: Optional[AbstractMessage], priority: Optional[OutputPriority]) -> OutputPriority:
+    if priority is not None:
+        return priority
+    if message is None:
+        return OutputPriority.TX
+    return message.output_priority()
+
+
+def create_message_tracker(
+    connection: "AbstractConnection", detailed: Optional[bool] = None
+) -> Union[MessageTracker, CompactMessageTracker]:
+    """
+    Creates the tracker of messages written to the socket of the connection.
+
+    :param connection: connection
+    :param detailed: if the full `MessageTracker` should be used, by default if
+    `track_detailed_sent_messages` is set on the node
+    """
+    if detailed is None:
+        detailed = connection.node.opts.track_detailed_sent_messages
+    if detailed:
+        return MessageTracker(connection)
+    return CompactMessageTracker(connection)
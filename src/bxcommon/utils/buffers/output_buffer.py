@@ -1,14 +1,39 @@
 import time
 from collections import deque
-from typing import Set, Optional
+from typing import Set, Optional, Deque, Tuple, Union, List, TYPE_CHECKING
+
+from prometheus_client import Histogram, Counter
 
 from bxcommon import constants
 from bxcommon.utils import memory_utils
+from bxcommon.utils.buffers import adaptive_hold_policy
+from bxcommon.utils.buffers.adaptive_hold_policy import AdaptiveHoldPolicy
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 from bxcommon.utils.memory_utils import SpecialMemoryProperties, SpecialTuple
 from bxutils import logging
 
+if TYPE_CHECKING:
+    # pylint: disable=ungrouped-imports,cyclic-import
+    from bxcommon.utils.buffers.message_tracker import MessageTracker, CompactMessageTracker
+
 logger = logging.get_logger(__name__)
 
+queuing_delay_histogram = Histogram(
+    "output_queuing_delay_s",
+    "Time messages wait in an output queue before they are scheduled for sending",
+    ("output_priority",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+_queuing_delay_by_priority = [
+    queuing_delay_histogram.labels(priority.name.lower()) for priority in OutputPriority
+]
+dropped_messages_counter = Counter(
+    "output_dropped_messages",
+    "Number of queued messages dropped from congested output buffers",
+    ("output_priority",),
+)
+
 
 class OutputBuffer(SpecialMemoryProperties):
     """
@@ -17,16 +42,40 @@ class OutputBuffer(SpecialMemoryProperties):
       - has_more_bytes(): Whether or not there are more bytes in this buffer.
       - get_buffer(): some bytes to send in the outputbuffer
       - advance_buffer(): Advances the buffer by some number of bytes
+
+    Messages are enqueued into one queue per `OutputPriority` class and moved to
+    `output_msgs` one at a time, so a message that has started sending always finishes
+    first. The next message comes from the highest non-empty class, except that each
+    waiting lower class earns its minimum share (`constants.OUTPUT_BUFFER_MIN_SHARE_*`)
+    of credit every time another class is served, and is served as soon as its credit
+    adds up to a full message. Prepended messages skip the class queues.
+
+    A `SegmentedBuffer` is kept as a single message and sent one segment at a time.
+
+    A message tracker set with `set_message_tracker` is told each time a message is taken
+    from the class queues, so that it follows the order messages are sent in.
+
+    With buffering enabled, small messages taken from the class queues in the same order are
+    copied into a batch of up to `min_size` bytes, sent once it was held for `max_hold_time`.
+    With a `hold_policy`, the hold time of each batch is chosen by the policy instead, and
+    messages it does not hold are sent right away.
     """
     EMPTY = memoryview(bytearray(0))  # The empty outputbuffer
 
-    def __init__(self, min_size=None, max_hold_time=None, enable_buffering=False) -> None:
+    def __init__(
+        self,
+        min_size=None,
+        max_hold_time=None,
+        enable_buffering=False,
+        hold_policy: Optional[AdaptiveHoldPolicy] = None
+    ) -> None:
         if min_size is None:
             min_size = constants.OUTPUT_BUFFER_MIN_SIZE
         if max_hold_time is None:
             max_hold_time = constants.OUTPUT_BUFFER_BATCH_MAX_HOLD_TIME
 
         self.enable_buffering = enable_buffering
+        self.hold_policy = hold_policy
 
         # A deque of memoryview objects representing the raw memoryviews of the messages
         # that are being sent on the outputbuffer.
@@ -46,6 +95,28 @@ class OutputBuffer(SpecialMemoryProperties):
         # size of the last valid memoryview
         self.valid_len = 0
         self.last_bytearray_create_time = None
+        # how long the batch in `last_bytearray` is held, and how many messages it has
+        self.last_bytearray_hold_time = max_hold_time
+        self.last_bytearray_messages_count = 0
+
+        # messages waiting to be scheduled with their enqueue time and hold time, by priority
+        self.priority_queues: List[Deque[Tuple[Union[bytearray, memoryview, SegmentedBuffer], float, float]]] = [
+            deque() for _ in OutputPriority
+        ]
+        self.min_shares = [
+            0.0,
+            constants.OUTPUT_BUFFER_MIN_SHARE_BLOCK,
+            constants.OUTPUT_BUFFER_MIN_SHARE_TX,
+            constants.OUTPUT_BUFFER_MIN_SHARE_SYNC,
+        ]
+        self._credits = [0.0 for _ in OutputPriority]
+        self._queued_messages_count = 0
+        # set by `flush` so messages queued behind `output_msgs` are not held once scheduled
+        self._flush_queued_messages = False
+        # maximum time messages of each class can wait in queue before `drop_expired_messages`
+        # drops them, classes set to None are never dropped
+        self.max_queued_age_s: List[Optional[float]] = [None, None, constants.OUTPUT_BUFFER_TX_MAX_AGE_S, None]
+        self.message_tracker: Optional[Union["MessageTracker", "CompactMessageTracker"]] = None
 
     def __len__(self):
         return self.length
@@ -59,13 +130,20 @@ class OutputBuffer(SpecialMemoryProperties):
 
         if self.enable_buffering and \
                 self.last_bytearray is not None and \
-                now - self.last_bytearray_create_time >= self.max_hold_time:
-            self.flush()
+                now - self.last_bytearray_create_time >= self.last_bytearray_hold_time:
+            self._flush_batch()
 
         if not self.output_msgs:
-            return OutputBuffer.EMPTY
+            if not self._queued_messages_count:
+                return OutputBuffer.EMPTY
+            self._schedule_next_message()
+            if not self.output_msgs:
+                return OutputBuffer.EMPTY
 
-        return memoryview(self.output_msgs[0])[self.index:]
+        msg_bytes = self.output_msgs[0]
+        if isinstance(msg_bytes, SegmentedBuffer):
+            return msg_bytes.get_view(self.index)
+        return memoryview(msg_bytes)[self.index:]
 
     def advance_buffer(self, num_bytes: int):
         if num_bytes < 0:
@@ -88,42 +166,32 @@ class OutputBuffer(SpecialMemoryProperties):
             self.output_msgs.popleft()
             self.index = 0
 
+            if not self.output_msgs and self._queued_messages_count:
+                self._schedule_next_message()
+
     def at_msg_boundary(self):
         return self.index == 0
 
-    def enqueue_msgbytes(self, msg_bytes):
-        if not isinstance(msg_bytes, (bytearray, memoryview)):
+    def enqueue_msgbytes(self, msg_bytes, priority: OutputPriority = OutputPriority.TX):
+        if not isinstance(msg_bytes, (bytearray, memoryview, SegmentedBuffer)):
             raise ValueError("Msg_bytes must be a bytearray. The type given was a {}".format(type(msg_bytes)))
 
-        length = len(msg_bytes)
-
+        now = time.time()
         if not self.enable_buffering:
-            self.output_msgs.append(msg_bytes)
-        elif length + self.valid_len > self.min_size:
-            if self.last_bytearray is not None:
-                self.flush()
-            self.output_msgs.append(msg_bytes)
+            hold_time = 0.0
+        elif self.hold_policy is None:
+            hold_time = self.max_hold_time
         else:
-            now = time.time()
-            if self.last_bytearray is None:
-                self.last_bytearray = bytearray(self.min_size)
-                self.last_memview = memoryview(self.last_bytearray)
-                self.last_bytearray[:length] = msg_bytes
-                self.valid_len = length
-                self.last_bytearray_create_time = now
-            else:
-                if self.last_bytearray_create_time is None:
-                    raise ValueError("last_bytearray_create_time cannot be None")
-                self.last_bytearray[self.valid_len:self.valid_len + length] = msg_bytes
-                self.valid_len += length
-
-                if now - self.last_bytearray_create_time > self.max_hold_time:
-                    self.flush()
+            hold_time = self.hold_policy.get_hold_time(priority, now)
 
+        self.priority_queues[priority].append((msg_bytes, now, hold_time))
+        self._queued_messages_count += 1
         self.length += len(msg_bytes)
+        if not self.output_msgs:
+            self._schedule_next_message()
 
     def prepend_msgbytes(self, msg_bytes):
-        if not isinstance(msg_bytes, (bytearray, memoryview)):
+        if not isinstance(msg_bytes, (bytearray, memoryview, SegmentedBuffer)):
             raise ValueError("Msg_bytes must be a bytearray.")
 
         if self.index == 0:
@@ -135,20 +203,37 @@ class OutputBuffer(SpecialMemoryProperties):
 
         self.length += len(msg_bytes)
 
+    def set_message_tracker(
+        self, message_tracker: Optional[Union["MessageTracker", "CompactMessageTracker"]]
+    ) -> None:
+        """
+        Sets the tracker of the messages in the buffer, which then keeps its entries
+        in the order the messages are scheduled for sending.
+        """
+        if message_tracker is not None:
+            message_tracker.track_scheduling()
+        self.message_tracker = message_tracker
+
     def has_more_bytes(self):
         return self.length != 0
 
     # TODO: @soumya this is called every 200ms. This needs some future cleanup; possibly in the alarm data structure.
     # Consult Nagle algorithm before implementing improvements.
     def flush(self):
-        if self.last_bytearray is None:
-            return
+        """
+        Sends the batch of held messages, and stops holding messages still queued behind `output_msgs`.
+        """
+        if self._queued_messages_count:
+            self._flush_queued_messages = True
+        self._flush_batch()
 
-        self.output_msgs.append(self.last_memview[:self.valid_len])
-        self.last_bytearray_create_time = None
-        self.last_bytearray = None
-        self.last_memview = None
-        self.valid_len = 0
+    def get_flush_time(self) -> Optional[float]:
+        """
+        :return: time the batch of held messages is due to be sent, None if no messages are held
+        """
+        if self.last_bytearray_create_time is None:
+            return None
+        return self.last_bytearray_create_time + self.last_bytearray_hold_time
 
     def safe_empty(self):
         """
@@ -164,5 +249,153 @@ class OutputBuffer(SpecialMemoryProperties):
             self.output_msgs.clear()
             self.length = 0
 
+        for queue in self.priority_queues:
+            queue.clear()
+        self._queued_messages_count = 0
+        self._flush_queued_messages = False
+        self._credits = [0.0 for _ in OutputPriority]
+
+    def is_droppable(self, priority: OutputPriority) -> bool:
+        return self.max_queued_age_s[priority] is not None
+
+    def drop_expired_messages(self) -> List[Union[bytearray, memoryview, SegmentedBuffer]]:
+        """
+        Drops queued messages that waited longer than the maximum age of their class.
+        Messages already moved to `output_msgs` or into the batch are never dropped.
+
+        The message tracker, if any, is told which messages of each class were dropped.
+
+        :return: bytes of the dropped messages
+        """
+        now = time.time()
+        dropped_messages = []
+        for priority, max_age_s in enumerate(self.max_queued_age_s):
+            if max_age_s is None:
+                continue
+
+            queue = self.priority_queues[priority]
+            dropped_messages_count = len(dropped_messages)
+            while queue and now - queue[0][1] > max_age_s:
+                msg_bytes = queue.popleft()[0]
+                self.length -= len(msg_bytes)
+                dropped_messages.append(msg_bytes)
+
+            dropped_messages_count = len(dropped_messages) - dropped_messages_count
+            if dropped_messages_count:
+                self._queued_messages_count -= dropped_messages_count
+                dropped_messages_counter.labels(OutputPriority(priority).name.lower()).inc(dropped_messages_count)
+                if self.message_tracker is not None:
+                    self.message_tracker.on_messages_dropped(OutputPriority(priority), dropped_messages_count)
+
+        return dropped_messages
+
+    def has_queued_messages(self) -> bool:
+        """
+        :return: if messages are waiting for the ones before them to be sent
+        """
+        return self._queued_messages_count > 0
+
+    def get_queued_bytes_by_priority(self) -> List[int]:
+        return [sum(len(queued_message[0]) for queued_message in queue) for queue in self.priority_queues]
+
     def special_memory_size(self, ids: Optional[Set[int]] = None) -> SpecialTuple:
-        return memory_utils.get_special_size(self.output_msgs, ids=ids)
+        return memory_utils.add_special_objects(
+            self.output_msgs, *(queue for queue in self.priority_queues if queue), ids=ids
+        )
+
+    def _schedule_next_message(self) -> None:
+        """
+        Moves the next message from the priority queues to `output_msgs`, or with buffering
+        enabled, the next messages into the batch until it is full.
+        """
+        if self.enable_buffering:
+            self._schedule_next_batch()
+            return
+
+        if self._queued_messages_count:
+            self.output_msgs.append(self._pop_next_queued_message(time.time())[0])
+
+    def _schedule_next_batch(self) -> None:
+        """
+        Copies queued messages into the batch in scheduling order. Messages that are not held or
+        do not fit into the batch are moved to `output_msgs` after the batch instead, and
+        the remaining messages stay queued until `output_msgs` is empty again.
+        """
+        now = time.time()
+        while self._queued_messages_count:
+            msg_bytes, enqueue_time, hold_time = self._pop_next_queued_message(now)
+            length = len(msg_bytes)
+
+            if hold_time <= 0 or length + self.valid_len > self.min_size or isinstance(msg_bytes, SegmentedBuffer):
+                self._flush_batch()
+                self.output_msgs.append(msg_bytes)
+                return
+
+            if self.last_bytearray is None:
+                self.last_bytearray = bytearray(self.min_size)
+                self.last_memview = memoryview(self.last_bytearray)
+                self.last_bytearray[:length] = msg_bytes
+                self.valid_len = length
+                self.last_bytearray_create_time = enqueue_time
+                self.last_bytearray_hold_time = hold_time
+                self.last_bytearray_messages_count = 1
+                if self.hold_policy is not None:
+                    adaptive_hold_policy.hold_time_histogram.observe(hold_time)
+            else:
+                self.last_bytearray[self.valid_len:self.valid_len + length] = msg_bytes
+                self.valid_len += length
+                self.last_bytearray_messages_count += 1
+
+        if self.last_bytearray is not None and (
+            self._flush_queued_messages or now - self.last_bytearray_create_time > self.last_bytearray_hold_time
+        ):
+            self._flush_batch()
+        self._flush_queued_messages = False
+
+    def _pop_next_queued_message(
+        self, now: float
+    ) -> Tuple[Union[bytearray, memoryview, SegmentedBuffer], float, float]:
+        """
+        Pops the next message to send from the priority queues, which must not be empty.
+        """
+        priority_queues = self.priority_queues
+        priority_credits = self._credits
+        next_priority = -1
+        starved_priority_served = False
+
+        for priority, queue in enumerate(priority_queues):
+            if not queue:
+                priority_credits[priority] = 0.0
+                continue
+
+            if next_priority == -1:
+                next_priority = priority
+                continue
+
+            credit = priority_credits[priority] + self.min_shares[priority]
+            if credit >= 1 and not starved_priority_served:
+                credit -= 1
+                next_priority = priority
+                starved_priority_served = True
+            priority_credits[priority] = credit
+
+        queued_message = priority_queues[next_priority].popleft()
+        self._queued_messages_count -= 1
+        _queuing_delay_by_priority[next_priority].observe(now - queued_message[1])
+        message_tracker = self.message_tracker
+        if message_tracker is not None:
+            message_tracker.on_message_scheduled(OutputPriority(next_priority))
+        return queued_message
+
+    def _flush_batch(self) -> None:
+        if self.last_bytearray is None:
+            return
+
+        if self.hold_policy is not None:
+            adaptive_hold_policy.batch_messages_histogram.observe(self.last_bytearray_messages_count)
+        self.output_msgs.append(self.last_memview[:self.valid_len])
+        self.last_bytearray_create_time = None
+        self.last_bytearray_messages_count = 0
+        self.last_bytearray = None
+        self.last_memview = None
+        self.valid_len = 0
@@ -0,0 +1,12 @@
+from enum import IntEnum
+
+
+class OutputPriority(IntEnum):
+    """
+    Classes of the `OutputBuffer` queues. Lower values are sent first, see
+    `OutputBuffer` for how lower classes are kept from starving.
+    """
+    CONTROL = 0
+    BLOCK = 1
+    TX = 2
+    SYNC = 3
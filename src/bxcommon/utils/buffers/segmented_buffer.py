@@ -0,0 +1,38 @@
+from typing import Sequence, Tuple, Union
+
+
+class SegmentedBuffer:
+    """
+    Read-only message made of several buffers that are sent one after another,
+    e.g. a rewritten header followed by the unchanged body of the original message.
+    Lets `OutputBuffer` send the message without joining the segments into a new buffer.
+    """
+
+    __slots__ = ("segments", "_length")
+
+    segments: Tuple[memoryview, ...]
+
+    def __init__(self, segments: Sequence[Union[bytearray, memoryview]]) -> None:
+        self.segments = tuple(memoryview(segment).toreadonly() for segment in segments if len(segment))
+        self._length = sum(len(segment) for segment in self.segments)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __repr__(self) -> str:
+        return f"SegmentedBuffer<segments: {len(self.segments)}, length: {self._length}>"
+
+    def get_view(self, offset: int) -> memoryview:
+        """
+        :param offset: offset from the start of the message
+        :return: rest of the segment containing the byte at offset
+        """
+        for segment in self.segments:
+            segment_length = len(segment)
+            if offset < segment_length:
+                return segment[offset:]
+            offset -= segment_length
+        return memoryview(b"")
+
+    def tobytes(self) -> bytes:
+        return b"".join(self.segments)
@@ -78,8 +78,36 @@ def get_argument_parser() -> argparse.ArgumentParser:
                             default=constants.DUMP_REMOVED_SHORT_IDS_PATH)
     arg_parser.add_argument("--enable-buffered-send", help="Enables buffering of sent byte to improve performance",
                             type=convert.str_to_bool, default=False)
+    arg_parser.add_argument(
+        "--enable-adaptive-buffered-send",
+        help="Tunes how long buffered sends hold small messages from the message rate and ping latency "
+             "of each connection, and sends blocks without holding them (default: False)",
+        type=convert.str_to_bool,
+        default=False
+    )
     arg_parser.add_argument("--track-detailed-sent-messages", help="Enables tracking of messages written on socket",
                             type=convert.str_to_bool, default=False)
+    arg_parser.add_argument(
+        "--output-buffer-high-watermark-bytes",
+        help="Size of the output buffer of a connection that stops accepting writes, above which the connection "
+             f"is congested and drops expired transactions (default: {constants.OUTPUT_BUFFER_HIGH_WATERMARK_BYTES})",
+        type=int,
+        default=constants.OUTPUT_BUFFER_HIGH_WATERMARK_BYTES
+    )
+    arg_parser.add_argument(
+        "--output-buffer-low-watermark-bytes",
+        help="Size of the output buffer below which a congested connection recovers "
+             f"(default: {constants.OUTPUT_BUFFER_LOW_WATERMARK_BYTES})",
+        type=int,
+        default=constants.OUTPUT_BUFFER_LOW_WATERMARK_BYTES
+    )
+    arg_parser.add_argument(
+        "--use-timing-wheel-alarm-queue",
+        help="Stores alarms in a timing wheel instead of a heap, "
+             "which registers and cancels alarms in constant time (default: False)",
+        type=convert.str_to_bool,
+        default=False
+    )
     arg_parser.add_argument(
         "--use-extensions",
         help="If true than the node will use the extension module for "
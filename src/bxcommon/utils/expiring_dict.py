@@ -2,18 +2,20 @@ from typing import TypeVar, Generic, Optional, Dict
 
 from bxcommon.utils.alarm_queue import AlarmQueue
 from bxcommon.utils.expiration_queue import ExpirationQueue
+from bxcommon.utils.expiry_sweeper import ExpiringCollection, ExpirySweeper, get_expiry_sweeper
 
 KT = TypeVar("KT")
 VT = TypeVar("VT")
 
 
-class ExpiringDict(Generic[KT, VT]):
+class ExpiringDict(ExpiringCollection, Generic[KT, VT]):
     """
-    Dictionary with expiration time.
+    Dictionary with expiration time. Expired items are removed by the expiry sweeper of the alarm queue.
     """
 
     contents: Dict[KT, VT]
     _alarm_queue: AlarmQueue
+    _expiry_sweeper: ExpirySweeper
     _expiration_queue: ExpirationQueue[KT]
     _expiration_time: int
     _name: str
@@ -21,9 +23,11 @@ class ExpiringDict(Generic[KT, VT]):
     def __init__(self, alarm_queue: AlarmQueue, expiration_time_s: int, name: str) -> None:
         self.contents = {}
         self._alarm_queue = alarm_queue
+        self._expiry_sweeper = get_expiry_sweeper(alarm_queue)
         self._expiration_queue = ExpirationQueue(expiration_time_s)
         self._expiration_time = expiration_time_s
         self._name = name
+        self._expiry_sweeper.register(self)
 
     def __contains__(self, item: KT):
         return item in self.contents
@@ -44,17 +48,18 @@ class ExpiringDict(Generic[KT, VT]):
     def add(self, key: KT, value: VT) -> None:
         self.contents[key] = value
         self._expiration_queue.add(key)
-        self._alarm_queue.register_approx_alarm(
-            self._expiration_time * 2,
-            self._expiration_time,
-            self.cleanup,
-            alarm_name=f"ExpiringDict[{self._name}]#cleanup"
-        )
+        self._expiry_sweeper.schedule()
 
     def cleanup(self) -> float:
         self._expiration_queue.remove_expired(remove_callback=self.remove_item)
         return 0
 
+    def sweep_expired(self, limit: int) -> int:
+        return len(self._expiration_queue.remove_expired(remove_callback=self.remove_item, limit=limit))
+
+    def has_expiring_entries(self) -> bool:
+        return bool(self._expiration_queue)
+
     def remove_item(self, key: KT) -> Optional[VT]:
         if key in self.contents:
             return self.contents.pop(key)
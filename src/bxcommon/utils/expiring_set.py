@@ -2,19 +2,21 @@ from typing import List, TypeVar, Generic, Set
 
 from bxcommon.utils.alarm_queue import AlarmQueue
 from bxcommon.utils.expiration_queue import ExpirationQueue
+from bxcommon.utils.expiry_sweeper import ExpiringCollection, ExpirySweeper, get_expiry_sweeper
 from bxutils import logging
 
 T = TypeVar("T")
 logger = logging.get_logger(__name__)
 
 
-class ExpiringSet(Generic[T]):
+class ExpiringSet(ExpiringCollection, Generic[T]):
     """
-    Set with expiration time.
+    Set with expiration time. Expired items are removed by the expiry sweeper of the alarm queue.
     """
 
     contents: Set[T]
     _alarm_queue: AlarmQueue
+    _expiry_sweeper: ExpirySweeper
     _expiration_queue: ExpirationQueue[T]
     _expiration_time: int
     _log_removal: bool
@@ -25,10 +27,12 @@ class ExpiringSet(Generic[T]):
     ):
         self.contents = set()
         self._alarm_queue = alarm_queue
+        self._expiry_sweeper = get_expiry_sweeper(alarm_queue)
         self._expiration_queue = ExpirationQueue(expiration_time_s)
         self._expiration_time = expiration_time_s
         self._log_removal = log_removal
         self._name = name
+        self._expiry_sweeper.register(self)
 
     def __contains__(self, item: T) -> bool:
         return item in self.contents
@@ -39,12 +43,7 @@ class ExpiringSet(Generic[T]):
     def add(self, item: T) -> None:
         self.contents.add(item)
         self._expiration_queue.add(item)
-        self._alarm_queue.register_approx_alarm(
-            self._expiration_time * 2,
-            self._expiration_time,
-            self.cleanup,
-            alarm_name=f"ExpiringSet[{self._name}]#cleanup"
-        )
+        self._expiry_sweeper.schedule()
 
     def remove(self, item: T) -> None:
         self.contents.remove(item)
@@ -66,6 +65,12 @@ class ExpiringSet(Generic[T]):
         self._expiration_queue.remove_expired(remove_callback=self._safe_remove_item)
         return 0
 
+    def sweep_expired(self, limit: int) -> int:
+        return len(self._expiration_queue.remove_expired(remove_callback=self._safe_remove_item, limit=limit))
+
+    def has_expiring_entries(self) -> bool:
+        return bool(self._expiration_queue)
+
     def _safe_remove_item(self, item: T):
         if self._log_removal:
             logger.debug("Removing {} from expiring set.", item)
@@ -0,0 +1,131 @@
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Optional
+
+from bxcommon import constants
+from bxcommon.utils.alarm_queue import AlarmQueue, AlarmId
+from bxutils import logging
+
+logger = logging.get_logger(__name__)
+
+
+class ExpiringCollection(ABC):
+    """
+    Collection whose expired entries are removed by an `ExpirySweeper`.
+    """
+
+    @abstractmethod
+    def sweep_expired(self, limit: int) -> int:
+        """
+        Removes up to `limit` expired entries.
+        :return: number of entries removed
+        """
+
+    @abstractmethod
+    def has_expiring_entries(self) -> bool:
+        pass
+
+
+class ExpirySweeper:
+    """
+    Removes expired entries of all expiring collections of an alarm queue from a single periodic
+    alarm, instead of an alarm per collection.
+
+    Each sweep visits the collections round robin, starting after the last one visited by the
+    previous sweep, and removes at most `batch_size` entries per visit. It goes on until no
+    collection has expired entries left or `budget_s` is spent. The alarm runs every
+    `interval_s` from the first entry added until a sweep finds all collections empty.
+
+    Collections are referenced weakly and dropped once they are garbage collected.
+    """
+
+    interval_s: float
+    budget_s: float
+    batch_size: int
+
+    def __init__(
+        self,
+        alarm_queue: AlarmQueue,
+        interval_s: float = constants.EXPIRY_SWEEPER_INTERVAL_S,
+        budget_s: float = constants.EXPIRY_SWEEPER_BUDGET_S,
+        batch_size: int = constants.EXPIRY_SWEEPER_BATCH_SIZE,
+    ) -> None:
+        # the alarm queue references the sweeper through its alarm
+        self._alarm_queue_ref = weakref.ref(alarm_queue)
+        self.interval_s = interval_s
+        self.budget_s = budget_s
+        self.batch_size = batch_size
+        self._collections: Deque["weakref.ReferenceType[ExpiringCollection]"] = deque()
+        self._alarm_id: Optional[AlarmId] = None
+
+    def register(self, collection: ExpiringCollection) -> None:
+        self._collections.append(weakref.ref(collection))
+
+    def unregister(self, collection: ExpiringCollection) -> None:
+        for collection_ref in self._collections:
+            if collection_ref() is collection:
+                self._collections.remove(collection_ref)
+                break
+
+    def schedule(self) -> None:
+        """
+        Makes sure a sweep is scheduled, called when entries are added to a collection.
+        """
+        alarm_id = self._alarm_id
+        if alarm_id is None or not alarm_id.is_active:
+            alarm_queue = self._alarm_queue_ref()
+            if alarm_queue is not None:
+                self._alarm_id = alarm_queue.register_alarm(
+                    self.interval_s, self.sweep, alarm_name="ExpirySweeper#sweep"
+                )
+
+    def sweep(self) -> float:
+        """
+        Removes expired entries from the collections.
+        :return: delay of the next sweep, 0 if there is nothing left to expire
+        """
+        collections = self._collections
+        end_time = time.time() + self.budget_s
+        batch_size = self.batch_size
+        removed_count = 0
+        visits_without_backlog = 0
+
+        while collections and visits_without_backlog < len(collections):
+            collection_ref = collections.popleft()
+            collection = collection_ref()
+            if collection is None:
+                continue
+            collections.append(collection_ref)
+
+            removed = collection.sweep_expired(batch_size)
+            removed_count += removed
+            if removed >= batch_size:
+                visits_without_backlog = 0
+            else:
+                visits_without_backlog += 1
+
+            if time.time() > end_time:
+                logger.debug("Expiry sweep ran out of time after removing {} entries.", removed_count)
+                break
+
+        for collection_ref in collections:
+            collection = collection_ref()
+            if collection is not None and collection.has_expiring_entries():
+                return self.interval_s
+        return 0
+
+
+_sweepers: "weakref.WeakKeyDictionary[AlarmQueue, ExpirySweeper]" = weakref.WeakKeyDictionary()
+
+
+def get_expiry_sweeper(alarm_queue: AlarmQueue) -> ExpirySweeper:
+    """
+    Returns the sweeper shared by the expiring collections of `alarm_queue`.
+    """
+    sweeper = _sweepers.get(alarm_queue)
+    if sweeper is None:
+        sweeper = ExpirySweeper(alarm_queue)
+        _sweepers[alarm_queue] = sweeper
+    return sweeper
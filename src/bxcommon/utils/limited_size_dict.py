@@ -1,5 +1,7 @@
-from collections import deque
-from typing import TypeVar, Generic, Dict, Deque, Optional
+from collections import OrderedDict, deque
+from typing import TypeVar, Generic, Dict, Optional, Deque
+
+from bxcommon.utils.deprecated import deprecated
 
 KT = TypeVar("KT")
 VT = TypeVar("VT")
@@ -7,34 +9,36 @@ VT = TypeVar("VT")
 
 class LimitedSizeDict(Generic[KT, VT]):
     """
-    Dictionary with expiration time.
+    Dictionary of at most `max_size` items, that evicts the oldest added item to make room for a new one.
+
+    Updating the value of a key keeps its position. `move_to_end` makes a key the newest,
+    for least recently used eviction instead of first in first out.
     """
 
+    # NOTE: this cannot be annotated as an collections.OrderedDict
     contents: Dict[KT, VT]
-    key_tracker: Deque[KT]
     _max_size: int
 
     def __init__(self, max_size: int) -> None:
-        self.contents = {}
-        self.key_tracker = deque()
+        self.contents = OrderedDict()
         self._max_size = max_size
 
+    @property
+    @deprecated
+    def key_tracker(self) -> Deque[KT]:
+        """
+        Copy of the keys in eviction order. Order is tracked by `contents`, so appending to it has no effect.
+        """
+        return deque(self.contents)
+
     def __contains__(self, item: KT) -> bool:
         return item in self.contents
 
     def __setitem__(self, key: KT, value: VT) -> None:
-        if key in self.contents:
-            self.contents[key] = value
-        else:
-            self.add(key, value)
+        self.add(key, value)
 
     def __delitem__(self, key: KT) -> None:
-        """
-        Deletion is fairly expensive. Generally, there is no need to delete
-        from this data structure.
-        """
         del self.contents[key]
-        self.key_tracker.remove(key)
 
     def __getitem__(self, item: KT) -> VT:
         return self.contents[item]
@@ -43,15 +47,23 @@ class LimitedSizeDict(Generic[KT, VT]):
         return len(self.contents)
 
     def add(self, key: KT, value: VT) -> None:
-        self._make_room_for_new_item()
-
-        self.contents[key] = value
-        self.key_tracker.append(key)
+        contents = self.contents
+        if key not in contents:
+            self._make_room_for_new_item()
+        contents[key] = value
 
     def get(self, key: KT, default: Optional[VT] = None) -> Optional[VT]:
         return self.contents.get(key, default)
 
+    def move_to_end(self, key: KT) -> None:
+        """
+        Makes key the last to be evicted.
+        """
+        # pyre-fixme[16]: `Dict` has no attribute `move_to_end`.
+        self.contents.move_to_end(key)
+
     def _make_room_for_new_item(self) -> None:
-        while len(self.key_tracker) >= self._max_size:
-            key = self.key_tracker.popleft()
-            del self.contents[key]
+        contents = self.contents
+        while len(contents) >= self._max_size:
+            # pyre-fixme[28]: Unexpected keyword argument `last`.
+            contents.popitem(last=False)
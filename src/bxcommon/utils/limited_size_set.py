@@ -1,48 +1,59 @@
-from collections import deque
-from typing import TypeVar, Generic, Deque, Set
+from collections import OrderedDict
+from typing import TypeVar, Generic, Dict, Iterator, KeysView
 
 T = TypeVar("T")
 
 
 class LimitedSizeSet(Generic[T]):
     """
-    Set with expiration time.
+    Set of at most `max_size` items, that evicts the oldest added item to make room for a new one.
+
+    Adding an item already in the set keeps its position. `move_to_end` makes an item the newest,
+    for least recently used eviction instead of first in first out.
     """
 
-    contents: Set[T]
-    _item_tracker: Deque[T]
+    # NOTE: this cannot be annotated as an collections.OrderedDict
+    _contents: Dict[T, None]
     _max_size: int
 
     def __init__(self, max_size: int) -> None:
-        self.contents = set()
-        self._item_tracker = deque()
+        self._contents = OrderedDict()
         self._max_size = max_size
 
+    @property
+    def contents(self) -> KeysView[T]:
+        """
+        Read-only set-like view of the items, oldest first. Use `add` and `remove` to modify the set.
+        """
+        return self._contents.keys()
+
     def __contains__(self, item: T) -> bool:
-        return item in self.contents
+        return item in self._contents
 
-    def __iter__(self):
-        for item in self.contents:
-            yield item
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._contents)
 
     def remove(self, value: T) -> None:
-        """
-        Deletion is fairly expensive. Generally, there is no need to delete
-        from this data structure.
-        """
-        self.contents.remove(value)
-        self._item_tracker.remove(value)
+        del self._contents[value]
 
     def __len__(self) -> int:
-        return len(self.contents)
+        return len(self._contents)
 
     def add(self, value: T) -> None:
-        self.contents.add(value)
-        if len(self.contents) != len(self._item_tracker):
+        contents = self._contents
+        if value not in contents:
             self._make_room_for_new_item()
-            self._item_tracker.append(value)
+            contents[value] = None
+
+    def move_to_end(self, value: T) -> None:
+        """
+        Makes value the last to be evicted.
+        """
+        # pyre-fixme[16]: `Dict` has no attribute `move_to_end`.
+        self._contents.move_to_end(value)
 
     def _make_room_for_new_item(self) -> None:
-        while len(self.contents) > self._max_size:
-            key = self._item_tracker.popleft()
-            self.contents.remove(key)
+        contents = self._contents
+        while len(contents) >= self._max_size:
+            # pyre-fixme[28]: Unexpected keyword argument `last`.
+            contents.popitem(last=False)
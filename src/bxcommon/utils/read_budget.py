@@ -0,0 +1,31 @@
+import time
+
+from bxcommon import constants
+
+
+class ReadBudget:
+    """
+    Limits the input a connection processes in one event loop turn. Input left over once the
+    budget is used up waits for the next turn, see `AbstractNode.process_pending_input`.
+    """
+
+    max_bytes: int
+    max_messages: int
+    max_time_s: float
+
+    def __init__(
+        self,
+        max_bytes: int = constants.INBOUND_READ_BUDGET_BYTES,
+        max_messages: int = constants.INBOUND_READ_BUDGET_MESSAGES,
+        max_time_s: float = constants.INBOUND_READ_BUDGET_TIME_S,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.max_time_s = max_time_s
+
+    def is_exhausted(self, start_time: float, messages_processed: int, bytes_processed: int) -> bool:
+        return (
+            messages_processed >= self.max_messages
+            or bytes_processed >= self.max_bytes
+            or time.time() - start_time >= self.max_time_s
+        )
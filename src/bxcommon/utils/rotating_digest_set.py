@@ -0,0 +1,64 @@
+import hashlib
+from typing import Union, Set
+
+
+class RotatingDigestSet:
+    """
+    Set of the 128 bit digests of recently added keys, over a sliding window.
+
+    Keys are added to the current generation. Once it holds `capacity` keys it replaces
+    the previous generation and a new empty one is started, so a key is remembered for
+    at least `capacity` and at most `2 * capacity` later additions. Lookups have no false
+    negatives within that window and no false positives, short of a digest collision.
+    """
+
+    capacity: int
+    rotations: int
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("Digest set capacity must be positive.")
+
+        self.capacity = capacity
+        self.rotations = 0
+
+        self._current: Set[bytes] = set()
+        self._previous: Set[bytes] = set()
+
+    def __contains__(self, key: Union[bytes, bytearray, memoryview]) -> bool:
+        digest = self._get_digest(key)
+        return digest in self._current or digest in self._previous
+
+    def add(self, key: Union[bytes, bytearray, memoryview]) -> None:
+        """
+        Adds the key to the current generation, unless it is already there. Keys of the previous
+        generation are added again, so keys that are still seen outlive the rotation of the previous generation.
+        """
+        digest = self._get_digest(key)
+        if digest in self._current:
+            return
+
+        if len(self._current) >= self.capacity:
+            self._previous = self._current
+            self._current = set()
+            self.rotations += 1
+
+        self._current.add(digest)
+
+    def check_and_add(self, key: Union[bytes, bytearray, memoryview]) -> bool:
+        """
+        Adds the key to the set.
+
+        :return: if the key was already in the set
+        """
+        contains = key in self
+        self.add(key)
+        return contains
+
+    def clear(self) -> None:
+        self._current = set()
+        self._previous = set()
+
+    @staticmethod
+    def _get_digest(key: Union[bytes, bytearray, memoryview]) -> bytes:
+        return hashlib.blake2b(key, digest_size=16).digest()
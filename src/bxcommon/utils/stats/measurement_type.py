@@ -2,3 +2,7 @@ class MeasurementType:
     PING = "PING"
     PING_INCOMING = "PING_INCOMING"
     PING_OUTGOING = "PING_OUTGOING"
+    DUPLICATES_DROPPED = "DUPLICATES_DROPPED"
+    COMPRESSION_INPUT_BYTES = "COMPRESSION_INPUT_BYTES"
+    COMPRESSION_OUTPUT_BYTES = "COMPRESSION_OUTPUT_BYTES"
+    COMPRESSION_TIME = "COMPRESSION_TIME"
@@ -25,3 +25,8 @@ class PeerStats:
     ping_max: float = 0
     ping_incoming_max: float = 0
     ping_outgoing_max: float = 0
+    duplicates_dropped: int = 0
+    compression_input_bytes: int = 0
+    compression_output_bytes: int = 0
+    compression_ratio: float = 1.0
+    compression_time_s: float = 0
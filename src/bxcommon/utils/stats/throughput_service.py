@@ -3,6 +3,7 @@ import functools
 
 from dataclasses import dataclass
 from collections import defaultdict
+from datetime import datetime
 from typing import Optional, Union, Dict, Type, Any, TYPE_CHECKING
 
 from prometheus_client import Counter
@@ -95,10 +96,34 @@ class ThroughputStatistics(StatisticsService[ThroughputIntervalData, "AbstractNo
             peer_stats.ping_incoming_max = max(peer_stats.ping_incoming_max, measure_value)
         elif measure_type is MeasurementType.PING_OUTGOING:
             peer_stats.ping_outgoing_max = max(peer_stats.ping_outgoing_max, measure_value)
+        elif measure_type is MeasurementType.DUPLICATES_DROPPED:
+            peer_stats.duplicates_dropped += int(measure_value)
+        elif measure_type is MeasurementType.COMPRESSION_INPUT_BYTES:
+            peer_stats.compression_input_bytes += int(measure_value)
+        elif measure_type is MeasurementType.COMPRESSION_OUTPUT_BYTES:
+            peer_stats.compression_output_bytes += int(measure_value)
+            if peer_stats.compression_input_bytes:
+                peer_stats.compression_ratio = \
+                    peer_stats.compression_output_bytes / peer_stats.compression_input_bytes
+        elif measure_type is MeasurementType.COMPRESSION_TIME:
+            peer_stats.compression_time_s += measure_value
 
         else:
             raise ValueError(f"Unexpected throughput measurement: {measure_type}={measure_value}")
 
+    def get_peer_throughput_out(self, peer_desc: str) -> Optional[float]:
+        """
+        :return: bytes per second sent to the peer in the current interval, if any were sent
+        """
+        peer_stats = self.interval_data.peer_to_stats.get(peer_desc)
+        if peer_stats is None or not peer_stats.peer_total_sent:
+            return None
+
+        elapsed_s = (datetime.utcnow() - self.interval_data.start_time).total_seconds()
+        if elapsed_s <= 0:
+            return None
+        return peer_stats.peer_total_sent / elapsed_s
+
     def get_info(self) -> Dict[str, Any]:
         node = self.node
         assert node is not None
@@ -110,6 +135,7 @@ class ThroughputStatistics(StatisticsService[ThroughputIntervalData, "AbstractNo
                     "peer_address": "%s:%d" % (conn.peer_ip, conn.peer_port),
                     "peer_id": conn.peer_id,
                     "output_buffer_length": conn.get_backlog_size(),
+                    "socket_options": conn.socket_connection.socket_options,
                 }
             )
 
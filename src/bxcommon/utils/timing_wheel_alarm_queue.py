@@ -0,0 +1,275 @@
+import time
+from collections import deque
+from operator import attrgetter
+from typing import List, Optional, Deque, Tuple
+
+from bxcommon import constants
+from bxcommon.utils.alarm_queue import AlarmQueue, AlarmId
+
+_alarm_order = attrgetter("fire_time", "count")
+
+
+class TimingWheelAlarmQueue(AlarmQueue):
+    """
+    Alarm queue stored in a hierarchical timing wheel, as in the Linux kernel timers.
+
+    Time is split into ticks of `tick_s` seconds. Level 0 has a slot per tick for alarms
+    due in the next 256 ticks, and each higher level has 64 slots that cover 64 slots of
+    the level below. Registering an alarm appends it to its slot and canceling it only
+    marks it inactive, so both are O(1) regardless of the number of alarms. Slots of a
+    higher level are redistributed to the lower levels as time reaches them. Time without
+    alarms is skipped a whole slot of the lowest level that holds alarms at a time.
+
+    Alarms still fire in order and no earlier than their fire time. Alarms of each tick are
+    collected at once into `_due`, from which `fire_alarms` pops them.
+
+    Alarms further away than the top level covers (about 50 days at 1ms ticks) are
+    kept in `_overflow` and redistributed each time the top level wraps around, which
+    is before any of them is due.
+    """
+
+    LEVEL_BITS = (8, 6, 6, 6, 6)
+
+    tick_s: float
+
+    def __init__(self, tick_s: float = constants.ALARM_TIMING_WHEEL_TICK_S) -> None:
+        super().__init__()
+        self.tick_s = tick_s
+
+        self._wheels: List[List[List[AlarmId]]] = [[[] for _ in range(1 << bits)] for bits in self.LEVEL_BITS]
+        self._shifts: List[int] = []
+        # wheel, shift, index mask and range in ticks of each level above level 0
+        self._higher_levels: List[Tuple[List[List[AlarmId]], int, int, int]] = []
+        shift = 0
+        for wheel, bits in zip(self._wheels, self.LEVEL_BITS):
+            self._shifts.append(shift)
+            if shift:
+                self._higher_levels.append((wheel, shift, (1 << bits) - 1, 1 << (shift + bits)))
+            shift += bits
+        self._level0_range = 1 << self.LEVEL_BITS[0]
+        self._level0_mask = self._level0_range - 1
+
+        self._current_tick = int(time.time() / tick_s)
+        self._due: Deque[AlarmId] = deque()
+        # alarms beyond the range of the top level
+        self._overflow: List[AlarmId] = []
+
+        # alarms in the wheel and in `_due`, including canceled ones not yet dropped
+        self._size = 0
+        self._wheel_size = 0
+        self._level0_size = 0
+        self._higher_level_sizes = [0] * len(self._higher_levels)
+
+        self._next_alarm: Optional[AlarmId] = None
+        self._next_alarm_valid = True
+
+    def _push_alarm(self, alarm_id: AlarmId) -> None:
+        self._place(alarm_id, int(alarm_id.fire_time / self.tick_s))
+        self._size += 1
+
+        if self._next_alarm_valid:
+            next_alarm = self._next_alarm
+            if next_alarm is None or alarm_id < next_alarm:
+                self._next_alarm = alarm_id
+
+    def _pop_due_alarm(self, curr_time: float) -> Optional[AlarmId]:
+        due = self._due
+        if not due:
+            self._advance(curr_time)
+            if not due:
+                return None
+
+        alarm_id = due.popleft()
+        self._size -= 1
+        if not alarm_id.is_active:
+            self._on_cancelled_alarm_removed()
+        if alarm_id is self._next_alarm:
+            self._next_alarm_valid = False
+        return alarm_id
+
+    def _remove_cancelled_alarms(self) -> None:
+        # canceled alarms are dropped when their slot is reached
+        next_alarm = self._next_alarm
+        if next_alarm is not None and not next_alarm.is_active:
+            self._next_alarm_valid = False
+
+    def _has_alarms(self) -> bool:
+        return self._size > 0
+
+    def _stored_alarms_count(self) -> int:
+        return self._size
+
+    def _next_fire_time(self) -> Optional[float]:
+        if not self._next_alarm_valid:
+            self._next_alarm = self._find_next_alarm()
+            self._next_alarm_valid = True
+
+        next_alarm = self._next_alarm
+        if next_alarm is None:
+            return None
+        return next_alarm.fire_time
+
+    def _place(self, alarm_id: AlarmId, tick: int) -> None:
+        current_tick = self._current_tick
+        delta = tick - current_tick
+        self._wheel_size += 1
+
+        if delta < self._level0_range:
+            # alarms already late go to the current slot
+            self._wheels[0][max(tick, current_tick) & self._level0_mask].append(alarm_id)
+            self._level0_size += 1
+            return
+
+        for level, (wheel, shift, mask, level_range) in enumerate(self._higher_levels):
+            if delta < level_range:
+                wheel[(tick >> shift) & mask].append(alarm_id)
+                self._higher_level_sizes[level] += 1
+                return
+
+        self._overflow.append(alarm_id)
+
+    def _advance(self, curr_time: float) -> None:
+        """
+        Moves the alarms due at `curr_time` to `_due`, in fire order.
+        """
+        target_tick = int(curr_time / self.tick_s)
+        current_tick = self._current_tick
+        level0 = self._wheels[0]
+        level0_mask = self._level0_mask
+
+        while current_tick < target_tick:
+            if not self._wheel_size:
+                current_tick = target_tick
+                break
+
+            if not self._level0_size:
+                # skip to the next slot of the lowest level holding alarms, nothing to fire before it
+                shift = self._lowest_occupied_level_shift()
+                current_tick = ((current_tick >> shift) + 1) << shift
+                if current_tick > target_tick:
+                    current_tick = target_tick
+                    break
+            else:
+                index = current_tick & level0_mask
+                slot = level0[index]
+                if slot:
+                    level0[index] = []
+                    self._level0_size -= len(slot)
+                    self._wheel_size -= len(slot)
+                    self._collect(slot)
+                current_tick += 1
+                if current_tick & level0_mask:
+                    continue
+
+            self._current_tick = current_tick
+            self._cascade(current_tick)
+
+        self._current_tick = current_tick
+
+        # alarms of the current tick that are already due
+        index = current_tick & level0_mask
+        slot = level0[index]
+        if slot:
+            ready = [alarm_id for alarm_id in slot if alarm_id.fire_time <= curr_time]
+            if ready:
+                level0[index] = [alarm_id for alarm_id in slot if alarm_id.fire_time > curr_time]
+                self._level0_size -= len(ready)
+                self._wheel_size -= len(ready)
+                self._collect(ready)
+
+    def _cascade(self, current_tick: int) -> None:
+        """
+        Redistributes the higher level slots that start at `current_tick`.
+        """
+        wheels = self._wheels
+        shifts = self._shifts
+        for level in range(1, len(self.LEVEL_BITS)):
+            shift = shifts[level]
+            index = (current_tick >> shift) & ((1 << self.LEVEL_BITS[level]) - 1)
+            slot = wheels[level][index]
+            if slot:
+                wheels[level][index] = []
+                self._wheel_size -= len(slot)
+                self._higher_level_sizes[level - 1] -= len(slot)
+                self._redistribute(slot)
+            if index:
+                break
+        else:
+            overflow = self._overflow
+            if overflow:
+                self._overflow = []
+                self._wheel_size -= len(overflow)
+                self._redistribute(overflow)
+
+    def _redistribute(self, alarm_ids: List[AlarmId]) -> None:
+        tick_s = self.tick_s
+        for alarm_id in alarm_ids:
+            if alarm_id.is_active:
+                self._place(alarm_id, int(alarm_id.fire_time / tick_s))
+            else:
+                self._size -= 1
+                self._on_cancelled_alarm_removed()
+
+    def _lowest_occupied_level_shift(self) -> int:
+        for level_size, (_wheel, shift, _mask, _level_range) in zip(self._higher_level_sizes, self._higher_levels):
+            if level_size:
+                return shift
+        return self._higher_levels[-1][1]
+
+    def _collect(self, slot: List[AlarmId]) -> None:
+        active = [alarm_id for alarm_id in slot if alarm_id.is_active]
+        cancelled_count = len(slot) - len(active)
+        self._size -= cancelled_count
+        self.cancelled_count = max(0, self.cancelled_count - cancelled_count)
+        active.sort(key=_alarm_order)
+        self._due.extend(active)
+
+    def _find_next_alarm(self) -> Optional[AlarmId]:
+        for alarm_id in self._due:
+            if alarm_id.is_active:
+                return alarm_id
+
+        current_tick = self._current_tick
+        level0 = self._wheels[0]
+        level0_mask = self._level0_mask
+        next_alarm: Optional[AlarmId] = None
+        next_tick = 0
+
+        if self._level0_size:
+            for offset in range(level0_mask + 1):
+                next_alarm = self._min_active(level0[(current_tick + offset) & level0_mask])
+                if next_alarm is not None:
+                    next_tick = current_tick + offset
+                    break
+
+        for level in range(1, len(self.LEVEL_BITS)):
+            shift = self._shifts[level]
+            # slots of this level start after the current one
+            next_slot_tick = ((current_tick >> shift) + 1) << shift
+            if next_alarm is not None and next_tick < next_slot_tick:
+                break
+
+            wheel = self._wheels[level]
+            mask = len(wheel) - 1
+            first_index = (current_tick >> shift) + 1
+            for offset in range(len(wheel)):
+                candidate = self._min_active(wheel[(first_index + offset) & mask])
+                if candidate is not None:
+                    if next_alarm is None or candidate < next_alarm:
+                        next_alarm = candidate
+                        next_tick = int(candidate.fire_time / self.tick_s)
+                    break
+
+        for alarm_id in self._overflow:
+            if alarm_id.is_active and (next_alarm is None or alarm_id < next_alarm):
+                next_alarm = alarm_id
+
+        return next_alarm
+
+    @staticmethod
+    def _min_active(slot: List[AlarmId]) -> Optional[AlarmId]:
+        min_alarm = None
+        for alarm_id in slot:
+            if alarm_id.is_active and (min_alarm is None or alarm_id < min_alarm):
+                min_alarm = alarm_id
+        return min_alarm
@@ -0,0 +1,201 @@
+import socket
+from typing import Dict, List, Tuple
+
+from bxcommon.connections.abstract_connection import AbstractConnection
+from bxcommon.connections.connection_pool import ConnectionPool
+from bxcommon.connections.connection_type import ConnectionType
+from bxcommon.constants import LOCALHOST, ALL_NETWORK_NUM
+from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
+from bxcommon.messages.bloxroute.bloxroute_message_factory import bloxroute_message_factory
+from bxcommon.messages.bloxroute.broadcast_message import BroadcastMessage
+from bxcommon.messages.bloxroute.broadcast_tree_ack_message import BroadcastTreeAckMessage
+from bxcommon.messages.bloxroute.broadcast_tree_assign_message import BroadcastTreeAssignMessage
+from bxcommon.models.broadcast_message_type import BroadcastMessageType
+from bxcommon.services.broadcast_service import BroadcastService, BroadcastOptions
+from bxcommon.services.broadcast_tree import build_broadcast_tree
+from bxcommon.services.broadcast_tree_service import BroadcastTreeService
+from bxcommon.test_utils import helpers
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.test_utils.mocks.mock_connection import MockConnection
+from bxcommon.test_utils.mocks.mock_node import MockNode
+from bxcommon.test_utils.mocks.mock_socket_connection import MockSocketConnection
+from bxcommon.utils.buffers.input_buffer import InputBuffer
+from bxcommon.utils.object_hash import Sha256Hash
+
+
+class SimulatedBroadcastTreeService(BroadcastTreeService):
+    def can_assign_tree_children(self, connection: AbstractConnection) -> bool:
+        return True
+
+
+class SimulatedBroadcastService(
+    BroadcastService[AbstractBroadcastMessage, AbstractConnection, BroadcastOptions]
+):
+    def __init__(self, connection_pool: ConnectionPool, broadcast_tree_service: BroadcastTreeService) -> None:
+        super().__init__(connection_pool)
+        self.broadcast_tree_service = broadcast_tree_service
+
+    def should_broadcast_to_connection(
+        self,
+        message: AbstractBroadcastMessage,
+        connection: AbstractConnection,
+        options: BroadcastOptions
+    ) -> bool:
+        return True
+
+    def select_tree_connections(
+        self, message: AbstractBroadcastMessage, options: BroadcastOptions, connections: List[AbstractConnection]
+    ) -> List[AbstractConnection]:
+        return self.broadcast_tree_service.select_connections(
+            connections, options.broadcasting_connection, lambda _connection: True
+        )
+
+
+class SimulatedNode:
+    """
+    In-process node with a loopback socket per peer. Messages are written to the sockets
+    from the connection output buffers and read back into the peer's input buffers.
+    """
+
+    def __init__(self, node_id: str, mock_node: MockNode, connection_types: Tuple[ConnectionType, ...]) -> None:
+        self.node_id = node_id
+        self.connection_types = connection_types
+        self.mock_node = mock_node
+        self.connection_pool = ConnectionPool()
+        self.broadcast_tree_service = SimulatedBroadcastTreeService(self.connection_pool)
+        self.broadcast_service = SimulatedBroadcastService(self.connection_pool, self.broadcast_tree_service)
+        self.sockets: Dict[AbstractConnection, socket.socket] = {}
+        self.inputbufs: Dict[AbstractConnection, InputBuffer] = {}
+        self.received_messages: List[AbstractBroadcastMessage] = []
+        self.bytes_sent = 0
+
+    def add_peer(self, peer_id: str, sock: socket.socket) -> None:
+        fileno = sock.fileno()
+        connection = MockConnection(
+            MockSocketConnection(fileno, self.mock_node, ip_address=LOCALHOST, port=fileno), self.mock_node
+        )
+        connection.network_num = ALL_NETWORK_NUM
+        connection.peer_id = peer_id
+        connection.on_connection_established()
+        self.connection_pool.add(fileno, LOCALHOST, fileno, connection)
+        self.connection_pool.index_conn_node_id(peer_id, connection)
+        self.sockets[connection] = sock
+        self.inputbufs[connection] = InputBuffer()
+
+    def broadcast(self, message: AbstractBroadcastMessage, connection=None) -> None:
+        self.broadcast_service.broadcast(
+            message,
+            BroadcastOptions(broadcast_connection=connection, connection_types=self.connection_types)
+        )
+
+    def send(self) -> bool:
+        sent = False
+        for connection, sock in self.sockets.items():
+            outputbuf = connection.outputbuf
+            while outputbuf.has_more_bytes():
+                buf = outputbuf.get_buffer()
+                sock.sendall(buf)
+                self.bytes_sent += len(buf)
+                outputbuf.advance_buffer(len(buf))
+                sent = True
+        return sent
+
+    def receive(self) -> None:
+        for connection, sock in self.sockets.items():
+            inputbuf = self.inputbufs[connection]
+            try:
+                while True:
+                    inputbuf.add_bytes(bytearray(sock.recv(65536)))
+            except BlockingIOError:
+                pass
+
+            while True:
+                is_full_message, _, payload_length = \
+                    bloxroute_message_factory.get_message_header_preview_from_input_buffer(inputbuf)
+                if not is_full_message:
+                    break
+                message_length = bloxroute_message_factory.base_message_type.HEADER_LENGTH + payload_length
+                message = bloxroute_message_factory.create_message_from_buffer(inputbuf.remove_bytes(message_length))
+                if isinstance(message, BroadcastTreeAssignMessage):
+                    self.broadcast_tree_service.on_tree_children_assigned(connection, message.peer_ids())
+                elif isinstance(message, BroadcastTreeAckMessage):
+                    self.broadcast_tree_service.on_tree_children_confirmed(connection, message.peer_ids())
+                else:
+                    self.received_messages.append(message)
+                    self.broadcast(message, connection)
+
+
+class BroadcastTreeSimulationTest(AbstractTestCase):
+
+    def setUp(self) -> None:
+        self.mock_node = MockNode(helpers.get_common_opts(8000))
+        self.sockets = []
+
+    def tearDown(self) -> None:
+        for sock in self.sockets:
+            sock.close()
+
+    def _connect(self, node: SimulatedNode, peer: SimulatedNode) -> None:
+        node_socket, peer_socket = socket.socketpair()
+        for sock in (node_socket, peer_socket):
+            sock.setblocking(False)
+            self.sockets.append(sock)
+        node.add_peer(peer.node_id, node_socket)
+        peer.add_peer(node.node_id, peer_socket)
+
+    def _run(self, nodes: List[SimulatedNode]) -> None:
+        while any([node.send() for node in nodes]):
+            for node in nodes:
+                node.receive()
+
+    def test_broadcast_through_tree_over_loopback(self):
+        root = SimulatedNode(helpers.generate_node_id(), self.mock_node, (MockConnection.CONNECTION_TYPE,))
+        # peers only relay messages from the root to their tree children
+        peers = [
+            SimulatedNode(helpers.generate_node_id(), self.mock_node, (ConnectionType.RELAY_BLOCK,)) for _ in range(10)
+        ]
+        broadcast_tree = build_broadcast_tree({peer.node_id: (i + 1) / 1000 for i, peer in enumerate(peers)}, 3)
+        peers_by_id = {peer.node_id: peer for peer in peers}
+        # one forwarder is not connected to its last child
+        unconnected_forwarder_id, unconnected_children = next(iter(broadcast_tree.children_by_forwarder.items()))
+        unconnected_child_id = unconnected_children[-1]
+        for i, peer in enumerate(peers):
+            self._connect(root, peer)
+            for other_peer in peers[i + 1:]:
+                if {peer.node_id, other_peer.node_id} != {unconnected_forwarder_id, unconnected_child_id}:
+                    self._connect(peer, other_peer)
+
+        root.broadcast_tree_service.set_broadcast_tree(broadcast_tree)
+        self._run([root] + peers)
+
+        for forwarder_id, children in broadcast_tree.children_by_forwarder.items():
+            forwarder = peers_by_id[forwarder_id]
+            self.assertEqual(root.node_id, forwarder.broadcast_tree_service.tree_parent_peer_id)
+            if forwarder_id == unconnected_forwarder_id:
+                self.assertEqual(children[:-1], forwarder.broadcast_tree_service.tree_children)
+            else:
+                self.assertEqual(children, forwarder.broadcast_tree_service.tree_children)
+        self.assertEqual(
+            len(broadcast_tree.forwarder_by_child) - 1, len(broadcast_tree.confirmed_forwarder_by_child)
+        )
+
+        for node in [root] + peers:
+            node.bytes_sent = 0
+        message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), ALL_NETWORK_NUM, "",
+                                   BroadcastMessageType.BLOCK, False, helpers.generate_bytearray(1000))
+        root.broadcast(message)
+        self._run([root] + peers)
+
+        for peer in peers:
+            self.assertEqual(1, len(peer.received_messages))
+            self.assertEqual(message.rawbytes(), peer.received_messages[0].rawbytes())
+
+        # root only uploads to the forwarders, and to the child its forwarder is not connected to
+        self.assertEqual(
+            (len(broadcast_tree.children_by_forwarder) + 1) * len(message.rawbytes()), root.bytes_sent
+        )
+        for forwarder_id, children in broadcast_tree.children_by_forwarder.items():
+            forwarder = peers_by_id[forwarder_id]
+            self.assertEqual(
+                len(forwarder.broadcast_tree_service.tree_children) * len(message.rawbytes()), forwarder.bytes_sent
+            )
@@ -1,15 +1,29 @@
 import time
+import zlib
 
-from mock import MagicMock
+from mock import MagicMock, patch
 
 from bxcommon import constants
 from bxcommon.connections.connection_state import ConnectionState
 from bxcommon.connections.internal_node_connection import InternalNodeConnection
+from bxcommon.messages.bloxroute.abstract_bloxroute_message import AbstractBloxrouteMessage
+from bxcommon.messages.bloxroute.batch_message import BatchMessage
+from bxcommon.messages.bloxroute.broadcast_tree_ack_message import BroadcastTreeAckMessage
+from bxcommon.messages.bloxroute.broadcast_tree_assign_message import BroadcastTreeAssignMessage
+from bxcommon.messages.bloxroute.compressed_message import CompressedMessage
+from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.messages.bloxroute.hello_message import HelloMessage
+from bxcommon.messages.bloxroute.ping_message import PingMessage
 from bxcommon.messages.bloxroute.pong_message import PongMessage
+from bxcommon.messages.bloxroute.protocol_version import BATCH_MESSAGE, COMPRESSED_MESSAGE, BROADCAST_TREE_MESSAGE
+from bxcommon.messages.bloxroute.tx_message import TxMessage
+from bxcommon.services.broadcast_tree import BroadcastTree
+from bxcommon.services.message_batch_service import MessageBatchService
 from bxcommon.test_utils import helpers
 from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.test_utils.mocks.mock_clock import MockClock
 from bxcommon.utils.alarm_queue import AlarmQueue
+from bxcommon.utils.stats.throughput_service import throughput_statistics
 
 
 class InternalNodeConnectionTest(AbstractTestCase):
@@ -58,3 +72,370 @@ class InternalNodeConnectionTest(AbstractTestCase):
         self.connection.node.alarm_queue.fire_alarms()
         self.assertIsNone(self.connection.pong_timeout_alarm_id)
         self.assertTrue(self.connection.is_active())
+
+    def test_duplicate_messages_dropped_before_parsing(self):
+        node = self.connection.node
+        node.init_duplicate_message_filter()
+        other_connection = helpers.create_connection(InternalNodeConnection, node, file_no=2, port=8001)
+        other_connection.on_connection_established()
+        for connection in (self.connection, other_connection):
+            connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+
+        handler = MagicMock()
+        self.connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+        other_connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        tx_hash = helpers.generate_object_hash()
+        tx_message = TxMessage(tx_hash, 1, tx_val=helpers.generate_bytearray(250))
+        tx_message_with_short_id = TxMessage(tx_hash, 1, short_id=10, tx_val=helpers.generate_bytearray(250))
+
+        self.connection.inputbuf.add_bytes(bytearray(tx_message.rawbytes()))
+        self.connection.inputbuf.add_bytes(bytearray(tx_message.rawbytes()))
+        self.connection.process_message()
+        other_connection.inputbuf.add_bytes(bytearray(tx_message.rawbytes()))
+        other_connection.inputbuf.add_bytes(bytearray(tx_message_with_short_id.rawbytes()))
+        other_connection.process_message()
+
+        self.assertEqual(2, handler.call_count)
+        self.assertEqual(tx_message.rawbytes(), handler.call_args_list[0][0][0].rawbytes())
+        self.assertEqual(10, handler.call_args_list[1][0][0].short_id())
+        self.assertEqual(0, self.connection.inputbuf.length)
+        self.assertEqual(0, other_connection.inputbuf.length)
+        self.assertEqual(1, self.connection.duplicate_messages_dropped)
+        self.assertEqual(1, other_connection.duplicate_messages_dropped)
+
+    def test_duplicate_messages_processed_if_handler_failed(self):
+        self.connection.node.init_duplicate_message_filter()
+        self.connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        handler = MagicMock(side_effect=[ValueError("failed"), None])
+        self.connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250))
+        for _ in range(3):
+            self.connection.inputbuf.add_bytes(bytearray(tx_message.rawbytes()))
+        self.connection.process_message()
+
+        self.assertEqual(2, handler.call_count)
+        self.assertEqual(0, self.connection.inputbuf.length)
+        self.assertEqual(1, self.connection.duplicate_messages_dropped)
+
+    def test_duplicate_messages_processed_without_filter(self):
+        self.connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        handler = MagicMock()
+        self.connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250))
+        self.connection.inputbuf.add_bytes(bytearray(tx_message.rawbytes()))
+        self.connection.inputbuf.add_bytes(bytearray(tx_message.rawbytes()))
+        self.connection.process_message()
+
+        self.assertEqual(2, handler.call_count)
+        self.assertEqual(0, self.connection.duplicate_messages_dropped)
+
+    def test_duplicate_messages_count_toward_read_budget(self):
+        self.connection.node.init_duplicate_message_filter()
+        self.connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        self.connection.read_budget.max_messages = 2
+        handler = MagicMock()
+        self.connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        for message_batch_service in [None, MessageBatchService(self.connection)]:
+            self.connection.message_batch_service = message_batch_service
+            handler.reset_mock()
+            tx_messages = [
+                TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250)) for _ in range(3)
+            ]
+            self.connection.inputbuf.add_bytes(bytearray(tx_messages[0].rawbytes()))
+            self.connection.process_message()
+
+            for tx_message in tx_messages:
+                self.connection.inputbuf.add_bytes(bytearray(tx_message.rawbytes()))
+            self.connection.process_message()
+            self.assertEqual(2, handler.call_count)
+            self.assertTrue(self.connection.has_pending_input)
+            self.assertEqual(len(tx_messages[2].rawbytes()), self.connection.inputbuf.length)
+
+            self.connection.process_message()
+            self.assertEqual(3, handler.call_count)
+            self.assertFalse(self.connection.has_pending_input)
+
+    def test_small_messages_sent_in_batch(self):
+        other_connection = helpers.create_connection(InternalNodeConnection, self.connection.node, file_no=2, port=8001)
+        other_connection.on_connection_established()
+        other_connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        handler = MagicMock()
+        other_connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        self._get_sent_bytes(self.connection)
+        tx_messages = [
+            TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250)) for _ in range(3)
+        ]
+        for tx_message in tx_messages:
+            self.connection.enqueue_msg(tx_message)
+        self.assertEqual(0, self.connection.outputbuf.length)
+        self.assertIsNotNone(self.connection.message_envelope_service._message_batch_alarm_id)
+
+        time.time = MagicMock(return_value=time.time() + constants.BATCH_MESSAGE_FLUSH_DELAY_S)
+        self.alarm_queue.fire_alarms()
+        self.assertIsNone(self.connection.message_envelope_service._message_batch_alarm_id)
+
+        sent_bytes = self._get_sent_bytes(self.connection)
+        self.assertEqual(BloxrouteMessageType.BATCH, AbstractBloxrouteMessage.unpack(sent_bytes)[0])
+
+        other_connection.inputbuf.add_bytes(sent_bytes)
+        other_connection.process_message()
+        self.assertEqual(3, handler.call_count)
+        for tx_message, call_args in zip(tx_messages, handler.call_args_list):
+            self.assertEqual(tx_message.rawbytes(), call_args[0][0].rawbytes())
+
+    def test_batched_messages_validated_and_filtered(self):
+        self.connection.node.init_duplicate_message_filter()
+        self.connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        handler = MagicMock(side_effect=[ValueError("failed"), None, None])
+        self.connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        tx_messages = [
+            TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250)) for _ in range(3)
+        ]
+        invalid_tx_bytes = bytearray(tx_messages[2].rawbytes())
+        # control flags without the VALID flag
+        invalid_tx_bytes[-1] = 0
+        batch_message = BatchMessage([
+            tx_messages[0].rawbytes(),
+            tx_messages[1].rawbytes(),
+            tx_messages[1].rawbytes(),
+            invalid_tx_bytes,
+            BatchMessage([tx_messages[2].rawbytes()]).rawbytes(),
+            tx_messages[0].rawbytes(),
+        ])
+        self.connection.inputbuf.add_bytes(bytearray(batch_message.rawbytes()))
+        self.connection.process_message()
+
+        # the first message failed and is processed again, the copy of the second one is dropped
+        self.assertEqual(3, handler.call_count)
+        self.assertEqual(tx_messages[1].rawbytes(), handler.call_args_list[1][0][0].rawbytes())
+        self.assertEqual(tx_messages[0].rawbytes(), handler.call_args_list[2][0][0].rawbytes())
+        self.assertEqual(1, self.connection.duplicate_messages_dropped)
+        self.assertTrue(self.connection.is_alive())
+
+    def test_batch_flushed_before_other_messages(self):
+        self._get_sent_bytes(self.connection)
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250))
+        ping_message = PingMessage(12345)
+
+        self.connection.enqueue_msg(tx_message)
+        self.connection.enqueue_msg(ping_message)
+
+        self.assertIsNone(self.connection.message_envelope_service._message_batch_alarm_id)
+        # a single message is sent without the batch envelope
+        self.assertEqual(
+            tx_message.rawbytes().tobytes() + ping_message.rawbytes().tobytes(),
+            bytes(self._get_sent_bytes(self.connection))
+        )
+
+    def test_messages_not_batched_for_older_peers(self):
+        self.connection.protocol_version = BATCH_MESSAGE - 1
+        self._get_sent_bytes(self.connection)
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250))
+        self.connection.enqueue_msg(tx_message)
+
+        self.assertIsNone(self.connection.message_envelope_service._message_batch_alarm_id)
+        self.assertNotEqual(0, self.connection.outputbuf.length)
+
+    def test_batch_flushed_on_max_count(self):
+        self._get_sent_bytes(self.connection)
+        for _ in range(constants.BATCH_MESSAGE_MAX_COUNT):
+            self.connection.enqueue_msg(
+                TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(10))
+            )
+
+        self.assertIsNone(self.connection.message_envelope_service._message_batch_alarm_id)
+        batch_message = BatchMessage(buf=self._get_sent_bytes(self.connection))
+        self.assertEqual(constants.BATCH_MESSAGE_MAX_COUNT, batch_message.count())
+
+    def test_large_messages_sent_compressed(self):
+        other_connection = helpers.create_connection(InternalNodeConnection, self.connection.node, file_no=2, port=8001)
+        other_connection.on_connection_established()
+        other_connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        handler = MagicMock()
+        other_connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        self._get_sent_bytes(self.connection)
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=bytearray(5000))
+        self.connection.enqueue_msg(tx_message)
+
+        sent_bytes = self._get_sent_bytes(self.connection)
+        self.assertEqual(BloxrouteMessageType.COMPRESSED, AbstractBloxrouteMessage.unpack(sent_bytes)[0])
+        self.assertLess(len(sent_bytes), len(tx_message.rawbytes()))
+        self.assertEqual(len(tx_message.rawbytes()), CompressedMessage(buf=bytearray(sent_bytes)).uncompressed_length())
+
+        other_connection.inputbuf.add_bytes(sent_bytes)
+        other_connection.process_message()
+        handler.assert_called_once()
+        self.assertEqual(tx_message.rawbytes(), handler.call_args[0][0].rawbytes())
+
+    def test_compression_enabled_while_congested(self):
+        compression = self.connection.message_envelope_service.compression
+        self._get_sent_bytes(self.connection)
+        for _ in range(3):
+            self.connection.enqueue_msg(TxMessage(helpers.generate_object_hash(), 1, tx_val=bytearray(5000)))
+            self._get_sent_bytes(self.connection)
+
+        start_time = time.time()
+        time.time = MagicMock(return_value=start_time + constants.COMPRESSION_UPDATE_INTERVAL_S)
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=bytearray(5000))
+        self.connection.enqueue_msg(tx_message)
+        self.assertFalse(compression.enabled)
+        self.connection.message_envelope_service.flush_message_batch()
+        self.assertEqual(tx_message.rawbytes(), self._get_sent_bytes(self.connection))
+
+        # messages queue up behind each other
+        self.connection.enqueue_msg_bytes(bytearray(5000))
+        self.connection.enqueue_msg_bytes(bytearray(5000))
+        for _ in range(5):
+            self.connection.enqueue_msg(TxMessage(helpers.generate_object_hash(), 1, tx_val=bytearray(5000)))
+        time.time = MagicMock(return_value=start_time + 2 * constants.COMPRESSION_UPDATE_INTERVAL_S)
+        with patch.object(throughput_statistics, "get_peer_throughput_out", return_value=1024):
+            self.connection.enqueue_msg(TxMessage(helpers.generate_object_hash(), 1, tx_val=bytearray(5000)))
+        self.assertTrue(compression.enabled)
+
+    def test_compressed_messages_over_payload_limit_not_decompressed(self):
+        self.connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        handler = MagicMock()
+        self.connection.message_handlers[BloxrouteMessageType.TRANSACTION] = handler
+
+        tx_message = TxMessage(
+            helpers.generate_object_hash(), 1, tx_val=bytearray(constants.DEFAULT_MAX_PAYLOAD_LEN_BYTES)
+        )
+        msg_bytes = tx_message.rawbytes()
+        compressed_message = CompressedMessage(zlib.compress(msg_bytes, 1), len(msg_bytes))
+        self.connection.inputbuf.add_bytes(bytearray(compressed_message.rawbytes()))
+        self.connection.process_message()
+
+        handler.assert_not_called()
+        self.assertEqual(0, self.connection.inputbuf.length)
+        self.assertTrue(self.connection.is_alive())
+
+        # not sent compressed either
+        self._get_sent_bytes(self.connection)
+        self.connection.enqueue_msg(tx_message)
+        self.assertEqual(
+            BloxrouteMessageType.TRANSACTION,
+            AbstractBloxrouteMessage.unpack(self._get_sent_bytes(self.connection))[0]
+        )
+
+    def test_messages_not_compressed(self):
+        self._get_sent_bytes(self.connection)
+        # not smaller when compressed
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(5000))
+        self.connection.enqueue_msg(tx_message, prepend=True)
+        self.assertEqual(tx_message.rawbytes(), self._get_sent_bytes(self.connection))
+
+        # peer does not support compressed messages
+        self.connection.protocol_version = COMPRESSED_MESSAGE - 1
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=bytearray(5000))
+        self.connection.enqueue_msg(tx_message, prepend=True)
+        self.assertEqual(
+            BloxrouteMessageType.TRANSACTION,
+            AbstractBloxrouteMessage.unpack(self._get_sent_bytes(self.connection))[0]
+        )
+
+    def test_broadcast_tree_assignment_acknowledged(self):
+        node = self.connection.node
+        self.connection.header_size = AbstractBloxrouteMessage.HEADER_LENGTH
+        self.connection.peer_id = helpers.generate_node_id()
+        node.connection_pool.index_conn_node_id(self.connection.peer_id, self.connection)
+        child_connection = helpers.create_connection(InternalNodeConnection, node, file_no=2, port=8001)
+        child_connection.on_connection_established()
+        child_connection.peer_id = helpers.generate_node_id()
+        node.connection_pool.index_conn_node_id(child_connection.peer_id, child_connection)
+        unknown_peer_id = helpers.generate_node_id()
+        self._get_sent_bytes(self.connection)
+
+        # as a forwarder, only the connected child is acknowledged
+        self.connection.inputbuf.add_bytes(
+            bytearray(BroadcastTreeAssignMessage([child_connection.peer_id, unknown_peer_id]).rawbytes())
+        )
+        self.connection.process_message()
+        self.assertEqual(self.connection.peer_id, node.broadcast_tree_service.tree_parent_peer_id)
+        self.assertEqual([child_connection.peer_id], node.broadcast_tree_service.tree_children)
+        ack_message = self.connection.message_factory.create_message_from_buffer(
+            self._get_sent_bytes(self.connection)
+        )
+        self.assertIsInstance(ack_message, BroadcastTreeAckMessage)
+        self.assertEqual([child_connection.peer_id], ack_message.peer_ids())
+
+        # as the root, the child is confirmed by the acknowledgement of the forwarder
+        broadcast_tree = BroadcastTree({self.connection.peer_id: [child_connection.peer_id, unknown_peer_id]})
+        node.broadcast_tree_service.set_broadcast_tree(broadcast_tree)
+        assign_message = self.connection.message_factory.create_message_from_buffer(
+            self._get_sent_bytes(self.connection)
+        )
+        self.assertIsInstance(assign_message, BroadcastTreeAssignMessage)
+        self.assertEqual([child_connection.peer_id, unknown_peer_id], assign_message.peer_ids())
+
+        self.connection.inputbuf.add_bytes(bytearray(BroadcastTreeAckMessage([child_connection.peer_id]).rawbytes()))
+        self.connection.process_message()
+        self.assertEqual(
+            {child_connection.peer_id: self.connection.peer_id}, broadcast_tree.confirmed_forwarder_by_child
+        )
+
+    def test_broadcast_tree_not_assigned_to_older_peers(self):
+        node = self.connection.node
+        self.connection.peer_id = helpers.generate_node_id()
+        node.connection_pool.index_conn_node_id(self.connection.peer_id, self.connection)
+        self.connection.protocol_version = BROADCAST_TREE_MESSAGE - 1
+        self._get_sent_bytes(self.connection)
+
+        broadcast_tree = BroadcastTree({self.connection.peer_id: [helpers.generate_node_id()]})
+        node.broadcast_tree_service.set_broadcast_tree(broadcast_tree)
+        self.assertEqual(0, len(self._get_sent_bytes(self.connection)))
+
+    def _get_sent_bytes(self, connection: InternalNodeConnection) -> bytearray:
+        sent_bytes = bytearray()
+        outputbuf = connection.outputbuf
+        outputbuf.flush()
+        while outputbuf.has_more_bytes():
+            buf = outputbuf.get_buffer()
+            sent_bytes += buf
+            outputbuf.advance_buffer(len(buf))
+        return sent_bytes
+
+    def test_adaptive_buffered_send_flushes_held_messages_on_time(self):
+        clock = MockClock()
+        clock_patch = clock.patch()
+        clock_patch.start()
+        self.addCleanup(clock_patch.stop)
+
+        opts = helpers.get_common_opts(8002, enable_buffered_send=True, enable_adaptive_buffered_send=True)
+        connection = helpers.create_connection(InternalNodeConnection, node_opts=opts)
+        connection.on_connection_established()
+        connection.node.alarm_queue = AlarmQueue()
+        connection.socket_connection.send = MagicMock()
+        connection.socket_connection.can_send = True
+        hold_policy = connection.outputbuf.hold_policy
+        self.assertIsNotNone(hold_policy)
+
+        connection.ping_message_timestamps.add(1, clock.time())
+        clock.advance(0.5)
+        connection.msg_pong(PongMessage(1))
+        self.assertEqual(0.5, hold_policy.rtt_s)
+
+        for _ in range(3):
+            clock.advance(0.001)
+            connection.enqueue_msg_bytes(bytearray(10))
+        # the first message was sent before the message rate was known, the others wait behind it
+        self.assertIsNone(connection.outputbuf.get_flush_time())
+        connection.advance_sent_bytes(10)
+
+        flush_time = connection.outputbuf.get_flush_time()
+        self.assertIsNotNone(flush_time)
+        self.assertEqual(flush_time, connection._output_flush_alarm_id.fire_time)
+
+        connection.socket_connection.send.reset_mock()
+        clock.advance(flush_time - clock.time())
+        connection.node.alarm_queue.fire_alarms()
+        connection.socket_connection.send.assert_called_once()
+        self.assertIsNone(connection.outputbuf.get_flush_time())
+        self.assertEqual(20, len(connection.outputbuf.output_msgs[-1]))
+        self.assertIsNone(connection._output_flush_alarm_id)
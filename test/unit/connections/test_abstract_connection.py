@@ -1,4 +1,6 @@
-from mock import MagicMock
+import time
+
+from mock import MagicMock, patch
 
 from bxcommon.messages.abstract_message import AbstractMessage
 from bxcommon.test_utils.abstract_test_case import AbstractTestCase
@@ -12,7 +14,11 @@ from bxcommon.messages.bloxroute.bloxroute_message_factory import bloxroute_mess
 from bxcommon.messages.bloxroute.hello_message import HelloMessage
 from bxcommon.messages.bloxroute.ping_message import PingMessage
 from bxcommon.messages.bloxroute.pong_message import PongMessage
+from bxcommon.services.message_batch_service import MessageBatchService
+from bxcommon.test_utils import helpers
 from bxcommon.test_utils.helpers import create_connection
+from bxcommon.utils.buffers.message_tracker import MessageTracker
+from bxcommon.utils.buffers.output_priority import OutputPriority
 
 
 class AbstractConnectionTest(AbstractTestCase):
@@ -135,3 +141,176 @@ class AbstractConnectionTest(AbstractTestCase):
         result = self.connection.send_ping()
         self.connection.enqueue_msg.assert_called_once_with(PingMessage())
         self.assertEqual(self.connection.ping_interval_s, result)
+
+    def test_process_message_batch_groups_messages_of_same_type(self):
+        self.connection.message_batch_service = MessageBatchService(self.connection)
+        mock_pong_batch = MagicMock()
+        mock_ping = MagicMock()
+        self.connection.message_handlers = {
+            b"ping": mock_ping
+        }
+        self.connection.message_batch_service.message_batch_handlers = {
+            b"pong": mock_pong_batch
+        }
+        self.connection.on_connection_established()
+
+        self.connection.inputbuf.add_bytes(PongMessage().rawbytes())
+        self.connection.inputbuf.add_bytes(PongMessage().rawbytes())
+        self.connection.inputbuf.add_bytes(PingMessage().rawbytes())
+        self.connection.inputbuf.add_bytes(PongMessage().rawbytes())
+        self.connection.inputbuf.add_bytes(PongMessage().rawbytes()[:-2])
+
+        self.connection.process_message()
+
+        self.assertEqual(2, mock_pong_batch.call_count)
+        self.assertEqual(2, len(mock_pong_batch.call_args_list[0][0][0]))
+        self.assertEqual(1, len(mock_pong_batch.call_args_list[1][0][0]))
+        mock_ping.assert_called_once()
+        self.assertEqual(len(PongMessage().rawbytes()) - 2, self.connection.inputbuf.length)
+
+    def test_process_message_batch_abort_in_between_groups(self):
+        self.connection.message_batch_service = MessageBatchService(self.connection)
+        mock_pong = MagicMock()
+        self.connection.message_handlers = {
+            b"ack": lambda _msg: self.connection.mark_for_close(),
+            b"pong": mock_pong
+        }
+        self.connection.on_connection_established()
+        self.connection.inputbuf.add_bytes(AckMessage().rawbytes())
+        self.connection.inputbuf.add_bytes(PongMessage().rawbytes())
+
+        self.connection.process_message()
+        mock_pong.assert_not_called()
+
+    def test_process_message_batch_handler_error_recovers(self):
+        self.connection.message_batch_service = MessageBatchService(self.connection)
+        self.connection.message_batch_service.message_batch_handlers = {
+            b"pong": MagicMock(side_effect=ValueError("failed to handle"))
+        }
+        self.connection.on_connection_established()
+        self.connection.inputbuf.add_bytes(PongMessage().rawbytes())
+
+        self.connection.process_message()
+        self.assertTrue(self.connection.is_alive())
+        self.assertEqual(1, self.connection.num_bad_messages)
+        self.assertEqual(0, self.connection.inputbuf.length)
+
+    def test_process_message_stops_at_read_budget(self):
+        mock_pong = MagicMock()
+        self.connection.message_handlers = {
+            b"pong": mock_pong
+        }
+        self.connection.read_budget.max_messages = 2
+        self.connection.on_connection_established()
+        for _ in range(3):
+            self.connection.inputbuf.add_bytes(PongMessage().rawbytes())
+
+        self.connection.process_message()
+        self.assertEqual(2, mock_pong.call_count)
+        self.assertTrue(self.connection.has_pending_input)
+        self.assertEqual(len(PongMessage().rawbytes()), self.connection.inputbuf.length)
+
+        self.connection.process_message()
+        self.assertEqual(3, mock_pong.call_count)
+        self.assertFalse(self.connection.has_pending_input)
+
+    def test_process_message_batch_stops_at_read_budget(self):
+        self.connection.message_batch_service = MessageBatchService(self.connection)
+        mock_pong_batch = MagicMock()
+        self.connection.message_batch_service.message_batch_handlers = {
+            b"pong": mock_pong_batch
+        }
+        self.connection.read_budget.max_messages = 2
+        self.connection.on_connection_established()
+        for _ in range(3):
+            self.connection.inputbuf.add_bytes(PongMessage().rawbytes())
+
+        self.connection.process_message()
+        mock_pong_batch.assert_called_once()
+        self.assertEqual(2, len(mock_pong_batch.call_args[0][0]))
+        self.assertTrue(self.connection.has_pending_input)
+
+    def test_update_reading_state_pauses_and_resumes_reading(self):
+        transport = self.connection.socket_connection.transport
+        transport.is_closing = MagicMock(return_value=False)
+        self.connection.has_pending_input = True
+        self.connection.inputbuf.add_bytes(
+            bytearray(constants.INBOUND_BACKLOG_PAUSE_READING_THRESHOLD_BYTES + 1)
+        )
+
+        self.connection.update_reading_state()
+        self.assertTrue(self.connection.reading_paused_for_backlog)
+        self.assertTrue(self.connection.socket_connection.reading_paused_for_backlog)
+        transport.pause_reading.assert_called_once()
+
+        # bytes already read from the socket are still delivered
+        self.assertTrue(self.connection.socket_connection.is_receivable())
+        self.connection.node.on_bytes_received = MagicMock()
+        self.connection.socket_connection.buffer_updated(10)
+        self.connection.node.on_bytes_received.assert_called_once()
+        self.connection.update_reading_state()
+        transport.pause_reading.assert_called_once()
+
+        self.connection.inputbuf.remove_bytes(
+            constants.INBOUND_BACKLOG_PAUSE_READING_THRESHOLD_BYTES
+            - constants.INBOUND_BACKLOG_RESUME_READING_THRESHOLD_BYTES
+        )
+        self.connection.update_reading_state()
+        self.assertTrue(self.connection.reading_paused_for_backlog)
+
+        self.connection.has_pending_input = False
+        self.connection.update_reading_state()
+        self.assertFalse(self.connection.reading_paused_for_backlog)
+        self.assertFalse(self.connection.socket_connection.reading_paused_for_backlog)
+        transport.resume_reading.assert_called_once()
+
+    def test_output_backlog_watermarks(self):
+        opts = helpers.get_common_opts(
+            8000, output_buffer_high_watermark_bytes=100, output_buffer_low_watermark_bytes=50
+        )
+        self.connection = create_connection(self.TestAbstractConnection, node_opts=opts)
+        self.assertEqual(100, self.connection.output_high_watermark)
+        self.assertEqual(50, self.connection.output_low_watermark)
+        self.connection.outputbuf.drop_expired_messages = MagicMock(return_value=[])
+        self.connection.on_connection_established()
+        self.connection.socket_connection.can_send = False
+        self.connection.on_writing_paused()
+
+        for _ in range(3):
+            self.connection.enqueue_msg_bytes(bytearray(40))
+        self.assertTrue(self.connection.output_congested)
+        self.connection.outputbuf.drop_expired_messages.assert_called()
+
+        self.connection.on_writing_resumed()
+        self.connection.advance_sent_bytes(40)
+        self.assertTrue(self.connection.output_congested)
+        self.connection.advance_sent_bytes(40)
+        self.assertFalse(self.connection.output_congested)
+
+    def test_output_backlog_drops_expired_messages_from_tracker(self):
+        self.connection.output_high_watermark = 100
+        self.connection.output_low_watermark = 50
+        self.connection.message_tracker = MessageTracker(self.connection)
+        self.connection.on_connection_established()
+        self.connection.socket_connection.can_send = False
+
+        start_time = time.time()
+        with patch("time.time", return_value=start_time):
+            for length in [10, 20, 30, 40]:
+                self.connection.enqueue_msg_bytes(bytearray(length), priority=OutputPriority.TX)
+                self.connection.message_tracker.append_message(length, None)
+            self.connection.enqueue_msg_bytes(bytearray(50), priority=OutputPriority.BLOCK)
+            self.connection.message_tracker.append_message(50, None, priority=OutputPriority.BLOCK)
+
+        with patch("time.time", return_value=start_time + constants.OUTPUT_BUFFER_TX_MAX_AGE_S + 0.01):
+            self.connection.on_writing_paused()
+
+        self.assertTrue(self.connection.output_congested)
+        # the first message is already scheduled for sending and is not dropped
+        self.assertEqual(60, len(self.connection.outputbuf))
+        self.assertEqual(60, self.connection.message_tracker.bytes_remaining)
+        self.assertEqual([10], [entry.length for entry in self.connection.message_tracker.messages])
+
+        self.connection.outputbuf.advance_buffer(10)
+        self.connection.message_tracker.advance_bytes(10)
+        self.assertEqual([50], [entry.length for entry in self.connection.message_tracker.messages])
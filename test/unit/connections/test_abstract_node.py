@@ -133,6 +133,43 @@ class AbstractNodeTest(AbstractTestCase):
         self.node.on_bytes_received(self.fileno, data)
         self.assertEqual(data, self.connection.inputbuf.input_list[0])
 
+    def test_on_bytes_received_read_budget_round_robin(self):
+        other_connection = helpers.create_connection(
+            MockConnection, self.node, file_no=2, ip=self.ip, port=self.port + 1, add_to_pool=False
+        )
+        self.node.connection_pool.add(self.fileno, self.ip, self.port, self.connection)
+        self.node.connection_pool.add(2, self.ip, self.port + 1, other_connection)
+
+        def exhaust_budget(connection):
+            connection.has_pending_input = True
+
+        self.connection.add_received_bytes = self.connection.inputbuf.add_bytes
+        other_connection.add_received_bytes = other_connection.inputbuf.add_bytes
+
+        self.connection.process_message = MagicMock(side_effect=lambda: exhaust_budget(self.connection))
+        other_connection.process_message = MagicMock(side_effect=lambda: exhaust_budget(other_connection))
+
+        self.node.on_bytes_received(self.fileno, helpers.generate_bytearray(250))
+        self.node.on_bytes_received(2, helpers.generate_bytearray(250))
+        self.assertTrue(self.node.has_pending_input())
+        self.assertEqual([self.fileno, 2], list(self.node.connections_with_pending_input))
+
+        # connection waiting for its turn only buffers new input
+        self.node.on_bytes_received(self.fileno, helpers.generate_bytearray(250))
+        self.connection.process_message.assert_called_once()
+        self.assertEqual(500, self.connection.inputbuf.length)
+
+        self.connection.process_message = MagicMock()
+        self.connection.has_pending_input = False
+        self.node.process_pending_input()
+        self.connection.process_message.assert_called_once()
+        self.assertEqual(2, other_connection.process_message.call_count)
+        self.assertEqual([2], list(self.node.connections_with_pending_input))
+
+        other_connection.dispose = MagicMock()
+        self.node._destroy_conn(other_connection)
+        self.assertFalse(self.node.has_pending_input())
+
     def test_get_bytes_to_send(self):
         data = helpers.generate_bytearray(250)
         self.connection.outputbuf.output_msgs.append(data)
@@ -287,6 +324,26 @@ class AbstractNodeTest(AbstractTestCase):
         # expect that memory details are not logged again
         logger_mock.debug.assert_called_once()
 
+    def test_update_broadcast_tree(self):
+        self.node.broadcast_tree_service = MagicMock()
+        for i in range(constants.BROADCAST_TREE_FANOUT + 2):
+            connection = helpers.create_connection(MockConnection, self.node, file_no=i + 10, port=9000 + i)
+            connection.on_connection_established()
+            connection.peer_id = f"peer{i}"
+            connection.ping_latency = i / 1000
+        not_measured_connection = helpers.create_connection(MockConnection, self.node, file_no=50, port=9050)
+        not_measured_connection.on_connection_established()
+        not_measured_connection.peer_id = "not_measured"
+
+        self.assertEqual(
+            constants.BROADCAST_TREE_UPDATE_INTERVAL_S,
+            self.node.update_broadcast_tree((MockConnection.CONNECTION_TYPE,))
+        )
+        broadcast_tree = self.node.broadcast_tree_service.set_broadcast_tree.call_args[0][0]
+        self.assertEqual(["peer0", "peer1"], list(broadcast_tree.children_by_forwarder))
+        self.assertEqual(constants.BROADCAST_TREE_FANOUT, len(broadcast_tree.forwarder_by_child))
+        self.assertIsNone(broadcast_tree.get_forwarder("not_measured"))
+
     def _assert_socket_connected(self):
         self.assertTrue(self.socket_connection.alive)
 
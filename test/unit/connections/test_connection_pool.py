@@ -60,6 +60,19 @@ class ConnectionPoolTest(AbstractTestCase):
         self.conn_pool1.add(ConnectionPool.INITIAL_FILENO + 1, "0.0.0.0", self.port1, self.conn1)
         self.assertEqual(ConnectionPool.INITIAL_FILENO * 2, self.conn_pool1.len_fileno)
 
+    def test_connections_version(self):
+        version = self.conn_pool1.connections_version
+        self.conn_pool1.add(self.fileno1, self.ip1, self.port1, self.conn1)
+        self.assertEqual(version + 1, self.conn_pool1.connections_version)
+        self.conn_pool1.on_connection_updated(self.conn1)
+        self.assertEqual(version + 2, self.conn_pool1.connections_version)
+        self.conn_pool1.delete(self.conn1)
+        self.assertEqual(version + 3, self.conn_pool1.connections_version)
+
+        node_pool_version = self.node1.connection_pool.connections_version
+        self.conn1.on_connection_established()
+        self.assertEqual(node_pool_version + 1, self.node1.connection_pool.connections_version)
+
     def test_update(self):
         self.conn_pool1.add(self.fileno1, self.ip1, self.port1, self.conn1)
         self.conn_pool1.add(self.fileno2, self.ip2, self.port2, self.conn2)
@@ -161,6 +174,34 @@ class ConnectionPoolTest(AbstractTestCase):
         ])
         self.assertNotIn(self.conn1, relay_transaction_connections)
 
+    def test_get_by_connection_types_cached(self):
+        self.conn1.CONNECTION_TYPE = ConnectionType.EXTERNAL_GATEWAY
+        self.conn2.CONNECTION_TYPE = ConnectionType.RELAY_BLOCK
+        self.conn3.CONNECTION_TYPE = ConnectionType.RELAY_ALL
+        self._add_connections()
+
+        relay_connections = self.conn_pool1.get_by_connection_types([ConnectionType.RELAY_BLOCK])
+        self.assertEqual((self.conn2, self.conn3), relay_connections)
+        self.assertIs(relay_connections, self.conn_pool1.get_by_connection_types((ConnectionType.RELAY_BLOCK,)))
+        self.assertIs(
+            relay_connections,
+            self.conn_pool1.get_by_connection_types([ConnectionType.RELAY_BLOCK, ConnectionType.RELAY_BLOCK])
+        )
+        self.assertEqual((), self.conn_pool1.get_by_connection_types([]))
+
+        self.conn_pool1.delete(self.conn2)
+        relay_connections = self.conn_pool1.get_by_connection_types([ConnectionType.RELAY_BLOCK])
+        self.assertEqual((self.conn3,), relay_connections)
+
+        self.conn_pool1.add(self.fileno2, self.ip2, self.port2, self.conn2)
+        relay_connections = self.conn_pool1.get_by_connection_types([ConnectionType.RELAY_BLOCK])
+        self.assertEqual((self.conn3, self.conn2), relay_connections)
+
+        self.conn1.peer_id = self.node_id1
+        self.conn_pool1.update_connection_type(self.conn1, ConnectionType.RELAY_BLOCK)
+        relay_connections = self.conn_pool1.get_by_connection_types([ConnectionType.RELAY_BLOCK])
+        self.assertEqual((self.conn3, self.conn2, self.conn1), relay_connections)
+
     def test_get_by_fileno(self):
         self._add_connections()
         self.assertEqual(self.conn1, self.conn_pool1.get_by_fileno(self.fileno1))
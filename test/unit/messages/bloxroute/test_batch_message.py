@@ -0,0 +1,45 @@
+from bxcommon.messages.bloxroute.batch_message import BatchMessage
+from bxcommon.messages.bloxroute.bloxroute_message_factory import bloxroute_message_factory
+from bxcommon.messages.bloxroute.ping_message import PingMessage
+from bxcommon.messages.bloxroute.tx_message import TxMessage
+from bxcommon.test_utils import helpers
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.utils.buffers.output_priority import OutputPriority
+
+
+class BatchMessageTests(AbstractTestCase):
+
+    def test_batch_message(self):
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, short_id=10, tx_val=helpers.generate_bytearray(250))
+        ping_message = PingMessage(12345)
+
+        msg = BatchMessage([tx_message.rawbytes(), ping_message.rawbytes()], OutputPriority.BLOCK)
+        self.assertEqual(OutputPriority.BLOCK, msg.output_priority())
+
+        parsed_msg = bloxroute_message_factory.create_message_from_buffer(bytearray(msg.rawbytes()))
+        self.assertIsInstance(parsed_msg, BatchMessage)
+        self.assertEqual(2, parsed_msg.count())
+
+        parsed_messages = list(parsed_msg.messages(bloxroute_message_factory))
+        self.assertEqual(2, len(parsed_messages))
+        self.assertIsInstance(parsed_messages[0], TxMessage)
+        self.assertEqual(tx_message.rawbytes(), parsed_messages[0].rawbytes())
+        self.assertEqual(10, parsed_messages[0].short_id())
+        self.assertIsInstance(parsed_messages[1], PingMessage)
+        self.assertEqual(12345, parsed_messages[1].nonce())
+
+        messages_bytes = list(parsed_msg.messages_bytes())
+        self.assertEqual([tx_message.rawbytes(), ping_message.rawbytes()], messages_bytes)
+
+    def test_batch_message_truncated(self):
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, tx_val=helpers.generate_bytearray(250))
+        msg = BatchMessage([tx_message.rawbytes(), tx_message.rawbytes()])
+
+        truncated_msg = BatchMessage([tx_message.rawbytes()])
+        truncated_msg.buf[BatchMessage.HEADER_LENGTH:BatchMessage.HEADER_LENGTH + 4] = msg.buf[
+            BatchMessage.HEADER_LENGTH:BatchMessage.HEADER_LENGTH + 4
+        ]
+        parsed_msg = BatchMessage(buf=truncated_msg.buf)
+
+        with self.assertRaises(ValueError):
+            list(parsed_msg.messages(bloxroute_message_factory))
@@ -37,6 +37,20 @@ class TestBloxrouteMessageValidator(AbstractTestCase):
         self.message_validator.validate(False, BloxrouteMessageType.TRANSACTION, constants.BX_HDR_COMMON_OFF,
                                         self.message_validation_settings.max_tx_size_bytes, input_buffer)
 
+    def test_get_max_payload_len(self):
+        self.assertEqual(
+            constants.DEFAULT_MAX_PAYLOAD_LEN_BYTES, self.message_validator.get_max_payload_len()
+        )
+        self.assertEqual(
+            constants.DEFAULT_MAX_PAYLOAD_LEN_BYTES,
+            BloxrouteMessageValidator(None, protocol_version.PROTOCOL_VERSION).get_max_payload_len()
+        )
+        message_validator = BloxrouteMessageValidator(
+            MessageSizeValidationSettings(max_block_size_bytes=10 * 1024 * 1024, max_tx_size_bytes=50000),
+            protocol_version.PROTOCOL_VERSION
+        )
+        self.assertEqual(10 * 1024 * 1024, message_validator.get_max_payload_len())
+
     def test_is_valid_payload_len(self):
         message_bytes = bytearray(1000)
         message_bytes[:constants.STARTING_SEQUENCE_BYTES_LEN] = constants.STARTING_SEQUENCE_BYTES
@@ -0,0 +1,30 @@
+from bxcommon.messages.bloxroute.bloxroute_message_factory import bloxroute_message_factory
+from bxcommon.messages.bloxroute.broadcast_tree_ack_message import BroadcastTreeAckMessage
+from bxcommon.messages.bloxroute.broadcast_tree_assign_message import BroadcastTreeAssignMessage
+from bxcommon.test_utils import helpers
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+
+
+class BroadcastTreeMessagesTest(AbstractTestCase):
+
+    def test_broadcast_tree_assign_message(self):
+        peer_ids = [helpers.generate_node_id() for _ in range(3)]
+        msg = BroadcastTreeAssignMessage(peer_ids)
+        self.assertEqual(peer_ids, msg.peer_ids())
+
+        parsed_msg = bloxroute_message_factory.create_message_from_buffer(bytearray(msg.rawbytes()))
+        self.assertIsInstance(parsed_msg, BroadcastTreeAssignMessage)
+        self.assertEqual(peer_ids, parsed_msg.peer_ids())
+
+    def test_broadcast_tree_ack_message(self):
+        peer_ids = [helpers.generate_node_id()]
+        parsed_msg = bloxroute_message_factory.create_message_from_buffer(
+            bytearray(BroadcastTreeAckMessage(peer_ids).rawbytes())
+        )
+        self.assertIsInstance(parsed_msg, BroadcastTreeAckMessage)
+        self.assertEqual(peer_ids, parsed_msg.peer_ids())
+
+        empty_msg = bloxroute_message_factory.create_message_from_buffer(
+            bytearray(BroadcastTreeAckMessage([]).rawbytes())
+        )
+        self.assertEqual([], empty_msg.peer_ids())
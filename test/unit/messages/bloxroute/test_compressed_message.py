@@ -0,0 +1,37 @@
+import zlib
+
+from bxcommon.messages.bloxroute.bloxroute_message_factory import bloxroute_message_factory
+from bxcommon.messages.bloxroute.compressed_message import CompressedMessage
+from bxcommon.messages.bloxroute.tx_message import TxMessage
+from bxcommon.test_utils import helpers
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.utils.buffers.output_priority import OutputPriority
+
+
+class CompressedMessageTests(AbstractTestCase):
+
+    def test_compressed_message(self):
+        tx_message = TxMessage(helpers.generate_object_hash(), 1, short_id=10, tx_val=bytearray(2000))
+        msg_bytes = tx_message.rawbytes()
+
+        msg = CompressedMessage(zlib.compress(msg_bytes, 1), len(msg_bytes), OutputPriority.BLOCK)
+        self.assertEqual(OutputPriority.BLOCK, msg.output_priority())
+        self.assertLess(len(msg.rawbytes()), len(msg_bytes))
+
+        parsed_msg = bloxroute_message_factory.create_message_from_buffer(bytearray(msg.rawbytes()))
+        self.assertIsInstance(parsed_msg, CompressedMessage)
+        self.assertEqual(len(msg_bytes), parsed_msg.uncompressed_length())
+
+        parsed_tx_message = bloxroute_message_factory.create_message_from_buffer(parsed_msg.decompress(len(msg_bytes)))
+        self.assertIsInstance(parsed_tx_message, TxMessage)
+        self.assertEqual(msg_bytes, parsed_tx_message.rawbytes())
+
+    def test_compressed_message_length_mismatch(self):
+        msg_bytes = TxMessage(helpers.generate_object_hash(), 1, tx_val=bytearray(2000)).rawbytes()
+
+        with self.assertRaises(ValueError):
+            CompressedMessage(zlib.compress(msg_bytes, 1), len(msg_bytes) - 1).decompress(len(msg_bytes))
+        with self.assertRaises(ValueError):
+            CompressedMessage(zlib.compress(msg_bytes, 1), len(msg_bytes) + 1).decompress(len(msg_bytes) + 1)
+        with self.assertRaises(ValueError):
+            CompressedMessage(zlib.compress(msg_bytes, 1), len(msg_bytes)).decompress(len(msg_bytes) - 1)
@@ -1,7 +1,12 @@
+import gc
+import weakref
+from unittest.mock import MagicMock
+
 from bxcommon.test_utils.abstract_test_case import AbstractTestCase
 from bxcommon import constants
 from bxcommon.constants import VERSIONED_HELLO_MSG_MIN_PAYLOAD_LEN
 from bxcommon.messages.abstract_message_factory import AbstractMessageFactory
+from bxcommon.messages.bloxroute.bloxroute_message_type import BloxrouteMessageType
 from bxcommon.messages.bloxroute.broadcast_message import BroadcastMessage
 from bxcommon.messages.bloxroute.hello_message import HelloMessage
 from bxcommon.messages.versioning.abstract_version_manager import AbstractVersionManager
@@ -25,6 +30,7 @@ message_factory_v1 = MessageFactoryV1()
 class VersionManager(AbstractVersionManager):
     CURRENT_PROTOCOL_VERSION = 3
     VERSION_MESSAGE_MAIN_LENGTH = VERSIONED_HELLO_MSG_MIN_PAYLOAD_LEN
+    CACHED_CONVERSION_MESSAGE_TYPES = frozenset([BloxrouteMessageType.BROADCAST])
 
     def __init__(self):
         super(VersionManager, self).__init__()
@@ -40,6 +46,14 @@ class AbstractVersionManagerTest(AbstractTestCase):
 
     def setUp(self):
         self.version_manager = VersionManager()
+        self.message_converter = MagicMock()
+        self.message_converter.convert_to_older_version = MagicMock(side_effect=lambda msg: MagicMock())
+        message_converter_factory = MagicMock()
+        message_converter_factory.get_message_converter = MagicMock(return_value=self.message_converter)
+        self.version_manager.protocol_to_converter_factory_mapping = {
+            1: message_converter_factory,
+            2: message_converter_factory,
+        }
 
     def test_is_protocol_supported(self):
         self.assertFalse(self.version_manager.is_protocol_supported(0))
@@ -83,3 +97,57 @@ class AbstractVersionManagerTest(AbstractTestCase):
         input_buffer.add_bytes(hello_msg.rawbytes())
 
         self.assertEqual(version, self.version_manager.get_connection_protocol_version(input_buffer))
+
+    def test_convert_message_to_older_version_cached(self):
+        message = self._broadcast_message()
+
+        converted_v2 = self.version_manager.convert_message_to_older_version(2, message)
+        self.assertEqual(converted_v2, self.version_manager.convert_message_to_older_version(2, message))
+        self.assertEqual(1, self.message_converter.convert_to_older_version.call_count)
+
+        converted_v1 = self.version_manager.convert_message_to_older_version(1, message)
+        self.assertNotEqual(converted_v2, converted_v1)
+        self.assertEqual(converted_v1, self.version_manager.convert_message_to_older_version(1, message))
+        self.assertEqual(2, self.message_converter.convert_to_older_version.call_count)
+
+        self.assertEqual(2, self.version_manager.conversion_cache_hits)
+        self.assertEqual(2, self.version_manager.conversion_cache_misses)
+        self.assertEqual(0.5, self.version_manager.get_conversion_cache_hit_rate())
+
+    def test_convert_message_to_older_version_invalidate(self):
+        message = self._broadcast_message()
+        converted = self.version_manager.convert_message_to_older_version(2, message)
+
+        self.version_manager.invalidate_converted_message(message)
+        self.assertNotEqual(converted, self.version_manager.convert_message_to_older_version(2, message))
+        self.assertEqual(2, self.message_converter.convert_to_older_version.call_count)
+
+    def test_conversions_cached_on_message(self):
+        message = self._broadcast_message()
+        converted = self.version_manager.convert_message_to_older_version(2, message)
+        self.assertEqual({2: converted}, message.converted_message)
+
+        other_message = self._broadcast_message()
+        self.assertNotEqual(converted, self.version_manager.convert_message_to_older_version(2, other_message))
+        self.assertEqual(2, self.message_converter.convert_to_older_version.call_count)
+
+        # conversions are released with the message, the version manager keeps no reference to it
+        self.message_converter.reset_mock()
+        message_ref = weakref.ref(message)
+        del message
+        gc.collect()
+        self.assertIsNone(message_ref())
+
+    def test_conversion_not_cached_for_type(self):
+        message = HelloMessage(protocol_version=3, network_num=1)
+        self.version_manager.convert_message_to_older_version(2, message)
+        self.version_manager.convert_message_to_older_version(2, message)
+        self.assertEqual(2, self.message_converter.convert_to_older_version.call_count)
+        self.assertEqual(0, self.version_manager.conversion_cache_misses)
+
+    def _broadcast_message(self) -> BroadcastMessage:
+        return BroadcastMessage(
+            message_hash=Sha256Hash(crypto.double_sha256(b"hello")),
+            network_num=1,
+            source_id="",
+            blob=bytearray(1))
@@ -0,0 +1,55 @@
+import socket
+import sys
+import unittest
+
+from bxcommon.connections.connection_type import ConnectionType
+from bxcommon.network import socket_tuning_profile
+from bxcommon.network.socket_tuning_profile import SocketTuningProfile
+
+
+class SocketTuningProfileTest(unittest.TestCase):
+    def test_get_profile_by_connection_type(self):
+        relay_block_profile = SocketTuningProfile(tcp_nodelay=True)
+        gateway_profile = SocketTuningProfile(tcp_nodelay=False)
+        profiles = {
+            ConnectionType.RELAY_BLOCK: relay_block_profile,
+            ConnectionType.GATEWAY: gateway_profile,
+        }
+
+        self.assertIs(relay_block_profile, socket_tuning_profile.get_profile(ConnectionType.RELAY_BLOCK, profiles))
+        self.assertIs(relay_block_profile, socket_tuning_profile.get_profile(ConnectionType.RELAY_ALL, profiles))
+        self.assertIs(
+            gateway_profile, socket_tuning_profile.get_profile(ConnectionType.EXTERNAL_GATEWAY, profiles)
+        )
+        self.assertIs(
+            socket_tuning_profile.DEFAULT_PROFILE, socket_tuning_profile.get_profile(ConnectionType.SDN, profiles)
+        )
+
+    def test_apply_profile(self):
+        profile = SocketTuningProfile(
+            receive_buffer_size=64 * 1024,
+            tcp_nodelay=True,
+            tcp_notsent_lowat=16 * 1024,
+            tcp_user_timeout_ms=10 * 1000,
+        )
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            applied_options = socket_tuning_profile.apply_profile(sock, profile)
+        finally:
+            sock.close()
+
+        self.assertIn("SO_RCVBUF", applied_options)
+        self.assertEqual(1, applied_options["TCP_NODELAY"])
+        if "linux" in sys.platform:
+            self.assertEqual(16 * 1024, applied_options["TCP_NOTSENT_LOWAT"])
+            self.assertEqual(10 * 1000, applied_options["TCP_USER_TIMEOUT"])
+
+    def test_apply_profile_skips_failed_options(self):
+        profile = SocketTuningProfile(tcp_nodelay=True)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            applied_options = socket_tuning_profile.apply_profile(sock, profile)
+        finally:
+            sock.close()
+
+        self.assertEqual({}, applied_options)
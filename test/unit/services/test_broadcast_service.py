@@ -1,3 +1,7 @@
+import random
+from typing import Optional, Hashable
+from mock import MagicMock
+
 from bxcommon import constants
 from bxcommon.connections.abstract_connection import AbstractConnection
 from bxcommon.connections.connection_pool import ConnectionPool
@@ -6,6 +10,7 @@ from bxcommon.connections.connection_type import ConnectionType
 from bxcommon.constants import LOCALHOST, ALL_NETWORK_NUM
 from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
 from bxcommon.messages.bloxroute.broadcast_message import BroadcastMessage
+from bxcommon.messages.bloxroute.tx_message import TxMessage
 from bxcommon.models.broadcast_message_type import BroadcastMessageType
 from bxcommon.services.broadcast_service import BroadcastService, BroadcastOptions
 from bxcommon.test_utils import helpers
@@ -28,6 +33,11 @@ class TestBroadcastService(
         return connection.network_num in [constants.ALL_NETWORK_NUM, message.network_num()]
 
 
+class TestUncachedBroadcastService(TestBroadcastService):
+    def get_targets_key(self, message: AbstractBroadcastMessage, options: BroadcastOptions) -> Optional[Hashable]:
+        return None
+
+
 class BroadcastServiceTest(AbstractTestCase):
     def setUp(self) -> None:
         self.node = MockNode(helpers.get_common_opts(8000))
@@ -89,3 +99,106 @@ class BroadcastServiceTest(AbstractTestCase):
         self.assertNotIn(gateway_message, relay_block_conn.enqueued_messages)
         self.assertNotIn(gateway_message, relay_transaction_conn.enqueued_messages)
         self.assertIn(gateway_message, gateway_conn.enqueued_messages)
+
+    def test_broadcast_skips_congested_connections_for_droppable_messages(self):
+        congested_conn = self._add_connection(0, 9000, ALL_NETWORK_NUM)
+        congested_conn.output_congested = True
+        conn = self._add_connection(1, 9001, ALL_NETWORK_NUM)
+
+        tx_message = TxMessage(helpers.generate_object_hash(), ALL_NETWORK_NUM, tx_val=helpers.generate_bytearray(250))
+        self.sut.broadcast(tx_message, BroadcastOptions(connection_types=[MockConnection.CONNECTION_TYPE]))
+        self.assertNotIn(tx_message, congested_conn.enqueued_messages)
+        self.assertIn(tx_message, conn.enqueued_messages)
+
+        block_message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), ALL_NETWORK_NUM, "",
+                                         BroadcastMessageType.BLOCK, False, helpers.generate_bytearray(250))
+        self.sut.broadcast(block_message, BroadcastOptions(connection_types=[MockConnection.CONNECTION_TYPE]))
+        self.assertIn(block_message, congested_conn.enqueued_messages)
+        self.assertIn(block_message, conn.enqueued_messages)
+
+    def test_broadcast_converts_and_serializes_once_per_version(self):
+        current_version_conns = [self._add_connection(i, 9000 + i, ALL_NETWORK_NUM) for i in range(3)]
+        old_version_conns = [self._add_connection(i, 9000 + i, ALL_NETWORK_NUM) for i in range(3, 5)]
+
+        message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), ALL_NETWORK_NUM, "",
+                                   BroadcastMessageType.BLOCK, False, helpers.generate_bytearray(250))
+        converted_message_bytes = helpers.generate_bytearray(250)
+        for conn in old_version_conns:
+            conn.get_message_version = MagicMock(return_value=5)
+            conn.get_versioned_message_bytes = MagicMock(return_value=converted_message_bytes)
+
+        broadcast_connections = self.sut.broadcast(
+            message, BroadcastOptions(connection_types=[MockConnection.CONNECTION_TYPE])
+        )
+        self.assertEqual(5, len(broadcast_connections))
+
+        converted_calls = sum(conn.get_versioned_message_bytes.call_count for conn in old_version_conns)
+        self.assertEqual(1, converted_calls)
+
+        current_version_buffers = set()
+        for conn in current_version_conns:
+            self.assertIn(message, conn.enqueued_messages)
+            msg_bytes = conn.outputbuf.output_msgs[0]
+            self.assertEqual(message.rawbytes(), msg_bytes)
+            current_version_buffers.add(id(msg_bytes))
+        self.assertEqual(1, len(current_version_buffers))
+
+        old_version_buffers = set()
+        for conn in old_version_conns:
+            self.assertIn(message, conn.enqueued_messages)
+            msg_bytes = conn.outputbuf.output_msgs[0]
+            self.assertTrue(msg_bytes.readonly)
+            self.assertEqual(converted_message_bytes, msg_bytes)
+            old_version_buffers.add(id(msg_bytes))
+        self.assertEqual(1, len(old_version_buffers))
+
+    def test_precomputed_targets_match_predicate(self):
+        uncached_service = TestUncachedBroadcastService(self.connection_pool)
+        network_nums = [ALL_NETWORK_NUM, 1, 2, 3]
+        connection_types = [ConnectionType.RELAY_BLOCK, ConnectionType.RELAY_TRANSACTION, ConnectionType.GATEWAY]
+        conns = [
+            self._add_connection(i, 9000 + i, random.choice(network_nums), random.choice(connection_types))
+            for i in range(30)
+        ]
+
+        def assert_targets_match():
+            for network_num in network_nums:
+                message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), network_num, "",
+                                           BroadcastMessageType.BLOCK, False, helpers.generate_bytearray(250))
+                for types in ([ConnectionType.RELAY_BLOCK], [ConnectionType.RELAY_ALL, ConnectionType.GATEWAY]):
+                    options = BroadcastOptions(broadcast_connection=conns[0], connection_types=types)
+                    self.assertEqual(
+                        uncached_service.get_connections_for_broadcast(message, options),
+                        self.sut.get_connections_for_broadcast(message, options)
+                    )
+
+        assert_targets_match()
+
+        for conn in conns[:10]:
+            conn.network_num = random.choice(network_nums)
+            self.connection_pool.on_connection_updated(conn)
+        assert_targets_match()
+
+        for conn in conns[10:15]:
+            self.connection_pool.delete(conn)
+        conns.append(self._add_connection(40, 9040, 1, ConnectionType.RELAY_BLOCK))
+        assert_targets_match()
+
+    def test_precomputed_targets_updated_on_connection_changes(self):
+        conn = self._add_connection(0, 9000, 2)
+        message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), 1, "",
+                                   BroadcastMessageType.BLOCK, False, helpers.generate_bytearray(250))
+        options = BroadcastOptions(connection_types=[MockConnection.CONNECTION_TYPE])
+        self.assertEqual([], self.sut.get_connections_for_broadcast(message, options))
+
+        # targets are reused until the pool is notified of the change
+        conn.network_num = 1
+        self.assertEqual([], self.sut.get_connections_for_broadcast(message, options))
+        self.connection_pool.on_connection_updated(conn)
+        self.assertEqual([conn], self.sut.get_connections_for_broadcast(message, options))
+
+        other_conn = self._add_connection(1, 9001, ALL_NETWORK_NUM)
+        self.assertEqual([conn, other_conn], self.sut.get_connections_for_broadcast(message, options))
+
+        self.connection_pool.delete(conn)
+        self.assertEqual([other_conn], self.sut.get_connections_for_broadcast(message, options))
@@ -0,0 +1,58 @@
+from bxcommon.services.broadcast_tree import BroadcastTree, build_broadcast_tree
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+
+
+class BroadcastTreeTest(AbstractTestCase):
+
+    def test_build_broadcast_tree_few_peers(self):
+        broadcast_tree = build_broadcast_tree({"a": 0.1, "b": 0.2}, 2)
+        self.assertEqual({}, broadcast_tree.children_by_forwarder)
+        self.assertEqual({"a", "b"}, broadcast_tree.get_direct_peers(["a", "b"]))
+
+    def test_build_broadcast_tree_invalid_fanout(self):
+        with self.assertRaises(ValueError):
+            build_broadcast_tree({"a": 0.1}, 0)
+
+    def test_build_broadcast_tree(self):
+        latencies = {f"peer{i}": (10 - i) / 100 for i in range(10)}
+        broadcast_tree = build_broadcast_tree(latencies, 3)
+
+        # fastest peers are forwarders
+        self.assertEqual(["peer9", "peer8", "peer7"], list(broadcast_tree.children_by_forwarder))
+        self.assertEqual(["peer6", "peer3", "peer0"], broadcast_tree.get_children("peer9"))
+        self.assertEqual(["peer5", "peer2"], broadcast_tree.get_children("peer8"))
+        self.assertEqual(["peer4", "peer1"], broadcast_tree.get_children("peer7"))
+        self.assertEqual([], broadcast_tree.get_children("peer0"))
+
+        self.assertEqual("peer9", broadcast_tree.get_forwarder("peer0"))
+        self.assertIsNone(broadcast_tree.get_forwarder("peer9"))
+
+        for children in broadcast_tree.children_by_forwarder.values():
+            self.assertLessEqual(len(children), 3)
+        self.assertEqual(7, len(broadcast_tree.forwarder_by_child))
+
+    def test_get_direct_peers(self):
+        broadcast_tree = BroadcastTree({"a": ["c", "d"], "b": ["e"]})
+
+        # children are sent to directly until confirmed by their forwarder
+        self.assertEqual({"a", "b", "c", "d", "e"}, broadcast_tree.get_direct_peers(["a", "b", "c", "d", "e"]))
+        broadcast_tree.confirm_children("a", ["c", "d"])
+        broadcast_tree.confirm_children("b", ["e"])
+
+        self.assertEqual({"a", "b"}, broadcast_tree.get_direct_peers(["a", "b", "c", "d", "e"]))
+
+        # children of forwarders that are not targets are sent to directly
+        self.assertEqual({"a", "e"}, broadcast_tree.get_direct_peers(["a", "c", "d", "e"]))
+        self.assertEqual({"c", "f"}, broadcast_tree.get_direct_peers(["c", "f", None]))
+
+    def test_confirm_children(self):
+        broadcast_tree = BroadcastTree({"a": ["c", "d"], "b": ["e"]})
+
+        # peers assigned to other forwarders are not confirmed
+        broadcast_tree.confirm_children("a", ["c", "e", "f"])
+        self.assertEqual({"c": "a"}, broadcast_tree.confirmed_forwarder_by_child)
+
+        broadcast_tree.confirm_children("b", ["e"])
+        broadcast_tree.confirm_children("a", ["d"])
+        self.assertEqual({"d": "a", "e": "b"}, broadcast_tree.confirmed_forwarder_by_child)
+        self.assertEqual({"a", "b", "c"}, broadcast_tree.get_direct_peers(["a", "b", "c", "d", "e"]))
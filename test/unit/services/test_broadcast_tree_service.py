@@ -0,0 +1,189 @@
+from typing import List
+
+from mock import MagicMock
+
+from bxcommon.connections.abstract_connection import AbstractConnection
+from bxcommon.connections.connection_pool import ConnectionPool
+from bxcommon.connections.connection_type import ConnectionType
+from bxcommon.constants import LOCALHOST, ALL_NETWORK_NUM
+from bxcommon.messages.bloxroute.abstract_broadcast_message import AbstractBroadcastMessage
+from bxcommon.messages.bloxroute.broadcast_message import BroadcastMessage
+from bxcommon.messages.bloxroute.broadcast_tree_ack_message import BroadcastTreeAckMessage
+from bxcommon.messages.bloxroute.broadcast_tree_assign_message import BroadcastTreeAssignMessage
+from bxcommon.models.broadcast_message_type import BroadcastMessageType
+from bxcommon.services.broadcast_service import BroadcastService, BroadcastOptions
+from bxcommon.services.broadcast_tree import BroadcastTree
+from bxcommon.services.broadcast_tree_service import BroadcastTreeService
+from bxcommon.test_utils import helpers
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.test_utils.mocks.mock_connection import MockConnection
+from bxcommon.test_utils.mocks.mock_node import MockNode
+from bxcommon.test_utils.mocks.mock_socket_connection import MockSocketConnection
+from bxcommon.utils.object_hash import Sha256Hash
+
+
+class TestTreeBroadcastService(
+    BroadcastService[AbstractBroadcastMessage, AbstractConnection, BroadcastOptions]
+):
+    def __init__(self, connection_pool: ConnectionPool, broadcast_tree_service: BroadcastTreeService) -> None:
+        super().__init__(connection_pool)
+        self.broadcast_tree_service = broadcast_tree_service
+
+    def should_broadcast_to_connection(
+        self,
+        message: AbstractBroadcastMessage,
+        connection: AbstractConnection,
+        options: BroadcastOptions
+    ) -> bool:
+        return connection.network_num in [ALL_NETWORK_NUM, message.network_num()]
+
+    def select_tree_connections(
+        self, message: AbstractBroadcastMessage, options: BroadcastOptions, connections: List[AbstractConnection]
+    ) -> List[AbstractConnection]:
+        return self.broadcast_tree_service.select_connections(
+            connections,
+            options.broadcasting_connection,
+            lambda connection: self.should_broadcast_to_connection(message, connection, options)
+        )
+
+
+class BroadcastTreeServiceTest(AbstractTestCase):
+    def setUp(self) -> None:
+        self.node = MockNode(helpers.get_common_opts(8000))
+        self.connection_pool = ConnectionPool()
+        self.sut = BroadcastTreeService(self.connection_pool)
+        self.broadcast_service = TestTreeBroadcastService(self.connection_pool, self.sut)
+
+    def _add_connection(self, fileno: int, port: int, network_num: int,
+                        connection_type=MockConnection.CONNECTION_TYPE) -> MockConnection:
+        conn = MockConnection(MockSocketConnection(fileno, self.node, ip_address=LOCALHOST, port=port), self.node)
+        conn.network_num = network_num
+        conn.on_connection_established()
+        conn.CONNECTION_TYPE = connection_type
+
+        self.connection_pool.add(fileno, LOCALHOST, port, conn)
+        return conn
+
+    def test_broadcast_through_tree(self):
+        conns = []
+        for i in range(5):
+            conn = self._add_connection(i, 9000 + i, ALL_NETWORK_NUM)
+            conn.peer_id = f"peer{i}"
+            self.connection_pool.index_conn_node_id(conn.peer_id, conn)
+            conns.append(conn)
+        not_matching_network_num = self._add_connection(5, 9005, 2)
+        not_matching_network_num.peer_id = "peer5"
+        self.connection_pool.index_conn_node_id("peer5", not_matching_network_num)
+        self.sut.set_broadcast_tree(BroadcastTree({"peer0": ["peer2", "peer3"], "peer5": ["peer4"]}))
+
+        # children are sent to directly until their forwarder confirms them
+        message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), 1, "", BroadcastMessageType.BLOCK, False,
+                                   helpers.generate_bytearray(250))
+        broadcast_connections = self.broadcast_service.broadcast(
+            message, BroadcastOptions(connection_types=[MockConnection.CONNECTION_TYPE])
+        )
+        self.assertEqual(set(conns), set(broadcast_connections))
+
+        self.sut.on_tree_children_confirmed(conns[0], ["peer2"])
+        self.sut.on_tree_children_confirmed(not_matching_network_num, ["peer4"])
+        message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), 1, "", BroadcastMessageType.BLOCK, False,
+                                   helpers.generate_bytearray(250))
+        broadcast_connections = self.broadcast_service.broadcast(
+            message, BroadcastOptions(connection_types=[MockConnection.CONNECTION_TYPE])
+        )
+
+        # peer3 is not confirmed, and peer4 forwarder does not receive the message, so they are sent directly
+        self.assertEqual({conns[0], conns[1], conns[3], conns[4]}, set(broadcast_connections))
+        self.assertNotIn(message, conns[2].enqueued_messages)
+
+    def test_broadcast_forwards_to_tree_children(self):
+        parent_conn = self._add_connection(0, 9000, ALL_NETWORK_NUM)
+        parent_conn.peer_id = "parent"
+        child_conn = self._add_connection(1, 9001, ALL_NETWORK_NUM, ConnectionType.RELAY_BLOCK)
+        child_conn.peer_id = "child"
+        self.connection_pool.index_conn_node_id("child", child_conn)
+        other_conn = self._add_connection(2, 9002, ALL_NETWORK_NUM)
+        self.sut.set_tree_children("parent", ["child", "unknown"])
+
+        message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), 1, "", BroadcastMessageType.BLOCK, False,
+                                   helpers.generate_bytearray(250))
+        self.broadcast_service.broadcast(
+            message,
+            BroadcastOptions(broadcast_connection=parent_conn, connection_types=[MockConnection.CONNECTION_TYPE])
+        )
+        self.assertIn(message, child_conn.enqueued_messages)
+        self.assertIn(message, other_conn.enqueued_messages)
+        self.assertNotIn(message, parent_conn.enqueued_messages)
+
+        # messages from other peers are not forwarded to the children
+        other_message = BroadcastMessage(Sha256Hash(helpers.generate_hash()), 1, "", BroadcastMessageType.BLOCK,
+                                         False, helpers.generate_bytearray(250))
+        self.broadcast_service.broadcast(
+            other_message,
+            BroadcastOptions(broadcast_connection=other_conn, connection_types=[MockConnection.CONNECTION_TYPE])
+        )
+        self.assertNotIn(other_message, child_conn.enqueued_messages)
+        self.assertIn(other_message, parent_conn.enqueued_messages)
+
+    def test_set_broadcast_tree_assigns_children(self):
+        self.sut.can_assign_tree_children = MagicMock(return_value=True)
+        node_ids = [helpers.generate_node_id() for _ in range(4)]
+        conns = []
+        for i, node_id in enumerate(node_ids):
+            conn = self._add_connection(i, 9000 + i, ALL_NETWORK_NUM)
+            conn.peer_id = node_id
+            self.connection_pool.index_conn_node_id(node_id, conn)
+            conns.append(conn)
+
+        self.sut.set_broadcast_tree(BroadcastTree({node_ids[0]: [node_ids[2], node_ids[3]]}))
+        self.assertEqual(1, len(conns[0].enqueued_messages))
+        assign_message = conns[0].enqueued_messages[0]
+        self.assertIsInstance(assign_message, BroadcastTreeAssignMessage)
+        self.assertEqual([node_ids[2], node_ids[3]], assign_message.peer_ids())
+        for conn in conns[1:]:
+            self.assertEqual([], conn.enqueued_messages)
+
+        # previous forwarders are unassigned
+        self.sut.set_broadcast_tree(BroadcastTree({node_ids[1]: [node_ids[2], node_ids[3]]}))
+        self.assertEqual([], conns[0].enqueued_messages[-1].peer_ids())
+        self.assertEqual([node_ids[2], node_ids[3]], conns[1].enqueued_messages[-1].peer_ids())
+
+    def test_set_broadcast_tree_not_supported_by_forwarder(self):
+        node_ids = [helpers.generate_node_id() for _ in range(2)]
+        conn = self._add_connection(0, 9000, ALL_NETWORK_NUM)
+        conn.peer_id = node_ids[0]
+        self.connection_pool.index_conn_node_id(node_ids[0], conn)
+
+        self.sut.set_broadcast_tree(BroadcastTree({node_ids[0]: [node_ids[1]]}))
+        self.assertEqual([], conn.enqueued_messages)
+
+    def test_on_tree_children_assigned(self):
+        parent_conn = self._add_connection(0, 9000, ALL_NETWORK_NUM)
+        parent_conn.peer_id = helpers.generate_node_id()
+        child_conn = self._add_connection(1, 9001, ALL_NETWORK_NUM)
+        child_conn.peer_id = helpers.generate_node_id()
+        self.connection_pool.index_conn_node_id(child_conn.peer_id, child_conn)
+        closed_child_conn = self._add_connection(2, 9002, ALL_NETWORK_NUM)
+        closed_child_conn.peer_id = helpers.generate_node_id()
+        self.connection_pool.index_conn_node_id(closed_child_conn.peer_id, closed_child_conn)
+        closed_child_conn.mark_for_close()
+
+        # only children with a live connection are forwarded to and acknowledged
+        self.sut.on_tree_children_assigned(
+            parent_conn, [child_conn.peer_id, closed_child_conn.peer_id, helpers.generate_node_id()]
+        )
+        self.assertEqual(parent_conn.peer_id, self.sut.tree_parent_peer_id)
+        self.assertEqual([child_conn.peer_id], self.sut.tree_children)
+        ack_message = parent_conn.enqueued_messages[-1]
+        self.assertIsInstance(ack_message, BroadcastTreeAckMessage)
+        self.assertEqual([child_conn.peer_id], ack_message.peer_ids())
+
+        # an empty assignment from another peer keeps the current one
+        other_conn = self._add_connection(3, 9003, ALL_NETWORK_NUM)
+        other_conn.peer_id = helpers.generate_node_id()
+        self.sut.on_tree_children_assigned(other_conn, [])
+        self.assertEqual(parent_conn.peer_id, self.sut.tree_parent_peer_id)
+        self.assertEqual([child_conn.peer_id], self.sut.tree_children)
+
+        self.sut.on_tree_children_assigned(parent_conn, [])
+        self.assertEqual([], self.sut.tree_children)
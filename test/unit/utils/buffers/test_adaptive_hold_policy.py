@@ -0,0 +1,132 @@
+from prometheus_client import REGISTRY
+
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.test_utils.mocks.mock_clock import MockClock
+from bxcommon.utils.buffers.adaptive_hold_policy import AdaptiveHoldPolicy
+from bxcommon.utils.buffers.output_buffer import OutputBuffer
+from bxcommon.utils.buffers.output_priority import OutputPriority
+
+
+class AdaptiveHoldPolicyTest(AbstractTestCase):
+
+    def setUp(self) -> None:
+        self.clock = MockClock()
+        clock_patch = self.clock.patch()
+        clock_patch.start()
+        self.addCleanup(clock_patch.stop)
+
+        self.hold_policy = AdaptiveHoldPolicy(
+            max_hold_time_s=0.05, target_batch_count=8, rtt_fraction=0.1, smoothing=0.5
+        )
+        self.output_buffer = OutputBuffer(min_size=1000, enable_buffering=True, hold_policy=self.hold_policy)
+
+    def _get_hold_times(self, intervals, priority=OutputPriority.TX):
+        hold_times = []
+        for interval in intervals:
+            self.clock.advance(interval)
+            hold_times.append(self.hold_policy.get_hold_time(priority, self.clock.time()))
+        return hold_times
+
+    def test_holds_under_heavy_load(self):
+        hold_times = self._get_hold_times([0, 0.001, 0.001, 0.001])
+
+        self.assertEqual(0, hold_times[0])
+        self.assertAlmostEqual(0.008, hold_times[1], places=5)
+        self.assertAlmostEqual(0.008, hold_times[-1], places=5)
+        self.assertAlmostEqual(0.001, self.hold_policy.message_interval_s, places=5)
+
+        hold_times = self._get_hold_times([0.0001] * 20)
+        self.assertAlmostEqual(0.0008, hold_times[-1], places=5)
+
+    def test_hold_time_limits(self):
+        hold_times = self._get_hold_times([0, 0.02, 0.02])
+        self.assertEqual(0.05, hold_times[-1])
+
+        self.hold_policy.set_rtt(0.1)
+        hold_times = self._get_hold_times([0.001, 0.001, 0.001, 0.001, 0.001, 0.001])
+        self.assertAlmostEqual(0.01, hold_times[-1], places=5)
+
+    def test_no_hold_under_light_load(self):
+        hold_times = self._get_hold_times([0, 0.1, 0.1])
+        self.assertEqual([0, 0, 0], hold_times)
+
+        # the mean interval has to drop under the maximum hold time before holding again
+        hold_times = self._get_hold_times([0.001, 0.001])
+        self.assertEqual(0, hold_times[0])
+        self.assertEqual(0.05, hold_times[1])
+
+        self.hold_policy.set_rtt(0.01)
+        self.assertEqual([0], self._get_hold_times([0.001]))
+
+    def test_no_hold_for_blocks(self):
+        self._get_hold_times([0, 0.001, 0.001, 0.001])
+
+        unheld_before = REGISTRY.get_sample_value("output_buffer_unheld_messages_total", {"reason": "priority"})
+        self.assertEqual([0, 0], self._get_hold_times([0.001, 0.001], OutputPriority.BLOCK))
+        self.assertEqual([0], self._get_hold_times([0.001], OutputPriority.CONTROL))
+        self.assertEqual(
+            unheld_before + 3,
+            REGISTRY.get_sample_value("output_buffer_unheld_messages_total", {"reason": "priority"})
+        )
+        self.assertLess(0, self._get_hold_times([0.001])[0])
+
+    def test_output_buffer_coalesces_under_heavy_load(self):
+        batches_before = REGISTRY.get_sample_value("output_buffer_batch_messages_count")
+        messages = [bytearray([i]) * 10 for i in range(6)]
+
+        self.output_buffer.enqueue_msgbytes(messages[0])
+        self.assertEqual(messages[0], self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(10)
+
+        for message in messages[1:]:
+            self.clock.advance(0.001)
+            self.output_buffer.enqueue_msgbytes(message)
+        self.assertEqual(OutputBuffer.EMPTY, self.output_buffer.get_buffer())
+        # held from the second message, the first to come at a known rate
+        self.assertAlmostEqual(self.clock.time() - 0.004 + 0.008, self.output_buffer.get_flush_time(), places=5)
+
+        self.clock.advance(0.003)
+        self.assertEqual(OutputBuffer.EMPTY, self.output_buffer.get_buffer())
+        self.clock.advance(0.001)
+        self.assertEqual(b"".join(messages[1:]), self.output_buffer.get_buffer())
+        self.assertIsNone(self.output_buffer.get_flush_time())
+        self.assertEqual(batches_before + 1, REGISTRY.get_sample_value("output_buffer_batch_messages_count"))
+
+    def test_output_buffer_sends_blocks_without_holding(self):
+        for _ in range(4):
+            self.clock.advance(0.001)
+            self.output_buffer.enqueue_msgbytes(bytearray(10))
+        # the first message is sent right away, the others wait behind it
+        self.assertEqual([0, 0, 30, 0], self.output_buffer.get_queued_bytes_by_priority())
+
+        block = bytearray(1) * 20
+        self.output_buffer.enqueue_msgbytes(block, OutputPriority.BLOCK)
+
+        self.assertEqual(bytearray(10), self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(10)
+        # the block goes ahead of the queued messages and is not held
+        self.assertEqual(block, self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(20)
+        self.assertIsNotNone(self.output_buffer.get_flush_time())
+        self.assertEqual(OutputBuffer.EMPTY, self.output_buffer.get_buffer())
+
+        self.clock.advance(0.01)
+        self.assertEqual(bytearray(30), self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(30)
+        self.assertFalse(self.output_buffer.has_more_bytes())
+
+    def test_output_buffer_flushes_held_batch_for_block(self):
+        for _ in range(4):
+            self.clock.advance(0.001)
+            self.output_buffer.enqueue_msgbytes(bytearray(10))
+        self.output_buffer.advance_buffer(10)
+        self.assertEqual(OutputBuffer.EMPTY, self.output_buffer.get_buffer())
+        self.assertIsNotNone(self.output_buffer.get_flush_time())
+
+        block = bytearray(1) * 20
+        self.output_buffer.enqueue_msgbytes(block, OutputPriority.BLOCK)
+
+        self.assertIsNone(self.output_buffer.get_flush_time())
+        self.assertEqual(bytearray(30), self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(30)
+        self.assertEqual(block, self.output_buffer.get_buffer())
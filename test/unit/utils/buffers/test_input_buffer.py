@@ -1,3 +1,4 @@
+import timeit
 import unittest
 from collections import deque
 
@@ -74,6 +75,84 @@ class TestInputBuffer(unittest.TestCase):
         self.assertEqual(bytearray([i for i in range(35, 61)]), self.in_buf.get_slice(34, 60))
         self.assertEqual(self.in_buf[34:], self.in_buf.get_slice(34, 60))
 
+    def test_endswith_across_chunks(self):
+        self.make_input_buffer()
+
+        self.assertTrue(self.in_buf.endswith(bytearray(range(15, 61))))
+        self.assertFalse(self.in_buf.endswith(bytearray(range(14, 60))))
+        self.assertFalse(self.in_buf.endswith(bytearray(61)))
+        self.assertEqual(deque([self.data1, self.data2, self.data3]), self.in_buf.input_list)
+
+    def test_peek_and_slice_do_not_merge_chunks(self):
+        self.make_input_buffer()
+
+        self.assertEqual(bytearray(range(1, 31)), self.in_buf.peek_message(30))
+        self.assertEqual(bytearray(range(11, 51)), self.in_buf.get_slice(10, 50))
+        self.assertEqual(deque([self.data1, self.data2, self.data3]), self.in_buf.input_list)
+
+    def test_get_segments(self):
+        self.make_input_buffer()
+
+        segments = self.in_buf.get_segments(10, 50)
+        self.assertEqual(3, len(segments))
+        self.assertEqual(bytearray(range(11, 21)), segments[0])
+        self.assertEqual(self.data2, segments[1])
+        self.assertEqual(bytearray(range(41, 51)), segments[2])
+
+        # views of the received chunks
+        self.data2[0] = 0
+        self.assertEqual(0, segments[1][0])
+
+        self.assertEqual(
+            [bytearray(range(26, 31))], [bytearray(segment) for segment in self.in_buf.get_segments(25, 30)]
+        )
+        self.assertEqual([], self.in_buf.get_segments(60, 60))
+
+    def test_remove_bytes_keeps_rest_of_chunk_as_view(self):
+        self.make_input_buffer()
+
+        self.assertEqual(bytearray(range(1, 26)), self.in_buf.remove_bytes(25))
+        self.assertEqual(2, len(self.in_buf.input_list))
+        self.assertIsInstance(self.in_buf.input_list[0], memoryview)
+        self.assertEqual(bytearray(range(26, 41)), self.in_buf.peek_message(5))
+
+        removed = self.in_buf.remove_bytes(15)
+        self.assertIsInstance(removed, bytearray)
+        self.assertEqual(bytearray(range(26, 41)), removed)
+        self.assertEqual(deque([self.data3]), self.in_buf.input_list)
+
+        self.assertIs(self.data3, self.in_buf.remove_bytes(20))
+        self.assertEqual(0, self.in_buf.length)
+
+    @unittest.skip("Run this test only for local debugging")
+    def test_performance(self):
+        chunk = bytearray(1024)
+        message_len = 1024 * 1024
+        small_message_len = 100
+
+        def receive_large_message() -> None:
+            input_buffer = InputBuffer()
+            while input_buffer.length < message_len:
+                input_buffer.add_bytes(bytearray(chunk))
+                input_buffer.peek_message(24)
+            input_buffer.remove_bytes(message_len)
+
+        def receive_small_messages() -> None:
+            input_buffer = InputBuffer()
+            for _ in range(100):
+                input_buffer.add_bytes(bytearray(64 * 1024))
+                while input_buffer.length >= small_message_len:
+                    input_buffer.peek_message(24)
+                    input_buffer.remove_bytes(small_message_len)
+
+        number_of_iterations = 5
+        timeit_large_message = timeit.timeit(receive_large_message, number=number_of_iterations)
+        timeit_small_messages = timeit.timeit(receive_small_messages, number=number_of_iterations)
+        print(
+            f"\ntimeit_large_message:  {timeit_large_message * 1000 / number_of_iterations:.4f}ms, "
+            f"\ntimeit_small_messages:  {timeit_small_messages * 1000 / number_of_iterations:.4f}ms"
+        )
+
     def make_input_buffer(self):
         self.in_buf.add_bytes(self.data1)
         self.in_buf.add_bytes(self.data2)
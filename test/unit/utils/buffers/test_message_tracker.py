@@ -1,3 +1,7 @@
+import time
+from unittest.mock import patch
+
+from bxcommon import constants
 from bxcommon.messages.bloxroute.tx_message import TxMessage
 from bxcommon.test_utils import helpers
 from bxcommon.test_utils.abstract_test_case import AbstractTestCase
@@ -6,8 +10,9 @@ from bxcommon.test_utils.mocks.mock_node import MockNode
 from bxcommon.test_utils.mocks.mock_socket_connection import (
     MockSocketConnection,
 )
-from bxcommon.utils.buffers.message_tracker import MessageTracker
+from bxcommon.utils.buffers.message_tracker import MessageTracker, CompactMessageTracker, create_message_tracker
 from bxcommon.utils.buffers.output_buffer import OutputBuffer
+from bxcommon.utils.buffers.output_priority import OutputPriority
 
 
 class MessageTrackerTest(AbstractTestCase):
@@ -99,3 +104,194 @@ class MessageTrackerTest(AbstractTestCase):
         self.assertEqual(
             self.output_buffer.length, self.tracker.bytes_remaining
         )
+
+
+class CompactMessageTrackerTest(AbstractTestCase):
+    def setUp(self) -> None:
+        self.node = MockNode(
+            helpers.get_common_opts(1001, external_ip="128.128.128.128")
+        )
+        self.tracker = CompactMessageTracker(
+            MockConnection(MockSocketConnection(1, self.node), self.node),
+            capacity=2
+        )
+        self.output_buffer = OutputBuffer(enable_buffering=True)
+
+    def test_create_message_tracker(self):
+        connection = MockConnection(MockSocketConnection(1, self.node), self.node)
+        self.assertIsInstance(create_message_tracker(connection), CompactMessageTracker)
+        self.assertIsInstance(create_message_tracker(connection, detailed=True), MessageTracker)
+
+    def test_advance_bytes(self):
+        messages = [
+            TxMessage(helpers.generate_object_hash(), 5, tx_val=helpers.generate_bytearray(250))
+            for _ in range(5)
+        ]
+        message_length = len(messages[0].rawbytes())
+        for message in messages:
+            self.tracker.append_message(message_length, message)
+        self.assertEqual(5, len(self.tracker))
+        self.assertEqual(5 * message_length, self.tracker.bytes_remaining)
+
+        self.tracker.advance_bytes(message_length + 120)
+        self.assertEqual(4, len(self.tracker))
+        self.assertEqual(4 * message_length - 120, self.tracker.bytes_remaining)
+
+        self.tracker.advance_bytes(4 * message_length - 120)
+        self.assertEqual(0, len(self.tracker))
+        self.assertEqual(0, self.tracker.bytes_remaining)
+
+    def test_prepend_message_after_message_in_progress(self):
+        block_message = helpers.TestBlockMessage(helpers.generate_object_hash(), helpers.generate_object_hash())
+        tx_message = TxMessage(helpers.generate_object_hash(), 5, tx_val=helpers.generate_bytearray(250))
+        self.tracker.append_message(100, tx_message)
+        self.tracker.append_message(100, tx_message)
+        self.tracker.advance_bytes(50)
+
+        self.tracker.prepend_message(200, block_message)
+        self.assertEqual(3, len(self.tracker))
+        self.assertFalse(self.tracker.is_sending_block_message())
+
+        self.tracker.advance_bytes(50)
+        self.assertTrue(self.tracker.is_sending_block_message())
+        self.tracker.advance_bytes(200)
+        self.assertFalse(self.tracker.is_sending_block_message())
+        self.assertEqual(100, self.tracker.bytes_remaining)
+
+    def test_entries_follow_output_buffer_scheduling(self):
+        block_message = helpers.TestBlockMessage(helpers.generate_object_hash(), helpers.generate_object_hash())
+        tx_message = TxMessage(helpers.generate_object_hash(), 5, tx_val=helpers.generate_bytearray(250))
+        for tracker in [MessageTracker(self.tracker.connection), self.tracker]:
+            output_buffer = OutputBuffer()
+            output_buffer.set_message_tracker(tracker)
+
+            # scheduled as soon as it is enqueued, before its entry is appended
+            output_buffer.enqueue_msgbytes(bytearray(100), OutputPriority.TX)
+            tracker.append_message(100, tx_message)
+            tracker.append_message(100, tx_message)
+            output_buffer.enqueue_msgbytes(bytearray(100), OutputPriority.TX)
+            output_buffer.enqueue_msgbytes(bytearray(200), OutputPriority.BLOCK)
+            tracker.append_message(200, block_message, priority=OutputPriority.BLOCK)
+            self.assertFalse(tracker.is_sending_block_message())
+            self.assertEqual(400, tracker.bytes_remaining)
+
+            # the block message is sent before the transaction enqueued ahead of it
+            for sent_bytes, sending_block_message in [(100, True), (200, False), (100, False)]:
+                output_buffer.advance_buffer(sent_bytes)
+                tracker.advance_bytes(sent_bytes)
+                self.assertEqual(sending_block_message, tracker.is_sending_block_message())
+            self.assertEqual(0, tracker.bytes_remaining)
+            self.assertEqual(0, output_buffer.length)
+
+    def test_prepend_message_same_as_message_tracker(self):
+        block_message = helpers.TestBlockMessage(helpers.generate_object_hash(), helpers.generate_object_hash())
+        tx_message = TxMessage(helpers.generate_object_hash(), 5, tx_val=helpers.generate_bytearray(250))
+        message_tracker = MessageTracker(self.tracker.connection)
+        for tracker in [message_tracker, self.tracker]:
+            tracker.append_message(100, tx_message)
+            tracker.prepend_message(200, block_message)
+            tracker.advance_bytes(100)
+            tracker.prepend_message(50, tx_message)
+            tracker.advance_bytes(100)
+            tracker.prepend_message(50, tx_message)
+
+        for sent_bytes in [100, 50, 50]:
+            self.assertEqual(message_tracker.is_sending_block_message(), self.tracker.is_sending_block_message())
+            message_tracker.advance_bytes(sent_bytes)
+            self.tracker.advance_bytes(sent_bytes)
+            self.assertEqual(message_tracker.bytes_remaining, self.tracker.bytes_remaining)
+        self.assertEqual(0, len(message_tracker.messages))
+        self.assertEqual(0, len(self.tracker))
+
+    def test_on_messages_dropped(self):
+        for tracker in [MessageTracker(self.tracker.connection), self.tracker]:
+            tx_message = TxMessage(helpers.generate_object_hash(), 5, tx_val=helpers.generate_bytearray(250))
+            block_message = helpers.TestBlockMessage(helpers.generate_object_hash(), helpers.generate_object_hash())
+            output_buffer = OutputBuffer()
+            output_buffer.set_message_tracker(tracker)
+
+            start_time = time.time()
+            with patch("time.time", return_value=start_time):
+                for length, message, priority in [
+                    (100, tx_message, OutputPriority.TX),
+                    (50, tx_message, OutputPriority.TX),
+                    (50, block_message, OutputPriority.BLOCK),
+                    (100, tx_message, OutputPriority.TX),
+                ]:
+                    output_buffer.enqueue_msgbytes(bytearray(length), priority)
+                    tracker.append_message(length, message, priority=priority)
+            output_buffer.advance_buffer(20)
+            tracker.advance_bytes(20)
+
+            # the queued transactions are dropped, not the block message of the same length
+            with patch("time.time", return_value=start_time + constants.OUTPUT_BUFFER_TX_MAX_AGE_S + 0.01):
+                self.assertEqual(2, len(output_buffer.drop_expired_messages()))
+            self.assertEqual(130, tracker.bytes_remaining)
+            self.assertFalse(tracker.is_sending_block_message())
+
+            output_buffer.advance_buffer(80)
+            tracker.advance_bytes(80)
+            self.assertTrue(tracker.is_sending_block_message())
+            output_buffer.advance_buffer(50)
+            tracker.advance_bytes(50)
+            self.assertEqual(0, tracker.bytes_remaining)
+            self.assertEqual(0, output_buffer.length)
+
+    def test_empty_bytes(self):
+        message1 = TxMessage(
+            helpers.generate_object_hash(),
+            5,
+            tx_val=helpers.generate_bytearray(250),
+        )
+        message2 = TxMessage(
+            helpers.generate_object_hash(),
+            5,
+            tx_val=helpers.generate_bytearray(250),
+        )
+        message3 = TxMessage(
+            helpers.generate_object_hash(),
+            5,
+            tx_val=helpers.generate_bytearray(250),
+        )
+        message_length = len(message1.rawbytes())
+
+        self.output_buffer.enqueue_msgbytes(message1.rawbytes())
+        self.output_buffer.flush()
+        self.output_buffer.enqueue_msgbytes(message2.rawbytes())
+        self.output_buffer.enqueue_msgbytes(message3.rawbytes())
+
+        self.tracker.append_message(message_length, message1)
+        self.tracker.append_message(message_length, message2)
+        self.tracker.append_message(message_length, message3)
+
+        self.output_buffer.advance_buffer(120)
+        self.tracker.advance_bytes(120)
+
+        self.output_buffer.safe_empty()
+        self.assertEqual(message_length - 120, self.output_buffer.length)
+
+        self.tracker.empty_bytes(self.output_buffer.length)
+
+        self.assertEqual(1, len(self.tracker))
+        self.assertEqual(message_length - 120, self.tracker.bytes_remaining)
+
+    def test_empty_bytes_more_bytes(self):
+        for _ in range(100):
+            message = TxMessage(
+                helpers.generate_object_hash(),
+                5,
+                tx_val=helpers.generate_bytearray(2500),
+            )
+            message_length = len(message.rawbytes())
+            self.output_buffer.enqueue_msgbytes(message.rawbytes())
+            self.tracker.append_message(message_length, message)
+
+        self.output_buffer.advance_buffer(3500)
+        self.tracker.advance_bytes(3500)
+
+        self.output_buffer.safe_empty()
+        self.tracker.empty_bytes(self.output_buffer.length)
+
+        self.assertEqual(
+            self.output_buffer.length, self.tracker.bytes_remaining
+        )
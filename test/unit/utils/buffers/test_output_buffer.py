@@ -2,11 +2,14 @@ import time
 import unittest
 from collections import deque
 
-from mock import MagicMock
+from mock import MagicMock, patch
 
+from bxcommon import constants
 from bxcommon.constants import OUTPUT_BUFFER_BATCH_MAX_HOLD_TIME, OUTPUT_BUFFER_MIN_SIZE
 from bxcommon.test_utils import helpers
 from bxcommon.utils.buffers.output_buffer import OutputBuffer
+from bxcommon.utils.buffers.output_priority import OutputPriority
+from bxcommon.utils.buffers.segmented_buffer import SegmentedBuffer
 
 
 class TestOutputBuffer(unittest.TestCase):
@@ -158,3 +161,146 @@ class TestOutputBuffer(unittest.TestCase):
         self.assertEqual(0, len(self.output_buffer))
         self.assertEqual(OutputBuffer.EMPTY, self.output_buffer.get_buffer())
 
+    def test_enqueue_msgbytes_higher_priority_first(self):
+        self.output_buffer = OutputBuffer(enable_buffering=False)
+        tx1 = helpers.generate_bytearray(10)
+        tx2 = helpers.generate_bytearray(10)
+        block = helpers.generate_bytearray(30)
+        ping = helpers.generate_bytearray(5)
+
+        self.output_buffer.enqueue_msgbytes(tx1, OutputPriority.TX)
+        self.output_buffer.enqueue_msgbytes(tx2, OutputPriority.TX)
+        self.output_buffer.enqueue_msgbytes(block, OutputPriority.BLOCK)
+        self.output_buffer.enqueue_msgbytes(ping, OutputPriority.CONTROL)
+        self.assertEqual(55, len(self.output_buffer))
+        self.assertEqual([5, 30, 10, 0], self.output_buffer.get_queued_bytes_by_priority())
+
+        # first message is already scheduled, partly sent messages finish first
+        self.output_buffer.advance_buffer(5)
+        self.assertEqual(tx1[5:], self.output_buffer.get_buffer())
+
+        sent = []
+        while self.output_buffer.has_more_bytes():
+            buffer = self.output_buffer.get_buffer()
+            sent.append(bytearray(buffer))
+            self.output_buffer.advance_buffer(len(buffer))
+
+        self.assertEqual([tx1[5:], ping, block, tx2], sent)
+
+    def test_enqueue_msgbytes_lower_priority_minimum_share(self):
+        self.output_buffer = OutputBuffer(enable_buffering=False)
+        self.output_buffer.enqueue_msgbytes(bytearray(b"c"), OutputPriority.CONTROL)
+        messages_per_tx = int(1 / constants.OUTPUT_BUFFER_MIN_SHARE_TX)
+        for _ in range(2 * messages_per_tx):
+            self.output_buffer.enqueue_msgbytes(bytearray(b"b"), OutputPriority.BLOCK)
+        self.output_buffer.enqueue_msgbytes(bytearray(b"t"), OutputPriority.TX)
+
+        sent = []
+        while self.output_buffer.has_more_bytes():
+            buffer = self.output_buffer.get_buffer()
+            sent.append(bytes(buffer))
+            self.output_buffer.advance_buffer(len(buffer))
+
+        self.assertEqual(b"c", sent[0])
+        self.assertLessEqual(sent.index(b"t"), messages_per_tx + 1)
+
+    def test_enqueue_msgbytes_buffering_higher_priority_first(self):
+        large_tx = helpers.generate_bytearray(OUTPUT_BUFFER_MIN_SIZE + 1)
+        tx1 = helpers.generate_bytearray(10)
+        tx2 = helpers.generate_bytearray(10)
+        block = helpers.generate_bytearray(30)
+
+        self.output_buffer.enqueue_msgbytes(large_tx, OutputPriority.TX)
+        self.output_buffer.enqueue_msgbytes(tx1, OutputPriority.TX)
+        self.output_buffer.enqueue_msgbytes(tx2, OutputPriority.TX)
+        self.output_buffer.enqueue_msgbytes(block, OutputPriority.BLOCK)
+        self.assertEqual([0, 30, 20, 0], self.output_buffer.get_queued_bytes_by_priority())
+
+        self.assertEqual(large_tx, self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(len(large_tx))
+
+        # queued messages are batched in scheduling order
+        self.assertEqual(OutputBuffer.EMPTY, self.output_buffer.get_buffer())
+        self.output_buffer.flush()
+        self.assertEqual(block + tx1 + tx2, self.output_buffer.get_buffer())
+
+    def test_safe_empty_priority_queues(self):
+        self.output_buffer = OutputBuffer(enable_buffering=False)
+        self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(10), OutputPriority.TX)
+        self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(10), OutputPriority.BLOCK)
+        self.output_buffer.advance_buffer(5)
+
+        self.output_buffer.safe_empty()
+        self.assertEqual(5, len(self.output_buffer))
+        self.assertEqual([0, 0, 0, 0], self.output_buffer.get_queued_bytes_by_priority())
+        self.output_buffer.advance_buffer(5)
+        self.assertEqual(OutputBuffer.EMPTY, self.output_buffer.get_buffer())
+
+    def test_drop_expired_messages(self):
+        self.output_buffer = OutputBuffer(enable_buffering=False)
+        start_time = time.time()
+        with patch("time.time", return_value=start_time):
+            self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(10), OutputPriority.TX)
+            self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(20), OutputPriority.TX)
+            self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(30), OutputPriority.BLOCK)
+        with patch("time.time", return_value=start_time + constants.OUTPUT_BUFFER_TX_MAX_AGE_S / 2):
+            self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(40), OutputPriority.TX)
+
+        self.assertTrue(self.output_buffer.is_droppable(OutputPriority.TX))
+        self.assertFalse(self.output_buffer.is_droppable(OutputPriority.BLOCK))
+
+        with patch("time.time", return_value=start_time + constants.OUTPUT_BUFFER_TX_MAX_AGE_S + 0.01):
+            # first tx is already scheduled for sending and is not dropped
+            self.assertEqual([20], [len(msg_bytes) for msg_bytes in self.output_buffer.drop_expired_messages()])
+
+        self.assertEqual(80, len(self.output_buffer))
+        self.assertEqual([0, 30, 40, 0], self.output_buffer.get_queued_bytes_by_priority())
+
+    def test_drop_expired_messages_buffering(self):
+        start_time = time.time()
+        with patch("time.time", return_value=start_time):
+            self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(OUTPUT_BUFFER_MIN_SIZE + 1))
+            self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(10), OutputPriority.TX)
+            self.output_buffer.enqueue_msgbytes(helpers.generate_bytearray(30), OutputPriority.BLOCK)
+
+        with patch("time.time", return_value=start_time + constants.OUTPUT_BUFFER_TX_MAX_AGE_S + 0.01):
+            # messages queued behind the one being sent are dropped before they are batched
+            self.assertEqual([10], [len(msg_bytes) for msg_bytes in self.output_buffer.drop_expired_messages()])
+            self.assertEqual(OUTPUT_BUFFER_MIN_SIZE + 31, len(self.output_buffer))
+
+            self.output_buffer.advance_buffer(OUTPUT_BUFFER_MIN_SIZE + 1)
+            self.assertEqual(30, len(self.output_buffer.get_buffer()))
+
+    def test_enqueue_segmented_buffer(self):
+        self.output_buffer = OutputBuffer(enable_buffering=False)
+        header = helpers.generate_bytearray(10)
+        body = helpers.generate_bytearray(100)
+        self.output_buffer.enqueue_msgbytes(SegmentedBuffer((header, body)))
+        self.assertEqual(110, len(self.output_buffer))
+
+        self.assertEqual(header, self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(4)
+        self.assertEqual(header[4:], self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(6)
+        self.assertEqual(body, self.output_buffer.get_buffer())
+
+        # prepended message does not split the segmented message
+        prepended = helpers.generate_bytearray(20)
+        self.output_buffer.prepend_msgbytes(prepended)
+        self.output_buffer.advance_buffer(50)
+        self.assertEqual(body[50:], self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(50)
+        self.assertEqual(prepended, self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(20)
+        self.assertFalse(self.output_buffer.has_more_bytes())
+
+    def test_enqueue_segmented_buffer_buffering(self):
+        data = helpers.generate_bytearray(20)
+        self.output_buffer.enqueue_msgbytes(data)
+        segmented_buffer = SegmentedBuffer((helpers.generate_bytearray(10), helpers.generate_bytearray(10)))
+        self.output_buffer.enqueue_msgbytes(segmented_buffer)
+
+        self.assertEqual(data, self.output_buffer.get_buffer())
+        self.output_buffer.advance_buffer(20)
+        self.assertEqual(segmented_buffer.segments[0], self.output_buffer.get_buffer())
+        self.assertEqual(20, len(self.output_buffer))
@@ -138,3 +138,20 @@ class ThroughputServiceTests(AbstractTestCase):
         add_measurement("localhost 0000", MeasurementType.PING_OUTGOING, 0.2)
         self.assertEqual(throughput_statistics.interval_data.peer_to_stats["localhost 0000"].ping_outgoing_max, 0.3)
         throughput_statistics.flush_info()
+
+    def test_compression_measurements(self):
+        add_measurement("localhost 0000", MeasurementType.COMPRESSION_INPUT_BYTES, 1000)
+        add_measurement("localhost 0000", MeasurementType.COMPRESSION_OUTPUT_BYTES, 250)
+        add_measurement("localhost 0000", MeasurementType.COMPRESSION_TIME, 0.5)
+
+        peer_stats = throughput_statistics.interval_data.peer_to_stats["localhost 0000"]
+        self.assertEqual(1000, peer_stats.compression_input_bytes)
+        self.assertEqual(250, peer_stats.compression_output_bytes)
+        self.assertEqual(0.25, peer_stats.compression_ratio)
+        self.assertEqual(0.5, peer_stats.compression_time_s)
+
+    def test_get_peer_throughput_out(self):
+        self.assertIsNone(throughput_statistics.get_peer_throughput_out("localhost 0000"))
+
+        add_throughput_event(**self.outbound_throughput_event1.__dict__)
+        self.assertLess(0, throughput_statistics.get_peer_throughput_out("localhost 0000"))
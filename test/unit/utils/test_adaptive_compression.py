@@ -0,0 +1,66 @@
+import os
+
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.utils.adaptive_compression import AdaptiveCompression
+
+
+class AdaptiveCompressionTest(AbstractTestCase):
+
+    def setUp(self) -> None:
+        self.compression = AdaptiveCompression(level=1, min_size=100, probe_interval=3)
+
+    def test_should_compress_min_size(self):
+        self.assertFalse(self.compression.should_compress(99))
+        self.assertTrue(self.compression.should_compress(100))
+
+    def test_compress_measures_ratio(self):
+        msg_bytes = bytearray(1000)
+        compressed_bytes, compression_time_s = self.compression.compress(msg_bytes)
+
+        self.assertLess(len(compressed_bytes), len(msg_bytes))
+        self.assertGreaterEqual(compression_time_s, 0)
+        self.assertEqual(1000, self.compression.input_bytes)
+        self.assertEqual(len(compressed_bytes), self.compression.output_bytes)
+
+        self.assertTrue(self.compression.update(True, 1000))
+        self.assertEqual(len(compressed_bytes) / 1000, self.compression.compression_ratio)
+        self.assertEqual(0, self.compression.input_bytes)
+
+    def test_compress_reuses_last_compressed_buffer(self):
+        msg_bytes = memoryview(bytearray(1000))
+        compressed_bytes, _ = self.compression.compress(msg_bytes)
+        other_compressed_bytes, compression_time_s = AdaptiveCompression().compress(msg_bytes)
+
+        self.assertIs(compressed_bytes, other_compressed_bytes)
+        self.assertEqual(0, compression_time_s)
+
+    def test_disabled_for_incompressible_bytes_on_fast_link(self):
+        self.compression.compress(bytearray(os.urandom(10000)))
+        self.assertFalse(self.compression.update(True, 1024 * 1024 * 1024))
+        self.assertFalse(self.compression.enabled)
+
+        # every probe_interval messages are still compressed
+        self.assertFalse(self.compression.should_compress(1000))
+        self.assertFalse(self.compression.should_compress(1000))
+        self.assertTrue(self.compression.should_compress(1000))
+
+    def test_enabled_for_compressible_bytes_on_slow_link(self):
+        self.compression.enabled = False
+        self.compression.compress(bytearray(10000))
+        self.assertTrue(self.compression.update(True, 1024))
+
+    def test_disabled_without_congestion(self):
+        self.compression.compress(bytearray(10000))
+        self.assertFalse(self.compression.update(False, 1024))
+
+        # congested without anything sent
+        self.compression.compress(bytearray(10000))
+        self.assertTrue(self.compression.update(True))
+
+    def test_update_without_measurements_keeps_estimates(self):
+        self.compression.compress(bytearray(10000))
+        self.compression.update(True, 1024)
+        compression_ratio = self.compression.compression_ratio
+
+        self.assertTrue(self.compression.update(True, 1024))
+        self.assertEqual(compression_ratio, self.compression.compression_ratio)
@@ -0,0 +1,47 @@
+import time
+
+from mock import MagicMock, patch
+
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.utils.alarm_profiler import AlarmProfiler
+
+
+class AlarmProfilerTest(AbstractTestCase):
+
+    def setUp(self):
+        self.time = MagicMock(return_value=time.time())
+        time_patch = patch("time.time", self.time)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+        self.profiler = AlarmProfiler(log_interval_s=60, top_count=2)
+
+    def test_record(self):
+        self.profiler.record("Service.cleanup", 0.01)
+        self.profiler.record("Service.cleanup", 0.03)
+
+        stats = self.profiler.durations["Service.cleanup"]
+        self.assertEqual(2, stats.count)
+        self.assertAlmostEqual(0.04, stats.total_duration_s)
+        self.assertAlmostEqual(0.03, stats.max_duration_s)
+
+    def test_get_top_alarms(self):
+        self.profiler.record("Service.cleanup", 0.01)
+        self.profiler.record("Node.flush", 0.002)
+        self.profiler.record("Node.flush", 0.002)
+        self.profiler.record("Stats.flush", 0.5)
+
+        self.assertEqual(
+            ["Stats.flush", "Service.cleanup"], [name for name, _stats in self.profiler.get_top_alarms()]
+        )
+
+    def test_logs_and_resets_after_interval(self):
+        self.profiler.record("Service.cleanup", 0.01)
+        self.time.return_value += 30
+        self.profiler.record("Service.cleanup", 0.01)
+        self.assertEqual(2, self.profiler.durations["Service.cleanup"].count)
+
+        self.time.return_value += 30
+        self.profiler.record("Service.cleanup", 0.01)
+        self.assertEqual({}, self.profiler.durations)
+        self.assertEqual(self.time.return_value, self.profiler.last_log_time)
@@ -1,7 +1,12 @@
+import threading
 import time
+import timeit
+from unittest import skip
 
-from mock import MagicMock
+from mock import MagicMock, patch
+from prometheus_client import REGISTRY
 
+from bxcommon import constants
 from bxcommon.test_utils.abstract_test_case import AbstractTestCase
 from bxcommon.utils.alarm_queue import AlarmQueue
 
@@ -73,3 +78,184 @@ class AlarmQueueTest(AbstractTestCase):
 
         time.time = MagicMock(return_value=time.time() + 2)
         self.alarm_queue.fire_alarms()
+
+    def test_register_approx_alarm_coalesces_within_slop(self):
+        coalesced_before = REGISTRY.get_sample_value("alarm_approx_coalesced_total")
+        for _ in range(100):
+            self.alarm_queue.register_approx_alarm(10, 3, self.function_to_pass, 1, 5)
+        self.alarm_queue.register_approx_alarm(12, 3, self.function_to_pass, 1, 5)
+
+        self.assertEqual(1, len(self.alarm_queue.alarms))
+        self.assertEqual(1, len(self.alarm_queue.approx_alarms_scheduled[self.function_to_pass]))
+        self.assertEqual(1, sum(len(bucket) for bucket in self.alarm_queue.approx_alarm_buckets.values()))
+        self.assertEqual(
+            coalesced_before + 100, REGISTRY.get_sample_value("alarm_approx_coalesced_total")
+        )
+
+        self.alarm_queue.register_approx_alarm(20, 3, self.function_to_pass, 1, 5)
+        self.assertEqual(2, len(self.alarm_queue.alarms))
+        self.assertEqual(2, len(self.alarm_queue.approx_alarms_scheduled[self.function_to_pass]))
+
+        # wider slop than the buckets were made for
+        self.alarm_queue.register_approx_alarm(40, 30, self.function_to_pass, 1, 5)
+        self.assertEqual(2, len(self.alarm_queue.alarms))
+
+    def test_approx_alarm_buckets_cleaned_up_after_firing(self):
+        self.alarm_queue.register_approx_alarm(1, 1, self.function_to_pass, 0, 0)
+        self.alarm_queue.register_approx_alarm(5, 1, self.function_to_pass, 0, 0)
+        self.assertEqual(2, len(self.alarm_queue.approx_alarm_buckets))
+
+        time.time = MagicMock(return_value=time.time() + 2)
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(1, len(self.alarm_queue.approx_alarm_buckets))
+
+        time.time = MagicMock(return_value=time.time() + 5)
+        self.alarm_queue.fire_alarms()
+        self.assertEqual({}, self.alarm_queue.approx_alarm_buckets)
+        self.assertEqual({}, self.alarm_queue.approx_alarms_scheduled)
+
+    def test_approx_alarm_buckets_follow_rescheduled_alarm(self):
+        fn = MagicMock(return_value=10)
+        self.alarm_queue.register_approx_alarm(1, 1, fn, alarm_name="fn")
+
+        time.time = MagicMock(return_value=time.time() + 2)
+        self.alarm_queue.fire_alarms()
+        fn.assert_called_once()
+
+        # rescheduled 10 seconds from now, so a registration for then is coalesced
+        self.alarm_queue.register_approx_alarm(10, 1, fn, alarm_name="fn")
+        self.assertEqual(1, len(self.alarm_queue.alarms))
+        self.alarm_queue.register_approx_alarm(1, 1, fn, alarm_name="fn")
+        self.assertEqual(2, len(self.alarm_queue.alarms))
+
+    def test_compacts_heap_of_mostly_cancelled_alarms(self):
+        alarm_ids = [
+            self.alarm_queue.register_alarm(100 + i, self.function_to_pass, 0, 0) for i in range(2000)
+        ]
+        for alarm_id in alarm_ids[999:]:
+            self.alarm_queue.unregister_alarm(alarm_id)
+
+        self.assertEqual(1001, self.alarm_queue.cancelled_count)
+        self.assertEqual(2000, REGISTRY.get_sample_value("alarm_queue_size"))
+        self.assertAlmostEqual(1001 / 999, REGISTRY.get_sample_value("alarm_queue_cancelled_ratio"))
+
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(999, len(self.alarm_queue.alarms))
+        self.assertEqual(0, self.alarm_queue.cancelled_count)
+        self.assertEqual(999, REGISTRY.get_sample_value("alarm_queue_size"))
+        self.assertEqual(0, REGISTRY.get_sample_value("alarm_queue_cancelled_ratio"))
+
+    def test_compaction_spread_over_ticks(self):
+        fired = []
+        alarm_ids = [self.alarm_queue.register_alarm(i, fired.append, i) for i in range(1, 2001)]
+        for alarm_id in alarm_ids[1::3] + alarm_ids[2::3]:
+            self.alarm_queue.unregister_alarm(alarm_id)
+
+        with patch.object(constants, "ALARM_QUEUE_COMPACTION_BATCH_SIZE", 500):
+            base_time = time.time()
+            for i in range(1, 5):
+                time.time = MagicMock(return_value=base_time + i * 3)
+                self.alarm_queue.fire_alarms()
+                # a batch is moved per tick, and the due alarms are popped from the earlier heap
+                self.assertEqual(max(0, 2000 - 503 * i), len(self.alarm_queue._compacting_alarms))
+            self.assertEqual(list(range(1, 13, 3)), fired)
+
+            new_alarm_id = self.alarm_queue.register_alarm(0.5, fired.append, "new")
+            self.assertEqual(new_alarm_id.fire_time, self.alarm_queue._next_fire_time())
+
+            time.time = MagicMock(return_value=base_time + 3000)
+            self.alarm_queue.fire_alarms()
+
+        self.assertEqual(list(range(1, 13, 3)) + ["new"] + list(range(13, 2001, 3)), fired)
+        self.assertEqual([], self.alarm_queue._compacting_alarms)
+        self.assertEqual([], self.alarm_queue.alarms)
+        self.assertEqual(0, self.alarm_queue.cancelled_count)
+
+    def test_fire_alarms_defers_alarms_over_tick_budget(self):
+        fired = []
+        for i in range(3):
+            self.alarm_queue.register_alarm(1, fired.append, i)
+        time.time = MagicMock(return_value=time.time() + 2)
+
+        with patch.object(constants, "ALARM_QUEUE_TICK_BUDGET_S", -1):
+            self.assertTrue(self.alarm_queue.fire_alarms())
+            self.assertEqual([0], fired)
+            self.assertEqual(0, self.alarm_queue.fire_ready_alarms())
+            self.assertEqual([0, 1], fired)
+            self.assertIsNone(self.alarm_queue.fire_ready_alarms())
+            self.assertEqual([0, 1, 2], fired)
+
+    def test_fire_alarms_records_durations(self):
+        self.alarm_queue.register_alarm(1, self.function_to_pass, 0, 0)
+        self.alarm_queue.register_alarm(1, self.function_to_pass, 0, 0)
+        time.time = MagicMock(return_value=time.time() + 2)
+        self.assertFalse(self.alarm_queue.fire_alarms())
+
+        durations = self.alarm_queue.profiler.durations[self.function_to_pass.__qualname__]
+        self.assertEqual(2, durations.count)
+
+    def test_owner_thread_skips_lock(self):
+        self.alarm_queue.set_owner_thread()
+        self.alarm_queue.lock = MagicMock()
+
+        alarm_id = self.alarm_queue.register_alarm(0, self.function_to_pass, 0, 0)
+        self.alarm_queue.register_alarm(0, self.function_to_pass, 0, 0)
+        self.alarm_queue.register_approx_alarm(0, 1, MagicMock(return_value=None), alarm_name="approx")
+        self.alarm_queue.unregister_alarm(alarm_id)
+        self.assertGreaterEqual(0, self.alarm_queue.time_to_next_alarm())
+        self.alarm_queue.fire_alarms()
+
+        self.alarm_queue.lock.__enter__.assert_not_called()
+        self.assertFalse(self.alarm_queue._has_alarms())
+
+    def test_other_thread_operations_applied_by_owner_thread(self):
+        self.alarm_queue.set_owner_thread()
+        fired = []
+        approx_fired = []
+        existing_alarm_id = self.alarm_queue.register_alarm(0, fired.append, "canceled by other thread")
+
+        def other_thread():
+            self.alarm_queue.register_alarm(0, fired.append, "first")
+            canceled_alarm_id = self.alarm_queue.register_alarm(0, fired.append, "canceled")
+            self.alarm_queue.register_approx_alarm(0, 1, approx_fired.append, "approx")
+            self.alarm_queue.register_alarm(0, fired.append, "last")
+            self.alarm_queue.unregister_alarm(canceled_alarm_id)
+            self.alarm_queue.unregister_alarm(existing_alarm_id)
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(1, len(self.alarm_queue.alarms))
+        self.assertEqual(0, self.alarm_queue.cancelled_count)
+
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(["first", "last"], fired)
+        self.assertEqual(["approx"], approx_fired)
+        self.assertFalse(self.alarm_queue._has_alarms())
+        self.assertEqual(0, self.alarm_queue.cancelled_count)
+        self.assertNotIn(approx_fired.append, self.alarm_queue.approx_alarms_scheduled)
+
+    @skip("Run this test only for local debugging")
+    def test_performance_of_owner_thread(self):
+        def run(alarm_queue: AlarmQueue) -> None:
+            alarm_ids = [alarm_queue.register_alarm(0.001 * (i % 10), self.function_to_pass, 0, 0) for i in range(5000)]
+            for alarm_id in alarm_ids[::2]:
+                alarm_queue.unregister_alarm(alarm_id)
+            for _ in range(10):
+                alarm_queue.time_to_next_alarm()
+                alarm_queue.fire_alarms()
+
+        def run_owned() -> None:
+            alarm_queue = AlarmQueue()
+            alarm_queue.set_owner_thread()
+            run(alarm_queue)
+
+        number_of_iterations = 10
+        with patch("time.time", lambda: 0):
+            timeit_locked = timeit.timeit(lambda: run(AlarmQueue()), number=number_of_iterations)
+            timeit_owned = timeit.timeit(run_owned, number=number_of_iterations)
+        print(
+            f"\ntimeit_locked_alarm_queue:  {timeit_locked * 1000 / number_of_iterations:.4f}ms, "
+            f"\ntimeit_owned_alarm_queue:  {timeit_owned * 1000 / number_of_iterations:.4f}ms"
+        )
@@ -0,0 +1,88 @@
+import unittest
+
+from mock import MagicMock, patch
+
+from bxcommon.utils.bucketed_expiration_queue import BucketedExpirationQueue
+
+
+class BucketedExpirationQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.time = MagicMock(return_value=1000.5)
+        time_patch = patch("time.time", self.time)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+        self.time_to_live = 60
+        self.queue = BucketedExpirationQueue(self.time_to_live)
+        self.removed_items = []
+
+    def test_remove_expired(self):
+        for i in range(10):
+            self.queue.add(i)
+            self.time.return_value += 0.3
+
+        self.assertEqual(10, len(self.queue))
+        self.assertEqual(0, self.queue.get_oldest())
+        self.assertEqual(1000.5, self.queue.get_oldest_item_timestamp())
+
+        self.assertEqual([], self.queue.remove_expired(1060.5, remove_callback=self._remove_item))
+        self.assertEqual(
+            [0, 1, 2], self.queue.remove_expired(1061.4, remove_callback=self._remove_item, limit=3)
+        )
+        self.assertEqual([3], self.queue.remove_expired(1061.4, remove_callback=self._remove_item))
+        self.assertEqual([0, 1, 2, 3], self.removed_items)
+        self.assertEqual(4, self.queue.get_oldest())
+
+        self.assertEqual([4, 5, 6, 7, 8, 9], self.queue.remove_expired(1070, remove_callback=self._remove_item))
+        self.assertEqual(0, len(self.queue))
+        self.assertIsNone(self.queue.get_oldest())
+
+    def test_remove_expired_batch(self):
+        for i in range(10):
+            self.queue.add(i)
+            self.time.return_value += 0.3
+
+        batches = []
+        self.assertEqual([0, 1], self.queue.remove_expired_batch(1061, remove_batch_callback=batches.append))
+        self.assertEqual(
+            [2, 3, 4, 5], self.queue.remove_expired_batch(1063, remove_batch_callback=batches.append, limit=4)
+        )
+        self.assertEqual([], self.queue.remove_expired_batch(1000, remove_batch_callback=batches.append))
+        self.assertEqual([[0, 1], [2, 3, 4, 5]], batches)
+        self.assertEqual({6: 1002.3, 7: 1002.6, 8: 1002.9, 9: 1003.2}, {
+            item: round(timestamp, 1) for item, timestamp in self.queue.queue.items()
+        })
+
+    def test_add_existing_item_moves_it_to_newest(self):
+        self.queue.add(1)
+        self.queue.add(2)
+        self.time.return_value += 5
+        self.queue.add(1)
+
+        self.assertEqual([2, 1], list(self.queue.queue))
+        self.assertEqual(2, self.queue.get_oldest())
+        self.assertEqual([2], self.queue.remove_expired(1063))
+        self.assertEqual([1], self.queue.remove_expired(1067))
+
+    def test_remove_and_remove_oldest(self):
+        for i in range(5):
+            self.queue.add(i)
+            self.time.return_value += 1
+
+        self.queue.remove(0)
+        self.queue.remove(3)
+        self.queue.remove(10)
+        self.assertEqual(3, len(self.queue))
+        self.assertEqual(1, self.queue.get_oldest())
+
+        self.queue.remove_oldest(remove_callback=self._remove_item)
+        self.queue.remove_oldest(remove_callback=self._remove_item)
+        self.assertEqual([1, 2], self.removed_items)
+        self.assertEqual(4, self.queue.get_oldest())
+
+        self.queue.clear()
+        self.assertEqual(0, len(self.queue))
+        self.assertIsNone(self.queue.get_oldest())
+
+    def _remove_item(self, item):
+        self.removed_items.append(item)
@@ -0,0 +1,76 @@
+import gc
+import time
+
+from mock import MagicMock, patch
+
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.utils.alarm_queue import AlarmQueue
+from bxcommon.utils.expiring_dict import ExpiringDict
+from bxcommon.utils.expiring_set import ExpiringSet
+from bxcommon.utils.expiry_sweeper import get_expiry_sweeper
+
+
+class ExpirySweeperTest(AbstractTestCase):
+
+    def setUp(self):
+        self.time = MagicMock(return_value=time.time())
+        time_patch = patch("time.time", self.time)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+        self.alarm_queue = AlarmQueue()
+        self.sweeper = get_expiry_sweeper(self.alarm_queue)
+
+    def test_single_alarm_for_all_collections(self):
+        expiring_dict = ExpiringDict(self.alarm_queue, 5, "dict")
+        expiring_set = ExpiringSet(self.alarm_queue, 10, "set")
+        self.assertIs(self.sweeper, get_expiry_sweeper(self.alarm_queue))
+        self.assertEqual(0, len(self.alarm_queue.alarms))
+
+        for i in range(100):
+            expiring_dict.add(i, i)
+            expiring_set.add(i)
+        self.assertEqual(1, len(self.alarm_queue.alarms))
+
+        self.time.return_value += 6
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(0, len(expiring_dict.contents))
+        self.assertEqual(100, len(expiring_set))
+        self.assertEqual(1, len(self.alarm_queue.alarms))
+
+        self.time.return_value += 5
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(0, len(expiring_set))
+        self.assertEqual(0, len(self.alarm_queue.alarms))
+
+        expiring_set.add(1)
+        self.assertEqual(1, len(self.alarm_queue.alarms))
+
+    def test_sweep_round_robin_within_budget(self):
+        self.sweeper.batch_size = 2
+        self.sweeper.budget_s = -1
+        collections = [ExpiringDict(self.alarm_queue, 1, f"dict{i}") for i in range(3)]
+        for expiring_dict in collections:
+            for i in range(5):
+                expiring_dict.add(i, i)
+        self.time.return_value += 2
+
+        self.sweeper.sweep()
+        self.assertEqual([3, 5, 5], [len(expiring_dict.contents) for expiring_dict in collections])
+        self.sweeper.sweep()
+        self.sweeper.sweep()
+        self.assertEqual([3, 3, 3], [len(expiring_dict.contents) for expiring_dict in collections])
+
+        self.sweeper.budget_s = 1
+        self.assertEqual(0, self.sweeper.sweep())
+        self.assertEqual([0, 0, 0], [len(expiring_dict.contents) for expiring_dict in collections])
+
+    def test_collections_dropped_when_collected(self):
+        expiring_dict = ExpiringDict(self.alarm_queue, 1, "dict")
+        expiring_dict.add(1, 1)
+        del expiring_dict
+        gc.collect()
+
+        self.time.return_value += 2
+        self.assertEqual(0, self.sweeper.sweep())
+        self.assertEqual(0, len(self.sweeper._collections))
@@ -1,3 +1,7 @@
+import timeit
+from collections import deque
+from unittest import skip
+
 from bxcommon.test_utils.abstract_test_case import AbstractTestCase
 from bxcommon.utils.limited_size_dict import LimitedSizeDict
 
@@ -33,3 +37,71 @@ class LimitedSizeDictTest(AbstractTestCase):
 
         for i in range(7, 11):
             self.assertEqual(str(i), self.sut[i])
+
+    def test_updating_item_keeps_capacity(self):
+        for _ in range(3):
+            self.sut.add(4, "four")
+        self.sut[3] = "three"
+
+        self.assertEqual(5, len(self.sut))
+        self.assertEqual("four", self.sut[4])
+
+        self.sut.add(5, "5")
+        self.sut.add(6, "6")
+        self.assertEqual(5, len(self.sut))
+        self.assertNotIn(1, self.sut)
+        for i in range(2, 7):
+            self.assertIn(i, self.sut)
+
+    def test_move_to_end(self):
+        self.sut.move_to_end(0)
+        self.sut.add(5, "5")
+
+        self.assertEqual(5, len(self.sut))
+        self.assertIn(0, self.sut)
+        self.assertNotIn(1, self.sut)
+
+    def test_delete_item(self):
+        del self.sut[2]
+        self.sut.add(5, "5")
+
+        self.assertEqual(5, len(self.sut))
+        self.assertNotIn(2, self.sut)
+        self.assertIn(0, self.sut)
+
+    @skip("Run this test only for local debugging")
+    def test_performance_against_deque_tracker(self):
+        # dedup cache pattern: mostly lookups of recently seen keys, with a new key every few lookups
+        # and an early removal every few new keys
+        max_size = 10000
+        keys = [i // 4 for i in range(200000)]
+        removed_keys = [key - max_size // 2 if key % 8 == 0 and key >= max_size else None for key in keys]
+
+        def run_deque_tracker() -> None:
+            contents = {}
+            key_tracker = deque()
+            for key, removed_key in zip(keys, removed_keys):
+                if key not in contents:
+                    while len(key_tracker) >= max_size:
+                        del contents[key_tracker.popleft()]
+                    contents[key] = key
+                    key_tracker.append(key)
+                if removed_key in contents:
+                    del contents[removed_key]
+                    key_tracker.remove(removed_key)
+
+        def run_limited_size_dict() -> None:
+            cache = LimitedSizeDict(max_size)
+            for key, removed_key in zip(keys, removed_keys):
+                if key not in cache:
+                    cache.add(key, key)
+                if removed_key in cache:
+                    del cache[removed_key]
+
+        number_of_iterations = 3
+        timeit_deque_tracker = timeit.timeit(run_deque_tracker, number=number_of_iterations)
+        timeit_limited_size_dict = timeit.timeit(run_limited_size_dict, number=number_of_iterations)
+        print(
+            f"\ntimeit_deque_tracker:  {timeit_deque_tracker * 1000 / number_of_iterations:.4f}ms, "
+            f"\ntimeit_limited_size_dict:  {timeit_limited_size_dict * 1000 / number_of_iterations:.4f}ms"
+        )
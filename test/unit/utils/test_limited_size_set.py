@@ -13,6 +13,13 @@ class LimitedSizeSetTest(AbstractTestCase):
         for i in range(5):
             self.assertIn(i, self.sut)
 
+    def test_contents(self):
+        self.sut.add(5)
+
+        self.assertEqual({1, 2, 3, 4, 5}, self.sut.contents)
+        self.assertIn(5, self.sut.contents)
+        self.assertEqual([1, 2, 3, 4, 5], list(self.sut.contents))
+
     def test_expiring_items(self):
         self.sut.add(6)
 
@@ -40,3 +47,28 @@ class LimitedSizeSetTest(AbstractTestCase):
         self.sut.add(4)
         self.assertEqual(5, len(self.sut))
         self.assertIn(0, self.sut)
+
+    def test_set_handles_duplicate_items_when_full(self):
+        for _ in range(3):
+            self.sut.add(4)
+        self.sut.add(5)
+        self.sut.add(6)
+
+        self.assertEqual(5, len(self.sut))
+        self.assertEqual([2, 3, 4, 5, 6], list(self.sut))
+
+    def test_move_to_end(self):
+        self.sut.move_to_end(0)
+        self.sut.add(5)
+
+        self.assertEqual(5, len(self.sut))
+        self.assertIn(0, self.sut)
+        self.assertNotIn(1, self.sut)
+
+    def test_remove(self):
+        self.sut.remove(2)
+        self.sut.add(5)
+
+        self.assertEqual([0, 1, 3, 4, 5], list(self.sut))
+        with self.assertRaises(KeyError):
+            self.sut.remove(2)
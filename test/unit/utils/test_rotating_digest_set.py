@@ -0,0 +1,82 @@
+import random
+
+from bxcommon.test_utils import helpers
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.utils.rotating_digest_set import RotatingDigestSet
+
+
+class RotatingDigestSetTest(AbstractTestCase):
+
+    def setUp(self):
+        self.sut = RotatingDigestSet(100)
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            RotatingDigestSet(0)
+
+    def test_add_and_contains(self):
+        rand = random.Random(37)
+        keys = [rand.getrandbits(256).to_bytes(32, "little") for _ in range(100)]
+        for key in keys:
+            self.assertNotIn(key, self.sut)
+            self.sut.add(key)
+
+        for key in keys:
+            self.assertIn(key, self.sut)
+            self.assertIn(memoryview(bytearray(key)), self.sut)
+
+    def test_check_and_add(self):
+        key = helpers.generate_bytes(32)
+        self.assertFalse(self.sut.check_and_add(key))
+        self.assertTrue(self.sut.check_and_add(key))
+        self.assertTrue(self.sut.check_and_add(key))
+
+    def test_add_existing_key_does_not_use_capacity(self):
+        key = helpers.generate_bytes(32)
+        for _ in range(200):
+            self.sut.add(key)
+        self.assertEqual(0, self.sut.rotations)
+        self.assertIn(key, self.sut)
+
+    def test_rotation(self):
+        first_key = helpers.generate_bytes(32)
+        self.sut.add(first_key)
+        for _ in range(99):
+            self.sut.add(helpers.generate_bytes(32))
+        self.assertEqual(0, self.sut.rotations)
+
+        # first key is remembered by the previous generation
+        self.sut.add(helpers.generate_bytes(32))
+        self.assertEqual(1, self.sut.rotations)
+        self.assertIn(first_key, self.sut)
+
+        for _ in range(100):
+            self.sut.add(helpers.generate_bytes(32))
+        self.assertEqual(2, self.sut.rotations)
+        self.assertNotIn(first_key, self.sut)
+
+    def test_check_and_add_refreshes_previous_generation_keys(self):
+        key = helpers.generate_bytes(32)
+        self.sut.add(key)
+        for _ in range(100):
+            self.sut.add(helpers.generate_bytes(32))
+
+        self.assertTrue(self.sut.check_and_add(key))
+        for _ in range(99):
+            self.sut.add(helpers.generate_bytes(32))
+        self.assertEqual(2, self.sut.rotations)
+        self.assertIn(key, self.sut)
+
+    def test_no_false_positives(self):
+        digest_set = RotatingDigestSet(10000)
+        for _ in range(10000):
+            digest_set.add(helpers.generate_bytes(32))
+
+        false_positives = sum(helpers.generate_bytes(32) in digest_set for _ in range(10000))
+        self.assertEqual(0, false_positives)
+
+    def test_clear(self):
+        key = helpers.generate_bytes(32)
+        self.sut.add(key)
+        self.sut.clear()
+        self.assertNotIn(key, self.sut)
@@ -0,0 +1,207 @@
+import random
+import time
+import timeit
+from typing import List
+from unittest import skip
+
+from mock import patch, MagicMock
+
+from bxcommon.test_utils.abstract_test_case import AbstractTestCase
+from bxcommon.utils.alarm_queue import AlarmQueue, AlarmId
+from bxcommon.utils.timing_wheel_alarm_queue import TimingWheelAlarmQueue
+
+
+class TimingWheelAlarmQueueTest(AbstractTestCase):
+
+    def setUp(self):
+        self.time = MagicMock(return_value=time.time())
+        time_patch = patch("time.time", self.time)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+        self.alarm_queue = TimingWheelAlarmQueue()
+        self.fired = []
+
+    def _advance_time(self, seconds: float) -> None:
+        self.time.return_value += seconds
+
+    def _fire(self, name, result=None):
+        self.fired.append(name)
+        return result
+
+    def test_fire_alarms_in_order_across_levels(self):
+        delays = [100, 0.5, 0.0005, 2, 7 * 24 * 60 * 60, 0.01, 0.5, 30]
+        for i, delay in enumerate(delays):
+            self.alarm_queue.register_alarm(delay, self._fire, i)
+
+        expected = [i for i, _delay in sorted(enumerate(delays), key=lambda item: item[1])]
+        for time_jump in [0.001, 0.1, 1, 10, 60, 3600, 8 * 24 * 60 * 60]:
+            self._advance_time(time_jump)
+            self.alarm_queue.fire_alarms()
+
+        self.assertEqual(expected, self.fired)
+        self.assertIsNone(self.alarm_queue.time_to_next_alarm())
+
+    def test_fire_alarms_in_order_after_single_jump(self):
+        delays = [100, 0.5, 0.0005, 2, 7 * 24 * 60 * 60, 0.01, 0.5, 30]
+        for i, delay in enumerate(delays):
+            self.alarm_queue.register_alarm(delay, self._fire, i)
+
+        expected = [i for i, _delay in sorted(enumerate(delays), key=lambda item: item[1])]
+        self._advance_time(8 * 24 * 60 * 60)
+        self.alarm_queue.fire_alarms()
+
+        self.assertEqual(expected, self.fired)
+
+    def test_alarm_does_not_fire_early(self):
+        self.alarm_queue.register_alarm(1.0005, self._fire, "alarm")
+
+        self._advance_time(1.0004)
+        self.alarm_queue.fire_alarms()
+        self.assertEqual([], self.fired)
+        self.assertLess(0, self.alarm_queue.time_to_next_alarm())
+
+        self._advance_time(0.0001)
+        self.assertGreaterEqual(0, self.alarm_queue.time_to_next_alarm())
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(["alarm"], self.fired)
+
+    def test_unregister_alarm(self):
+        alarm_id = self.alarm_queue.register_alarm(1, self._fire, "canceled")
+        self.alarm_queue.register_alarm(2, self._fire, "alarm")
+        self.assertAlmostEqual(1, self.alarm_queue.time_to_next_alarm(), places=3)
+
+        self.alarm_queue.unregister_alarm(alarm_id)
+        self.assertAlmostEqual(2, self.alarm_queue.time_to_next_alarm(), places=3)
+        self.assertEqual(1, self.alarm_queue.cancelled_count)
+
+        self._advance_time(3)
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(["alarm"], self.fired)
+        self.assertFalse(self.alarm_queue._has_alarms())
+        self.assertEqual(0, self.alarm_queue.cancelled_count)
+
+    def test_reschedule_alarm(self):
+        self.alarm_queue.register_alarm(1, self._fire, "alarm", 5)
+
+        self._advance_time(1)
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(["alarm"], self.fired)
+        self.assertAlmostEqual(5, self.alarm_queue.time_to_next_alarm(), places=3)
+
+        self._advance_time(5)
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(["alarm", "alarm"], self.fired)
+
+    def test_fire_ready_alarms(self):
+        self.alarm_queue.register_alarm(0.0001, self._fire, "first")
+        self.alarm_queue.register_alarm(0.0002, self._fire, "second")
+        self.alarm_queue.register_alarm(5, self._fire, "third")
+
+        self._advance_time(0.0003)
+        time_to_next_alarm = self.alarm_queue.fire_ready_alarms()
+
+        self.assertEqual(["first", "second"], self.fired)
+        self.assertAlmostEqual(5 - 0.0003, time_to_next_alarm, places=3)
+
+    def test_same_order_as_heap_alarm_queue(self):
+        random.seed(7)
+        heap_queue = AlarmQueue()
+        heap_fired = []
+        wheel_fired = []
+        heap_alarms: List[AlarmId] = []
+        wheel_alarms: List[AlarmId] = []
+
+        for i in range(3000):
+            action = random.random()
+            if action < 0.5:
+                delay = random.choice([0, 0.0003, 0.002, 0.1, 1, 30, 700]) * random.random()
+                heap_alarms.append(heap_queue.register_alarm(delay, heap_fired.append, i))
+                wheel_alarms.append(self.alarm_queue.register_alarm(delay, wheel_fired.append, i))
+            elif action < 0.6 and heap_alarms:
+                index = random.randrange(len(heap_alarms))
+                heap_queue.unregister_alarm(heap_alarms[index])
+                self.alarm_queue.unregister_alarm(wheel_alarms[index])
+            else:
+                self._advance_time(random.choice([0.0001, 0.001, 0.05, 2]) * random.random())
+                heap_queue.fire_alarms()
+                self.alarm_queue.fire_alarms()
+                self.assertEqual(heap_fired, wheel_fired)
+                # the heap may still hold canceled alarms at its head
+                next_fire_time = min(
+                    (alarm_id.fire_time for alarm_id in heap_queue.alarms if alarm_id.is_active), default=None
+                )
+                self.assertEqual(next_fire_time, self.alarm_queue._next_fire_time())
+
+        self._advance_time(1000)
+        heap_queue.fire_alarms()
+        self.alarm_queue.fire_alarms()
+        self.assertEqual(heap_fired, wheel_fired)
+
+    def test_same_order_as_heap_alarm_queue_beyond_wheel_range(self):
+        day_s = 24 * 60 * 60
+
+        def fire(fired: List[int], i: int, reschedule_delay: float) -> float:
+            fired.append(i)
+            return reschedule_delay
+
+        for seed in range(20):
+            random.seed(seed)
+            alarm_queue = TimingWheelAlarmQueue()
+            heap_queue = AlarmQueue()
+            heap_fired = []
+            wheel_fired = []
+            heap_alarms: List[AlarmId] = []
+            wheel_alarms: List[AlarmId] = []
+
+            for i in range(300):
+                action = random.random()
+                if action < 0.5:
+                    # delays past the range of the wheel, about 50 days
+                    delay = random.choice([1, 10 * day_s, 120 * day_s]) * random.random()
+                    reschedule_delay = random.choice([0, 30 * day_s, 100 * day_s])
+                    heap_alarms.append(heap_queue.register_alarm(delay, fire, heap_fired, i, reschedule_delay))
+                    wheel_alarms.append(alarm_queue.register_alarm(delay, fire, wheel_fired, i, reschedule_delay))
+                elif action < 0.6 and heap_alarms:
+                    index = random.randrange(len(heap_alarms))
+                    heap_queue.unregister_alarm(heap_alarms[index])
+                    alarm_queue.unregister_alarm(wheel_alarms[index])
+                else:
+                    self._advance_time(random.choice([60, 3600, 5 * day_s]) * random.random())
+                    heap_queue.fire_alarms()
+                    alarm_queue.fire_alarms()
+                    self.assertEqual(heap_fired, wheel_fired)
+                    next_fire_time = min(
+                        (alarm_id.fire_time for alarm_id in heap_queue.alarms if alarm_id.is_active), default=None
+                    )
+                    self.assertEqual(next_fire_time, alarm_queue._next_fire_time())
+
+    @skip("Run this test only for local debugging")
+    def test_performance_against_heap(self):
+        clock = [time.time()]
+
+        def run(alarm_queue: AlarmQueue) -> None:
+            # periodic alarms, and expiration alarms of which a third are canceled before firing
+            random.seed(1)
+            for _ in range(20):
+                alarm_queue.register_alarm(0.01, lambda: 0.01)
+            alarm_ids = []
+            for i in range(50000):
+                alarm_ids.append(alarm_queue.register_alarm(10 + 590 * random.random(), lambda: None))
+                if i % 3 == 0:
+                    alarm_queue.unregister_alarm(alarm_ids[random.randrange(len(alarm_ids))])
+                if i % 100 == 0:
+                    clock[0] += 0.002
+                    alarm_queue.fire_alarms()
+            for _ in range(700):
+                clock[0] += 1
+                alarm_queue.fire_alarms()
+
+        number_of_iterations = 3
+        with patch("time.time", lambda: clock[0]):
+            timeit_heap = timeit.timeit(lambda: run(AlarmQueue()), number=number_of_iterations)
+            timeit_wheel = timeit.timeit(lambda: run(TimingWheelAlarmQueue()), number=number_of_iterations)
+        print(
+            f"\ntimeit_heap_alarm_queue:  {timeit_heap * 1000 / number_of_iterations:.4f}ms, "
+            f"\ntimeit_timing_wheel_alarm_queue:  {timeit_wheel * 1000 / number_of_iterations:.4f}ms"
+        )